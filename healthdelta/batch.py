@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import concurrent.futures
+import contextlib
+import io
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from healthdelta.operator import run_all
+from healthdelta.progress import progress
+from healthdelta.state import state_lock, write_last_run_id
+
+
+@dataclass(frozen=True)
+class _BatchItem:
+    index: int
+    input_path: str
+    base_out: str
+    state_dir: str
+    since: str
+    # False for exports sharing a state dir: run_batch writes that dir's LAST_RUN once, after the pool finishes.
+    record_last_run: bool
+
+
+def _parse_inputs_file(path: Path) -> list[tuple[str, str | None]]:
+    """
+    One export per line: `<input>` or `<input>\\t<base_out>`. Blank lines and `#` comments are skipped.
+    """
+    out: list[tuple[str, str | None]] = []
+    for raw in path.read_text(encoding="utf-8").splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        if "\t" in line:
+            inp, out_dir = [x.strip() for x in line.split("\t", 1)]
+            out.append((inp, out_dir or None))
+        else:
+            out.append((line, None))
+    return out
+
+
+def _plan_items(
+    entries: list[tuple[str, str | None]], *, base_out: str, state_dir: str | None
+) -> list[_BatchItem]:
+    resolved: list[tuple[str, str, str]] = []
+    for inp, out_dir in entries:
+        item_out = out_dir or base_out
+        item_state = state_dir if state_dir is not None else str(Path(item_out) / "state")
+        resolved.append((inp, item_out, item_state))
+
+    # LAST_RUN chaining only makes sense for an export that owns its state dir; exports sharing one state dir run
+    # in parallel without a parent (run_id then depends only on the input fingerprint) and leave LAST_RUN alone.
+    state_users: dict[str, int] = {}
+    for _, _, st in resolved:
+        key = Path(st).resolve().as_posix()
+        state_users[key] = state_users.get(key, 0) + 1
+
+    items: list[_BatchItem] = []
+    for i, (inp, item_out, item_state) in enumerate(resolved, start=1):
+        shared = state_users[Path(item_state).resolve().as_posix()] > 1
+        items.append(
+            _BatchItem(
+                index=i,
+                input_path=inp,
+                base_out=item_out,
+                state_dir=item_state,
+                since="" if shared else "last",
+                record_last_run=not shared,
+            )
+        )
+    return items
+
+
+def _run_batch_item(item: _BatchItem, mode: str, jobs: int) -> dict[str, object]:
+    # Worker process: progress off (parallel workers would interleave), capture the operator summary lines.
+    progress.configure(mode="never")
+    buf = io.StringIO()
+    started = time.monotonic()
+    result: dict[str, object] = {"index": item.index, "status": "failed", "run_id": None, "error": None}
+    try:
+        with contextlib.redirect_stdout(buf):
+            run_all(
+                input_path=item.input_path,
+                base_out=item.base_out,
+                state_dir=item.state_dir,
+                since=item.since,
+                mode=mode,
+                jobs=jobs,
+                record_last_run=item.record_last_run,
+            )
+        kv = dict(line.split("=", 1) for line in buf.getvalue().splitlines() if "=" in line)
+        result["status"] = kv.get("status") or "failed"
+        result["run_id"] = kv.get("run_id") or None
+    except Exception as e:
+        # Exception messages can embed input paths; only the type is reported.
+        result["error"] = type(e).__name__
+    result["elapsed_s"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def _record_shared_last_runs(items: list[_BatchItem], results: list[dict[str, object]]) -> None:
+    # A shared state dir's LAST_RUN is the run of its last export in input order (not the last one to finish);
+    # failed exports are passed over.
+    last: dict[str, tuple[str, str]] = {}
+    by_index = {int(r["index"]): r for r in results}
+    for item in items:
+        run_id = by_index[item.index].get("run_id")
+        if not item.record_last_run and isinstance(run_id, str) and by_index[item.index]["status"] != "failed":
+            last[Path(item.state_dir).resolve().as_posix()] = (item.state_dir, run_id)
+    for state_dir, run_id in last.values():
+        with state_lock(state_dir):
+            write_last_run_id(state_dir, run_id)
+
+
+def run_batch(
+    *,
+    inputs_file: str,
+    base_out: str = "data",
+    state_dir: str | None = None,
+    mode: str = "share",
+    workers: int = 1,
+    jobs: int = 1,
+    summary_out: str | None = None,
+) -> int:
+    """
+    Run `run all` for every export listed in `inputs_file` on a process pool of `workers`.
+
+    Shared-state writes are serialized by SQLite transactions (registry, identity) and the operator's state-dir
+    file lock, and identical inputs landing on the same run_id are serialized by its per-run lock. Workers sharing
+    a state dir do not write its LAST_RUN: it is set once after the pool finishes, to the run of the last export
+    listed (in `inputs_file` order) that did not fail.
+    """
+    if mode not in {"local", "share"}:
+        raise ValueError("--mode must be one of: local, share")
+    if int(workers) < 1:
+        raise ValueError("--workers must be >= 1")
+
+    entries = _parse_inputs_file(Path(inputs_file))
+    items = _plan_items(entries, base_out=base_out, state_dir=state_dir)
+
+    started = time.monotonic()
+    results: list[dict[str, object]] = []
+    with progress.phase("batch: run exports"):
+        task = progress.task("batch: run exports", total=len(items), unit="exports")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=int(workers)) as pool:
+            futures = [pool.submit(_run_batch_item, item, mode, int(jobs)) for item in items]
+            for fut in concurrent.futures.as_completed(futures):
+                results.append(fut.result())
+                task.advance(1)
+
+    results.sort(key=lambda r: int(r["index"]))
+    _record_shared_last_runs(items, results)
+    failed = [r for r in results if r["status"] == "failed"]
+    summary = {
+        "schema_version": 1,
+        "exports": results,
+        "totals": {
+            "exports": len(results),
+            "failed": len(failed),
+            "by_status": {
+                s: sum(1 for r in results if r["status"] == s) for s in sorted({str(r["status"]) for r in results})
+            },
+            "workers": int(workers),
+            "elapsed_s": round(time.monotonic() - started, 3),
+        },
+    }
+
+    for r in results:
+        err = f" error={r['error']}" if r.get("error") else ""
+        print(f"export={r['index']} status={r['status']} run_id={r['run_id'] or ''} elapsed_s={r['elapsed_s']}{err}")
+    print(f"batch exports={len(results)} failed={len(failed)} elapsed_s={summary['totals']['elapsed_s']}")
+
+    if summary_out:
+        out = Path(summary_out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(summary, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    return 1 if failed else 0
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+
+from healthdelta.state import base_dir_for_state, file_lock, load_registry, resolve_state_paths, state_lock
+
+
+# Content-addressed store for staged input files, shared by every run of a state dir. Run dirs hold hardlinks to
+# the blobs, so an unchanged clinical JSON or export_cda.xml costs disk space once across all runs.
+BLOBS_DIRNAME = "blobs"
+
+
+def default_store(state_dir: str) -> Path:
+    return resolve_state_paths(state_dir).state_dir / BLOBS_DIRNAME
+
+
+def store_lock(store: Path, *, shared: bool = False):
+    """
+    Lock guarding the store against `gc`: staging holds it shared while it adopts blobs and until its staged manifest
+    is where the registry points; `gc` holds it exclusively.
+    """
+    return file_lock(store / ".lock", shared=shared)
+
+
+def blob_path(store: Path, sha256: str) -> Path:
+    return store / "sha256" / sha256[:2] / sha256
+
+
+def _tmp_name(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def link_from_store(store: Path, sha256: str, *, dst: Path, size_bytes: int) -> bool:
+    """
+    Stage `dst` as a hardlink to the blob for `sha256` when the store has it (checked by size). Returns False when
+    the caller has to write the file itself (no blob, or the filesystem can't link).
+    """
+    blob = blob_path(store, sha256)
+    try:
+        if blob.stat().st_size != size_bytes:
+            return False
+        if dst.is_symlink() or dst.exists():
+            dst.unlink()
+        os.link(blob, dst)
+    except OSError:
+        return False
+    return True
+
+
+def adopt(store: Path, path: Path, sha256: str) -> None:
+    """
+    Deduplicate a freshly staged file (sha256 already computed): replace it with a hardlink to the existing blob,
+    or make it the blob. Best effort: a store on another filesystem just leaves the staged copy in place.
+    """
+    blob = blob_path(store, sha256)
+    try:
+        st = path.stat()
+        try:
+            bst = blob.stat()
+        except FileNotFoundError:
+            bst = None
+        if bst is not None and bst.st_size == st.st_size:
+            if (bst.st_dev, bst.st_ino) == (st.st_dev, st.st_ino):
+                return
+            tmp = _tmp_name(path)
+            os.link(blob, tmp)
+            os.replace(tmp, path)
+            return
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _tmp_name(blob)
+        os.link(path, tmp)
+        os.replace(tmp, blob)
+    except OSError:
+        return
+
+
+def _referenced_digests(state_dir: str) -> set[str]:
+    base = base_dir_for_state(resolve_state_paths(state_dir).state_dir)
+    out: set[str] = set()
+    for entry in load_registry(state_dir).values():
+        artifacts = entry.get("artifacts") if isinstance(entry.get("artifacts"), dict) else {}
+        staging_dir = artifacts.get("staging_dir")
+        if not isinstance(staging_dir, str):
+            continue
+        manifest_path = base / staging_dir / "manifest.json"
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            continue
+        files = manifest.get("files") if isinstance(manifest, dict) else None
+        for f in files if isinstance(files, list) else []:
+            if isinstance(f, dict) and isinstance(f.get("sha256"), str):
+                out.add(f["sha256"])
+    return out
+
+
+def gc(*, state_dir: str, dry_run: bool = False) -> dict[str, int]:
+    """
+    Remove blobs not listed in the staged manifest of any run in the registry (a deleted run dir no longer
+    references its blobs). Run dirs hold their own hardlinks, so removing a blob never removes staged data;
+    `freed_bytes` counts only blobs that were linked nowhere else.
+
+    Runs under the state lock (no run registers meanwhile) and the exclusive store lock, so it waits for in-flight
+    staging to finish adopting blobs.
+    """
+    store = default_store(state_dir)
+    with state_lock(state_dir), store_lock(store):
+        return _gc_store(store, state_dir=state_dir, dry_run=dry_run)
+
+
+def _gc_store(store: Path, *, state_dir: str, dry_run: bool) -> dict[str, int]:
+    referenced = _referenced_digests(state_dir)
+    stats = {"blobs": 0, "referenced": 0, "removed": 0, "freed_bytes": 0}
+    root = store / "sha256"
+    if not root.is_dir():
+        return stats
+    for blob in sorted(p for p in root.glob("*/*") if p.is_file()):
+        if blob.name.startswith("."):
+            # Leftover temp link from an interrupted ingest.
+            if not dry_run:
+                blob.unlink(missing_ok=True)
+            continue
+        stats["blobs"] += 1
+        if blob.name in referenced:
+            stats["referenced"] += 1
+            continue
+        st = blob.stat()
+        stats["removed"] += 1
+        if st.st_nlink == 1:
+            stats["freed_bytes"] += st.st_size
+        if not dry_run:
+            blob.unlink(missing_ok=True)
+    return stats
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+
+# Durable progress for long stages (ingest of a multi-GB export.zip, NDJSON export of a multi-GB export.xml), so a
+# rerun of the same run_id continues instead of starting over. Checkpoints are tagged with a key derived from the
+# stage's inputs and options: one written for different inputs is ignored. They hold clinical-derived data and
+# live inside the (local-only) run dirs; stages remove them once their outputs are complete.
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def fsync_file(path: Path) -> None:
+    # Data a checkpoint refers to must be on disk before the checkpoint that says it is complete.
+    with path.open("rb") as f:
+        os.fsync(f.fileno())
+
+
+class Journal:
+    """
+    Append-only JSON-lines checkpoint: a header line with the key, then one line per completed unit of work.
+    Opening it with a different key (or an unreadable header) starts a fresh journal. A torn last line (killed
+    mid-write) is ignored, as is everything after it.
+
+    Entries reach the OS on every append (a killed process loses nothing) and the disk at most SYNC_INTERVAL_S
+    later (a crash of the machine loses the last few, which are redone).
+    """
+
+    SYNC_INTERVAL_S = 1.0
+
+    def __init__(self, path: Path, *, key: str) -> None:
+        self.path = path
+        self.entries: list[dict[str, Any]] = []
+        lines: list[str] = []
+        try:
+            lines = path.read_text(encoding="utf-8").split("\n")
+        except (OSError, UnicodeDecodeError):
+            pass
+        header = _loads(lines[0]) if lines else None
+        if isinstance(header, dict) and header.get("key") == key:
+            for line in lines[1:]:
+                entry = _loads(line)
+                if not isinstance(entry, dict):
+                    break
+                self.entries.append(entry)
+            # Drop a torn tail so new entries start on a fresh line.
+            self._rewrite([header, *self.entries])
+        else:
+            self._rewrite([{"key": key}])
+        self._synced_at = time.monotonic()
+
+    def _rewrite(self, objs: list[dict[str, Any]]) -> None:
+        write_text_atomic(self.path, "".join(_dumps(o) + "\n" for o in objs))
+
+    def append(self, entry: dict[str, Any]) -> None:
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(_dumps(entry) + "\n")
+            f.flush()
+            if time.monotonic() - self._synced_at >= self.SYNC_INTERVAL_S:
+                os.fsync(f.fileno())
+                self._synced_at = time.monotonic()
+        self.entries.append(entry)
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def _dumps(obj: object) -> str:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"))
+
+
+def _loads(line: str) -> Any:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+def write_text_atomic(path: Path, text: str) -> None:
+    # tmp + fsync + rename: a reader sees the previous checkpoint or the new one, never a torn file.
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp.replace(path)
+    _fsync_dir(path.parent)
+
+
+def write_json_atomic(path: Path, obj: object) -> None:
+    write_text_atomic(path, json.dumps(obj, indent=2, sort_keys=True) + "\n")
+
+
+def read_json(path: Path, *, key: str) -> dict[str, Any] | None:
+    """The checkpoint object at `path` if it was written with `key`, else None."""
+    try:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError):
+        return None
+    if not isinstance(obj, dict) or obj.get("key") != key:
+        return None
+    return obj
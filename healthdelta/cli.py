@@ -1,8 +1,9 @@
 import argparse
+import os
 import sys
 from pathlib import Path
 
-from healthdelta.ingest import ingest_ios_to_staging, ingest_to_staging
+from healthdelta.ingest import STAGING_MODES, ZIP_MEMBER_MODES, ingest_ios_to_staging, ingest_to_staging
 from healthdelta.deid import deidentify_run
 from healthdelta.identity import build_identity, confirm_identity_link, review_identity_links
 from healthdelta.duckdb_tools import build_duckdb, query_duckdb
@@ -11,12 +12,22 @@ from healthdelta.ndjson_validate import validate_ndjson_dir
 from healthdelta.pipeline import run_pipeline
 from healthdelta.reporting import build_report, show_report
 from healthdelta.operator import run_all as run_all_operator
+from healthdelta.batch import run_batch as run_batch_operator
+from healthdelta.blob_store import gc as blob_gc
 from healthdelta.note import build_doctor_note
-from healthdelta.profile import build_export_profile
+from healthdelta.profile import PROFILE_CACHE, build_export_profile
 from healthdelta.state import register_existing_run_dir
-from healthdelta.share_bundle import build_share_bundle, verify_share_bundle
+from healthdelta.share_bundle import (
+    apply_share_bundle,
+    build_share_bundle,
+    extract_share_bundle_file,
+    verify_share_bundle,
+)
 from healthdelta.version import get_build_info
 from healthdelta.backend_server import serve as serve_backend
+from healthdelta.daemon import run_daemon
+from healthdelta import file_reader
+from healthdelta.parse_cache import parse_cache
 from healthdelta.progress import progress
 
 
@@ -81,6 +92,17 @@ def main(argv: list[str] | None = None) -> int:
     parser.add_argument("--progress", default="auto", choices=["auto", "always", "never"], help="Progress output mode")
     parser.add_argument("--log-progress-every", default=5, type=float, help="Line-mode progress cadence in seconds")
     parser.add_argument("--quiet", action="store_true", help="Reduce progress output verbosity")
+    parser.add_argument(
+        "--io-workers",
+        default=file_reader.DEFAULT_IO_WORKERS,
+        type=int,
+        help=f"Threads for small-file reads/copies/hashing (default: {file_reader.DEFAULT_IO_WORKERS})",
+    )
+    parser.add_argument(
+        "--parse-cache-dir",
+        default=None,
+        help="Persist parsed clinical JSON here, keyed by sha256, for stages run as separate commands (local-only)",
+    )
     sub = parser.add_subparsers(dest="command", required=True)
 
     version_cmd = sub.add_parser("version", help="Print share-safe build/version information")
@@ -90,16 +112,48 @@ def main(argv: list[str] | None = None) -> int:
     serve_cmd.add_argument("--host", default="0.0.0.0", help="Bind host (default: 0.0.0.0)")
     serve_cmd.add_argument("--port", type=int, default=8080, help="Bind port (default: 8080)")
 
+    daemon_cmd = sub.add_parser("daemon", help="Watch an inbox and run new exports through `run all` (warm process)")
+    daemon_cmd.add_argument("--watch", required=True, help="Inbox directory receiving export.zip files or export dirs")
+    daemon_cmd.add_argument("--out", default="data", help="Base output directory (default: data)")
+    daemon_cmd.add_argument("--state", default=None, help="State directory (default: <base_out>/state)")
+    daemon_cmd.add_argument("--mode", default="share", choices=["local", "share"], help="Run mode (default: share)")
+    daemon_cmd.add_argument("--jobs", type=int, default=2, help="Max concurrent steps within each run (default: 2)")
+    daemon_cmd.add_argument(
+        "--max-exports", type=int, default=2, help="Max exports processed at once (default: 2; see runbook)"
+    )
+    daemon_cmd.add_argument("--interval", type=float, default=5.0, help="Inbox poll interval in seconds (default: 5)")
+    daemon_cmd.add_argument("--once", action="store_true", help="Process currently settled exports, then exit")
+
     ingest = sub.add_parser("ingest", help="Stage Apple Health export input deterministically")
     ingest.add_argument("variant", nargs="?", choices=["ios"], help="Ingest variant (default: apple health export)")
     ingest.add_argument("--input", required=True, help="Path to export.zip or an unpacked export directory")
     ingest.add_argument("--out", default="data/staging", help="Staging root directory (default: data/staging)")
+    ingest.add_argument(
+        "--staging-mode",
+        default="copy",
+        choices=list(STAGING_MODES),
+        help="How input files are staged: copy (default), hardlink, reflink, or reference (symlink, pinned by sha256)",
+    )
+    ingest.add_argument(
+        "--blob-store", default=None, help="Deduplicate staged files into this content-addressed store (hardlinks)"
+    )
+    ingest.add_argument(
+        "--zip-members",
+        default="extract",
+        choices=list(ZIP_MEMBER_MODES),
+        help="Zip input: extract members into staging (default) or read them straight from export.zip (virtual)",
+    )
 
     identity = sub.add_parser("identity", help="Build canonical identity registry")
     identity_sub = identity.add_subparsers(dest="identity_command", required=True)
 
     identity_build = identity_sub.add_parser("build", help="Build canonical people + aliases from a staging run")
     identity_build.add_argument("--input", required=True, help="Path to data/staging/<run_id>")
+    identity_build.add_argument(
+        "--no-aliases-json",
+        action="store_true",
+        help="Do not re-export aliases.json (identity.sqlite stays authoritative)",
+    )
 
     identity_review = identity_sub.add_parser("review", help="List unverified PersonLinks (share-safe)")
     identity_review.add_argument("--identity", default="data/identity", help="Identity directory (default: data/identity)")
@@ -125,6 +179,21 @@ def main(argv: list[str] | None = None) -> int:
     pipeline_run.add_argument("--state", default=None, help="State directory (default: <base_out>/state)")
     pipeline_run.add_argument("--since", default="last", help="Parent run selector: 'last' (default) or an explicit run_id")
     pipeline_run.add_argument("--note", default=None, help="Optional run note (stored in run registry)")
+    pipeline_run.add_argument(
+        "--staging-mode",
+        default="copy",
+        choices=list(STAGING_MODES),
+        help="How input files are staged: copy (default), hardlink, reflink, or reference (symlink, pinned by sha256)",
+    )
+    pipeline_run.add_argument(
+        "--no-blob-store", action="store_true", help="Copy staged files instead of linking them from <state>/blobs"
+    )
+    pipeline_run.add_argument(
+        "--zip-members",
+        default="extract",
+        choices=list(ZIP_MEMBER_MODES),
+        help="Zip input: extract members into staging (default) or read them straight from export.zip (virtual)",
+    )
 
     run_cmd = sub.add_parser("run", help="Run registry commands (stateful)")
     run_sub = run_cmd.add_subparsers(dest="run_command", required=True)
@@ -142,6 +211,45 @@ def main(argv: list[str] | None = None) -> int:
     run_all.add_argument("--mode", default="share", choices=["local", "share"], help="Run mode (default: share)")
     run_all.add_argument("--note", default=None, help="Optional run note (stored in run registry)")
     run_all.add_argument("--skip-note", action="store_true", help="Skip doctor note generation")
+    run_all.add_argument(
+        "--jobs", type=int, default=2, help="Max pipeline steps run concurrently when dependencies allow (default: 2)"
+    )
+    run_all.add_argument(
+        "--staging-mode",
+        default="copy",
+        choices=list(STAGING_MODES),
+        help="How input files are staged: copy (default), hardlink, reflink, or reference (symlink, pinned by sha256)",
+    )
+    run_all.add_argument(
+        "--no-blob-store", action="store_true", help="Copy staged files instead of linking them from <state>/blobs"
+    )
+    run_all.add_argument(
+        "--zip-members",
+        default="extract",
+        choices=list(ZIP_MEMBER_MODES),
+        help="Zip input: extract members into staging (default) or read them straight from export.zip (virtual)",
+    )
+    run_all.add_argument(
+        "--sample-fraction",
+        type=float,
+        default=None,
+        help="Sampled preview: run a deterministic, hash-selected fraction (0 < f <= 1) of records/clinical files",
+    )
+
+    run_batch = run_sub.add_parser("batch", help="Run `run all` for many exports on a process pool")
+    run_batch.add_argument(
+        "--inputs-file", required=True, help="Text file: one export path per line (optional TAB + per-export --out)"
+    )
+    run_batch.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    run_batch.add_argument("--out", default="data", help="Base output directory (default: data)")
+    run_batch.add_argument("--state", default=None, help="State directory (default: <base_out>/state)")
+    run_batch.add_argument("--mode", default="share", choices=["local", "share"], help="Run mode (default: share)")
+    run_batch.add_argument("--jobs", type=int, default=1, help="Concurrent steps within each export (default: 1)")
+    run_batch.add_argument("--summary-out", default=None, help="Optional path for the batch summary JSON")
+
+    gc_cmd = sub.add_parser("gc", help="Remove blob-store files that no run in the registry references")
+    gc_cmd.add_argument("--state", default="data/state", help="State directory (default: data/state)")
+    gc_cmd.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
 
     export = sub.add_parser("export", help="Export canonical, share-safe datasets")
     export_sub = export.add_subparsers(dest="export_command", required=True)
@@ -150,12 +258,35 @@ def main(argv: list[str] | None = None) -> int:
     export_nd.add_argument("--input", required=True, help="Path to pipeline run dir (staging/<run_id> or deid/<run_id>)")
     export_nd.add_argument("--out", required=True, help="Output directory for NDJSON streams")
     export_nd.add_argument("--mode", default="local", choices=["local", "share"], help="Export mode (default: local)")
-
-    export_profile = export_sub.add_parser("profile", help="Profile an unpacked Apple Health export directory (share-safe)")
-    export_profile.add_argument("--input", required=True, help="Path to an unpacked export directory")
+    export_nd.add_argument(
+        "--sample-fraction",
+        type=float,
+        default=None,
+        help="Export a deterministic, hash-selected fraction (0 < f <= 1) of records/clinical files (marked sampled)",
+    )
+
+    export_profile = export_sub.add_parser("profile", help="Profile an Apple Health export directory or export.zip (share-safe)")
+    export_profile.add_argument("--input", required=True, help="Path to an unpacked export directory or export.zip")
     export_profile.add_argument("--out", required=True, help="Output directory for profile artifacts")
-    export_profile.add_argument("--sample-json", type=int, default=200, help="Deterministic sample size for clinical JSON (0=all)")
+    export_profile.add_argument(
+        "--sample-json", type=int, default=0, help="Deterministic sample size for clinical JSON (default: 0 = all)"
+    )
     export_profile.add_argument("--top-files", type=int, default=20, help="Number of largest files to list (default: 20)")
+    export_profile.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes scanning large export.xml / export_cda.xml files in segments (default: CPU count)",
+    )
+    export_profile.add_argument(
+        "--mode",
+        default="share",
+        choices=["local", "share"],
+        help="Profile mode (default: share; local adds first/last start days per HealthKit type)",
+    )
+    export_profile.add_argument(
+        "--no-cache", action="store_true", help=f"Rescan everything; do not read or write --out/{PROFILE_CACHE}"
+    )
 
     export_validate = export_sub.add_parser("validate", help="Validate canonical NDJSON streams (share-safe, deterministic)")
     export_validate.add_argument("--input", required=True, help="Directory containing canonical NDJSON streams")
@@ -182,6 +313,12 @@ def main(argv: list[str] | None = None) -> int:
     report_build.add_argument("--db", required=True, help="DuckDB file path")
     report_build.add_argument("--out", required=True, help="Output directory for report artifacts")
     report_build.add_argument("--mode", default="local", choices=["local", "share"], help="Report mode (default: local)")
+    report_build.add_argument("--threads", type=int, default=1, help="DuckDB worker threads (default: 1; output is identical)")
+    report_build.add_argument(
+        "--hash-db",
+        action="store_true",
+        help="Also record a full-file sha256 of the DB in summary.json (slow for large DBs)",
+    )
 
     report_show = report_sub.add_parser("show", help="Print a short deterministic report summary to stdout")
     report_show.add_argument("--db", required=True, help="DuckDB file path")
@@ -200,10 +337,31 @@ def main(argv: list[str] | None = None) -> int:
     share_bundle = share_sub.add_parser("bundle", help="Create a deterministic tar.gz containing share-safe artifacts only")
     share_bundle.add_argument("--run", required=True, help="Path to operator run root: <base_out>/<run_id>")
     share_bundle.add_argument("--out", required=True, help="Output .tar.gz path")
+    share_bundle.add_argument(
+        "--base", default=None, help="Previous bundle_manifest.csv; only files that differ from it are archived (delta bundle)"
+    )
+    share_bundle.add_argument(
+        "--format",
+        default="tar.gz",
+        choices=["tar.gz", "indexed"],
+        help="Archive format (default: tar.gz); 'indexed' adds per-file gzip members + an offset index for random access",
+    )
 
     share_verify = share_sub.add_parser("verify", help="Verify a share bundle (allowlist + manifest hashes)")
     share_verify.add_argument("--bundle", required=True, help="Path to a .tar.gz share bundle")
 
+    share_extract = share_sub.add_parser("extract", help="Extract and verify a single file from a share bundle")
+    share_extract.add_argument("--bundle", required=True, help="Path to a .tar.gz share bundle")
+    share_extract.add_argument("--path", required=True, help="Run-relative file path (e.g., reports/summary.json)")
+    share_extract.add_argument("--out", required=True, help="Output file path")
+
+    share_apply = share_sub.add_parser("apply", help="Reconstruct and verify a full run tree from a (delta) share bundle")
+    share_apply.add_argument("--bundle", required=True, help="Path to a .tar.gz share bundle")
+    share_apply.add_argument("--out", required=True, help="Output directory (the tree is written to <out>/<run_id>/)")
+    share_apply.add_argument(
+        "--base", default=None, help="Previous bundle .tar.gz or directory containing its <run_id>/ tree (delta bundles)"
+    )
+
     try:
         args = parser.parse_args(argv)
     except SystemExit as e:
@@ -221,20 +379,44 @@ def main(argv: list[str] | None = None) -> int:
             print(f"git_sha={sha}")
         return 0
 
+    parse_cache.configure(disk_dir=args.parse_cache_dir)
+    try:
+        file_reader.configure(workers=int(args.io_workers))
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+
     rc = 0
     try:
         if args.command == "serve":
             serve_backend(host=str(args.host), port=int(args.port))
             rc = 0
+        elif args.command == "daemon":
+            rc = run_daemon(
+                watch_dir=args.watch,
+                base_out=args.out,
+                state_dir=args.state,
+                mode=args.mode,
+                jobs=int(args.jobs),
+                max_exports=int(args.max_exports),
+                interval_s=float(args.interval),
+                once=bool(args.once),
+            )
         elif args.command == "ingest":
             if args.variant == "ios":
                 ingest_ios_to_staging(input_dir=args.input, staging_root=args.out)
                 rc = 0
             else:
-                ingest_to_staging(input_path=args.input, staging_root=args.out)
+                ingest_to_staging(
+                    input_path=args.input,
+                    staging_root=args.out,
+                    staging_mode=args.staging_mode,
+                    blob_store=args.blob_store,
+                    zip_members=args.zip_members,
+                )
                 rc = 0
         elif args.command == "identity" and args.identity_command == "build":
-            build_identity(staging_run_dir=args.input)
+            build_identity(staging_run_dir=args.input, export_aliases=not args.no_aliases_json)
             rc = 0
         elif args.command == "identity" and args.identity_command == "review":
             lines = review_identity_links(identity_dir=args.identity)
@@ -263,13 +445,22 @@ def main(argv: list[str] | None = None) -> int:
                 state_dir=state_dir,
                 since=args.since,
                 note=args.note,
+                staging_mode=args.staging_mode,
+                use_blob_store=not args.no_blob_store,
+                zip_members=args.zip_members,
             )
         elif args.command == "export" and args.export_command == "ndjson":
-            export_ndjson(input_dir=args.input, out_dir=args.out, mode=args.mode)
+            export_ndjson(input_dir=args.input, out_dir=args.out, mode=args.mode, sample_fraction=args.sample_fraction)
             rc = 0
         elif args.command == "export" and args.export_command == "profile":
             build_export_profile(
-                input_dir=args.input, out_dir=args.out, sample_json=int(args.sample_json), top_files=int(args.top_files)
+                input_dir=args.input,
+                out_dir=args.out,
+                sample_json=int(args.sample_json),
+                top_files=int(args.top_files),
+                workers=int(args.workers),
+                mode=args.mode,
+                use_cache=not args.no_cache,
             )
             rc = 0
         elif args.command == "export" and args.export_command == "validate":
@@ -291,7 +482,7 @@ def main(argv: list[str] | None = None) -> int:
             query_duckdb(db_path=args.db, sql=args.sql, out_path=args.out)
             rc = 0
         elif args.command == "report" and args.report_command == "build":
-            build_report(db_path=args.db, out_dir=args.out, mode=args.mode)
+            build_report(db_path=args.db, out_dir=args.out, mode=args.mode, threads=int(args.threads), hash_db=bool(args.hash_db))
             rc = 0
         elif args.command == "report" and args.report_command == "show":
             show_report(db_path=args.db)
@@ -311,9 +502,33 @@ def main(argv: list[str] | None = None) -> int:
                 mode=args.mode,
                 note=args.note,
                 skip_note=bool(args.skip_note),
+                jobs=int(args.jobs),
+                staging_mode=args.staging_mode,
+                use_blob_store=not args.no_blob_store,
+                zip_members=args.zip_members,
+                sample_fraction=args.sample_fraction,
+            )
+        elif args.command == "run" and args.run_command == "batch":
+            rc = run_batch_operator(
+                inputs_file=args.inputs_file,
+                base_out=args.out,
+                state_dir=args.state,
+                mode=args.mode,
+                workers=int(args.workers),
+                jobs=int(args.jobs),
+                summary_out=args.summary_out,
+            )
+        elif args.command == "gc":
+            stats = blob_gc(state_dir=args.state, dry_run=bool(args.dry_run))
+            print(
+                f"gc blobs={stats['blobs']} referenced={stats['referenced']} removed={stats['removed']} "
+                f"freed_bytes={stats['freed_bytes']} dry_run={int(bool(args.dry_run))}"
             )
+            rc = 0
         elif args.command == "share" and args.share_command == "bundle":
-            build_share_bundle(run_dir=args.run, out_path=args.out)
+            build_share_bundle(
+                run_dir=args.run, out_path=args.out, base_manifest=args.base, bundle_format=str(args.format)
+            )
             rc = 0
         elif args.command == "share" and args.share_command == "verify":
             errors = verify_share_bundle(bundle_path=args.bundle)
@@ -325,6 +540,26 @@ def main(argv: list[str] | None = None) -> int:
             else:
                 print("ok")
                 rc = 0
+        elif args.command == "share" and args.share_command == "extract":
+            errors = extract_share_bundle_file(bundle_path=args.bundle, member_path=args.path, out_path=args.out)
+            if errors:
+                for e in errors:
+                    print(f"ERROR {e}", file=sys.stderr)
+                print(f"errors={len(errors)}", file=sys.stderr)
+                rc = 1
+            else:
+                print("ok")
+                rc = 0
+        elif args.command == "share" and args.share_command == "apply":
+            errors = apply_share_bundle(bundle_path=args.bundle, out_dir=args.out, base_path=args.base)
+            if errors:
+                for e in errors:
+                    print(f"ERROR {e}", file=sys.stderr)
+                print(f"errors={len(errors)}", file=sys.stderr)
+                rc = 1
+            else:
+                print("ok")
+                rc = 0
         else:
             raise AssertionError(f"Unhandled command: {args.command}")
     finally:
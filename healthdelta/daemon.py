@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import concurrent.futures
+import contextvars
+import hashlib
+import json
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from healthdelta.operator import StateTurn, WarmState, run_all
+from healthdelta.progress import progress
+
+
+# Inbox bookkeeping lives under the state dir: entry-name digest -> signature of the export that was processed.
+_DAEMON_SEEN_JSON = "daemon_seen.json"
+
+_IGNORED_SUFFIXES = (".partial", ".tmp", ".crdownload", ".download")
+
+
+@dataclass(frozen=True)
+class _InboxEntry:
+    path: Path
+    key: str
+    signature: str
+    mtime_ns: int
+
+
+def _entry_key(name: str) -> str:
+    # Export names can carry personal names; only a digest of the name is persisted or printed.
+    return hashlib.sha256(name.encode("utf-8")).hexdigest()
+
+
+def _signature(path: Path) -> tuple[str, int] | None:
+    """
+    Cheap change detector for a file or directory tree: relpath, size and mtime of every file. Returns None when
+    the entry vanished mid-scan.
+    """
+    h = hashlib.sha256()
+    newest = 0
+    try:
+        if path.is_file():
+            st = path.stat()
+            h.update(f"file\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+            return h.hexdigest(), st.st_mtime_ns
+        files = sorted([p for p in path.rglob("*") if p.is_file()], key=lambda p: p.relative_to(path).as_posix())
+        if not files:
+            return None
+        for p in files:
+            st = p.stat()
+            newest = max(newest, st.st_mtime_ns)
+            h.update(f"{p.relative_to(path).as_posix()}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    except FileNotFoundError:
+        return None
+    return h.hexdigest(), newest
+
+
+def _scan_inbox(watch_dir: Path) -> dict[str, _InboxEntry]:
+    entries: dict[str, _InboxEntry] = {}
+    for p in sorted(watch_dir.iterdir(), key=lambda x: x.name):
+        if p.name.startswith(".") or p.name.endswith(_IGNORED_SUFFIXES):
+            continue
+        if p.is_file() and p.suffix.lower() != ".zip":
+            continue
+        sig = _signature(p)
+        if sig is None:
+            continue
+        key = _entry_key(p.name)
+        entries[key] = _InboxEntry(path=p, key=key, signature=sig[0], mtime_ns=sig[1])
+    return entries
+
+
+def _load_seen(state_dir: Path) -> dict[str, str]:
+    path = state_dir / _DAEMON_SEEN_JSON
+    if not path.exists():
+        return {}
+    try:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    seen = obj.get("seen") if isinstance(obj, dict) else None
+    if not isinstance(seen, dict):
+        return {}
+    return {k: v for k, v in seen.items() if isinstance(k, str) and isinstance(v, str)}
+
+
+def _save_seen(state_dir: Path, seen: dict[str, str]) -> None:
+    state_dir.mkdir(parents=True, exist_ok=True)
+    path = state_dir / _DAEMON_SEEN_JSON
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"schema_version": 1, "seen": seen}, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+def run_daemon(
+    *,
+    watch_dir: str,
+    base_out: str = "data",
+    state_dir: str | None = None,
+    mode: str = "share",
+    jobs: int = 2,
+    max_exports: int = 2,
+    interval_s: float = 5.0,
+    once: bool = False,
+) -> int:
+    """
+    Watch an inbox for new exports (zip files or export directories) and run each through `run all` in this one
+    long-lived process. The process keeps the registry, the identity lookup and an in-memory DuckDB connection warm
+    across exports (see operator.WarmState).
+
+    An entry is queued once its size/mtime signature is unchanged across two consecutive scans (a copy still in
+    progress keeps changing). Up to `max_exports` exports run at once. Each takes a turn on the state dir in arrival
+    order: LAST_RUN, registration, stage, identity, deid and NDJSON export stay serialized in that order, while
+    input fingerprinting and DuckDB/reports/note overlap with other exports. `jobs` bounds step concurrency
+    inside each run.
+    """
+    if mode not in {"local", "share"}:
+        raise ValueError("--mode must be one of: local, share")
+    if interval_s <= 0:
+        raise ValueError("--interval must be > 0")
+    if max_exports < 1:
+        raise ValueError("--max-exports must be >= 1")
+
+    watch = Path(watch_dir)
+    if not watch.is_dir():
+        raise FileNotFoundError("--watch must be an existing directory")
+
+    base = Path(base_out)
+    state = Path(state_dir) if state_dir is not None else base / "state"
+
+    warm = WarmState.open(str(state))
+    seen = _load_seen(state)
+    previous: dict[str, _InboxEntry] = {}
+    running: dict[concurrent.futures.Future, _InboxEntry] = {}
+    processed = 0
+    failed = 0
+    scans = 0
+
+    def process(entry: _InboxEntry, turn: StateTurn) -> None:
+        try:
+            run_all(
+                input_path=str(entry.path),
+                base_out=str(base),
+                state_dir=str(state),
+                mode=mode,
+                jobs=jobs,
+                warm=warm,
+                turn=turn,
+            )
+        finally:
+            turn.release()
+
+    def collect(finished: set[concurrent.futures.Future]) -> None:
+        nonlocal processed, failed
+        for fut in sorted(finished, key=lambda f: running[f].mtime_ns):
+            entry = running.pop(fut)
+            exc = fut.exception()
+            if exc is not None:
+                # Failed exports are not retried until their contents change (new signature).
+                print(f"ERROR daemon export={entry.key[:12]} failed: {type(exc).__name__}", file=sys.stderr)
+                failed += 1
+            else:
+                processed += 1
+            seen[entry.key] = entry.signature
+        if finished:
+            _save_seen(state, seen)
+            sys.stdout.flush()
+
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_exports)
+    try:
+        while True:
+            with progress.phase("daemon: scan inbox"):
+                current = _scan_inbox(watch)
+            scans += 1
+            collect({fut for fut in running if fut.done()})
+
+            in_flight = {e.key for e in running.values()}
+            settled = [
+                e
+                for key, e in current.items()
+                if seen.get(key) != e.signature
+                and key not in in_flight
+                and key in previous
+                and previous[key].signature == e.signature
+            ]
+            settled.sort(key=lambda e: (e.mtime_ns, e.path.name))
+
+            for entry in settled:
+                print(f"daemon export={entry.key[:12]} status=processing", flush=True)
+                # Turns are taken here, in arrival order; the pool starts queued exports in the same order.
+                turn = warm.turns.take()
+                running[pool.submit(contextvars.copy_context().run, process, entry, turn)] = entry
+
+            previous = current
+            # --once: one settle window (two scans), then finish what was queued and exit.
+            if once and scans >= 2:
+                break
+            time.sleep(interval_s)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Queued and running exports are finished (and recorded as seen) before the process exits.
+        collect(set(concurrent.futures.wait(running).done))
+        pool.shutdown()
+        warm.close()
+
+    print(f"daemon processed={processed} failed={failed}")
+    return 1 if failed else 0
@@ -9,6 +9,11 @@ from pathlib import Path
 from typing import Any
 from xml.etree import ElementTree as ET
 
+from healthdelta import staged_source
+from healthdelta.fhir_stream import is_large_bundle, iter_members, write_sorted_json
+from healthdelta.identity import IDENTITY_DB, load_people
+from healthdelta.ingest import verify_staged_sources
+from healthdelta.parse_cache import parse_cache
 from healthdelta.progress import progress
 
 
@@ -60,14 +65,11 @@ class PersonPseudonym:
 
 
 def _load_people(identity_dir: Path) -> list[PersonPseudonym]:
-    people_path = identity_dir / "people.json"
-    obj = _read_json(people_path)
-    people = obj.get("people") if isinstance(obj, dict) else None
-    if not isinstance(people, list):
-        raise ValueError(f"Invalid people.json format: {people_path}")
+    if not (identity_dir / IDENTITY_DB).exists() and not (identity_dir / "people.json").exists():
+        raise FileNotFoundError("Missing people.json in identity dir")
 
     parsed = []
-    for p in people:
+    for p in load_people(identity_dir):
         if not isinstance(p, dict):
             continue
         person_key = p.get("person_key")
@@ -151,6 +153,17 @@ def _deid_fhir_json(obj: Any, people: list[PersonPseudonym]) -> Any:
     return obj
 
 
+def _deid_large_bundle(src: Path, dst: Path, people: list[PersonPseudonym]) -> None:
+    # Same output bytes as the whole-document path (a Bundle only gets string replacement), streamed twice:
+    # once for the small top-level members (output keys are sorted), once for the entries.
+    members = {m.key: _deep_replace_strings(m.value, people=people) for m in iter_members(src) if not m.item}
+    entries = (_deep_replace_strings(m.value, people=people) for m in iter_members(src) if m.item)
+    with dst.open("w", encoding="utf-8") as f:
+        # A non-array "entry" is an ordinary member; iter_members then yields no items and it is written whole.
+        streamed = isinstance(members.get("entry"), list) and not members["entry"]
+        write_sorted_json(f, members, stream_key="entry" if streamed else "", items=entries)
+
+
 def deidentify_run(*, staging_run_dir: str, identity_dir: str, out_dir: str) -> None:
     with progress.phase("deid: init"):
         run_dir = Path(staging_run_dir)
@@ -160,6 +173,7 @@ def deidentify_run(*, staging_run_dir: str, identity_dir: str, out_dir: str) ->
     layout_path = run_dir / "layout.json"
     if not layout_path.exists():
         raise FileNotFoundError("Missing layout.json in staging run dir")
+    verify_staged_sources(run_dir)
 
     with progress.phase("deid: load layout"):
         layout = _read_json(layout_path)
@@ -196,10 +210,10 @@ def deidentify_run(*, staging_run_dir: str, identity_dir: str, out_dir: str) ->
     if isinstance(export_xml_rel, str):
         with progress.phase("deid: export.xml"):
             src = run_dir / export_xml_rel
-            if src.exists():
-                dst = out_root / export_xml_rel
+            if staged_source.exists(src):
+                dst = out_root / staged_source.materialized_rel(export_xml_rel)
                 dst.parent.mkdir(parents=True, exist_ok=True)
-                text = src.read_text(encoding="utf-8", errors="replace")
+                text = staged_source.read_text(src, errors="replace")
                 dst.write_text(_deid_export_xml(text, people), encoding="utf-8")
                 output_files.append(dst)
 
@@ -219,20 +233,26 @@ def deidentify_run(*, staging_run_dir: str, identity_dir: str, out_dir: str) ->
                 task.advance(1)
                 continue
             src = run_dir / rel
-            if not src.exists():
+            if not staged_source.exists(src):
                 task.advance(1)
                 continue
-            dst = out_root / rel
+            # Virtual zip members (see staged_source) are written where extraction would have put them.
+            out_rel = staged_source.materialized_rel(rel)
+            dst = out_root / out_rel
             dst.parent.mkdir(parents=True, exist_ok=True)
             try:
-                obj = _read_json(src)
-                obj = _deid_fhir_json(obj, people)
-                dst.write_text(json.dumps(obj, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+                if is_large_bundle(src):
+                    _deid_large_bundle(src, dst, people)
+                else:
+                    obj = _deid_fhir_json(parse_cache.load_json(src), people)
+                    dst.write_text(json.dumps(obj, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+                    # Share-mode export reads this file next; hand it the object instead of a re-parse.
+                    parse_cache.remember(dst, obj)
             except json.JSONDecodeError:
-                text = src.read_text(encoding="utf-8", errors="replace")
+                text = staged_source.read_text(src, errors="replace")
                 dst.write_text(_apply_name_replacements(text, people), encoding="utf-8")
             output_files.append(dst)
-            out_clinical_rels.append(rel)
+            out_clinical_rels.append(out_rel)
             task.advance(1)
 
     with progress.phase("deid: write manifest"):
@@ -283,10 +303,13 @@ def deidentify_run(*, staging_run_dir: str, identity_dir: str, out_dir: str) ->
 
     out_layout = {
         "run_id": run_id,
-        "export_xml": export_xml_rel if isinstance(export_xml_rel, str) else None,
+        "export_xml": staged_source.materialized_rel(export_xml_rel) if isinstance(export_xml_rel, str) else None,
         "export_cda_xml": export_cda_rel if has_cda else None,
         "clinical_json": out_clinical_rels,
     }
+    if "sample_fraction" in layout:
+        # A sampled staging run stays marked as such.
+        out_layout["sample_fraction"] = layout["sample_fraction"]
 
     with progress.phase("deid: write outputs"):
         task = progress.task("deid: write outputs", total=2, unit="files")
@@ -5,10 +5,13 @@ import datetime as dt
 import hashlib
 import json
 import os
+import threading
+import uuid
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Iterable
 
 from healthdelta.progress import progress
+from healthdelta.sampling import SAMPLE_JSON, combine
 
 
 def _format_cell(v: object) -> str:
@@ -61,10 +64,12 @@ def _sha256_text(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 
-def _iter_ndjson(path: Path) -> Iterable[dict]:
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
+def _iter_ndjson(path: Path, *, digest: Any = None) -> Iterable[dict]:
+    with path.open("rb") as f:
+        for raw in f:
+            if digest is not None:
+                digest.update(raw)
+            line = raw.decode("utf-8").strip()
             if not line:
                 continue
             obj = json.loads(line)
@@ -72,12 +77,74 @@ def _iter_ndjson(path: Path) -> Iterable[dict]:
                 yield obj
 
 
+def require_duckdb():
+    try:
+        import duckdb
+    except Exception as e:  # pragma: no cover
+        raise RuntimeError("duckdb Python package is required (install dependency 'duckdb')") from e
+    return duckdb
+
+
+# One database file is attached to a shared connection at a time: a CHECKPOINT fails while another attached
+# database has a write transaction open, and DETACH is deferred while other transactions are active.
+_SHARED_LOCK = threading.Lock()
+
+
+class _AttachedDatabase:
+    """
+    A cursor of a shared in-memory DuckDB connection with one database file attached (under a unique alias) and
+    selected, holding the shared connection until close(), which rolls back anything uncommitted and detaches.
+    """
+
+    def __init__(self, shared: Any, db_path: Path, *, read_only: bool) -> None:
+        _SHARED_LOCK.acquire()
+        self._shared = shared
+        self._alias = f"hd_{uuid.uuid4().hex}"
+        self._cur: Any = None
+        try:
+            self._cur = shared.cursor()
+            path = str(db_path).replace("'", "''")
+            self._cur.execute(f"ATTACH '{path}' AS {self._alias}{' (READ_ONLY)' if read_only else ''};")
+            self._cur.execute(f"USE {self._alias};")
+        except BaseException:
+            self.close()
+            raise
+
+    def execute(self, *args: Any) -> Any:
+        return self._cur.execute(*args)
+
+    def executemany(self, *args: Any) -> Any:
+        return self._cur.executemany(*args)
+
+    def close(self) -> None:
+        try:
+            if self._cur is not None:
+                self._cur.close()
+            cur = self._shared.cursor()
+            try:
+                cur.execute(f"DETACH DATABASE IF EXISTS {self._alias};")
+            finally:
+                cur.close()
+        finally:
+            _SHARED_LOCK.release()
+
+
+def connect_database(db_path: Path, *, read_only: bool = False, shared: Any = None) -> Any:
+    """
+    Connect to the DuckDB file `db_path`. A long-lived process (the daemon) passes its in-memory connection as
+    `shared`: the file is then attached to it rather than opened as a new DuckDB instance.
+    """
+    if shared is not None:
+        return _AttachedDatabase(shared, db_path, read_only=read_only)
+    return require_duckdb().connect(database=str(db_path), read_only=read_only)
+
+
 def _table_columns(con, table: str) -> list[str]:
     rows = con.execute(
         """
         SELECT column_name
         FROM information_schema.columns
-        WHERE table_schema='main' AND table_name=?
+        WHERE table_catalog=current_database() AND table_schema='main' AND table_name=?
         ORDER BY ordinal_position;
         """,
         [table],
@@ -85,6 +152,14 @@ def _table_columns(con, table: str) -> list[str]:
     return [c for (c,) in rows if isinstance(c, str)]
 
 
+def _tables_present(con) -> set[str]:
+    rows = con.execute(
+        "SELECT table_name FROM information_schema.tables "
+        "WHERE table_catalog=current_database() AND table_schema='main' ORDER BY table_name;"
+    ).fetchall()
+    return {name for (name,) in rows if isinstance(name, str)}
+
+
 def _require_columns(con, table: str, required: list[str]) -> None:
     cols = set(_table_columns(con, table))
     missing = [c for c in required if c not in cols]
@@ -100,11 +175,228 @@ def _create_unique_index_if_possible(con, *, name: str, table: str, column: str)
         pass
 
 
-def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None:
+# Rollup tables: maintained at load time so reports/notes scale with distinct (day, type, person) keys, not raw rows.
+ROLLUP_DAILY_TABLE = "rollup_daily_counts"
+ROLLUP_PERSON_TABLE = "rollup_person_span"
+
+STREAM_TABLES = ("observations", "documents", "medications", "conditions")
+
+SOURCE_BUCKET_EXPR = "CASE WHEN source_file LIKE 'ndjson/%' THEN 'ios' ELSE source END"
+
+RECORD_TYPE_EXPR: dict[str, str] = {
+    "observations": "COALESCE(hk_type, resource_type, code, 'unknown')",
+    "documents": "COALESCE(resource_type, 'unknown')",
+    "medications": "COALESCE(resource_type, 'unknown')",
+    "conditions": "COALESCE(resource_type, code, 'unknown')",
+}
+
+# Metadata table: key/value rows written by the loader (e.g. the content fingerprint read by reports).
+META_TABLE = "healthdelta_meta"
+CONTENT_FINGERPRINT_KEY = "content_fingerprint"
+# Present once any sampled NDJSON export (see healthdelta.sampling) was loaded; reports and notes surface it.
+SAMPLE_FRACTION_KEY = "sample_fraction"
+
+# Bump when loader mapping/dedupe semantics change, so fingerprints of equal inputs differ across loader behavior.
+_LOADER_VERSION = "duckdb-loader/1"
+
+_ROLLUP_DAILY_KEYS = "table_name, canonical_person_id, source, source_bucket, record_type, day"
+_ROLLUP_PERSON_KEYS = "table_name, canonical_person_id, run_id"
+
+
+def _ensure_rollup_schema(con) -> None:
+    con.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_DAILY_TABLE} (
+          table_name VARCHAR,
+          canonical_person_id VARCHAR,
+          source VARCHAR,
+          source_bucket VARCHAR,
+          record_type VARCHAR,
+          day DATE,
+          n BIGINT
+        );
+        """
+    )
+    con.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_PERSON_TABLE} (
+          table_name VARCHAR,
+          canonical_person_id VARCHAR,
+          run_id VARCHAR,
+          n BIGINT,
+          min_event_time TIMESTAMP,
+          max_event_time TIMESTAMP
+        );
+        """
+    )
+
+
+def _read_meta(con, key: str) -> str | None:
+    if META_TABLE not in _tables_present(con):
+        return None
+    row = con.execute(f"SELECT value FROM {META_TABLE} WHERE key=?;", [key]).fetchone()
+    return row[0] if row and isinstance(row[0], str) else None
+
+
+def _write_content_fingerprint(con, *, stream_digests: dict[str, str], inserted_rows: int) -> None:
+    """
+    Chain the loaded stream digests onto the previous fingerprint. Loads that insert nothing keep the
+    fingerprint, so re-running the same build is a no-op for downstream report summaries.
+    """
+    con.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key VARCHAR, value VARCHAR);")
+    previous = _read_meta(con, CONTENT_FINGERPRINT_KEY)
+    if previous is not None and inserted_rows == 0:
+        return
+    payload = {
+        "loader_version": _LOADER_VERSION,
+        "previous": previous,
+        "streams": {k: stream_digests[k] for k in sorted(stream_digests)},
+    }
+    fingerprint = _sha256_text(json.dumps(payload, sort_keys=True, separators=(",", ":")))
+    con.execute(f"DELETE FROM {META_TABLE} WHERE key IN (?, ?);", [CONTENT_FINGERPRINT_KEY, "loader_version"])
+    con.execute(
+        f"INSERT INTO {META_TABLE} VALUES (?, ?), (?, ?);",
+        [CONTENT_FINGERPRINT_KEY, fingerprint, "loader_version", _LOADER_VERSION],
+    )
+
+
+def _read_sample_fraction(ndjson_root: Path) -> float | None:
     try:
-        import duckdb
-    except Exception as e:  # pragma: no cover
-        raise RuntimeError("duckdb Python package is required (install dependency 'duckdb')") from e
+        obj = json.loads((ndjson_root / SAMPLE_JSON).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    f = obj.get("sample_fraction") if isinstance(obj, dict) else None
+    if not isinstance(f, (int, float)) or isinstance(f, bool):
+        raise ValueError(f"invalid {SAMPLE_JSON}: sample_fraction missing")
+    return float(f)
+
+
+def _write_sample_fraction(con, fraction: float | None) -> None:
+    # Rows of a sampled load stay in the DB, so the marker is never cleared by a later full load.
+    if fraction is None:
+        return
+    con.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key VARCHAR, value VARCHAR);")
+    previous = _read_meta(con, SAMPLE_FRACTION_KEY)
+    fraction = combine(fraction, float(previous) if previous is not None else None)
+    con.execute(f"DELETE FROM {META_TABLE} WHERE key=?;", [SAMPLE_FRACTION_KEY])
+    con.execute(f"INSERT INTO {META_TABLE} VALUES (?, ?);", [SAMPLE_FRACTION_KEY, repr(fraction)])
+
+
+def read_sample_fraction(con) -> float | None:
+    """The sample fraction recorded in a DB built from sampled NDJSON, else None."""
+    value = _read_meta(con, SAMPLE_FRACTION_KEY)
+    return float(value) if value is not None else None
+
+
+def _rollup_delta_sql(table: str, *, new_keys_only: bool) -> tuple[str, str]:
+    where = (
+        f"WHERE record_key IN (SELECT record_key FROM _rollup_new_keys WHERE table_name='{table}')"
+        if new_keys_only
+        else ""
+    )
+    daily = f"""
+        SELECT '{table}' AS table_name,
+               canonical_person_id,
+               source,
+               {SOURCE_BUCKET_EXPR} AS source_bucket,
+               {RECORD_TYPE_EXPR[table]} AS record_type,
+               CAST(date_trunc('day', event_time) AS DATE) AS day,
+               COUNT(*) AS n
+        FROM {table} {where}
+        GROUP BY 1, 2, 3, 4, 5, 6
+    """
+    person = f"""
+        SELECT '{table}' AS table_name,
+               canonical_person_id,
+               run_id,
+               COUNT(*) AS n,
+               MIN(event_time) AS min_event_time,
+               MAX(event_time) AS max_event_time
+        FROM {table} {where}
+        GROUP BY 1, 2, 3
+    """
+    return daily, person
+
+
+def _merge_rollup_delta(con, *, table: str, keys: str, delta_sql: str, merged_cols: str) -> None:
+    # Replace only the key groups the delta touches: merge their existing rows with the delta, delete them, and
+    # insert the merged rows. Key columns are nullable (person id, day), so groups match with IS NOT DISTINCT FROM
+    # (a primary key + ON CONFLICT upsert would need non-null keys).
+    match = " AND ".join(f"r.{k} IS NOT DISTINCT FROM d.{k}" for k in keys.split(", "))
+    con.execute(f"CREATE TEMP TABLE _rollup_delta AS {delta_sql};")
+    try:
+        con.execute(
+            f"""
+            CREATE TEMP TABLE _rollup_merged AS
+            SELECT {keys}, {merged_cols}
+            FROM (
+              SELECT r.* FROM {table} r WHERE EXISTS (SELECT 1 FROM _rollup_delta d WHERE {match})
+              UNION ALL
+              SELECT * FROM _rollup_delta
+            )
+            GROUP BY {keys};
+            """
+        )
+        con.execute(f"DELETE FROM {table} r WHERE EXISTS (SELECT 1 FROM _rollup_delta d WHERE {match});")
+        con.execute(f"INSERT INTO {table} SELECT * FROM _rollup_merged;")
+    finally:
+        con.execute("DROP TABLE IF EXISTS _rollup_merged;")
+        con.execute("DROP TABLE IF EXISTS _rollup_delta;")
+
+
+def _update_rollups(con, *, new_keys: dict[str, list[str]], rebuild: bool) -> None:
+    """
+    Fold newly inserted rows into the rollup tables (or rebuild them from every stream table when the DB predates
+    rollups). Only the delta is aggregated, and only the rollup groups it touches are rewritten.
+    """
+    tables = [t for t in STREAM_TABLES if t in _tables_present(con)]
+    if rebuild:
+        con.execute(f"DELETE FROM {ROLLUP_DAILY_TABLE};")
+        con.execute(f"DELETE FROM {ROLLUP_PERSON_TABLE};")
+        for t in tables:
+            daily, person = _rollup_delta_sql(t, new_keys_only=False)
+            con.execute(f"INSERT INTO {ROLLUP_DAILY_TABLE} {daily};")
+            con.execute(f"INSERT INTO {ROLLUP_PERSON_TABLE} {person};")
+        return
+
+    tables = [t for t in tables if new_keys.get(t)]
+    if not tables:
+        return
+
+    con.execute("CREATE TEMP TABLE _rollup_new_keys (table_name VARCHAR, record_key VARCHAR);")
+    try:
+        for t in tables:
+            con.executemany("INSERT INTO _rollup_new_keys VALUES (?, ?);", [[t, k] for k in new_keys[t]])
+
+        # Each delta query groups by its table_name, so the per-table deltas never share a key group.
+        deltas = [_rollup_delta_sql(t, new_keys_only=True) for t in tables]
+        _merge_rollup_delta(
+            con,
+            table=ROLLUP_DAILY_TABLE,
+            keys=_ROLLUP_DAILY_KEYS,
+            delta_sql=" UNION ALL ".join(d for d, _ in deltas),
+            merged_cols="CAST(SUM(n) AS BIGINT) AS n",
+        )
+        _merge_rollup_delta(
+            con,
+            table=ROLLUP_PERSON_TABLE,
+            keys=_ROLLUP_PERSON_KEYS,
+            delta_sql=" UNION ALL ".join(p for _, p in deltas),
+            merged_cols=(
+                "CAST(SUM(n) AS BIGINT) AS n, MIN(min_event_time) AS min_event_time, "
+                "MAX(max_event_time) AS max_event_time"
+            ),
+        )
+    finally:
+        con.execute("DROP TABLE IF EXISTS _rollup_new_keys;")
+
+
+def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False, shared_con: Any = None) -> None:
+    """
+    Load the NDJSON streams under `input_dir` into `db_path` (see docs/runbook_duckdb.md). `shared_con` is an
+    in-memory connection kept by a long-lived process; the DB file is attached to it (see connect_database).
+    """
+    require_duckdb()
 
     with progress.phase("duckdb: detect input layout"):
         input_root = Path(input_dir)
@@ -127,6 +419,7 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
                     ios_run_id = None
 
         ndjson_root = ios_ndjson_dir if ios_mode else input_root
+        sample_fraction = _read_sample_fraction(ndjson_root)
         db = Path(db_path)
 
         db_existed = db.exists()
@@ -136,7 +429,7 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
         db.parent.mkdir(parents=True, exist_ok=True)
 
     with progress.phase("duckdb: connect"):
-        con = duckdb.connect(database=str(db))
+        con = connect_database(db, shared=shared_con)
     try:
         with progress.phase("duckdb: init transaction"):
             con.execute("PRAGMA threads=1;")
@@ -200,6 +493,12 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
             raise FileNotFoundError("Missing required NDJSON stream: documents.ndjson")
 
         with progress.phase("duckdb: schema checks"):
+            # DBs built before rollups existed get them backfilled from every stored row.
+            existing = _tables_present(con)
+            rebuild_rollups = ROLLUP_DAILY_TABLE not in existing or ROLLUP_PERSON_TABLE not in existing
+            _ensure_rollup_schema(con)
+            new_keys: dict[str, list[str]] = {t: [] for t in STREAM_TABLES}
+            stream_digests: dict[str, Any] = {}
             _require_columns(con, "observations", ["record_key"])
             _require_columns(con, "documents", ["record_key"])
             _create_unique_index_if_possible(
@@ -210,7 +509,8 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
         with progress.phase("duckdb: load observations"):
             task = progress.task("duckdb: load observations", unit="rows")
             batch = 0
-            for obj in _iter_ndjson(observations_path):
+            stream_digests["observations"] = hashlib.sha256()
+            for obj in _iter_ndjson(observations_path, digest=stream_digests["observations"]):
                 record_key = obj.get("record_key")
                 if not isinstance(record_key, str) or not record_key:
                     record_key = obj.get("event_key")
@@ -234,11 +534,12 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
                     except ValueError:
                         value_num = None
 
-                con.execute(
+                inserted = con.execute(
                     """
                     INSERT INTO observations
                     SELECT ?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?
-                    WHERE NOT EXISTS (SELECT 1 FROM observations WHERE record_key=?);
+                    WHERE NOT EXISTS (SELECT 1 FROM observations WHERE record_key=?)
+                    RETURNING record_key;
                     """,
                     [
                         obj.get("schema_version") if isinstance(obj.get("schema_version"), int) else None,
@@ -262,7 +563,9 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
                         obj.get("status") if isinstance(obj.get("status"), str) else None,
                         record_key,
                     ],
-                )
+                ).fetchone()
+                if inserted:
+                    new_keys["observations"].append(record_key)
 
                 batch += 1
                 if batch >= 1000:
@@ -275,7 +578,8 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
             with progress.phase("duckdb: load documents"):
                 task = progress.task("duckdb: load documents", unit="rows")
                 batch = 0
-                for obj in _iter_ndjson(documents_path):
+                stream_digests["documents"] = hashlib.sha256()
+                for obj in _iter_ndjson(documents_path, digest=stream_digests["documents"]):
                     record_key = obj.get("record_key")
                     if not isinstance(record_key, str) or not record_key:
                         record_key = obj.get("event_key")
@@ -286,11 +590,12 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
                     if not isinstance(event_key, str) or not event_key:
                         event_key = record_key
 
-                    con.execute(
+                    inserted = con.execute(
                         """
                         INSERT INTO documents
                         SELECT ?,?,?,?,?,?,?,?,?,?,?,?
-                        WHERE NOT EXISTS (SELECT 1 FROM documents WHERE record_key=?);
+                        WHERE NOT EXISTS (SELECT 1 FROM documents WHERE record_key=?)
+                        RETURNING record_key;
                         """,
                         [
                             obj.get("schema_version") if isinstance(obj.get("schema_version"), int) else None,
@@ -307,7 +612,9 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
                             _stable_json(obj.get("type_coding")),
                             record_key,
                         ],
-                    )
+                    ).fetchone()
+                    if inserted:
+                        new_keys["documents"].append(record_key)
 
                     batch += 1
                     if batch >= 1000:
@@ -343,7 +650,8 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
             with progress.phase("duckdb: load medications"):
                 task = progress.task("duckdb: load medications", unit="rows")
                 batch = 0
-                for obj in _iter_ndjson(medications_path):
+                stream_digests["medications"] = hashlib.sha256()
+                for obj in _iter_ndjson(medications_path, digest=stream_digests["medications"]):
                     record_key = obj.get("record_key")
                     if not isinstance(record_key, str) or not record_key:
                         record_key = obj.get("event_key")
@@ -354,11 +662,12 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
                     if not isinstance(event_key, str) or not event_key:
                         event_key = record_key
 
-                    con.execute(
+                    inserted = con.execute(
                         """
                         INSERT INTO medications
                         SELECT ?,?,?,?,?,?,?,?,?,?,?
-                        WHERE NOT EXISTS (SELECT 1 FROM medications WHERE record_key=?);
+                        WHERE NOT EXISTS (SELECT 1 FROM medications WHERE record_key=?)
+                        RETURNING record_key;
                         """,
                         [
                             obj.get("schema_version") if isinstance(obj.get("schema_version"), int) else None,
@@ -374,7 +683,9 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
                             obj.get("status") if isinstance(obj.get("status"), str) else None,
                             record_key,
                         ],
-                    )
+                    ).fetchone()
+                    if inserted:
+                        new_keys["medications"].append(record_key)
 
                     batch += 1
                     if batch >= 1000:
@@ -411,7 +722,8 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
             with progress.phase("duckdb: load conditions"):
                 task = progress.task("duckdb: load conditions", unit="rows")
                 batch = 0
-                for obj in _iter_ndjson(conditions_path):
+                stream_digests["conditions"] = hashlib.sha256()
+                for obj in _iter_ndjson(conditions_path, digest=stream_digests["conditions"]):
                     record_key = obj.get("record_key")
                     if not isinstance(record_key, str) or not record_key:
                         record_key = obj.get("event_key")
@@ -422,11 +734,12 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
                     if not isinstance(event_key, str) or not event_key:
                         event_key = record_key
 
-                    con.execute(
+                    inserted = con.execute(
                         """
                         INSERT INTO conditions
                         SELECT ?,?,?,?,?,?,?,?,?,?,?,?
-                        WHERE NOT EXISTS (SELECT 1 FROM conditions WHERE record_key=?);
+                        WHERE NOT EXISTS (SELECT 1 FROM conditions WHERE record_key=?)
+                        RETURNING record_key;
                         """,
                         [
                             obj.get("schema_version") if isinstance(obj.get("schema_version"), int) else None,
@@ -443,7 +756,9 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
                             _stable_json(obj.get("code_coding")),
                             record_key,
                         ],
-                    )
+                    ).fetchone()
+                    if inserted:
+                        new_keys["conditions"].append(record_key)
 
                     batch += 1
                     if batch >= 1000:
@@ -452,6 +767,17 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
                 if batch:
                     task.advance(batch)
 
+        with progress.phase("duckdb: update rollups"):
+            _update_rollups(con, new_keys=new_keys, rebuild=rebuild_rollups)
+
+        with progress.phase("duckdb: record content fingerprint"):
+            _write_content_fingerprint(
+                con,
+                stream_digests={k: h.hexdigest() for k, h in stream_digests.items()},
+                inserted_rows=sum(len(v) for v in new_keys.values()),
+            )
+            _write_sample_fraction(con, sample_fraction)
+
         with progress.phase("duckdb: commit"):
             con.execute("COMMIT;")
             con.execute("CHECKPOINT;")
@@ -460,17 +786,14 @@ def build_duckdb(*, input_dir: str, db_path: str, replace: bool = False) -> None
 
 
 def query_duckdb(*, db_path: str, sql: str, out_path: str | None = None) -> None:
-    try:
-        import duckdb
-    except Exception as e:  # pragma: no cover
-        raise RuntimeError("duckdb Python package is required (install dependency 'duckdb')") from e
+    require_duckdb()
 
     db = Path(db_path)
     if not db.exists():
         raise FileNotFoundError(f"Missing DB file: {db.name}")
 
     with progress.phase("duckdb: query"):
-        con = duckdb.connect(database=str(db), read_only=True)
+        con = connect_database(db, read_only=True)
         try:
             con.execute("PRAGMA threads=1;")
             res = con.execute(sql)
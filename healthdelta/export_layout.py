@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Iterable
 
 
 @dataclass(frozen=True)
@@ -14,10 +15,35 @@ class ExportLayout:
     clinical_dir_rel: str | None
 
 
-def _posix_rel(p: Path) -> str:
-    if p.is_absolute():
-        return p.name
-    return p.as_posix()
+_EXPORT_ROOT_CANDIDATES = [".", "apple_health_export"]
+_CLINICAL_DIR_CANDIDATES = [
+    "clinical-records",
+    "clinical_records",
+    "clinical/clinical-records",
+    "clinical/clinical_records",
+]
+
+
+def _join(root_rel: str, rel: str) -> str:
+    return rel if root_rel == "." else f"{root_rel}/{rel}"
+
+
+def _resolve(is_file: Callable[[str], bool], is_dir: Callable[[str], bool]) -> ExportLayout:
+    # `is_file` / `is_dir` take posix paths relative to the input (directory or zip).
+    export_root_rel = next((c for c in _EXPORT_ROOT_CANDIDATES if is_file(_join(c, "export.xml"))), None)
+    if export_root_rel is None:
+        raise ValueError("export.xml not found in input directory (expected export.xml or apple_health_export/export.xml)")
+
+    export_xml_rel = "export.xml"
+    export_cda_rel = "export_cda.xml" if is_file(_join(export_root_rel, "export_cda.xml")) else None
+    clinical_dir_rel = next((c for c in _CLINICAL_DIR_CANDIDATES if is_dir(_join(export_root_rel, c))), None)
+
+    return ExportLayout(
+        export_root_rel=export_root_rel,
+        export_xml_rel=export_xml_rel,
+        export_cda_rel=export_cda_rel,
+        clinical_dir_rel=clinical_dir_rel,
+    )
 
 
 def resolve_export_layout(input_dir: Path) -> ExportLayout:
@@ -31,31 +57,21 @@ def resolve_export_layout(input_dir: Path) -> ExportLayout:
     if not input_dir.is_dir():
         raise ValueError("--input must be an unpacked export directory")
 
-    candidates = [input_dir, input_dir / "apple_health_export"]
-    export_root = next((c for c in candidates if (c / "export.xml").exists()), None)
-    if export_root is None:
-        raise ValueError("export.xml not found in input directory (expected export.xml or apple_health_export/export.xml)")
-
-    export_root_rel = _posix_rel(export_root.relative_to(input_dir)) if export_root != input_dir else "."
+    return _resolve(lambda rel: (input_dir / rel).exists(), lambda rel: (input_dir / rel).is_dir())
 
-    export_xml_rel = "export.xml"
-    export_cda_rel = "export_cda.xml" if (export_root / "export_cda.xml").exists() else None
-
-    clinical_dir_rel: str | None = None
-    clinical_candidates = [
-        export_root / "clinical-records",
-        export_root / "clinical_records",
-        export_root / "clinical" / "clinical-records",
-        export_root / "clinical" / "clinical_records",
-    ]
-    for c in clinical_candidates:
-        if c.exists() and c.is_dir():
-            clinical_dir_rel = _posix_rel(c.relative_to(export_root))
-            break
 
-    return ExportLayout(
-        export_root_rel=export_root_rel,
-        export_xml_rel=export_xml_rel,
-        export_cda_rel=export_cda_rel,
-        clinical_dir_rel=clinical_dir_rel,
-    )
+def resolve_zip_layout(names: Iterable[str]) -> ExportLayout:
+    """
+    The same layout for an export.zip, from its member names (paths are relative to the zip root, which plays
+    the part of the input directory).
+    """
+    files: set[str] = set()
+    dirs: set[str] = set()
+    for name in names:
+        parts = name.strip("/").split("/")
+        dirs.update("/".join(parts[:i]) for i in range(1, len(parts)))
+        if name.endswith("/"):
+            dirs.add("/".join(parts))
+        else:
+            files.add("/".join(parts))
+    return _resolve(lambda rel: rel in files, lambda rel: rel in dirs)
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, NamedTuple
+
+from healthdelta import staged_source
+
+
+# Clinical JSON files at or above this size that are FHIR Bundles are streamed entry by entry instead of being
+# loaded whole (json.loads needs several times the file size in memory).
+STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+_CHUNK_CHARS = 1024 * 1024
+_PREFIX_BYTES = 64 * 1024
+
+_RESOURCE_TYPE_RE = re.compile(rb"\"resourceType\"\s*:\s*\"([A-Za-z][A-Za-z0-9]+)\"")
+_WS = " \t\n\r"
+_NUMBER_TAIL_RE = re.compile(r"[0-9.eE+-]*")
+
+
+class Member(NamedTuple):
+    """
+    One top-level member of a streamed JSON object, in document order. A streamed array member is announced
+    as `Member(key, [], item=False)` and followed by one `Member(key, element, item=True)` per element.
+    """
+
+    key: str
+    value: Any
+    item: bool
+
+
+def is_large_bundle(path: Path) -> bool:
+    """
+    True when `path` is at least STREAM_THRESHOLD_BYTES and its first resourceType (bounded prefix read, as in
+    profile) is Bundle. Anything else keeps the whole-document path. The prefix read does not verify a staged zip
+    member; the full read that follows does.
+    """
+    if staged_source.size(path) < STREAM_THRESHOLD_BYTES:
+        return False
+    with staged_source.open_binary(path) as f:
+        m = _RESOURCE_TYPE_RE.search(f.read(_PREFIX_BYTES))
+    return bool(m and m.group(1) == b"Bundle")
+
+
+def contains_bytes(path: Path, pattern: re.Pattern[bytes], *, overlap: int = 256) -> bool:
+    # Chunked regex search; `overlap` must cover the longest possible match. It stops at the first match, so a
+    # staged zip member is not verified here: only use it as a pre-filter before a full read.
+    tail = b""
+    with staged_source.open_binary(path) as f:
+        for chunk in iter(lambda: f.read(_CHUNK_CHARS), b""):
+            if pattern.search(tail + chunk):
+                return True
+            tail = chunk[-overlap:]
+    return False
+
+
+class _Reader:
+    def __init__(self, f: BinaryIO) -> None:
+        self._f = f
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, n: int | None = None) -> bool:
+        if self.eof:
+            return False
+        data = self._f.read(_CHUNK_CHARS if n is None else n)
+        if not data:
+            self.eof = True
+            self.buf += self._decoder.decode(b"", final=True)
+            return False
+        if self.pos > _CHUNK_CHARS:
+            # Drop consumed text: the buffer holds at most the current value plus one read.
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+        self.buf += self._decoder.decode(data)
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise json.JSONDecodeError("Unexpected end of JSON", self.buf, self.pos)
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise json.JSONDecodeError(f"Expecting {ch!r}", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        n = _CHUNK_CHARS
+        while True:
+            try:
+                obj, end = self._json.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Most likely a value cut off at the end of the buffer: read more (growing reads keep a large
+                # value from being re-decoded once per chunk).
+                if not self._fill(n):
+                    raise
+                n *= 2
+                continue
+            if not self.eof and (end == len(self.buf) or self._number_cut(obj, end)):
+                # A number (or literal) ending at the buffer edge may continue in the next read.
+                if self._fill(n):
+                    continue
+            self.pos = end
+            return obj
+
+    def _number_cut(self, obj: Any, end: int) -> bool:
+        # `12.` or `1e` at the end of a read decodes as 12 or 1 with the rest of the number still in the buffer.
+        if not isinstance(obj, (int, float)) or isinstance(obj, bool):
+            return False
+        return _NUMBER_TAIL_RE.fullmatch(self.buf, end) is not None
+
+
+def iter_members(path: Path, *, stream_key: str = "entry") -> Iterator[Member]:
+    """
+    Stream the members of the top-level JSON object in `path`. The array under `stream_key` is yielded one
+    element at a time, so peak memory is bounded by the largest single element (plus one read chunk).
+    Raises json.JSONDecodeError on malformed input, as json.loads would (possibly after yielding some members).
+    """
+    with staged_source.open_binary(path) as f:
+        r = _Reader(f)
+        r.expect("{")
+        if r.peek() == "}":
+            return
+        while True:
+            key = r.value()
+            if not isinstance(key, str):
+                raise json.JSONDecodeError("Expecting property name", r.buf, r.pos)
+            r.expect(":")
+            if key == stream_key and r.peek() == "[":
+                r.pos += 1
+                yield Member(key, [], False)
+                if r.peek() == "]":
+                    r.pos += 1
+                else:
+                    while True:
+                        yield Member(key, r.value(), True)
+                        ch = r.peek()
+                        r.pos += 1
+                        if ch == "]":
+                            break
+                        if ch != ",":
+                            raise json.JSONDecodeError("Expecting ',' delimiter", r.buf, r.pos - 1)
+            else:
+                yield Member(key, r.value(), False)
+            ch = r.peek()
+            r.pos += 1
+            if ch == "}":
+                break
+            if ch != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", r.buf, r.pos - 1)
+        try:
+            r.peek()
+        except json.JSONDecodeError:
+            return
+        raise json.JSONDecodeError("Extra data", r.buf, r.pos)
+
+
+def _indent(text: str, prefix: str) -> str:
+    # JSON text has no raw newlines inside strings, so line-wise indentation cannot corrupt values.
+    return text.replace("\n", "\n" + prefix)
+
+
+def write_sorted_json(f: Any, members: dict[str, Any], *, stream_key: str, items: Iterator[Any]) -> None:
+    """
+    Write `json.dumps(obj, indent=2, sort_keys=True) + "\\n"` for the object made of `members` with
+    `members[stream_key]` (an array) replaced by `items`, without materializing that array.
+    """
+    if not members:
+        f.write("{}\n")
+        return
+    f.write("{")
+    for i, key in enumerate(sorted(members)):
+        f.write(("," if i else "") + "\n  " + json.dumps(key) + ": ")
+        if key != stream_key:
+            f.write(_indent(json.dumps(members[key], indent=2, sort_keys=True), "  "))
+            continue
+        first = True
+        for item in items:
+            f.write(("[" if first else ",") + "\n    " + _indent(json.dumps(item, indent=2, sort_keys=True), "    "))
+            first = False
+        f.write("[]" if first else "\n  ]")
+    f.write("\n}\n")
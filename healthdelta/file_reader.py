@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import os
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, TypeVar
+
+
+T = TypeVar("T")
+I = TypeVar("I")
+
+# Small-file reads are syscall/latency bound (network filesystems, spinning disks): overlap them on threads.
+DEFAULT_IO_WORKERS = 8
+
+_io_workers = DEFAULT_IO_WORKERS
+
+_END = object()
+
+
+def configure(*, workers: int) -> None:
+    global _io_workers
+    if int(workers) < 1:
+        raise ValueError("--io-workers must be >= 1")
+    _io_workers = int(workers)
+
+
+def io_workers() -> int:
+    return _io_workers
+
+
+def scan_files(root: Path, *, suffix: str | None = None) -> list[Path]:
+    """
+    Files under `root` (recursively; `suffix` filters by name ending), as `sorted(root.rglob(...))` would return
+    them. Uses os.scandir so each directory costs one listing instead of a stat per entry; like rglob, symlinked
+    directories are not descended into.
+    """
+    out: list[Path] = []
+    stack = [str(root)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif (suffix is None or entry.name.endswith(suffix)) and entry.is_file():
+                out.append(Path(entry.path))
+    return sorted(out)
+
+
+def map_files(fn: Callable[[I], T], items: Iterable[I], *, workers: int | None = None) -> Iterator[tuple[I, T]]:
+    """
+    Yield `(item, fn(item))` in input order while up to `workers` calls run on a thread pool. At most 4x
+    `workers` results are buffered, so memory stays bounded for large directories. Exceptions from `fn` are
+    raised when their item is reached.
+
+    `fn` runs on worker threads: it must not touch progress (advance tasks from the consuming loop instead).
+    """
+    n = int(workers) if workers is not None else _io_workers
+    items_it = iter(items)
+    if n <= 1:
+        for item in items_it:
+            yield item, fn(item)
+        return
+
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=n, thread_name_prefix="healthdelta-io")
+    pending: collections.deque[tuple[I, concurrent.futures.Future[T]]] = collections.deque()
+    try:
+        for item in items_it:
+            pending.append((item, pool.submit(fn, item)))
+            if len(pending) >= n * 4:
+                break
+        while pending:
+            item, fut = pending.popleft()
+            nxt = next(items_it, _END)
+            if nxt is not _END:
+                pending.append((nxt, pool.submit(fn, nxt)))
+            yield item, fut.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
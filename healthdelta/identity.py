@@ -4,11 +4,20 @@ import datetime as dt
 import hashlib
 import json
 import re
+import sqlite3
+import threading
 import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from healthdelta import staged_source
+from healthdelta.fhir_stream import contains_bytes, is_large_bundle, iter_members
+from healthdelta.file_reader import map_files
+from healthdelta.ingest import verify_staged_sources
+from healthdelta.parse_cache import parse_cache
 from healthdelta.progress import progress
 
 
@@ -67,8 +76,11 @@ def _read_json(path: Path) -> dict:
 
 
 def _write_json(path: Path, obj: object) -> None:
+    # Atomic replace: concurrent runs sharing an identity dir never read a torn file.
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(obj, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(obj, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    tmp.replace(path)
 
 
 def _stable_alias_key(payload: dict) -> str:
@@ -123,18 +135,24 @@ def _extract_external_ids(patient: dict) -> list[dict]:
     return deduped
 
 
-def _walk_fhir_resources(obj: object) -> list[dict]:
-    resources: list[dict] = []
-    if isinstance(obj, dict):
-        rt = obj.get("resourceType")
-        if isinstance(rt, str):
-            resources.append(obj)
-        for v in obj.values():
-            resources.extend(_walk_fhir_resources(v))
-    elif isinstance(obj, list):
-        for v in obj:
-            resources.extend(_walk_fhir_resources(v))
-    return resources
+def _iter_fhir_resources(obj: object) -> Iterator[dict]:
+    # Iterative pre-order walk (same order as a recursive one): no recursion limit, no intermediate lists.
+    stack: list[object] = [obj]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            if isinstance(cur.get("resourceType"), str):
+                yield cur
+            stack.extend(reversed([v for v in cur.values() if isinstance(v, (dict, list))]))
+        elif isinstance(cur, list):
+            stack.extend(reversed([v for v in cur if isinstance(v, (dict, list))]))
+
+
+# Byte-level pre-filter: files that never mention a Patient resourceType are not parsed at all.
+_PATIENT_RESOURCE_TYPE_RE = re.compile(rb'"resourceType"\s*:\s*"Patient"')
+
+# Bump when the per-file Patient extraction changes; cached scans from older versions are ignored.
+_PATIENT_SCAN_VERSION = "patient-scan/1"
 
 
 def _sha256_text(s: str) -> str:
@@ -153,6 +171,64 @@ def _person_link_id(system_fingerprint: str, source_patient_id: str) -> str:
     return _sha256_text(f"{system_fingerprint}:{source_patient_id}")
 
 
+def _scan_patients(raw: bytes, *, path: Path | None = None) -> list[dict]:
+    """
+    Patient resources in one clinical JSON file as cacheable records: resource index, raw name, external ids.
+    With `path`, the parse goes through the run's parse cache (deid/export reuse it).
+    """
+    if not _PATIENT_RESOURCE_TYPE_RE.search(raw):
+        return []
+    try:
+        content = parse_cache.load_json(path, raw=raw) if path is not None else json.loads(raw)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return []
+    out: list[dict] = []
+    for idx, res in enumerate(_iter_fhir_resources(content)):
+        if res.get("resourceType") != "Patient":
+            continue
+        name = _extract_patient_name(res)
+        if name:
+            out.append({"idx": idx, "name": name, "external_ids": _extract_external_ids(res)})
+    return out
+
+
+def _scan_patients_streamed(path: Path) -> list[dict]:
+    """
+    `_scan_patients` for a large Bundle: entries are parsed one at a time. Resource indexes match the
+    whole-document walk (the Bundle itself is index 0, then its members in document order).
+    """
+    if not contains_bytes(path, _PATIENT_RESOURCE_TYPE_RE):
+        return []
+    out: list[dict] = []
+    idx = 1
+    try:
+        for member in iter_members(path):
+            for res in _iter_fhir_resources(member.value):
+                if res.get("resourceType") == "Patient":
+                    name = _extract_patient_name(res)
+                    if name:
+                        out.append({"idx": idx, "name": name, "external_ids": _extract_external_ids(res)})
+                idx += 1
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return []
+    return out
+
+
+def _staged_file_digests(run_dir: Path) -> dict[str, str]:
+    # relpath -> sha256 from the staging manifest (written at ingest); empty when the manifest is missing.
+    manifest_path = run_dir / "manifest.json"
+    if not manifest_path.exists():
+        return {}
+    obj = _read_json(manifest_path)
+    files = obj.get("files") if isinstance(obj, dict) else None
+    out: dict[str, str] = {}
+    if isinstance(files, list):
+        for f in files:
+            if isinstance(f, dict) and isinstance(f.get("path"), str) and isinstance(f.get("sha256"), str):
+                out[f["path"]] = f["sha256"]
+    return out
+
+
 @dataclass(frozen=True)
 class _PatientHit:
     rel: str
@@ -161,14 +237,308 @@ class _PatientHit:
     external_ids: list[dict]
 
 
-def _load_person_links(identity_dir: Path) -> dict:
-    path = identity_dir / "person_links.json"
+# Source of truth for the identity registry. people.json / person_links.json are exported after every change;
+# aliases.json (append-only, grows with total history) only when requested.
+IDENTITY_DB = "identity.sqlite"
+
+_VERIFICATION_STATES = ("verified", "unverified", "user_confirmed")
+
+_PEOPLE_NOTES = {
+    "matching_rule": "same person iff first_norm AND last_norm match",
+    "normalization": "trim + collapse whitespace + casefold; middle names/initials ignored by taking first token and last token",
+}
+_ALIASES_NOTES = {
+    "append_only": True,
+    "dedupe_rule": "alias_key = sha256(stable alias payload)",
+}
+_LINKS_NOTES = {
+    "identifiers": "system_fingerprint and source_patient_id are sha256 fingerprints; raw external IDs are not stored here",
+    "verification_state": list(_VERIFICATION_STATES),
+}
+
+
+def _load_json_list(path: Path, key: str) -> list[dict]:
     if not path.exists():
-        return {"schema_version": 1, "run_id": None, "links": []}
+        return []
     obj = _read_json(path)
-    if isinstance(obj, dict) and isinstance(obj.get("links"), list):
-        return obj
-    raise ValueError(f"Invalid person_links.json: {path}")
+    items = obj.get(key) if isinstance(obj, dict) else None
+    return [x for x in items if isinstance(x, dict)] if isinstance(items, list) else []
+
+
+def _alias_external_ids(alias: dict) -> list[tuple[str, str]]:
+    src = alias.get("source")
+    external = src.get("external_ids") if isinstance(src, dict) else None
+    out: list[tuple[str, str]] = []
+    if isinstance(external, list):
+        for ext in external:
+            if not isinstance(ext, dict):
+                continue
+            system = ext.get("system")
+            value = ext.get("value")
+            if isinstance(system, str) and isinstance(value, str) and system.strip() and value.strip():
+                out.append((system, value))
+    return out
+
+
+def _insert_alias(con: sqlite3.Connection, alias: dict) -> bool:
+    cur = con.execute(
+        "INSERT OR IGNORE INTO aliases VALUES (?, ?, ?, ?);",
+        (
+            alias["alias_key"],
+            alias.get("last_norm", ""),
+            alias.get("first_norm", ""),
+            json.dumps(alias, sort_keys=True, separators=(",", ":")),
+        ),
+    )
+    if cur.rowcount == 0:
+        return False
+    person_key = alias.get("person_key")
+    if isinstance(person_key, str):
+        # Last alias wins an external id seen with several people, as when the map was built from aliases.json.
+        con.executemany(
+            "INSERT INTO alias_external_ids VALUES (?, ?, ?) "
+            "ON CONFLICT (system, value) DO UPDATE SET person_key=excluded.person_key;",
+            [(system, value, person_key) for system, value in _alias_external_ids(alias)],
+        )
+    return True
+
+
+def _import_legacy_json(con: sqlite3.Connection, identity_dir: Path) -> None:
+    people_path = identity_dir / "people.json"
+    links_path = identity_dir / "person_links.json"
+    for person in _load_json_list(people_path, "people"):
+        row = (person.get("person_key"), person.get("first_norm"), person.get("last_norm"), person.get("created_at"))
+        if all(isinstance(x, str) for x in row[:3]):
+            con.execute("INSERT OR IGNORE INTO people VALUES (?, ?, ?, ?);", row)
+    for alias in _load_json_list(identity_dir / "aliases.json", "aliases"):
+        if isinstance(alias.get("alias_key"), str):
+            _insert_alias(con, alias)
+    for link in _load_json_list(links_path, "links"):
+        row = (
+            link.get("system_fingerprint"),
+            link.get("source_patient_id"),
+            link.get("person_key"),
+            link.get("verification_state"),
+        )
+        if all(isinstance(x, str) for x in row):
+            con.execute("INSERT OR IGNORE INTO person_links VALUES (?, ?, ?, ?);", row)
+    for path in (people_path, links_path):
+        if path.exists():
+            run_id = _read_json(path).get("run_id")
+            if isinstance(run_id, str):
+                con.execute("INSERT OR REPLACE INTO meta VALUES ('run_id', ?);", (run_id,))
+                break
+
+
+_IDENTITY_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS people (
+      person_key TEXT PRIMARY KEY, first_norm TEXT NOT NULL, last_norm TEXT NOT NULL, created_at TEXT
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS people_name ON people(first_norm, last_norm);",
+    """
+    CREATE TABLE IF NOT EXISTS aliases (
+      alias_key TEXT PRIMARY KEY, last_norm TEXT NOT NULL, first_norm TEXT NOT NULL, alias_json TEXT NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS alias_external_ids (
+      system TEXT NOT NULL, value TEXT NOT NULL, person_key TEXT NOT NULL, PRIMARY KEY (system, value)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS person_links (
+      system_fingerprint TEXT NOT NULL,
+      source_patient_id TEXT NOT NULL,
+      person_key TEXT NOT NULL,
+      verification_state TEXT NOT NULL,
+      PRIMARY KEY (system_fingerprint, source_patient_id)
+    );
+    """,
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);",
+    """
+    CREATE TABLE IF NOT EXISTS patient_scan_cache (
+      file_sha256 TEXT NOT NULL, scan_version TEXT NOT NULL, patients_json TEXT NOT NULL,
+      PRIMARY KEY (file_sha256, scan_version)
+    );
+    """,
+)
+
+
+def _bump_lookup_version(con: sqlite3.Connection) -> None:
+    # Changes whenever what load_people / load_external_id_map read may have changed (see IdentityLookup).
+    con.execute("INSERT OR REPLACE INTO meta VALUES ('lookup_version', ?);", (str(uuid.uuid4()),))
+
+
+@contextmanager
+def _identity_txn(identity_dir: Path) -> Iterator[sqlite3.Connection]:
+    """
+    Write transaction on the identity store; the first write imports an existing JSON registry. BEGIN IMMEDIATE
+    serializes concurrent builds sharing the identity dir.
+    """
+    identity_dir.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(str(identity_dir / IDENTITY_DB), timeout=60, isolation_level=None)
+    try:
+        con.execute("PRAGMA journal_mode=WAL;")
+        con.execute("BEGIN IMMEDIATE;")
+        try:
+            for ddl in _IDENTITY_SCHEMA:
+                con.execute(ddl)
+            if con.execute("SELECT value FROM meta WHERE key='legacy_json_imported';").fetchone() is None:
+                _import_legacy_json(con, identity_dir)
+                con.execute("INSERT INTO meta VALUES ('legacy_json_imported', '1');")
+                _bump_lookup_version(con)
+            yield con
+        except BaseException:
+            con.execute("ROLLBACK;")
+            raise
+        con.execute("COMMIT;")
+    finally:
+        con.close()
+
+
+def _query_store(identity_dir: Path, sql: str, params: tuple = ()) -> list[tuple] | None:
+    # Read-only; None when the identity dir has no store yet (callers fall back to the JSON files).
+    db = identity_dir / IDENTITY_DB
+    if not db.exists():
+        return None
+    con = sqlite3.connect(f"file:{db.as_posix()}?mode=ro", uri=True, timeout=60)
+    try:
+        return con.execute(sql, params).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        con.close()
+
+
+def _load_scan_cache(identity_dir: Path, digests: list[str]) -> dict[str, list[dict]]:
+    out: dict[str, list[dict]] = {}
+    for i in range(0, len(digests), 500):
+        chunk = digests[i : i + 500]
+        rows = _query_store(
+            identity_dir,
+            f"SELECT file_sha256, patients_json FROM patient_scan_cache WHERE scan_version=? "
+            f"AND file_sha256 IN ({','.join('?' * len(chunk))});",
+            (_PATIENT_SCAN_VERSION, *chunk),
+        )
+        if rows is None:
+            return out
+        out.update({sha: json.loads(patients) for sha, patients in rows})
+    return out
+
+
+def load_people(identity_dir: str | Path) -> list[dict]:
+    """
+    Canonical people (person_key, first_norm, last_norm, created_at), sorted by last_norm/first_norm/person_key.
+    """
+    root = Path(identity_dir)
+    rows = _query_store(
+        root, "SELECT person_key, first_norm, last_norm, created_at FROM people ORDER BY last_norm, first_norm, person_key;"
+    )
+    if rows is None:
+        people_path = root / "people.json"
+        if not people_path.exists():
+            return []
+        obj = _read_json(people_path)
+        if not (isinstance(obj, dict) and isinstance(obj.get("people"), list)):
+            raise ValueError(f"Invalid people.json format: {people_path}")
+        return [p for p in obj["people"] if isinstance(p, dict)]
+    return [{"person_key": r[0], "first_norm": r[1], "last_norm": r[2], "created_at": r[3]} for r in rows]
+
+
+def load_external_id_map(identity_dir: str | Path) -> dict[tuple[str, str], str]:
+    """
+    Observed `(system, value) -> person_key` for every external patient id seen in an alias. An id seen with
+    several people maps to the person of the last alias recorded.
+    """
+    root = Path(identity_dir)
+    rows = _query_store(root, "SELECT system, value, person_key FROM alias_external_ids;")
+    if rows is not None:
+        return {(system, value): person_key for system, value, person_key in rows}
+    mapping: dict[tuple[str, str], str] = {}
+    for alias in _load_json_list(root / "aliases.json", "aliases"):
+        person_key = alias.get("person_key")
+        if isinstance(person_key, str):
+            for key in _alias_external_ids(alias):
+                mapping[key] = person_key
+    return mapping
+
+
+class IdentityLookup:
+    """
+    `load_people` + `load_external_id_map` kept in memory by a long-lived process (the daemon). A store is re-read
+    only when its lookup_version changed (a build, from any process, that added people, aliases or links); legacy
+    JSON identity dirs have no version and are read every time. Returned values are shared: do not mutate them.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[str, list[dict], dict[tuple[str, str], str]]] = {}
+
+    def get(self, identity_dir: str | Path) -> tuple[list[dict], dict[tuple[str, str], str]]:
+        root = Path(identity_dir)
+        rows = _query_store(root, "SELECT value FROM meta WHERE key='lookup_version';")
+        version = rows[0][0] if rows else None
+        key = str(root.resolve())
+        with self._lock:
+            cached = self._entries.get(key)
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        people, id_map = load_people(root), load_external_id_map(root)
+        if version is not None:
+            with self._lock:
+                self._entries[key] = (version, people, id_map)
+        return people, id_map
+
+
+def _load_links(identity_dir: Path) -> list[dict]:
+    rows = _query_store(
+        identity_dir,
+        "SELECT system_fingerprint, source_patient_id, person_key, verification_state FROM person_links "
+        "ORDER BY system_fingerprint, source_patient_id, person_key;",
+    )
+    if rows is None:
+        path = identity_dir / "person_links.json"
+        if not path.exists():
+            return []
+        obj = _read_json(path)
+        if not (isinstance(obj, dict) and isinstance(obj.get("links"), list)):
+            raise ValueError(f"Invalid person_links.json: {path}")
+        return [l for l in obj["links"] if isinstance(l, dict)]
+    return [
+        {"system_fingerprint": r[0], "source_patient_id": r[1], "person_key": r[2], "verification_state": r[3]}
+        for r in rows
+    ]
+
+
+def _export_json(con: sqlite3.Connection, identity_dir: Path, *, aliases: bool) -> int:
+    row = con.execute("SELECT value FROM meta WHERE key='run_id';").fetchone()
+    run_id = row[0] if row else None
+    people = [
+        {"person_key": r[0], "first_norm": r[1], "last_norm": r[2], "created_at": r[3]}
+        for r in con.execute(
+            "SELECT person_key, first_norm, last_norm, created_at FROM people ORDER BY last_norm, first_norm, person_key;"
+        )
+    ]
+    links = [
+        {"system_fingerprint": r[0], "source_patient_id": r[1], "person_key": r[2], "verification_state": r[3]}
+        for r in con.execute(
+            "SELECT system_fingerprint, source_patient_id, person_key, verification_state FROM person_links "
+            "ORDER BY system_fingerprint, source_patient_id, person_key;"
+        )
+    ]
+    _write_json(identity_dir / "people.json", {"schema_version": 1, "run_id": run_id, "people": people, "notes": _PEOPLE_NOTES})
+    _write_json(identity_dir / "person_links.json", {"schema_version": 1, "run_id": run_id, "links": links, "notes": _LINKS_NOTES})
+    if not aliases:
+        return 2
+    alias_rows = [
+        json.loads(r[0]) for r in con.execute("SELECT alias_json FROM aliases ORDER BY last_norm, first_norm, alias_key;")
+    ]
+    _write_json(
+        identity_dir / "aliases.json", {"schema_version": 1, "run_id": run_id, "aliases": alias_rows, "notes": _ALIASES_NOTES}
+    )
+    return 3
 
 
 def review_identity_links(*, identity_dir: str = "data/identity") -> list[str]:
@@ -176,16 +546,8 @@ def review_identity_links(*, identity_dir: str = "data/identity") -> list[str]:
     Returns deterministic, share-safe lines for unverified links.
     Output lines intentionally avoid names/DOBs and include only fingerprints + person_key.
     """
-    root = Path(identity_dir)
-    obj = _load_person_links(root)
-    links = obj.get("links")
-    if not isinstance(links, list):
-        return []
-
     rows: list[tuple[str, str]] = []
-    for link in links:
-        if not isinstance(link, dict):
-            continue
+    for link in _load_links(Path(identity_dir)):
         if link.get("verification_state") != "unverified":
             continue
         sys_fp = link.get("system_fingerprint")
@@ -205,52 +567,41 @@ def confirm_identity_link(*, identity_dir: str = "data/identity", link_id: str)
     Returns True if the link exists (even if already confirmed), False if not found.
     """
     root = Path(identity_dir)
-    obj = _load_person_links(root)
-    links = obj.get("links")
-    if not isinstance(links, list):
-        raise ValueError("person_links.json missing links")
-
-    found = False
-    updated_any = False
-    updated_links: list[dict] = []
-    for link in links:
-        if not isinstance(link, dict):
-            continue
-        sys_fp = link.get("system_fingerprint")
-        src_pid = link.get("source_patient_id")
-        if not (isinstance(sys_fp, str) and isinstance(src_pid, str)):
-            continue
-        lid = _person_link_id(sys_fp, src_pid)
-        if lid != link_id:
-            updated_links.append(link)
-            continue
-
-        found = True
-        if link.get("verification_state") != "user_confirmed":
-            link = {**link, "verification_state": "user_confirmed"}
-            updated_any = True
-        updated_links.append(link)
-
-    if not found:
+    if not (root / IDENTITY_DB).exists() and not (root / "person_links.json").exists():
         return False
 
-    if updated_any:
-        # Preserve existing metadata, but normalize the links ordering deterministically.
-        obj_out = dict(obj)
-        obj_out["links"] = sorted(
-            updated_links,
-            key=lambda l: (l.get("system_fingerprint", ""), l.get("source_patient_id", ""), l.get("person_key", "")),
-        )
-        _write_json(root / "person_links.json", obj_out)
+    with _identity_txn(root) as con:
+        # link_id is a digest of the primary key, so this is a scan over links (not aliases).
+        target = None
+        for sys_fp, src_pid, state in con.execute(
+            "SELECT system_fingerprint, source_patient_id, verification_state FROM person_links;"
+        ):
+            if _person_link_id(sys_fp, src_pid) == link_id:
+                target = (sys_fp, src_pid, state)
+                break
+        if target is None:
+            return False
+        if target[2] != "user_confirmed":
+            con.execute(
+                "UPDATE person_links SET verification_state='user_confirmed' "
+                "WHERE system_fingerprint=? AND source_patient_id=?;",
+                target[:2],
+            )
+            _export_json(con, root, aliases=False)
     return True
 
 
-def build_identity(*, staging_run_dir: str, output_dir: str = "data/identity") -> None:
+def build_identity(*, staging_run_dir: str, output_dir: str = "data/identity", export_aliases: bool = True) -> None:
+    """
+    Incrementally add this run's Patient observations to the identity store. `export_aliases=False` skips
+    rewriting the append-only aliases.json (the store stays authoritative).
+    """
     with progress.phase("identity: init"):
         run_dir = Path(staging_run_dir)
         layout_path = run_dir / "layout.json"
         if not layout_path.exists():
             raise FileNotFoundError("Missing layout.json in staging run dir")
+        verify_staged_sources(run_dir)
 
     with progress.phase("identity: load layout"):
         layout = _read_json(layout_path)
@@ -263,92 +614,48 @@ def build_identity(*, staging_run_dir: str, output_dir: str = "data/identity") -
         raise ValueError("layout.json clinical_json must be a list")
 
     identity_dir = Path(output_dir)
-    people_path = identity_dir / "people.json"
-    aliases_path = identity_dir / "aliases.json"
-    links_path = identity_dir / "person_links.json"
-
-    people: list[dict] = []
-    aliases: list[dict] = []
-    links: list[dict] = []
-    with progress.phase("identity: load existing state"):
-        if people_path.exists():
-            obj = _read_json(people_path)
-            if isinstance(obj, dict) and isinstance(obj.get("people"), list):
-                people = obj["people"]
-        if aliases_path.exists():
-            obj = _read_json(aliases_path)
-            if isinstance(obj, dict) and isinstance(obj.get("aliases"), list):
-                aliases = obj["aliases"]
-        if links_path.exists():
-            obj = _read_json(links_path)
-            if isinstance(obj, dict) and isinstance(obj.get("links"), list):
-                links = obj["links"]
-
-    name_to_people: dict[tuple[str, str], list[str]] = {}
-    for person in people:
-        if not isinstance(person, dict):
-            continue
-        first_norm = person.get("first_norm")
-        last_norm = person.get("last_norm")
-        person_key = person.get("person_key")
-        if isinstance(first_norm, str) and isinstance(last_norm, str) and isinstance(person_key, str):
-            name_to_people.setdefault((first_norm, last_norm), [])
-            if person_key not in name_to_people[(first_norm, last_norm)]:
-                name_to_people[(first_norm, last_norm)].append(person_key)
-
-    alias_keys_existing = set()
-    for alias in aliases:
-        if isinstance(alias, dict) and isinstance(alias.get("alias_key"), str):
-            alias_keys_existing.add(alias["alias_key"])
-
-    link_key_to_person: dict[tuple[str, str], str] = {}
-    for link in links:
-        if not isinstance(link, dict):
-            continue
-        sys_fp = link.get("system_fingerprint")
-        src_pid = link.get("source_patient_id")
-        person_key = link.get("person_key")
-        state = link.get("verification_state")
-        if not (isinstance(sys_fp, str) and isinstance(src_pid, str) and isinstance(person_key, str)):
-            continue
-        if state not in {"verified", "unverified", "user_confirmed"}:
-            continue
-        link_key_to_person[(sys_fp, src_pid)] = person_key
-
     now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0).isoformat()
 
-    # First pass: collect all Patient resources and count name collisions within this run.
+    # First pass: collect all Patient resources and count name collisions within this run. Files whose manifest
+    # sha256 was scanned before come from the per-file cache and are not read; others are byte-filtered first.
+    digests = _staged_file_digests(run_dir)
+    clinical_rels = {rel for rel in clinical_paths if isinstance(rel, str)}
+    cached = _load_scan_cache(identity_dir, sorted({d for rel, d in digests.items() if rel in clinical_rels}))
+    new_scans: dict[str, list[dict]] = {}
     hits: list[_PatientHit] = []
+
+    def _scan_file(rel: object) -> list[dict] | None:
+        # Runs on the shared small-file reader pool: read + byte filter (+ parse of Patient files) overlap.
+        if not isinstance(rel, str):
+            return None
+        sha = digests.get(rel)
+        if sha is not None and sha in cached:
+            return cached[sha]
+        p = run_dir / rel
+        try:
+            if is_large_bundle(p):
+                return _scan_patients_streamed(p)
+            raw = staged_source.read_bytes(p)
+        except FileNotFoundError:
+            return None
+        return _scan_patients(raw, path=p)
+
     with progress.phase("identity: scan clinical JSON"):
         task = progress.task("identity: scan clinical JSON", total=len(clinical_paths), unit="files")
-        for rel in clinical_paths:
-            if not isinstance(rel, str):
-                task.advance(1)
-                continue
-            p = run_dir / rel
-            if not p.exists():
-                task.advance(1)
-                continue
-            try:
-                content = _read_json(p)
-            except json.JSONDecodeError:
+        for rel, patients in map_files(_scan_file, clinical_paths):
+            if patients is None:
                 task.advance(1)
                 continue
+            sha = digests.get(rel)
+            if sha is not None and sha not in cached:
+                new_scans[sha] = patients
 
-            resources = _walk_fhir_resources(content)
-            for idx, res in enumerate(resources):
-                if res.get("resourceType") != "Patient":
-                    continue
-                name = _extract_patient_name(res)
-                if not name:
-                    continue
+            for rec in patients:
                 try:
-                    parsed = parse_name(name)
+                    parsed = parse_name(rec["name"])
                 except ValueError:
                     continue
-
-                external_ids = _extract_external_ids(res)
-                hits.append(_PatientHit(rel=rel, idx=idx, parsed=parsed, external_ids=external_ids))
+                hits.append(_PatientHit(rel=rel, idx=rec["idx"], parsed=parsed, external_ids=rec["external_ids"]))
             task.advance(1)
 
     name_counts: dict[tuple[str, str], int] = {}
@@ -356,146 +663,141 @@ def build_identity(*, staging_run_dir: str, output_dir: str = "data/identity") -
         k = (h.parsed.first_norm, h.parsed.last_norm)
         name_counts[k] = name_counts.get(k, 0) + 1
 
-    def _create_person(*, parsed: ParsedName) -> str:
-        person_key = str(uuid.uuid4())
-        people.append(
-            {
-                "person_key": person_key,
-                "first_norm": parsed.first_norm,
-                "last_norm": parsed.last_norm,
-                "created_at": now,
-            }
-        )
-        name_to_people.setdefault((parsed.first_norm, parsed.last_norm), [])
-        name_to_people[(parsed.first_norm, parsed.last_norm)].append(person_key)
-        return person_key
-
-    def _add_links(*, person_key: str, external_ids: list[dict], verification_state: str) -> None:
-        if verification_state not in {"verified", "unverified", "user_confirmed"}:
-            raise ValueError(f"Invalid verification_state: {verification_state}")
-        for ext in external_ids:
-            if not isinstance(ext, dict):
-                continue
-            system = ext.get("system")
-            value = ext.get("value")
-            if not (isinstance(system, str) and isinstance(value, str) and system.strip() and value.strip()):
-                continue
-
-            sys_fp = _system_fingerprint(system)
-            src_pid = _source_patient_id_fingerprint(system, value)
-            key = (sys_fp, src_pid)
-            existing = link_key_to_person.get(key)
-            if existing is not None:
-                if existing != person_key:
-                    raise RuntimeError(f"Conflicting PersonLink for {key}: {existing} vs {person_key}")
-                continue
-            link_key_to_person[key] = person_key
-            links.append(
-                {
-                    "system_fingerprint": sys_fp,
-                    "source_patient_id": src_pid,
-                    "person_key": person_key,
-                    "verification_state": verification_state,
-                }
+    with _identity_txn(identity_dir) as con:
+        changes_before = con.total_changes
+        # Point lookups against the store, memoized for this run; only rows this run touches are read.
+        name_to_people: dict[tuple[str, str], list[str]] = {}
+        link_key_to_person: dict[tuple[str, str], str | None] = {}
+
+        def _people_named(match_key: tuple[str, str]) -> list[str]:
+            if match_key not in name_to_people:
+                name_to_people[match_key] = [
+                    r[0]
+                    for r in con.execute(
+                        "SELECT person_key FROM people WHERE first_norm=? AND last_norm=? ORDER BY person_key;", match_key
+                    )
+                ]
+            return name_to_people[match_key]
+
+        def _linked_person(key: tuple[str, str]) -> str | None:
+            if key not in link_key_to_person:
+                row = con.execute(
+                    "SELECT person_key FROM person_links WHERE system_fingerprint=? AND source_patient_id=? "
+                    "AND verification_state IN (?, ?, ?);",
+                    (*key, *_VERIFICATION_STATES),
+                ).fetchone()
+                link_key_to_person[key] = row[0] if row else None
+            return link_key_to_person[key]
+
+        def _create_person(*, parsed: ParsedName) -> str:
+            person_key = str(uuid.uuid4())
+            named = _people_named((parsed.first_norm, parsed.last_norm))
+            con.execute(
+                "INSERT INTO people VALUES (?, ?, ?, ?);", (person_key, parsed.first_norm, parsed.last_norm, now)
             )
+            named.append(person_key)
+            return person_key
+
+        def _add_links(*, person_key: str, external_ids: list[dict], verification_state: str) -> None:
+            if verification_state not in _VERIFICATION_STATES:
+                raise ValueError(f"Invalid verification_state: {verification_state}")
+            for ext in external_ids:
+                if not isinstance(ext, dict):
+                    continue
+                system = ext.get("system")
+                value = ext.get("value")
+                if not (isinstance(system, str) and isinstance(value, str) and system.strip() and value.strip()):
+                    continue
 
-    # Second pass: assign person_key and append aliases + links.
-    with progress.phase("identity: assign people + aliases"):
-        task = progress.task("identity: assign people", total=len(hits), unit="records")
-        batch = 0
-        for h in sorted(hits, key=lambda x: (x.rel, x.idx)):
-            try:
-                match_key = (h.parsed.first_norm, h.parsed.last_norm)
-
-                linked_person_keys = set()
-                for ext in h.external_ids:
-                    if not isinstance(ext, dict):
-                        continue
-                    system = ext.get("system")
-                    value = ext.get("value")
-                    if not (isinstance(system, str) and isinstance(value, str) and system.strip() and value.strip()):
-                        continue
-                    key = (_system_fingerprint(system), _source_patient_id_fingerprint(system, value))
-                    pk = link_key_to_person.get(key)
-                    if isinstance(pk, str) and pk:
-                        linked_person_keys.add(pk)
-
-                if len(linked_person_keys) > 1:
-                    raise RuntimeError(f"Patient has external IDs linked to multiple people: {sorted(linked_person_keys)}")
-
-                person_key: str | None = next(iter(linked_person_keys)) if linked_person_keys else None
-                link_state_for_new = "unverified"
-
-                if person_key is None:
-                    candidates = name_to_people.get(match_key, [])
-                    if name_counts.get(match_key, 0) == 1 and len(candidates) == 1:
-                        # Unambiguous name match: link to existing person, but keep unverified until confirmed.
-                        person_key = candidates[0]
-                    else:
-                        # Ambiguous within the run or multiple candidates exist: do not auto-merge.
-                        person_key = _create_person(parsed=h.parsed)
-
-                    _add_links(person_key=person_key, external_ids=h.external_ids, verification_state=link_state_for_new)
-
-                alias_payload: dict[str, Any] = {
-                    "person_key": person_key,
-                    "first_raw": h.parsed.first,
-                    "last_raw": h.parsed.last,
-                    "first_norm": h.parsed.first_norm,
-                    "last_norm": h.parsed.last_norm,
-                    "name_raw": h.parsed.raw,
-                    "source": {
-                        "run_id": run_id,
-                        "file": h.rel,
-                        "external_ids": h.external_ids,
-                    },
-                }
-                alias_key = _stable_alias_key(alias_payload)
-                if alias_key in alias_keys_existing:
+                key = (_system_fingerprint(system), _source_patient_id_fingerprint(system, value))
+                existing = _linked_person(key)
+                if existing is not None:
+                    if existing != person_key:
+                        raise RuntimeError(f"Conflicting PersonLink for {key}: {existing} vs {person_key}")
                     continue
-                alias_keys_existing.add(alias_key)
-                aliases.append({**alias_payload, "alias_key": alias_key, "observed_at": now})
-            finally:
-                batch += 1
-                if batch >= 200:
-                    task.advance(batch)
-                    batch = 0
-        if batch:
-            task.advance(batch)
-
-    people_out = {
-        "schema_version": 1,
-        "run_id": run_id,
-        "people": sorted(people, key=lambda p: (p.get("last_norm", ""), p.get("first_norm", ""), p.get("person_key", ""))),
-        "notes": {
-            "matching_rule": "same person iff first_norm AND last_norm match",
-            "normalization": "trim + collapse whitespace + casefold; middle names/initials ignored by taking first token and last token",
-        },
-    }
-    aliases_out = {
-        "schema_version": 1,
-        "run_id": run_id,
-        "aliases": sorted(aliases, key=lambda a: (a.get("last_norm", ""), a.get("first_norm", ""), a.get("alias_key", ""))),
-        "notes": {
-            "append_only": True,
-            "dedupe_rule": "alias_key = sha256(stable alias payload)",
-        },
-    }
-    links_out = {
-        "schema_version": 1,
-        "run_id": run_id,
-        "links": sorted(links, key=lambda l: (l.get("system_fingerprint", ""), l.get("source_patient_id", ""), l.get("person_key", ""))),
-        "notes": {
-            "identifiers": "system_fingerprint and source_patient_id are sha256 fingerprints; raw external IDs are not stored here",
-            "verification_state": ["verified", "unverified", "user_confirmed"],
-        },
-    }
-
-    with progress.phase("identity: write outputs"):
-        task = progress.task("identity: write outputs", total=3, unit="files")
-        _write_json(people_path, people_out)
-        task.advance(1)
-        _write_json(aliases_path, aliases_out)
-        task.advance(1)
-        _write_json(links_path, links_out)
-        task.advance(1)
+                link_key_to_person[key] = person_key
+                # Unique on (system_fingerprint, source_patient_id); a row in an unknown state is left untouched.
+                con.execute(
+                    "INSERT OR IGNORE INTO person_links VALUES (?, ?, ?, ?);", (*key, person_key, verification_state)
+                )
+
+        # Second pass: assign person_key and append aliases + links.
+        with progress.phase("identity: assign people + aliases"):
+            task = progress.task("identity: assign people", total=len(hits), unit="records")
+            batch = 0
+            for h in sorted(hits, key=lambda x: (x.rel, x.idx)):
+                try:
+                    match_key = (h.parsed.first_norm, h.parsed.last_norm)
+
+                    linked_person_keys = set()
+                    for ext in h.external_ids:
+                        if not isinstance(ext, dict):
+                            continue
+                        system = ext.get("system")
+                        value = ext.get("value")
+                        if not (isinstance(system, str) and isinstance(value, str) and system.strip() and value.strip()):
+                            continue
+                        pk = _linked_person((_system_fingerprint(system), _source_patient_id_fingerprint(system, value)))
+                        if isinstance(pk, str) and pk:
+                            linked_person_keys.add(pk)
+
+                    if len(linked_person_keys) > 1:
+                        raise RuntimeError(
+                            f"Patient has external IDs linked to multiple people: {sorted(linked_person_keys)}"
+                        )
+
+                    person_key: str | None = next(iter(linked_person_keys)) if linked_person_keys else None
+                    link_state_for_new = "unverified"
+
+                    if person_key is None:
+                        candidates = _people_named(match_key)
+                        if name_counts.get(match_key, 0) == 1 and len(candidates) == 1:
+                            # Unambiguous name match: link to existing person, but keep unverified until confirmed.
+                            person_key = candidates[0]
+                        else:
+                            # Ambiguous within the run or multiple candidates exist: do not auto-merge.
+                            person_key = _create_person(parsed=h.parsed)
+
+                        _add_links(
+                            person_key=person_key, external_ids=h.external_ids, verification_state=link_state_for_new
+                        )
+
+                    alias_payload: dict[str, Any] = {
+                        "person_key": person_key,
+                        "first_raw": h.parsed.first,
+                        "last_raw": h.parsed.last,
+                        "first_norm": h.parsed.first_norm,
+                        "last_norm": h.parsed.last_norm,
+                        "name_raw": h.parsed.raw,
+                        "source": {
+                            "run_id": run_id,
+                            "file": h.rel,
+                            "external_ids": h.external_ids,
+                        },
+                    }
+                    # Unique on alias_key: re-observing an identical alias is a no-op.
+                    _insert_alias(
+                        con, {**alias_payload, "alias_key": _stable_alias_key(alias_payload), "observed_at": now}
+                    )
+                finally:
+                    batch += 1
+                    if batch >= 200:
+                        task.advance(batch)
+                        batch = 0
+            if batch:
+                task.advance(batch)
+
+        if con.total_changes != changes_before:
+            _bump_lookup_version(con)
+        con.execute("INSERT OR REPLACE INTO meta VALUES ('run_id', ?);", (run_id,))
+        con.executemany(
+            "INSERT OR IGNORE INTO patient_scan_cache VALUES (?, ?, ?);",
+            [
+                (sha, _PATIENT_SCAN_VERSION, json.dumps(patients, sort_keys=True, separators=(",", ":")))
+                for sha, patients in sorted(new_scans.items())
+            ],
+        )
+
+        with progress.phase("identity: write outputs"):
+            task = progress.task("identity: write outputs", total=3 if export_aliases else 2, unit="files")
+            task.advance(_export_json(con, identity_dir, aliases=export_aliases))
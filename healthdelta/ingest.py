@@ -1,15 +1,23 @@
 from __future__ import annotations
 
 import dataclasses
+import contextlib
 import datetime as dt
 import hashlib
 import json
+import os
 import shutil
+import threading
 import zipfile
 from pathlib import Path
 
+from healthdelta.blob_store import adopt, link_from_store, store_lock
+from healthdelta.checkpoint import Journal, fsync_file
 from healthdelta.export_layout import resolve_export_layout
+from healthdelta.file_reader import map_files, scan_files
 from healthdelta.progress import progress
+from healthdelta.sampling import sample_clinical_rels, validate_fraction
+from healthdelta.staged_source import is_zip_member, virtual_rel
 
 
 def _sha256_file(path: Path) -> str:
@@ -30,21 +38,224 @@ def _sha256_zip_bytes(zip_path: Path) -> str:
     return h.hexdigest()
 
 
-def _copy_file_with_progress(*, src: Path, dst: Path, label: str) -> None:
+STAGING_MODES = ("copy", "hardlink", "reflink", "reference")
+
+ZIP_MEMBER_MODES = ("extract", "virtual")
+
+# Staged files that share storage with the input: their manifest digests are re-checked by later stages.
+_PINNED_STAGING_MODES = {"hardlink", "reference"}
+
+# Completed zip members (and the staged export.zip) of an interrupted ingest, in the run dir; removed once the
+# manifests are written. A rerun into the same run dir skips what it lists.
+INGEST_CHECKPOINT = ".ingest_checkpoint.jsonl"
+
+_FICLONE = 0x40049409  # Linux ioctl: share extents (btrfs, XFS, bcachefs, ...)
+
+
+def _unlink_staged(dst: Path) -> None:
+    # A run dir staged earlier with hardlink/reference mode shares files with its input: never write through them.
+    if dst.is_symlink() or dst.exists():
+        dst.unlink()
+
+
+def _link_file(*, src: Path, dst: Path, mode: str) -> str:
+    """
+    Stage `src` at `dst` without copying bytes where possible. Returns the method used: the requested one, or
+    "copy" when the filesystem can't (cross-device hardlink, no reflink support, ...).
+    """
+    _unlink_staged(dst)
+    try:
+        if mode == "hardlink":
+            os.link(src, dst)
+            return "hardlink"
+        if mode == "reference":
+            dst.symlink_to(src.resolve())
+            return "reference"
+        if mode == "reflink":
+            import fcntl
+
+            with src.open("rb") as fsrc, dst.open("wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return "reflink"
+    except (OSError, ImportError):
+        _unlink_staged(dst)
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def _stage_file(
+    *,
+    src: Path,
+    dst: Path,
+    mode: str,
+    label: str,
+    methods: dict[str, int],
+    store: Path | None = None,
+    sha256: str | None = None,
+) -> str | None:
+    """
+    Stage one input file (`sha256`: the input's digest, when already computed). Returns the sha256 of the staged
+    bytes when known without reading them again: hashed while copying, or the input digest for links.
+    """
     dst.parent.mkdir(parents=True, exist_ok=True)
+    if store is not None and sha256 is not None and link_from_store(store, sha256, dst=dst, size_bytes=src.stat().st_size):
+        methods["blob"] = methods.get("blob", 0) + 1
+        return sha256
+    if mode == "copy":
+        digest = _copy_file_with_progress(src=src, dst=dst, label=label)
+        used = "copy"
+    else:
+        used = _link_file(src=src, dst=dst, mode=mode)
+        digest = sha256
+    methods[used] = methods.get(used, 0) + 1
+    return digest
+
+
+def _adopt_staged_files(*, store: Path, run_dir: Path, files: list[dict]) -> None:
+    files = [f for f in files if not is_zip_member(f["path"])]
+    with progress.phase("ingest: deduplicate into blob store"):
+        task = progress.task("Link staged files into blob store", total=len(files), unit="files")
+        for f in files:
+            adopt(store, run_dir / f["path"], f["sha256"])
+            task.advance(1)
+
+
+def _staging_section(*, mode: str, methods: dict[str, int], run_dir: Path, files: list[dict]) -> dict:
+    pinned = {}
+    if mode in _PINNED_STAGING_MODES:
+        # Fast path for verification: an unchanged mtime skips re-hashing (a changed one forces it).
+        pinned = {f["path"]: (run_dir / f["path"]).stat().st_mtime_ns for f in files}
+    return {"mode": mode, "methods": dict(sorted(methods.items())), "pinned_mtime_ns": pinned}
+
+
+def verify_staged_sources(run_dir: Path) -> None:
+    """
+    For runs staged with `--staging-mode hardlink|reference`, check that every staged file still matches the
+    size and sha256 pinned in `manifest.json` (the input can be edited after ingest). Stat-only unless a file's
+    mtime changed. No-op for copy/reflink staging and for dirs without a staging manifest.
+    """
+    manifest_path = run_dir / "manifest.json"
+    if not manifest_path.exists():
+        return
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    staging = manifest.get("staging") if isinstance(manifest, dict) else None
+    if not isinstance(staging, dict) or staging.get("mode") not in _PINNED_STAGING_MODES:
+        return
+    pinned = staging.get("pinned_mtime_ns") if isinstance(staging.get("pinned_mtime_ns"), dict) else {}
+    for f in manifest.get("files") or []:
+        if not isinstance(f, dict) or not isinstance(f.get("path"), str) or is_zip_member(f["path"]):
+            # Virtual zip members are verified against their sha256 as they are read (staged_source).
+            continue
+        rel = f["path"]
+        try:
+            st = (run_dir / rel).stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"staged input missing (staging mode {staging['mode']}): {rel}") from None
+        if st.st_size != f.get("size_bytes"):
+            raise ValueError(f"staged input changed since ingest (staging mode {staging['mode']}): {rel}")
+        if pinned.get(rel) != st.st_mtime_ns and _sha256_file(run_dir / rel) != f.get("sha256"):
+            raise ValueError(f"staged input changed since ingest (staging mode {staging['mode']}): {rel}")
+
+
+def _copy_file_with_progress(*, src: Path, dst: Path, label: str) -> str:
+    # Returns the sha256 of the bytes written, so the staged copy need not be read back to hash it.
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    _unlink_staged(dst)
     total = src.stat().st_size
     task = progress.task(label, total=total, unit="bytes")
+    h = hashlib.sha256()
     with src.open("rb") as fsrc, dst.open("wb") as fdst:
         for chunk in iter(lambda: fsrc.read(1024 * 1024), b""):
             fdst.write(chunk)
+            h.update(chunk)
             task.advance(len(chunk))
+    return h.hexdigest()
+
+
+_RECORD_TOKEN = b"<Record"
+
+
+@dataclasses.dataclass(frozen=True)
+class _ExtractedMember:
+    size_bytes: int
+    sha256: str
+    record_count: int
+
+
+class _ZipMemberExtractor:
+    """
+    Extract zip members from worker threads, each with its own ZipFile handle (one shared handle serializes all
+    reads behind its lock). zlib and hashlib release the GIL, so members decompress in parallel; each member is
+    hashed (and, for export.xml, its `<Record` occurrences counted) while it is written.
+    """
+
+    def __init__(self, zip_path: Path) -> None:
+        self._zip_path = zip_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._handles: list[zipfile.ZipFile] = []
+
+    def __enter__(self) -> _ZipMemberExtractor:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        with self._lock:
+            for zf in self._handles:
+                zf.close()
+            self._handles.clear()
+
+    def _zipfile(self) -> zipfile.ZipFile:
+        zf = getattr(self._local, "zf", None)
+        if zf is None:
+            zf = zipfile.ZipFile(self._zip_path)
+            self._local.zf = zf
+            with self._lock:
+                self._handles.append(zf)
+        return zf
+
+    def extract(self, member: str, out_path: Path | None, *, count_records: bool) -> _ExtractedMember:
+        # `out_path=None` only hashes/counts (virtual zip members are read from export.zip later).
+        if out_path is not None:
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            _unlink_staged(out_path)
+        h = hashlib.sha256()
+        size = 0
+        records = 0
+        tail = b""
+        with self._zipfile().open(member) as src, (
+            out_path.open("wb") if out_path is not None else contextlib.nullcontext()
+        ) as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                if dst is not None:
+                    dst.write(chunk)
+                h.update(chunk)
+                size += len(chunk)
+                if count_records:
+                    # Same count as _count_xml_record_estimate: `<Record` never spans lines or overlaps itself,
+                    # and the carried tail is too short to hold a whole match.
+                    buf = tail + chunk
+                    records += buf.count(_RECORD_TOKEN)
+                    tail = buf[-(len(_RECORD_TOKEN) - 1) :]
+            if dst is not None:
+                # On disk before the ingest checkpoint records the member as done.
+                dst.flush()
+                os.fsync(dst.fileno())
+        return _ExtractedMember(size_bytes=size, sha256=h.hexdigest(), record_count=records)
+
+
+def _size_or_none(path: Path) -> int | None:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return None
 
 
 def _count_xml_record_estimate(xml_path: Path) -> int:
     count = 0
     with xml_path.open("rb") as f:
         for line in f:
-            count += line.count(b"<Record")
+            count += line.count(_RECORD_TOKEN)
     return count
 
 
@@ -82,7 +293,7 @@ def _resolve_input(input_path: Path) -> InputResolution:
     clinical_json_paths: list[Path] = []
     if isinstance(layout.clinical_dir_rel, str):
         clinical_root = export_root / layout.clinical_dir_rel
-        clinical_json_paths = sorted([p for p in clinical_root.rglob("*.json") if p.is_file()])
+        clinical_json_paths = scan_files(clinical_root, suffix=".json")
     return InputResolution(
         kind="dir",
         input_path=input_path,
@@ -92,15 +303,23 @@ def _resolve_input(input_path: Path) -> InputResolution:
     )
 
 
-def _compute_run_id_for_directory(*, input_root: Path, export_xml: Path, clinical_json_paths: list[Path]) -> str:
+def _compute_run_id_for_directory(
+    *,
+    input_root: Path,
+    export_xml: Path,
+    clinical_json_paths: list[Path],
+    digests: dict[Path, str] | None = None,
+) -> str:
     h = hashlib.sha256()
     files = [export_xml, *clinical_json_paths]
     task = progress.task("Derive run_id (hash inputs)", total=len(files), unit="files")
-    for p in files:
+    for p, digest in map_files(_sha256_file, files):
+        if digests is not None:
+            digests[p] = digest
         rel = p.relative_to(input_root).as_posix().encode("utf-8", errors="strict")
         h.update(rel)
         h.update(b"\0")
-        h.update(_sha256_file(p).encode("ascii"))
+        h.update(digest.encode("ascii"))
         h.update(b"\n")
         task.advance(1)
     return h.hexdigest()
@@ -119,7 +338,76 @@ def _write_json(path: Path, obj: object) -> None:
     path.write_text(json.dumps(obj, indent=2, sort_keys=True) + "\n", encoding="utf-8")
 
 
-def ingest_to_staging(*, input_path: str, staging_root: str = "data/staging", run_id_override: str | None = None) -> Path:
+def _apply_sample(*, manifest: dict, layout: dict, run_dir: Path, fraction: float | None) -> None:
+    if fraction is None:
+        return
+    with progress.phase("ingest: sample clinical json"):
+        layout["clinical_json"] = sample_clinical_rels(run_dir, layout["clinical_json"], fraction)
+    layout["sample_fraction"] = fraction
+    manifest["sample"] = {"fraction": fraction, "clinical_json_file_count": len(layout["clinical_json"])}
+
+
+def ingest_to_staging(
+    *,
+    input_path: str,
+    staging_root: str = "data/staging",
+    run_id_override: str | None = None,
+    staging_mode: str = "copy",
+    blob_store: str | None = None,
+    zip_members: str = "extract",
+    sample_fraction: float | None = None,
+) -> Path:
+    """
+    Stage an export under `<staging_root>/<run_id>`. `staging_mode` chooses how input files land there (the
+    layout later stages see is the same): `copy`, `hardlink`/`reflink` (falling back to copy per file when the
+    filesystem can't), or `reference` (symlinks to the input, pinned by the manifest sha256s; see
+    `verify_staged_sources`). With the default `zip_members="extract"`, zip members are extracted and only
+    export.zip itself is linked.
+
+    With `blob_store`, staged files are hardlinks into that content-addressed store (see healthdelta.blob_store):
+    inputs whose digest is already stored are linked instead of copied. Ignored for hardlink/reference staging,
+    whose files share the input's inode and must not become blobs.
+
+    `zip_members="virtual"` stages zip input without extracting it: layout.json/manifest.json record members as
+    `source/export.zip!/<member>` (hashed while streaming), and later stages read them from export.zip through
+    healthdelta.staged_source, verified against those digests.
+
+    With `sample_fraction`, everything is staged (and listed in manifest.json) but layout.json lists only the
+    sampled clinical JSON files (see healthdelta.sampling) and records the fraction, so later stages see the subset.
+
+    Zip ingest is resumable: completed members are journaled in INGEST_CHECKPOINT, and staging the same export
+    into the same run dir again (e.g. after the process was killed) skips them.
+    """
+    if staging_mode not in STAGING_MODES:
+        raise ValueError(f"--staging-mode must be one of: {', '.join(STAGING_MODES)}")
+    if zip_members not in ZIP_MEMBER_MODES:
+        raise ValueError(f"--zip-members must be one of: {', '.join(ZIP_MEMBER_MODES)}")
+    sample_fraction = validate_fraction(sample_fraction)
+    store = Path(blob_store) if blob_store and staging_mode not in _PINNED_STAGING_MODES else None
+    # Blobs this run adopts are referenced by no registered manifest yet: keep `gc` out until staging is done.
+    with store_lock(store, shared=True) if store is not None else contextlib.nullcontext():
+        return _ingest_to_staging(
+            input_path=input_path,
+            staging_root=staging_root,
+            run_id_override=run_id_override,
+            staging_mode=staging_mode,
+            store=store,
+            zip_members=zip_members,
+            sample_fraction=sample_fraction,
+        )
+
+
+def _ingest_to_staging(
+    *,
+    input_path: str,
+    staging_root: str,
+    run_id_override: str | None,
+    staging_mode: str,
+    store: Path | None,
+    zip_members: str,
+    sample_fraction: float | None,
+) -> Path:
+    methods: dict[str, int] = {}
     with progress.phase("ingest: resolve input"):
         resolved = _resolve_input(Path(input_path))
     staging_root_path = Path(staging_root)
@@ -133,19 +421,55 @@ def ingest_to_staging(*, input_path: str, staging_root: str = "data/staging", ru
         source_dir = run_dir / "source"
         unpacked_dir = source_dir / "unpacked"
 
+        virtual = zip_members == "virtual"
         with progress.phase("ingest: stage directories"):
             run_dir.mkdir(parents=True, exist_ok=True)
             source_dir.mkdir(parents=True, exist_ok=True)
-            unpacked_dir.mkdir(parents=True, exist_ok=True)
+            if not virtual:
+                unpacked_dir.mkdir(parents=True, exist_ok=True)
+
+        journal = Journal(run_dir / INGEST_CHECKPOINT, key=f"zip:{computed}:{staging_mode}:{zip_members}")
+        done = {e["member"]: e for e in journal.entries if isinstance(e.get("member"), str)}
+        staged_before = next((e for e in journal.entries if e.get("staged") == "export.zip"), None)
 
         staged_zip = source_dir / "export.zip"
         with progress.phase("ingest: stage export.zip"):
-            _copy_file_with_progress(src=resolved.input_path, dst=staged_zip, label="Copy export.zip")
+            if staged_before is not None and _size_or_none(staged_zip) == staged_before["size_bytes"]:
+                zip_digest = staged_before["sha256"]
+                methods[staged_before["method"]] = methods.get(staged_before["method"], 0) + 1
+            else:
+                used: dict[str, int] = {}
+                zip_digest = _stage_file(
+                    src=resolved.input_path,
+                    dst=staged_zip,
+                    mode=staging_mode,
+                    label="Copy export.zip",
+                    methods=used,
+                    store=store,
+                    sha256=computed,
+                )
+                fsync_file(staged_zip)
+                (method,) = used
+                methods[method] = methods.get(method, 0) + 1
+                journal.append(
+                    {
+                        "staged": "export.zip",
+                        "size_bytes": staged_zip.stat().st_size,
+                        "sha256": zip_digest or _sha256_file(staged_zip),
+                        "method": method,
+                    }
+                )
+
+        zip_rel = staged_zip.relative_to(run_dir).as_posix()
+
+        def member_rel(member: str) -> str:
+            return virtual_rel(zip_rel, member) if virtual else (Path("source") / "unpacked" / member).as_posix()
 
         export_xml_rel = None
         export_cda_rel: str | None = None
         clinical_rels: list[str] = []
-        with progress.phase("ingest: extract zip members"):
+        member_of: dict[str, str] = {}
+        with progress.phase("ingest: hash zip members" if virtual else "ingest: extract zip members"):
             with zipfile.ZipFile(resolved.input_path) as zf:
                 members = [m for m in sorted(zf.namelist()) if not m.endswith("/")]
 
@@ -158,37 +482,56 @@ def ingest_to_staging(*, input_path: str, staging_root: str = "data/staging", ru
                     return False
 
                 selected = [m for m in members if include_member(m)]
-                task = progress.task("Extract staged files", total=len(selected), unit="files")
-
-                for member in selected:
-                    lower = member.lower()
-                    out_path = unpacked_dir / member
-                    out_path.parent.mkdir(parents=True, exist_ok=True)
-                    with zf.open(member) as src, out_path.open("wb") as dst:
-                        shutil.copyfileobj(src, dst)
-                    if lower.endswith("export.xml") and export_xml_rel is None:
-                        export_xml_rel = (Path("source") / "unpacked" / member).as_posix()
-                    if lower.endswith("export_cda.xml") and export_cda_rel is None:
-                        export_cda_rel = (Path("source") / "unpacked" / member).as_posix()
-                    if lower.endswith(".json"):
-                        clinical_rels.append((Path("source") / "unpacked" / member).as_posix())
+                sizes = {i.filename: i.file_size for i in zf.infolist()}
+
+            for member in selected:
+                lower = member.lower()
+                member_of[member_rel(member)] = member
+                if lower.endswith("export.xml") and export_xml_rel is None:
+                    export_xml_member = member
+                    export_xml_rel = member_rel(member)
+                if lower.endswith("export_cda.xml") and export_cda_rel is None:
+                    export_cda_rel = member_rel(member)
+                if lower.endswith(".json"):
+                    clinical_rels.append(member_rel(member))
+
+            # Largest first, so the one big export.xml is not the last member to start; the manifest is assembled
+            # in path order afterwards.
+            unique = sorted(set(selected), key=lambda m: (-sizes.get(m, 0), m))
+            task = progress.task("Hash zip members" if virtual else "Extract staged files", total=len(unique), unit="files")
+            extracted: dict[str, _ExtractedMember] = {}
+            with _ZipMemberExtractor(resolved.input_path) as extractor:
+
+                def extract(member: str) -> tuple[_ExtractedMember, bool]:
+                    out_path = None if virtual else unpacked_dir / member
+                    before = done.get(member)
+                    if before is not None and (out_path is None or _size_or_none(out_path) == before["size_bytes"]):
+                        return _ExtractedMember(before["size_bytes"], before["sha256"], before["record_count"]), True
+                    return extractor.extract(member, out_path, count_records=member.lower().endswith("export.xml")), False
+
+                for member, (result, resumed) in map_files(extract, unique):
+                    extracted[member] = result
+                    if not resumed:
+                        journal.append({"member": member, **dataclasses.asdict(result)})
                     task.advance(1)
 
         if export_xml_rel is None:
             raise ValueError("export.zip did not contain export.xml")
 
-        export_xml_path = run_dir / export_xml_rel
-        export_cda_path = run_dir / export_cda_rel if export_cda_rel is not None else None
-        clinical_paths = [run_dir / p for p in clinical_rels]
-
         files = []
         with progress.phase("ingest: hash staged files"):
-            to_hash = [p for p in [staged_zip, export_xml_path, export_cda_path, *clinical_paths] if p and p.exists()]
-            task = progress.task("Hash staged files", total=len(to_hash), unit="files")
-            for p in to_hash:
-                rel = p.relative_to(run_dir).as_posix()
-                files.append({"path": rel, "size_bytes": p.stat().st_size, "sha256": _sha256_file(p)})
-                task.advance(1)
+            # Members were hashed while extracting and export.zip while staging: nothing is read back here.
+            files.append(
+                {
+                    "path": zip_rel,
+                    "size_bytes": staged_zip.stat().st_size,
+                    "sha256": zip_digest or _sha256_file(staged_zip),
+                }
+            )
+            for rel in [export_xml_rel, export_cda_rel, *clinical_rels]:
+                if rel is not None:
+                    e = extracted[member_of[rel]]
+                    files.append({"path": rel, "size_bytes": e.size_bytes, "sha256": e.sha256})
 
         with progress.phase("ingest: write manifests"):
             manifest = {
@@ -196,8 +539,8 @@ def ingest_to_staging(*, input_path: str, staging_root: str = "data/staging", ru
                 "input": _redacted_input("zip"),
                 "files": sorted(files, key=lambda x: x["path"]),
                 "counts": {
-                    "xml_record_count_estimate": _count_xml_record_estimate(export_xml_path),
-                    "clinical_json_file_count": len(clinical_paths),
+                    "xml_record_count_estimate": extracted[export_xml_member].record_count,
+                    "clinical_json_file_count": len(clinical_rels),
                 },
                 "timestamps": {
                     "started_at": started_at,
@@ -216,20 +559,30 @@ def ingest_to_staging(*, input_path: str, staging_root: str = "data/staging", ru
                 "export_cda_xml": export_cda_rel,
                 "clinical_json": clinical_rels,
             }
+            _apply_sample(manifest=manifest, layout=layout, run_dir=run_dir, fraction=sample_fraction)
+
+            if staging_mode != "copy":
+                manifest["staging"] = _staging_section(mode=staging_mode, methods=methods, run_dir=run_dir, files=files)
+                manifest["determinism"]["time_fields"].append("staging.pinned_mtime_ns")
 
             _write_json(run_dir / "manifest.json", manifest)
             _write_json(run_dir / "layout.json", layout)
+        journal.remove()
+        if store is not None:
+            _adopt_staged_files(store=store, run_dir=run_dir, files=files)
         return run_dir
 
     export_xml = resolved.export_xml_path
     if export_xml is None:
         raise AssertionError("resolved.export_xml_path must be set for dir inputs")
 
+    input_digests: dict[Path, str] = {}
     with progress.phase("ingest: compute run_id"):
         computed = _compute_run_id_for_directory(
             input_root=resolved.input_path,
             export_xml=export_xml,
             clinical_json_paths=resolved.clinical_json_paths,
+            digests=input_digests,
         )
     run_id = run_id_override or computed
     run_dir = staging_root_path / run_id
@@ -239,16 +592,31 @@ def ingest_to_staging(*, input_path: str, staging_root: str = "data/staging", ru
 
     staged_export_xml = source_dir / "export.xml"
     with progress.phase("ingest: stage export.xml"):
-        _copy_file_with_progress(src=export_xml, dst=staged_export_xml, label="Copy export.xml")
+        xml_digest = _stage_file(
+            src=export_xml,
+            dst=staged_export_xml,
+            mode=staging_mode,
+            label="Copy export.xml",
+            methods=methods,
+            store=store,
+            sha256=input_digests[export_xml],
+        )
 
     staged_unpacked_dir = source_dir / "unpacked"
     staged_unpacked_dir.mkdir(parents=True, exist_ok=True)
 
     staged_export_cda = None
+    cda_digest = None
     if resolved.export_cda_path is not None and resolved.export_cda_path.exists():
         staged_export_cda = staged_unpacked_dir / "export_cda.xml"
         with progress.phase("ingest: stage export_cda.xml"):
-            _copy_file_with_progress(src=resolved.export_cda_path, dst=staged_export_cda, label="Copy export_cda.xml")
+            cda_digest = _stage_file(
+                src=resolved.export_cda_path,
+                dst=staged_export_cda,
+                mode=staging_mode,
+                label="Copy export_cda.xml",
+                methods=methods,
+            )
 
     staged_clinical_root = source_dir / "clinical" / "clinical-records"
     staged_clinical_root.mkdir(parents=True, exist_ok=True)
@@ -256,21 +624,56 @@ def ingest_to_staging(*, input_path: str, staging_root: str = "data/staging", ru
     clinical_rels: list[str] = []
     with progress.phase("ingest: stage clinical json"):
         task = progress.task("Copy clinical JSON", total=len(resolved.clinical_json_paths), unit="files")
+        # Canonicalize to stable staging paths regardless of input directory variant. When two inputs share a
+        # name the later one wins (as with sequential copies), so only that one is copied.
+        copies: dict[Path, Path] = {}
         for p in resolved.clinical_json_paths:
-            # Canonicalize to stable staging paths regardless of input directory variant.
             out_path = staged_clinical_root / p.name
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(p, out_path)
+            copies.pop(out_path, None)
+            copies[out_path] = p
             clinical_rels.append((out_path.relative_to(run_dir)).as_posix())
+
+        def stage_one(item: tuple[Path, Path]) -> str:
+            dst, src = item
+            sha = input_digests.get(src)
+            if store is not None and sha is not None and link_from_store(store, sha, dst=dst, size_bytes=src.stat().st_size):
+                return "blob"
+            if staging_mode == "copy":
+                _unlink_staged(dst)
+                shutil.copy2(src, dst)
+                return "copy"
+            return _link_file(src=src, dst=dst, mode=staging_mode)
+
+        clinical_from_store: set[Path] = set()
+        for (dst, _), used in map_files(stage_one, copies.items()):
+            if used == "blob":
+                clinical_from_store.add(dst)
+            if staging_mode != "copy" or used == "blob":
+                methods[used] = methods.get(used, 0) + 1
             task.advance(1)
+        task.advance(len(resolved.clinical_json_paths) - len(copies))
+
+    # Linked staged files have the input's bytes: reuse the run_id digests instead of hashing them again.
+    staged_digests: dict[Path, str] = {}
+    if xml_digest is not None:
+        staged_digests[staged_export_xml] = xml_digest
+    if staged_export_cda is not None and cda_digest is not None:
+        staged_digests[staged_export_cda] = cda_digest
+    staged_digests.update(
+        {
+            dst: input_digests[src]
+            for dst, src in copies.items()
+            if src in input_digests and (staging_mode != "copy" or dst in clinical_from_store)
+        }
+    )
 
     files = []
     with progress.phase("ingest: hash staged files"):
         to_hash = [p for p in [staged_export_xml, staged_export_cda, *[run_dir / r for r in clinical_rels]] if p and p.exists()]
         task = progress.task("Hash staged files", total=len(to_hash), unit="files")
-        for p in to_hash:
+        for p, digest in map_files(lambda x: staged_digests.get(x) or _sha256_file(x), to_hash):
             rel = p.relative_to(run_dir).as_posix()
-            files.append({"path": rel, "size_bytes": p.stat().st_size, "sha256": _sha256_file(p)})
+            files.append({"path": rel, "size_bytes": p.stat().st_size, "sha256": digest})
             task.advance(1)
 
     with progress.phase("ingest: write manifests"):
@@ -301,9 +704,16 @@ def ingest_to_staging(*, input_path: str, staging_root: str = "data/staging", ru
             "export_cda_xml": staged_export_cda.relative_to(run_dir).as_posix() if staged_export_cda is not None else None,
             "clinical_json": clinical_rels,
         }
+        _apply_sample(manifest=manifest, layout=layout, run_dir=run_dir, fraction=sample_fraction)
+
+        if staging_mode != "copy":
+            manifest["staging"] = _staging_section(mode=staging_mode, methods=methods, run_dir=run_dir, files=files)
+            manifest["determinism"]["time_fields"].append("staging.pinned_mtime_ns")
 
         _write_json(run_dir / "manifest.json", manifest)
         _write_json(run_dir / "layout.json", layout)
+    if store is not None:
+        _adopt_staged_files(store=store, run_dir=run_dir, files=files)
     return run_dir
 
 
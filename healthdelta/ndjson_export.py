@@ -1,15 +1,28 @@
 from __future__ import annotations
 
 import hashlib
+import heapq
+import io
 import json
+import os
+import re
+import shutil
 import tempfile
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, BinaryIO, Iterable, Iterator
 from xml.etree import ElementTree as ET
 
+from healthdelta import staged_source
+from healthdelta.checkpoint import read_json, write_json_atomic
+from healthdelta.identity import IdentityLookup, load_external_id_map, load_people
+from healthdelta.fhir_stream import is_large_bundle
+from healthdelta.file_reader import map_files
+from healthdelta.ingest import verify_staged_sources
+from healthdelta.parse_cache import parse_cache
 from healthdelta.progress import progress
+from healthdelta.sampling import SAMPLE_JSON, combine, keeps_file, keeps_key, layout_fraction, validate_fraction
 
 
 def _read_json(path: Path) -> Any:
@@ -20,14 +33,38 @@ def _sha256_bytes(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
 
 
+# Rows are sorted in memory. Once this many are buffered, export spills them as sorted runs and checkpoints its
+# parse position, so memory stays bounded and an interrupted export continues from the last checkpoint.
+SPILL_ROWS = 500_000
+
+_CHECKPOINT_DIRNAME = ".export_checkpoint"
+_STREAMS = ("observations", "documents", "medications", "conditions")
+
+# ET.iterparse's feed size (much larger feeds parse slower); checkpoint offsets are considered once per block.
+_XML_FEED_BYTES = 16 * 1024
+_XML_CHECKPOINT_BYTES = 1024 * 1024
+
+_DOCTYPE_SUBSET_END_RE = re.compile(rb"\]\s*>")
+
+
+def _row_line(row: dict) -> str:
+    return json.dumps(row, sort_keys=True, separators=(",", ":")) + "\n"
+
+
 def _write_ndjson(path: Path, rows: list[dict]) -> None:
+    _write_ndjson_lines(path, (_row_line(row) for row in rows), total=len(rows))
+
+
+def _write_ndjson_lines(path: Path, lines: Iterable[str], *, total: int | None) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False, dir=str(path.parent)) as tf:
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", delete=False, dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp"
+    ) as tf:
         tmp = Path(tf.name)
-        task = progress.task(f"Write {path.name}", total=len(rows), unit="rows")
+        task = progress.task(f"Write {path.name}", total=total, unit="rows")
         batch = 0
-        for row in rows:
-            tf.write(json.dumps(row, sort_keys=True, separators=(",", ":")) + "\n")
+        for line in lines:
+            tf.write(line)
             batch += 1
             if batch >= 1000:
                 task.advance(batch)
@@ -77,8 +114,9 @@ def _normalize_time(s: str | None) -> str | None:
 
 
 def _safe_relpath(path: str) -> str:
-    # Inputs are expected to be relative paths from layout.json; ensure we never emit absolute paths.
-    p = Path(path)
+    # Inputs are expected to be relative paths from layout.json; ensure we never emit absolute paths. Virtual zip
+    # members report their extracted location, so rows don't depend on how the zip was staged.
+    p = Path(staged_source.materialized_rel(path))
     if p.is_absolute():
         return p.name
     return p.as_posix()
@@ -94,50 +132,37 @@ class ExportContext:
     identity_dir: Path | None
     person_default: str | None
     patient_id_map: dict[tuple[str, str], str]  # (system,value)->canonical_person_id
+    sample_fraction: float | None = None  # sampled preview run (see healthdelta.sampling)
 
 
-def _load_identity(identity_dir: Path) -> tuple[str | None, dict[tuple[str, str], str]]:
-    people_path = identity_dir / "people.json"
-    aliases_path = identity_dir / "aliases.json"
-
+def _load_identity(
+    identity_dir: Path, lookup: IdentityLookup | None = None
+) -> tuple[str | None, dict[tuple[str, str], str]]:
+    if lookup is not None:
+        people, id_map = lookup.get(identity_dir)
+    else:
+        people, id_map = load_people(identity_dir), load_external_id_map(identity_dir)
     default_person_id: str | None = None
-    if people_path.exists():
-        obj = _read_json(people_path)
-        people = obj.get("people") if isinstance(obj, dict) else None
-        if isinstance(people, list) and len(people) == 1 and isinstance(people[0], dict) and isinstance(people[0].get("person_key"), str):
-            default_person_id = people[0]["person_key"]
-
-    mapping: dict[tuple[str, str], str] = {}
-    if aliases_path.exists():
-        obj = _read_json(aliases_path)
-        aliases = obj.get("aliases") if isinstance(obj, dict) else None
-        if isinstance(aliases, list):
-            for a in aliases:
-                if not isinstance(a, dict):
-                    continue
-                person_key = a.get("person_key")
-                src = a.get("source")
-                if not (isinstance(person_key, str) and isinstance(src, dict)):
-                    continue
-                external = src.get("external_ids")
-                if isinstance(external, list):
-                    for ext in external:
-                        if not isinstance(ext, dict):
-                            continue
-                        system = ext.get("system")
-                        value = ext.get("value")
-                        if isinstance(system, str) and isinstance(value, str) and system.strip() and value.strip():
-                            mapping[(system, value)] = person_key
-    return default_person_id, mapping
-
-
-def _resolve_context(*, input_dir: Path, mode: str) -> ExportContext:
+    if len(people) == 1 and isinstance(people[0].get("person_key"), str):
+        default_person_id = people[0]["person_key"]
+    return default_person_id, id_map
+
+
+def _resolve_context(
+    *,
+    input_dir: Path,
+    mode: str,
+    sample_fraction: float | None = None,
+    identity_lookup: IdentityLookup | None = None,
+) -> ExportContext:
     if mode not in {"local", "share"}:
         raise ValueError("--mode must be one of: local, share")
+    sample_fraction = validate_fraction(sample_fraction)
 
     run_root = input_dir
     if not (run_root / "layout.json").exists():
         raise FileNotFoundError(f"Missing layout.json: {run_root}")
+    verify_staged_sources(run_root)
 
     layout = _read_json(run_root / "layout.json")
     run_id = layout.get("run_id") if isinstance(layout, dict) and isinstance(layout.get("run_id"), str) else run_root.name
@@ -146,6 +171,13 @@ def _resolve_context(*, input_dir: Path, mode: str) -> ExportContext:
     clinical_json = layout.get("clinical_json")
     clinical_rels = [r for r in clinical_json if isinstance(r, str)] if isinstance(clinical_json, list) else []
 
+    # A sampled staging run already lists only its sampled clinical files; a (smaller) export-time fraction
+    # selects among them by the same file hash.
+    staged_fraction = layout_fraction(layout)
+    fraction = combine(staged_fraction, sample_fraction)
+    if fraction is not None and fraction != staged_fraction:
+        clinical_rels = [r for r in clinical_rels if keeps_file(r, fraction)]
+
     export_cda_rel: str | None = None
     if isinstance(layout, dict) and isinstance(layout.get("export_cda_xml"), str):
         export_cda_rel = layout["export_cda_xml"]
@@ -177,7 +209,7 @@ def _resolve_context(*, input_dir: Path, mode: str) -> ExportContext:
         candidate_identity = next((p for p in candidates if p.exists()), None)
         if candidate_identity is not None:
             identity_dir = candidate_identity
-            default_person_id, patient_id_map = _load_identity(candidate_identity)
+            default_person_id, patient_id_map = _load_identity(candidate_identity, identity_lookup)
 
         if mode == "share" and default_person_id is None and (run_root / "mapping.json").exists():
             mapping_obj = _read_json(run_root / "mapping.json")
@@ -195,6 +227,7 @@ def _resolve_context(*, input_dir: Path, mode: str) -> ExportContext:
         identity_dir=identity_dir,
         person_default=default_person_id,
         patient_id_map=patient_id_map,
+        sample_fraction=fraction,
     )
 
 
@@ -217,30 +250,162 @@ def _extract_fhir_subject_patient_id(resource: dict) -> str | None:
     return None
 
 
-def _walk_source_fhir_files(ctx: ExportContext) -> Iterable[tuple[str, dict]]:
-    for rel in ctx.clinical_json_rels:
+def _iter_fhir_files(ctx: ExportContext, *, start: int = 0) -> Iterable[tuple[str, Any]]:
+    """
+    `(rel, parsed JSON)` per clinical file in order (from index `start`), read on the shared small-file reader
+    pool. Missing or malformed files yield None.
+    """
+
+    def _load(rel: str) -> Any:
         p = ctx.root_dir / rel
-        if not p.exists():
-            continue
         try:
-            obj = _read_json(p)
-        except json.JSONDecodeError:
-            continue
+            if is_large_bundle(p):
+                # Bundles are not exported (only single-resource files are); skip without loading the document.
+                return {"resourceType": "Bundle"}
+            return parse_cache.load_json(p)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    return map_files(_load, ctx.clinical_json_rels[start:])
+
+
+def _walk_source_fhir_files(ctx: ExportContext) -> Iterable[tuple[str, dict]]:
+    for rel, obj in _iter_fhir_files(ctx):
         if isinstance(obj, dict):
             yield rel, obj
 
 
-def _export_healthkit_observations(ctx: ExportContext) -> list[dict]:
+def _prolog_end(head: bytes) -> int | None:
+    """
+    Offset just past the root element's start tag (after the XML declaration, comments, PIs and the DOCTYPE with
+    its internal subset), or None if that is not within `head`.
+    """
+    i = 0
+    while True:
+        i = head.find(b"<", i)
+        if i < 0:
+            return None
+        if head.startswith(b"<?", i):
+            j = head.find(b"?>", i)
+            end = j + 2 if j >= 0 else -1
+        elif head.startswith(b"<!--", i):
+            j = head.find(b"-->", i)
+            end = j + 3 if j >= 0 else -1
+        elif head.startswith(b"<!", i):
+            gt = head.find(b">", i)
+            br = head.find(b"[", i)
+            if br >= 0 and (gt < 0 or br < gt):
+                m = _DOCTYPE_SUBSET_END_RE.search(head, br)
+                end = m.end() if m else -1
+            else:
+                end = gt + 1 if gt >= 0 else -1
+        else:
+            j = head.find(b">", i)
+            return j + 1 if j >= 0 else None
+        if end < 0:
+            return None
+        i = end
+
+
+def _skip(f: BinaryIO, n: int) -> None:
+    if f.seekable():
+        f.seek(n, io.SEEK_CUR)
+        return
+    # Zip members can't seek: read through (which also keeps their end-of-stream digest check).
+    while n > 0:
+        chunk = f.read(min(n, _XML_CHECKPOINT_BYTES))
+        if not chunk:
+            return
+        n -= len(chunk)
+
+
+def _iterparse_checkpointed(path: Path, *, resume: list[int] | None = None) -> Iterator[tuple[str, Any]]:
+    """
+    `ET.iterparse(path, events=("end",))` plus `("checkpoint", [header_end, offset])` events, about once per
+    _XML_CHECKPOINT_BYTES, at offsets between children of the root element. `resume=[header_end, offset]` parses
+    the prolog (the bytes before `header_end`) and then the document from `offset`, yielding exactly the events
+    the full parse yields after that checkpoint.
+
+    Offsets are only taken while the body has had no comments, CDATA sections or PIs, so every `<` in it starts a
+    tag (Apple's export.xml has none; other documents just stop checkpointing). The staged XML may be a zip member
+    read straight from export.zip (see staged_source).
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    # Newer expat may defer a fed token until more input arrives; flush() (where available) parses it now.
+    flush = getattr(parser, "flush", None)
+    depth = 0
+
+    def events() -> Iterator[tuple[str, Any]]:
+        nonlocal depth
+        for event, el in parser.read_events():
+            if event == "start":
+                depth += 1
+            else:
+                depth -= 1
+                yield event, el
+
+    with staged_source.open_binary(path) as f:
+        if resume is None:
+            block = f.read(_XML_CHECKPOINT_BYTES)
+            header_end = _prolog_end(block)
+            pos = 0
+            if header_end is not None:
+                parser.feed(block[:header_end])
+                yield from events()
+                pos = header_end
+                block = block[header_end:]
+                if depth != 1:
+                    header_end = None
+        else:
+            header_end, pos = resume
+            parser.feed(f.read(header_end))
+            for _ in events():
+                pass
+            if depth != 1:
+                raise ValueError(f"export checkpoint does not match {path.name}")
+            _skip(f, pos - header_end)
+            block = f.read(_XML_CHECKPOINT_BYTES)
+
+        checkpointing = header_end is not None
+        last = b""
+        while block:
+            if checkpointing and (
+                b"<!" in block or b"<?" in block or (last == b"<" and block[:1] in (b"!", b"?"))
+            ):
+                checkpointing = False
+            last = block[-1:]
+            # Feed up to the last tag start in the block; the rest goes with the next block.
+            cut = block.rfind(b"<") if checkpointing else -1
+            body, block = (block[:cut], block[cut:]) if cut > 0 else (block, b"")
+            for i in range(0, len(body), _XML_FEED_BYTES):
+                parser.feed(body[i : i + _XML_FEED_BYTES])
+                yield from events()
+            pos += len(body)
+            if cut > 0:
+                if flush is not None:
+                    flush()
+                    yield from events()
+                if depth == 1:
+                    yield "checkpoint", [header_end, pos]
+            block += f.read(_XML_CHECKPOINT_BYTES)
+        parser.close()
+        yield from events()
+
+
+def _iter_healthkit_observations(ctx: ExportContext, *, resume: list[int] | None) -> Iterator[tuple[str | None, Any]]:
+    # Yields ("observations", row), and (None, cursor) where export may checkpoint.
     if not ctx.export_xml_rel:
-        return []
+        return
     path = ctx.root_dir / ctx.export_xml_rel
-    if not path.exists():
-        return []
+    if not staged_source.exists(path):
+        return
 
-    observations: list[dict] = []
     task = progress.task("Parse export.xml records", total=None, unit="records")
     batch = 0
-    for _, el in ET.iterparse(path, events=("end",)):
+    for event, el in _iterparse_checkpointed(path, resume=resume):
+        if event == "checkpoint":
+            yield None, el
+            continue
         if _localname(el.tag) != "Record":
             continue
         hk_type = el.attrib.get("type")
@@ -266,7 +431,8 @@ def _export_healthkit_observations(ctx: ExportContext) -> list[dict]:
         }
         minimal["event_key"] = _sha256_bytes(json.dumps(minimal, sort_keys=True, separators=(",", ":")).encode("utf-8"))
         minimal["record_key"] = minimal["event_key"]
-        observations.append(minimal)
+        if keeps_key(minimal["event_key"], ctx.sample_fraction):
+            yield "observations", minimal
         el.clear()
         batch += 1
         if batch >= 1000:
@@ -275,7 +441,6 @@ def _export_healthkit_observations(ctx: ExportContext) -> list[dict]:
 
     if batch:
         task.advance(batch)
-    return observations
 
 
 def _fhir_event_time(resource: dict) -> str | None:
@@ -311,139 +476,131 @@ def _fhir_event_time(resource: dict) -> str | None:
     return None
 
 
-def _export_fhir_streams(ctx: ExportContext) -> tuple[list[dict], list[dict], list[dict], list[dict]]:
-    observations: list[dict] = []
-    documents: list[dict] = []
-    meds: list[dict] = []
-    conds: list[dict] = []
-
+def _iter_fhir_rows(ctx: ExportContext, *, resume: int | None) -> Iterator[tuple[str | None, Any]]:
+    # Yields (stream, row), and (None, files done) after each file: export may checkpoint there.
+    start = resume or 0
     task_files = progress.task("Parse FHIR JSON files", total=len(ctx.clinical_json_rels), unit="files")
-    for rel in ctx.clinical_json_rels:
-        p = ctx.root_dir / rel
-        if not p.exists():
-            task_files.advance(1)
-            continue
-        try:
-            res = _read_json(p)
-        except json.JSONDecodeError:
-            task_files.advance(1)
-            continue
-        if not isinstance(res, dict):
-            task_files.advance(1)
-            continue
-
-        rt = res.get("resourceType")
-        if not isinstance(rt, str):
-            task_files.advance(1)
-            continue
+    task_files.advance(start)
+    for done, (rel, res) in enumerate(_iter_fhir_files(ctx, start=start), start=start + 1):
+        row = _fhir_row(ctx, rel, res) if isinstance(res, dict) else None
+        if row is not None:
+            yield row
+        task_files.advance(1)
+        yield None, done
 
-        # Patient resources are used only for identity mapping; do not emit them.
-        if rt == "Patient":
-            task_files.advance(1)
-            continue
 
-        rid = res.get("id") if isinstance(res.get("id"), str) else None
-        subject_patient_id = _extract_fhir_subject_patient_id(res)
-        person = _canonical_person_id(ctx, system="fhir:id", value=subject_patient_id) if subject_patient_id else _canonical_person_id(ctx)
-        event_time = _fhir_event_time(res)
+def _fhir_row(ctx: ExportContext, rel: str, res: dict) -> tuple[str, dict] | None:
+    rt = res.get("resourceType")
+    if not isinstance(rt, str):
+        return None
 
-        base = {
-            "schema_version": 2,
-            "canonical_person_id": person,
-            "source": "fhir",
-            "source_file": _safe_relpath(rel),
-            "event_time": event_time,
-            "run_id": ctx.run_id,
-            "resource_type": rt,
-            "source_id": f"{rt}/{rid}" if rid else None,
-        }
+    # Patient resources are used only for identity mapping; do not emit them.
+    if rt == "Patient":
+        return None
 
-        if rt == "Observation":
-            code = res.get("code")
-            if isinstance(code, dict):
-                coding = code.get("coding")
-                if isinstance(coding, list):
-                    codings: list[dict[str, str]] = []
-                    for c in coding:
-                        if not isinstance(c, dict):
-                            continue
-                        system = c.get("system")
-                        code_val = c.get("code")
-                        if isinstance(system, str) and isinstance(code_val, str) and system.strip() and code_val.strip():
-                            codings.append({"system": system, "code": code_val})
-                    if codings:
-                        base["code_coding"] = sorted(codings, key=lambda x: (x["system"], x["code"]))
-            val = res.get("valueQuantity")
-            if isinstance(val, dict):
-                if "value" in val:
-                    base["value"] = val["value"]
-                if isinstance(val.get("unit"), str):
-                    base["unit"] = val["unit"]
-            base["event_key"] = _sha256_bytes(json.dumps(base, sort_keys=True, separators=(",", ":")).encode("utf-8"))
-            base["record_key"] = base["event_key"]
-            observations.append(base)
-        elif rt == "DocumentReference":
-            t = res.get("type")
-            if isinstance(t, dict):
-                coding = t.get("coding")
-                if isinstance(coding, list):
-                    codings = []
-                    for c in coding:
-                        if not isinstance(c, dict):
-                            continue
-                        system = c.get("system")
-                        code_val = c.get("code")
-                        if isinstance(system, str) and isinstance(code_val, str) and system.strip() and code_val.strip():
-                            codings.append({"system": system, "code": code_val})
-                    if codings:
-                        base["type_coding"] = sorted(codings, key=lambda x: (x["system"], x["code"]))
-            status = res.get("status")
-            if isinstance(status, str):
-                base["status"] = status
-            base["event_key"] = _sha256_bytes(json.dumps(base, sort_keys=True, separators=(",", ":")).encode("utf-8"))
-            base["record_key"] = base["event_key"]
-            documents.append(base)
-        elif rt == "MedicationRequest":
-            status = res.get("status")
-            if isinstance(status, str):
-                base["status"] = status
-            base["event_key"] = _sha256_bytes(json.dumps(base, sort_keys=True, separators=(",", ":")).encode("utf-8"))
-            base["record_key"] = base["event_key"]
-            meds.append(base)
-        elif rt == "Condition":
-            code = res.get("code")
-            if isinstance(code, dict):
-                coding = code.get("coding")
-                if isinstance(coding, list):
-                    codings = []
-                    for c in coding:
-                        if not isinstance(c, dict):
-                            continue
-                        system = c.get("system")
-                        code_val = c.get("code")
-                        if isinstance(system, str) and isinstance(code_val, str) and system.strip() and code_val.strip():
-                            codings.append({"system": system, "code": code_val})
-                    if codings:
-                        base["code_coding"] = sorted(codings, key=lambda x: (x["system"], x["code"]))
-            base["event_key"] = _sha256_bytes(json.dumps(base, sort_keys=True, separators=(",", ":")).encode("utf-8"))
-            base["record_key"] = base["event_key"]
-            conds.append(base)
-        task_files.advance(1)
+    rid = res.get("id") if isinstance(res.get("id"), str) else None
+    subject_patient_id = _extract_fhir_subject_patient_id(res)
+    person = _canonical_person_id(ctx, system="fhir:id", value=subject_patient_id) if subject_patient_id else _canonical_person_id(ctx)
+    event_time = _fhir_event_time(res)
+
+    base = {
+        "schema_version": 2,
+        "canonical_person_id": person,
+        "source": "fhir",
+        "source_file": _safe_relpath(rel),
+        "event_time": event_time,
+        "run_id": ctx.run_id,
+        "resource_type": rt,
+        "source_id": f"{rt}/{rid}" if rid else None,
+    }
 
-    return observations, documents, meds, conds
+    if rt == "Observation":
+        code = res.get("code")
+        if isinstance(code, dict):
+            coding = code.get("coding")
+            if isinstance(coding, list):
+                codings: list[dict[str, str]] = []
+                for c in coding:
+                    if not isinstance(c, dict):
+                        continue
+                    system = c.get("system")
+                    code_val = c.get("code")
+                    if isinstance(system, str) and isinstance(code_val, str) and system.strip() and code_val.strip():
+                        codings.append({"system": system, "code": code_val})
+                if codings:
+                    base["code_coding"] = sorted(codings, key=lambda x: (x["system"], x["code"]))
+        val = res.get("valueQuantity")
+        if isinstance(val, dict):
+            if "value" in val:
+                base["value"] = val["value"]
+            if isinstance(val.get("unit"), str):
+                base["unit"] = val["unit"]
+        base["event_key"] = _sha256_bytes(json.dumps(base, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        base["record_key"] = base["event_key"]
+        return "observations", base
+    elif rt == "DocumentReference":
+        t = res.get("type")
+        if isinstance(t, dict):
+            coding = t.get("coding")
+            if isinstance(coding, list):
+                codings = []
+                for c in coding:
+                    if not isinstance(c, dict):
+                        continue
+                    system = c.get("system")
+                    code_val = c.get("code")
+                    if isinstance(system, str) and isinstance(code_val, str) and system.strip() and code_val.strip():
+                        codings.append({"system": system, "code": code_val})
+                if codings:
+                    base["type_coding"] = sorted(codings, key=lambda x: (x["system"], x["code"]))
+        status = res.get("status")
+        if isinstance(status, str):
+            base["status"] = status
+        base["event_key"] = _sha256_bytes(json.dumps(base, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        base["record_key"] = base["event_key"]
+        return "documents", base
+    elif rt == "MedicationRequest":
+        status = res.get("status")
+        if isinstance(status, str):
+            base["status"] = status
+        base["event_key"] = _sha256_bytes(json.dumps(base, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        base["record_key"] = base["event_key"]
+        return "medications", base
+    elif rt == "Condition":
+        code = res.get("code")
+        if isinstance(code, dict):
+            coding = code.get("coding")
+            if isinstance(coding, list):
+                codings = []
+                for c in coding:
+                    if not isinstance(c, dict):
+                        continue
+                    system = c.get("system")
+                    code_val = c.get("code")
+                    if isinstance(system, str) and isinstance(code_val, str) and system.strip() and code_val.strip():
+                        codings.append({"system": system, "code": code_val})
+                if codings:
+                    base["code_coding"] = sorted(codings, key=lambda x: (x["system"], x["code"]))
+        base["event_key"] = _sha256_bytes(json.dumps(base, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        base["record_key"] = base["event_key"]
+        return "conditions", base
+    return None
 
 
-def _export_cda_observations(ctx: ExportContext) -> list[dict]:
+def _iter_cda_observations(ctx: ExportContext, *, resume: list[int] | None) -> Iterator[tuple[str | None, Any]]:
+    # Observations nest deep in the CDA document, so checkpoints (between root children) are rare here.
     if not ctx.export_cda_rel:
-        return []
+        return
     path = ctx.root_dir / ctx.export_cda_rel
-    if not path.exists():
-        return []
+    if not staged_source.exists(path):
+        return
 
-    observations: list[dict] = []
     task = progress.task("Parse export_cda.xml observations", total=None, unit="rows")
     batch = 0
-    for _, el in ET.iterparse(path, events=("end",)):
+    for event, el in _iterparse_checkpointed(path, resume=resume):
+        if event == "checkpoint":
+            yield None, el
+            continue
         if _localname(el.tag) != "observation":
             continue
 
@@ -479,7 +636,8 @@ def _export_cda_observations(ctx: ExportContext) -> list[dict]:
         }
         base["event_key"] = _sha256_bytes(json.dumps(base, sort_keys=True, separators=(",", ":")).encode("utf-8"))
         base["record_key"] = base["event_key"]
-        observations.append(base)
+        if keeps_key(base["event_key"], ctx.sample_fraction):
+            yield "observations", base
         el.clear()
         batch += 1
         if batch >= 500:
@@ -488,65 +646,217 @@ def _export_cda_observations(ctx: ExportContext) -> list[dict]:
 
     if batch:
         task.advance(batch)
-    return observations
 
 
-def export_ndjson(*, input_dir: str, out_dir: str, mode: str = "local") -> None:
-    with progress.phase("export: resolve context"):
-        ctx = _resolve_context(input_dir=Path(input_dir), mode=mode)
-
-    with progress.phase("export: parse HealthKit"):
-        healthkit_obs = _export_healthkit_observations(ctx)
-    with progress.phase("export: parse FHIR"):
-        fhir_obs, fhir_docs, fhir_meds, fhir_conds = _export_fhir_streams(ctx)
-    with progress.phase("export: parse CDA"):
-        cda_obs = _export_cda_observations(ctx)
-
-    observations = [*healthkit_obs, *fhir_obs, *cda_obs]
-    documents = [*fhir_docs]
-    meds = [*fhir_meds]
-    conds = [*fhir_conds]
-
-    def dedupe(rows: list[dict]) -> list[dict]:
-        seen: set[str] = set()
-        out: list[dict] = []
-        for r in rows:
-            k = r.get("event_key")
-            if not isinstance(k, str):
-                k = _sha256_bytes(json.dumps(r, sort_keys=True, separators=(",", ":")).encode("utf-8"))
-                r["event_key"] = k
-            if k in seen:
+def _dedupe(rows: list[dict]) -> list[dict]:
+    seen: set[str] = set()
+    out: list[dict] = []
+    for r in rows:
+        k = r.get("event_key")
+        if not isinstance(k, str):
+            k = _sha256_bytes(json.dumps(r, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+            r["event_key"] = k
+        if k in seen:
+            continue
+        seen.add(k)
+        out.append(r)
+    return out
+
+
+def _sort_key(r: dict) -> tuple:
+    return (
+        r.get("event_time") or "",
+        r.get("canonical_person_id") or "",
+        r.get("source") or "",
+        r.get("source_file") or "",
+        r.get("source_id") or "",
+        r.get("event_key") or "",
+    )
+
+
+def _sort_rows(rows: list[dict]) -> list[dict]:
+    return sorted(rows, key=_sort_key)
+
+
+# Parse order of the sources (observations.ndjson holds HealthKit, then FHIR, then CDA rows before sorting).
+_SOURCES = (
+    ("export: parse HealthKit", _iter_healthkit_observations),
+    ("export: parse FHIR", _iter_fhir_rows),
+    ("export: parse CDA", _iter_cda_observations),
+)
+
+
+def _checkpoint_key(ctx: ExportContext, *, mode: str) -> str:
+    # Everything the rows depend on: a checkpoint of another input, identity or layout is never resumed.
+    def stat(rel: str | None) -> list[int] | None:
+        if rel is None:
+            return None
+        try:
+            _, size, mtime_ns = staged_source.cache_key(ctx.root_dir / rel)
+        except FileNotFoundError:
+            return None
+        return [size, mtime_ns]
+
+    obj = {
+        "mode": mode,
+        "run_id": ctx.run_id,
+        "export_xml": [ctx.export_xml_rel, stat(ctx.export_xml_rel)],
+        "export_cda_xml": [ctx.export_cda_rel, stat(ctx.export_cda_rel)],
+        "clinical_json": [[rel, stat(rel)] for rel in ctx.clinical_json_rels],
+        "person_default": ctx.person_default,
+        "patient_id_map": sorted([s, v, p] for (s, v), p in ctx.patient_id_map.items()),
+    }
+    if ctx.sample_fraction is not None:
+        obj["sample_fraction"] = ctx.sample_fraction
+    return _sha256_bytes(json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+
+
+class _SpilledRuns:
+    """
+    Sorted, deduplicated runs of rows spilled under `<out_dir>/.export_checkpoint`, plus the checkpoint naming the
+    parse position they cover: `position = [source index, cursor]` (cursor as yielded by that source's parser;
+    index len(_SOURCES) once every source is parsed). Rows are identical whichever way they are run, so merging
+    the runs gives the same files as sorting everything in memory.
+    """
+
+    def __init__(self, work_dir: Path, *, key: str) -> None:
+        self.work_dir = work_dir
+        self.key = key
+        self.position: list[Any] = [0, None]
+        self.runs: dict[str, list[dict[str, Any]]] = {stream: [] for stream in _STREAMS}
+        state = read_json(work_dir / "checkpoint.json", key=key)
+        if state is not None:
+            self.position = state["position"]
+            self.runs = state["runs"]
+        else:
+            # Left by an export of other inputs (or without a checkpoint yet): nothing in it is reusable.
+            self.remove()
+
+    def __bool__(self) -> bool:
+        return any(self.runs.values())
+
+    def rows(self, stream: str) -> int:
+        return sum(run["rows"] for run in self.runs[stream])
+
+    def spill(self, buffers: dict[str, list[dict]], *, position: list[Any]) -> None:
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        seq = sum(len(runs) for runs in self.runs.values())
+        for stream in _STREAMS:
+            rows = _sort_rows(_dedupe(buffers[stream]))
+            buffers[stream] = []
+            if not rows:
                 continue
-            seen.add(k)
-            out.append(r)
-        return out
-
-    def sort_rows(rows: list[dict]) -> list[dict]:
-        def key(r: dict) -> tuple:
-            return (
-                r.get("event_time") or "",
-                r.get("canonical_person_id") or "",
-                r.get("source") or "",
-                r.get("source_file") or "",
-                r.get("source_id") or "",
-                r.get("event_key") or "",
-            )
-
-        return sorted(rows, key=key)
+            name = f"{stream}-{seq:06d}.ndjson"
+            seq += 1
+            with (self.work_dir / name).open("w", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(_row_line(row))
+                f.flush()
+                os.fsync(f.fileno())
+            self.runs[stream].append({"file": name, "rows": len(rows)})
+        self.position = position
+        write_json_atomic(
+            self.work_dir / "checkpoint.json", {"key": self.key, "position": position, "runs": self.runs}
+        )
+
+    def merged_lines(self, stream: str) -> Iterator[str]:
+        def read(name: str) -> Iterator[tuple[tuple, str]]:
+            with (self.work_dir / name).open(encoding="utf-8") as f:
+                for line in f:
+                    yield _sort_key(json.loads(line)), line
+
+        prev: tuple | None = None
+        for key, line in heapq.merge(*(read(run["file"]) for run in self.runs[stream])):
+            # Duplicates (same event_key, hence same row) from different runs end up adjacent.
+            if key != prev:
+                yield line
+            prev = key
+
+    def remove(self) -> None:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def _write_sample_marker(out_root: Path, fraction: float | None) -> None:
+    # Written before any stream, so streams in this dir are never mistaken for a full export.
+    path = out_root / SAMPLE_JSON
+    if fraction is None:
+        path.unlink(missing_ok=True)
+        return
+    write_json_atomic(
+        path,
+        {
+            "sample_fraction": fraction,
+            "sampled": True,
+            "selection": {
+                "clinical_json": "sha256(file name) prefix",
+                "healthkit": "event_key prefix",
+                "cda": "event_key prefix",
+            },
+        },
+    )
 
-    out_root = Path(out_dir)
-    out_root.mkdir(parents=True, exist_ok=True)
 
-    with progress.phase("export: dedupe + sort"):
-        observations = sort_rows(dedupe(observations))
-        documents = sort_rows(dedupe(documents))
-        meds = sort_rows(dedupe(meds))
-        conds = sort_rows(dedupe(conds))
+def export_ndjson(
+    *,
+    input_dir: str,
+    out_dir: str,
+    mode: str = "local",
+    sample_fraction: float | None = None,
+    identity_lookup: IdentityLookup | None = None,
+) -> None:
+    """
+    Export the staged (local) or de-identified (share) run as NDJSON streams. Large exports spill sorted runs and
+    checkpoint under `<out_dir>/.export_checkpoint` (see SPILL_ROWS); exporting the same run into the same out_dir
+    again continues from the last checkpoint with byte-identical results.
+
+    A sampled export (`sample_fraction`, or a run staged with one) keeps HealthKit and CDA records by event_key
+    prefix and clinical files by file hash (see healthdelta.sampling), and writes the fraction to `<out_dir>/sample.json`.
+
+    `identity_lookup` lets a long-lived caller (the daemon) reuse people / external-id maps across runs.
+    """
+    with progress.phase("export: resolve context"):
+        ctx = _resolve_context(
+            input_dir=Path(input_dir), mode=mode, sample_fraction=sample_fraction, identity_lookup=identity_lookup
+        )
 
+    out_root = Path(out_dir)
+    out_root.mkdir(parents=True, exist_ok=True)
+    # A resumed out_dir may hold a stream file half-written when the export was killed.
+    for stale in out_root.glob(".*.ndjson.*.tmp"):
+        stale.unlink()
+    _write_sample_marker(out_root, ctx.sample_fraction)
+
+    spilled = _SpilledRuns(out_root / _CHECKPOINT_DIRNAME, key=_checkpoint_key(ctx, mode=mode))
+    buffers: dict[str, list[dict]] = {stream: [] for stream in _STREAMS}
+    buffered = 0
+    resume_index, resume_cursor = spilled.position
+    for index, (phase, parse) in enumerate(_SOURCES):
+        if index < resume_index:
+            continue
+        with progress.phase(phase):
+            for stream, item in parse(ctx, resume=resume_cursor if index == resume_index else None):
+                if stream is not None:
+                    buffers[stream].append(item)
+                    buffered += 1
+                elif buffered >= SPILL_ROWS:
+                    spilled.spill(buffers, position=[index, item])
+                    buffered = 0
+
+    if not spilled:
+        with progress.phase("export: dedupe + sort"):
+            rows = {stream: _sort_rows(_dedupe(buffers[stream])) for stream in _STREAMS}
+        with progress.phase("export: write ndjson"):
+            for stream in _STREAMS:
+                if rows[stream] or stream in ("observations", "documents"):
+                    _write_ndjson(out_root / f"{stream}.ndjson", rows[stream])
+        return
+
+    if buffered or spilled.position[0] < len(_SOURCES):
+        with progress.phase("export: dedupe + sort"):
+            spilled.spill(buffers, position=[len(_SOURCES), None])
     with progress.phase("export: write ndjson"):
-        _write_ndjson(out_root / "observations.ndjson", observations)
-        _write_ndjson(out_root / "documents.ndjson", documents)
-        if meds:
-            _write_ndjson(out_root / "medications.ndjson", meds)
-        if conds:
-            _write_ndjson(out_root / "conditions.ndjson", conds)
+        for stream in _STREAMS:
+            if spilled.rows(stream) or stream in ("observations", "documents"):
+                lines = spilled.merged_lines(stream)
+                _write_ndjson_lines(out_root / f"{stream}.ndjson", lines, total=spilled.rows(stream))
+    spilled.remove()
@@ -5,6 +5,13 @@ import tempfile
 from pathlib import Path
 from typing import Any
 
+from healthdelta.duckdb_tools import (
+    RECORD_TYPE_EXPR,
+    ROLLUP_DAILY_TABLE,
+    ROLLUP_PERSON_TABLE,
+    connect_database,
+    read_sample_fraction,
+)
 from healthdelta.progress import progress
 
 
@@ -29,13 +36,8 @@ def _write_text_atomic(path: Path, text: str) -> None:
     tmp.replace(path)
 
 
-def _connect_read_only(db_path: Path):
-    try:
-        import duckdb
-    except Exception as e:  # pragma: no cover
-        raise RuntimeError("duckdb Python package is required (install dependency 'duckdb')") from e
-
-    con = duckdb.connect(database=str(db_path), read_only=True)
+def _connect_read_only(db_path: Path, *, shared_con: Any = None):
+    con = connect_database(db_path, read_only=True, shared=shared_con)
     con.execute("PRAGMA threads=1;")
     con.execute("PRAGMA enable_progress_bar=false;")
     return con
@@ -43,7 +45,10 @@ def _connect_read_only(db_path: Path):
 
 def _tables_present(con) -> set[str]:
     tables = set()
-    for (name,) in con.execute("SELECT table_name FROM information_schema.tables WHERE table_schema='main' ORDER BY table_name;").fetchall():
+    for (name,) in con.execute(
+        "SELECT table_name FROM information_schema.tables "
+        "WHERE table_catalog=current_database() AND table_schema='main' ORDER BY table_name;"
+    ).fetchall():
         if isinstance(name, str):
             tables.add(name)
     return tables
@@ -53,12 +58,66 @@ def _rows(con, sql: str, params: list[Any] | None = None) -> list[tuple]:
     return con.execute(sql, params or []).fetchall()
 
 
-def _scalar(con, sql: str, params: list[Any] | None = None) -> Any:
-    r = con.execute(sql, params or []).fetchone()
-    return r[0] if r else None
+# GROUPING(table_name, run_id, source, label) bitmask per grouping set (1 = column rolled up).
+_G_ALL = 0b1111
+_G_RUN = 0b1011
+_G_TABLE = 0b0111
+_G_SOURCE = 0b1101
+_G_LABEL = 0b0110
 
 
-def build_doctor_note(*, db_path: str, out_dir: str, mode: str = "share") -> None:
+def _note_table_sql(tables: list[str]) -> str | None:
+    """
+    Every note aggregate in one pass over the stream tables: event_time range and distinct people, distinct
+    run_ids, per-table totals, per-source counts and observation labels.
+    """
+    if not tables:
+        return None
+    parts = []
+    for t in tables:
+        label = RECORD_TYPE_EXPR["observations"] if t == "observations" else "CAST(NULL AS VARCHAR)"
+        parts.append(
+            f"SELECT '{t}' AS table_name, run_id, source, {label} AS label, canonical_person_id, event_time FROM {t}"
+        )
+    return f"""
+    SELECT GROUPING(table_name, run_id, source, label) AS g,
+           table_name,
+           run_id,
+           source,
+           label,
+           COUNT(*) AS n,
+           MIN(event_time),
+           MAX(event_time),
+           COUNT(DISTINCT canonical_person_id)
+    FROM ({" UNION ALL ".join(parts)})
+    GROUP BY GROUPING SETS ((), (run_id), (table_name), (source), (table_name, label));
+    """
+
+
+def _note_rollup_sql() -> str:
+    """
+    Same row shape as `_note_table_sql`, answered from the load-time rollup tables.
+    """
+    return f"""
+    SELECT {_G_ALL} AS g, CAST(NULL AS VARCHAR), CAST(NULL AS VARCHAR), CAST(NULL AS VARCHAR), CAST(NULL AS VARCHAR),
+           COALESCE(SUM(n), 0), MIN(min_event_time), MAX(max_event_time), COUNT(DISTINCT canonical_person_id)
+    FROM {ROLLUP_PERSON_TABLE}
+    UNION ALL
+    SELECT {_G_RUN}, NULL, run_id, NULL, NULL, SUM(n), NULL, NULL, NULL
+    FROM {ROLLUP_PERSON_TABLE} GROUP BY run_id
+    UNION ALL
+    SELECT {_G_TABLE}, table_name, NULL, NULL, NULL, SUM(n), NULL, NULL, NULL
+    FROM {ROLLUP_PERSON_TABLE} GROUP BY table_name
+    UNION ALL
+    SELECT {_G_SOURCE}, NULL, NULL, source, NULL, SUM(n), NULL, NULL, NULL
+    FROM {ROLLUP_DAILY_TABLE} GROUP BY source
+    UNION ALL
+    SELECT {_G_LABEL}, table_name, NULL, NULL, record_type, SUM(n), NULL, NULL, NULL
+    FROM {ROLLUP_DAILY_TABLE} WHERE table_name='observations' GROUP BY table_name, record_type;
+    """
+
+
+def build_doctor_note(*, db_path: str, out_dir: str, mode: str = "share", shared_con: Any = None) -> None:
     if mode not in {"local", "share"}:
         raise ValueError("--mode must be one of: local, share")
 
@@ -70,108 +129,65 @@ def build_doctor_note(*, db_path: str, out_dir: str, mode: str = "share") -> Non
     out.mkdir(parents=True, exist_ok=True)
 
     with progress.phase("note: connect"):
-        con = _connect_read_only(db)
+        con = _connect_read_only(db, shared_con=shared_con)
     try:
         with progress.phase("note: scan tables"):
             present = _tables_present(con)
             tables = [t for t in ["observations", "documents", "medications", "conditions"] if t in present]
-
-        def union_all(select_expr: str) -> str | None:
-            if not tables:
-                return None
-            parts = [f"SELECT {select_expr} FROM {t}" for t in tables]
-            return " UNION ALL ".join(parts)
-
-        # run_id
-        with progress.phase("note: compute run_id"):
-            run_id_val = "unknown"
-            union_run = union_all("run_id")
-            if union_run is not None:
-                run_ids = [
-                    r
-                    for (r,) in _rows(
-                        con, f"SELECT DISTINCT run_id FROM ({union_run}) WHERE run_id IS NOT NULL ORDER BY run_id;"
-                    )
-                    if isinstance(r, str) and r
-                ]
-                if len(run_ids) == 1:
-                    run_id_val = run_ids[0]
-                elif len(run_ids) > 1:
-                    run_id_val = f"multiple({len(run_ids)})"
-
-        # event_time range + deterministic generated_at
-        with progress.phase("note: compute event_time range"):
-            min_et_s = None
-            max_et_s = None
-            union_et = union_all("event_time")
-            if union_et is not None:
-                min_et = _scalar(con, f"SELECT MIN(event_time) FROM ({union_et}) WHERE event_time IS NOT NULL;")
-                max_et = _scalar(con, f"SELECT MAX(event_time) FROM ({union_et}) WHERE event_time IS NOT NULL;")
+            # Load-time rollups (see duckdb_tools) answer the aggregate without touching raw rows.
+            use_rollups = ROLLUP_DAILY_TABLE in present and ROLLUP_PERSON_TABLE in present
+            sample_fraction = read_sample_fraction(con)
+
+        with progress.phase("note: aggregate"):
+            sql = _note_rollup_sql() if use_rollups else _note_table_sql(tables)
+            agg_rows = _rows(con, sql) if sql is not None else []
+
+        run_ids: list[str] = []
+        min_et_s = None
+        max_et_s = None
+        people = 0
+        totals: dict[str, int] = {t: 0 for t in ["observations", "documents", "medications", "conditions"]}
+        sources = {"healthkit": 0, "fhir": 0, "cda": 0}
+        raw: list[tuple[str, int]] = []
+        for g, table_name, run_id, source, label, n, min_et, max_et, distinct_people in agg_rows:
+            if g == _G_ALL:
                 min_et_s = _fmt_ts(min_et)
                 max_et_s = _fmt_ts(max_et)
+                people = int(distinct_people or 0)
+            elif g == _G_RUN:
+                if isinstance(run_id, str) and run_id:
+                    run_ids.append(run_id)
+            elif g == _G_TABLE:
+                if table_name in totals:
+                    totals[table_name] = int(n)
+            elif g == _G_SOURCE:
+                if isinstance(source, str) and source in sources:
+                    sources[source] = int(n)
+            elif g == _G_LABEL:
+                if table_name == "observations" and isinstance(label, str):
+                    raw.append((label, int(n)))
+
+        run_id_val = "unknown"
+        run_ids.sort()
+        if len(run_ids) == 1:
+            run_id_val = run_ids[0]
+        elif len(run_ids) > 1:
+            run_id_val = f"multiple({len(run_ids)})"
 
         generated_at = max_et_s or "1970-01-01T00:00:00Z"
 
-        # distinct people across all tables
-        with progress.phase("note: compute people count"):
-            people = 0
-            union_people = union_all("canonical_person_id")
-            if union_people is not None:
-                people = int(
-                    _scalar(
-                        con,
-                        f"SELECT COUNT(DISTINCT canonical_person_id) FROM ({union_people}) WHERE canonical_person_id IS NOT NULL;",
-                    )
-                    or 0
-                )
-
-        # totals per table (include even if missing)
-        with progress.phase("note: compute totals"):
-            totals: dict[str, int] = {}
-            task = progress.task("note: compute totals", total=4, unit="tables")
-            for t in ["observations", "documents", "medications", "conditions"]:
-                if t in present:
-                    totals[t] = int(_scalar(con, f"SELECT COUNT(*) FROM {t};") or 0)
-                else:
-                    totals[t] = 0
-                task.advance(1)
-
-        # counts by source across all tables
-        with progress.phase("note: compute sources"):
-            sources = {"healthkit": 0, "fhir": 0, "cda": 0}
-            union_src = union_all("source")
-            if union_src is not None:
-                for src, n in _rows(
-                    con, f"SELECT source, COUNT(*) AS n FROM ({union_src}) GROUP BY source ORDER BY source;"
-                ):
-                    if isinstance(src, str) and src in sources:
-                        sources[src] = int(n)
-
         # signals: top-N observation types/codes (no free-text)
-        with progress.phase("note: compute signals"):
-            signals = ""
-            if "observations" in present and totals["observations"] > 0:
-                raw = [
-                    (label, int(n))
-                    for label, n in _rows(
-                        con,
-                        """
-                        SELECT COALESCE(hk_type, resource_type, code, 'unknown') AS label,
-                               COUNT(*) AS n
-                        FROM observations
-                        GROUP BY label
-                        ORDER BY n DESC, label ASC;
-                        """,
-                    )
-                    if isinstance(label, str)
-                ]
-                raw.sort(key=lambda x: (-x[1], 0 if x[0].startswith("HK") else 1, x[0]))
-                top = raw[:5]
-                signals = ";".join([f"{k}:{v}" for k, v in top])
+        signals = ""
+        if totals["observations"] > 0:
+            raw.sort(key=lambda x: (-x[1], 0 if x[0].startswith("HK") else 1, x[0]))
+            top = raw[:5]
+            signals = ";".join([f"{k}:{v}" for k, v in top])
 
         # Build <= ~25 lines, deterministic order.
         lines: list[str] = []
         lines.append("HealthDelta Summary")
+        if sample_fraction is not None:
+            lines.append(f"SAMPLED PREVIEW sample_fraction={sample_fraction} (counts cover a subset of the export)")
         lines.append(f"run_id={run_id_val}")
         lines.append(f"generated_at={generated_at}")
         lines.append(f"people={people}")
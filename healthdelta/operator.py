@@ -1,27 +1,119 @@
 from __future__ import annotations
 
+import concurrent.futures
+import contextlib
+import contextvars
+import hashlib
+import json
+import shutil
+import threading
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Callable
 
+from healthdelta import staged_source
+from healthdelta.blob_store import default_store, store_lock
 from healthdelta.deid import deidentify_run
-from healthdelta.duckdb_tools import build_duckdb
-from healthdelta.identity import build_identity
-from healthdelta.ingest import ingest_to_staging
+from healthdelta.duckdb_tools import build_duckdb, require_duckdb
+from healthdelta.identity import IdentityLookup, build_identity
+from healthdelta.ingest import INGEST_CHECKPOINT, STAGING_MODES, ingest_to_staging
 from healthdelta.ndjson_export import export_ndjson
 from healthdelta.reporting import build_report
 from healthdelta.note import build_doctor_note
+from healthdelta.sampling import validate_fraction
 from healthdelta.state import (
+    PIPELINE_VERSION_SALT,
+    RegistryCache,
     compute_input_fingerprint,
     compute_run_id,
-    load_registry,
+    entry_input_fingerprint_sha256,
+    export_registry_json,
+    file_lock,
+    lookup_run,
     read_last_run_id,
     register_run,
-    run_input_fingerprint_sha256,
+    state_lock,
     update_run_artifacts,
     write_last_run_id,
 )
+from healthdelta.parse_cache import parse_cache
 from healthdelta.progress import progress
 
 
+class SharedStateTurns:
+    """
+    Turns on one state dir, granted in the order they were taken. While a `run all` holds its turn it reads and
+    writes LAST_RUN, registers, and runs stage, identity, deid and NDJSON export; it then releases the turn, and
+    its DuckDB, reports and note steps overlap with the next run's turn.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._taken = 0
+        self._serving = 0
+        self._released: set[int] = set()
+
+    def take(self) -> StateTurn:
+        with self._cond:
+            ticket = self._taken
+            self._taken += 1
+        return StateTurn(self, ticket)
+
+    def _wait(self, ticket: int) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: self._serving == ticket)
+
+    def _release(self, ticket: int) -> None:
+        with self._cond:
+            self._released.add(ticket)
+            while self._serving in self._released:
+                self._released.discard(self._serving)
+                self._serving += 1
+            self._cond.notify_all()
+
+
+class StateTurn:
+    def __init__(self, turns: SharedStateTurns, ticket: int) -> None:
+        self._turns = turns
+        self._ticket = ticket
+        self._released = False
+
+    def wait(self) -> None:
+        self._turns._wait(self._ticket)
+
+    @property
+    def released(self) -> bool:
+        return self._released
+
+    def release(self) -> None:
+        # Idempotent; releasing a turn that was never waited for just lets later turns pass it.
+        if not self._released:
+            self._released = True
+            self._turns._release(self._ticket)
+
+
+@dataclass
+class WarmState:
+    """
+    What a long-lived process (the daemon) keeps across `run all` calls on one state dir: the loaded registry,
+    the identity lookup, an in-memory DuckDB connection that each run attaches its DB file to, and the turns.
+    """
+
+    registry: RegistryCache
+    identity: IdentityLookup
+    duckdb: Any
+    turns: SharedStateTurns
+
+    @classmethod
+    def open(cls, state_dir: str) -> WarmState:
+        con = require_duckdb().connect(database=":memory:")
+        con.execute("PRAGMA enable_progress_bar=false;")
+        return cls(registry=RegistryCache(state_dir), identity=IdentityLookup(), duckdb=con, turns=SharedStateTurns())
+
+    def close(self) -> None:
+        self.duckdb.close()
+
+
 def _artifact_paths(*, base_out: Path, run_id: str, include_deid: bool) -> dict[str, str | None]:
     run_root = base_out / run_id
     return {
@@ -38,11 +130,178 @@ def _artifact_paths(*, base_out: Path, run_id: str, include_deid: bool) -> dict[
     }
 
 
-def _print_summary(*, run_id: str, base_out: Path, state_dir: Path, artifacts: dict[str, object], status: str) -> None:
-    print(f"status={status}")
-    print(f"run_id={run_id}")
-    print(f"base_out={base_out.as_posix()}")
-    print(f"state_dir={state_dir.as_posix()}")
+# Per-run step journal (run root, outside the share-bundle allowlist): completed step keys + input digests.
+_STEP_JOURNAL = "operator_steps.json"
+_RUN_LOCK = ".operator.lock"
+
+
+@dataclass(frozen=True)
+class _Step:
+    key: str
+    name: str
+    deps: tuple[str, ...]
+    # Run-root-relative outputs: cleared before the step (re)runs, and required to exist for a skip.
+    outputs: tuple[str, ...]
+    fn: Callable[[], None]
+    # The step checkpoints its own progress under `outputs`: a rerun after an interruption (same input digest)
+    # keeps them so the step can continue.
+    resumable: bool = False
+
+
+def _load_step_journal(run_root: Path) -> dict[str, dict]:
+    path = run_root / _STEP_JOURNAL
+    if not path.exists():
+        return {}
+    try:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    steps = obj.get("steps") if isinstance(obj, dict) else None
+    if not isinstance(steps, dict):
+        return {}
+    return {k: v for k, v in steps.items() if isinstance(k, str) and isinstance(v, dict)}
+
+
+def _save_step_journal(run_root: Path, steps: dict[str, dict]) -> None:
+    path = run_root / _STEP_JOURNAL
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(
+        json.dumps({"schema_version": 1, "steps": steps}, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+    )
+    tmp.replace(path)
+
+
+def _step_input_digests(steps: list[_Step], *, run_input_sha256: str, mode: str) -> dict[str, str]:
+    # A step's input digest chains the run input fingerprint with its dependencies' digests (steps are deterministic).
+    digests: dict[str, str] = {}
+    for step in steps:
+        h = hashlib.sha256()
+        h.update(f"{PIPELINE_VERSION_SALT}\n{step.key}\n{mode}\n{run_input_sha256}\n".encode("utf-8"))
+        for dep in sorted(step.deps):
+            h.update(f"{dep}={digests[dep]}\n".encode("utf-8"))
+        digests[step.key] = h.hexdigest()
+    return digests
+
+
+def _clear_outputs(run_root: Path, outputs: tuple[str, ...]) -> None:
+    for rel in outputs:
+        p = run_root / rel
+        if p.is_dir():
+            shutil.rmtree(p)
+        elif p.exists():
+            p.unlink()
+
+
+def _run_step_dag(steps: list[_Step], *, run_root: Path, digests: dict[str, str], jobs: int) -> None:
+    """
+    Run steps as a dependency DAG on a worker pool. Steps recorded as completed in the run's journal with the
+    same input digest (and whose outputs still exist) are skipped, so a crashed run resumes where it stopped;
+    a resumable step that was interrupted continues from its own checkpoint.
+    """
+    if jobs < 1:
+        raise ValueError("--jobs must be >= 1")
+
+    journal = _load_step_journal(run_root)
+    journal_lock = threading.Lock()
+    index = {step.key: i for i, step in enumerate(steps, start=1)}
+    total_steps = len(steps)
+
+    def run_one(step: _Step) -> None:
+        with journal_lock:
+            interrupted = journal.get(step.key) == {"status": "running", "input_sha256": digests[step.key]}
+            journal[step.key] = {"status": "running", "input_sha256": digests[step.key]}
+            _save_step_journal(run_root, journal)
+        with progress.phase(f"[{index[step.key]}/{total_steps}] {step.name}"):
+            if not (step.resumable and interrupted):
+                _clear_outputs(run_root, step.outputs)
+            step.fn()
+        with journal_lock:
+            journal[step.key] = {"status": "completed", "input_sha256": digests[step.key]}
+            _save_step_journal(run_root, journal)
+
+    def up_to_date(step: _Step) -> bool:
+        entry = journal.get(step.key) or {}
+        return (
+            entry.get("status") == "completed"
+            and entry.get("input_sha256") == digests[step.key]
+            and all((run_root / rel).exists() for rel in step.outputs)
+        )
+
+    done: set[str] = set()
+    pending = list(steps)
+    running: dict[concurrent.futures.Future, _Step] = {}
+    failure: BaseException | None = None
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for step in list(pending):
+                if failure is not None or len(running) >= jobs:
+                    break
+                if not all(d in done for d in step.deps):
+                    continue
+                pending.remove(step)
+                if up_to_date(step):
+                    with progress.phase(f"[{index[step.key]}/{total_steps}] {step.name} (up to date)"):
+                        done.add(step.key)
+                    continue
+                # Workers inherit the progress reporter via the caller's context.
+                running[pool.submit(contextvars.copy_context().run, run_one, step)] = step
+
+            if not running:
+                if failure is None and pending:
+                    # Skips above may have unblocked dependents; rescan before declaring a stall.
+                    if any(all(d in done for d in st.deps) for st in pending):
+                        continue
+                    raise RuntimeError(f"step DAG has unsatisfiable dependencies: {[st.key for st in pending]}")
+                break
+
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in finished:
+                step = running.pop(fut)
+                exc = fut.exception()
+                if exc is not None:
+                    failure = failure or exc
+                else:
+                    done.add(step.key)
+
+    if failure is not None:
+        raise failure
+
+
+def _planned_step_keys(*, include_deid: bool, skip_note: bool) -> list[str]:
+    keys = ["stage", "identity"]
+    if include_deid:
+        keys.append("deid")
+    keys.extend(["export_ndjson", "duckdb", "reports"])
+    if not skip_note:
+        keys.append("note")
+    return keys
+
+
+def _journal_complete(run_root: Path, step_keys: list[str]) -> bool:
+    journal = _load_step_journal(run_root)
+    return all((journal.get(k) or {}).get("status") == "completed" for k in step_keys)
+
+
+_SUMMARY_LOCK = threading.Lock()
+
+
+def _print_summary(
+    *,
+    run_id: str,
+    base_out: Path,
+    state_dir: Path,
+    artifacts: dict[str, object],
+    status: str,
+    sample_fraction: float | None = None,
+) -> None:
+    lines = [
+        f"status={status}",
+        f"run_id={run_id}",
+        f"base_out={base_out.as_posix()}",
+        f"state_dir={state_dir.as_posix()}",
+    ]
+    if sample_fraction is not None:
+        lines.append(f"sample_fraction={sample_fraction}")
     # Stable output ordering.
     for k in [
         "staging_dir",
@@ -56,7 +315,22 @@ def _print_summary(*, run_id: str, base_out: Path, state_dir: Path, artifacts: d
         "doctor_note_md",
     ]:
         v = artifacts.get(k)
-        print(f"{k}={'' if v is None else v}")
+        lines.append(f"{k}={'' if v is None else v}")
+    # One block per run: concurrent runs (daemon) must not interleave their summaries.
+    with _SUMMARY_LOCK:
+        print("\n".join(lines), flush=True)
+
+
+def _sampled_fingerprint(input_fingerprint: dict[str, object], fraction: float) -> dict[str, object]:
+    # A sampled preview is a different run of the same input: its own run_id and step digests, and never the
+    # no-op match (or resume target) of a full run.
+    sha = hashlib.sha256(f"{input_fingerprint['sha256']}\nsample_fraction={fraction!r}\n".encode("utf-8")).hexdigest()
+    return {
+        **input_fingerprint,
+        "algorithm": f"{input_fingerprint.get('algorithm')} + sample_fraction",
+        "sha256": sha,
+        "sample_fraction": fraction,
+    }
 
 
 def run_all(
@@ -68,143 +342,295 @@ def run_all(
     mode: str = "share",
     note: str | None = None,
     skip_note: bool = False,
+    jobs: int = 2,
+    staging_mode: str = "copy",
+    use_blob_store: bool = True,
+    zip_members: str = "extract",
+    sample_fraction: float | None = None,
+    record_last_run: bool = True,
+    warm: WarmState | None = None,
+    turn: StateTurn | None = None,
 ) -> int:
+    """
+    Run every stage for one export (see docs/runbook_operator.md). With `sample_fraction`, the run is a sampled
+    preview (see healthdelta.sampling): a deterministic subset flows through all stages, every artifact is marked,
+    and the run is not recorded as the last run (the next full run still diffs against the last full one).
+    `record_last_run=False` also leaves LAST_RUN alone (`run batch` sets it once for exports sharing a state dir).
+
+    A long-lived caller (the daemon) passes its `warm` state and a `turn` taken from `warm.turns` in arrival
+    order: the run fingerprints its input, waits for the turn, and releases it once its NDJSON export is done.
+    """
     if mode not in {"local", "share"}:
         raise ValueError("--mode must be one of: local, share")
+    if int(jobs) < 1:
+        raise ValueError("--jobs must be >= 1")
+    sample_fraction = validate_fraction(sample_fraction)
+    if staging_mode not in STAGING_MODES:
+        raise ValueError(f"--staging-mode must be one of: {', '.join(STAGING_MODES)}")
 
     base = Path(base_out)
     state = Path(state_dir) if state_dir is not None else base / "state"
+    if warm is not None and Path(warm.registry.state_dir) != state:
+        raise ValueError("warm state belongs to a different state dir")
 
-    input_p = Path(input_path)
-
-    parent_run_id: str | None
-    if since == "last":
-        parent_run_id = read_last_run_id(str(state))
+    if warm is not None:
+        registry = warm.registry
+        lookup = registry.lookup
     else:
-        parent_run_id = since or None
-
-    with progress.phase("operator: compute input fingerprint"):
-        input_fingerprint = compute_input_fingerprint(input_p)
-    fp_sha = input_fingerprint.get("sha256") if isinstance(input_fingerprint.get("sha256"), str) else None
-    if fp_sha is None:
-        raise ValueError("input_fingerprint.sha256 missing")
-
-    # No-op detection using Issue #11 behavior.
-    if parent_run_id is not None:
-        parent_fp = run_input_fingerprint_sha256(str(state), parent_run_id)
-        if parent_fp is not None and parent_fp == fp_sha:
-            runs = load_registry(str(state))
-            entry = runs.get(parent_run_id) if isinstance(runs.get(parent_run_id), dict) else {}
-            artifacts = entry.get("artifacts") if isinstance(entry.get("artifacts"), dict) else {}
-            if not artifacts:
-                artifacts = _artifact_paths(base_out=base, run_id=parent_run_id, include_deid=(mode == "share"))
-            _print_summary(run_id=parent_run_id, base_out=base, state_dir=state, artifacts=artifacts, status="no_changes")
-            return 0
+        registry = None
 
-    run_id = compute_run_id(parent_run_id=parent_run_id, input_fingerprint_sha256=fp_sha)
-
-    run_root = base / run_id
-    staging_dir = run_root / "staging"
-    identity_dir = state / "identity"
-    deid_dir = run_root / "deid"
-    ndjson_dir = run_root / "ndjson"
-    duckdb_dir = run_root / "duckdb"
-    reports_dir = run_root / "reports"
-    note_dir = run_root / "note"
-    duckdb_path = duckdb_dir / "run.duckdb"
-
-    run_root.mkdir(parents=True, exist_ok=True)
-    identity_dir.mkdir(parents=True, exist_ok=True)
-    deid_dir.mkdir(parents=True, exist_ok=True)
-    ndjson_dir.mkdir(parents=True, exist_ok=True)
-    duckdb_dir.mkdir(parents=True, exist_ok=True)
-    reports_dir.mkdir(parents=True, exist_ok=True)
-    note_dir.mkdir(parents=True, exist_ok=True)
-
-    include_deid = mode == "share"
-
-    def step_stage_input() -> None:
-        # Stage into a temporary run_id subdir then rename to <run_root>/staging to match operator layout.
-        staged_tmp = ingest_to_staging(input_path=str(input_p), staging_root=str(run_root), run_id_override=run_id)
-        if staging_dir.exists():
-            raise FileExistsError(f"staging dir already exists: {staging_dir}")
-        staged_tmp.replace(staging_dir)
-
-    def step_identity() -> None:
-        build_identity(staging_run_dir=str(staging_dir), output_dir=str(identity_dir))
-
-    def step_deid() -> None:
-        deidentify_run(staging_run_dir=str(staging_dir), identity_dir=str(identity_dir), out_dir=str(deid_dir))
-
-    artifacts = {
-        "staging_dir": f"{run_id}/staging",
-        "identity_dir": "state/identity",
-        "deid_dir": f"{run_id}/deid" if include_deid else None,
-        "ndjson_dir": f"{run_id}/ndjson",
-        "duckdb_db": f"{run_id}/duckdb/run.duckdb",
-        "reports_dir": f"{run_id}/reports",
-        "note_dir": f"{run_id}/note",
-        "doctor_note_txt": f"{run_id}/note/doctor_note.txt",
-        "doctor_note_md": f"{run_id}/note/doctor_note.md",
-    }
+        def lookup(run_id: str) -> dict | None:
+            return lookup_run(str(state), run_id)
 
-    register_run(
-        state_dir=str(state),
-        run_id=run_id,
-        input_fingerprint=input_fingerprint,
-        parent_run_id=parent_run_id,
-        note=note,
-        artifacts=artifacts,
-    )
-    write_last_run_id(str(state), run_id)
+    input_p = Path(input_path)
 
-    def step_export_ndjson() -> None:
-        if include_deid:
-            export_ndjson(input_dir=str(deid_dir), out_dir=str(ndjson_dir), mode="share")
+    try:
+        # Fingerprinting reads only the input: it overlaps with other runs' turns.
+        with progress.phase("operator: compute input fingerprint"):
+            input_fingerprint = compute_input_fingerprint(input_p)
+        if sample_fraction is not None:
+            input_fingerprint = _sampled_fingerprint(input_fingerprint, sample_fraction)
+        fp_sha = input_fingerprint.get("sha256") if isinstance(input_fingerprint.get("sha256"), str) else None
+        if fp_sha is None:
+            raise ValueError("input_fingerprint.sha256 missing")
+
+        if turn is not None:
+            with progress.phase("operator: wait for state turn"):
+                turn.wait()
+
+        parent_run_id: str | None
+        if since == "last":
+            parent_run_id = read_last_run_id(str(state))
         else:
-            export_ndjson(input_dir=str(staging_dir), out_dir=str(ndjson_dir), mode="local")
-        update_run_artifacts(str(state), run_id, {"ndjson_dir": f"{run_id}/ndjson"})
-
-    def step_duckdb() -> None:
-        build_duckdb(input_dir=str(ndjson_dir), db_path=str(duckdb_path), replace=True)
-        update_run_artifacts(str(state), run_id, {"duckdb_db": f"{run_id}/duckdb/run.duckdb"})
-
-    def step_reports() -> None:
-        build_report(db_path=str(duckdb_path), out_dir=str(reports_dir), mode=mode)
-        update_run_artifacts(str(state), run_id, {"reports_dir": f"{run_id}/reports"})
-
-    def step_note() -> None:
-        build_doctor_note(db_path=str(duckdb_path), out_dir=str(note_dir), mode=mode)
-        update_run_artifacts(
-            str(state),
-            run_id,
-            {
+            parent_run_id = since or None
+
+        include_deid = mode == "share"
+        step_keys = _planned_step_keys(include_deid=include_deid, skip_note=skip_note)
+
+        # No-op detection using Issue #11 behavior.
+        resumed = False
+        run_id: str | None = None
+        if parent_run_id is not None:
+            parent_fp = entry_input_fingerprint_sha256(lookup(parent_run_id))
+            parent_root = base / parent_run_id
+            if (
+                parent_fp is not None
+                and parent_fp == fp_sha
+                and (parent_root / _STEP_JOURNAL).exists()
+                and not _journal_complete(parent_root, step_keys)
+            ):
+                # Same input as an interrupted run: resume it instead of reporting no_changes.
+                run_id = parent_run_id
+                resumed = True
+            elif parent_fp is not None and parent_fp == fp_sha:
+                entry = lookup(parent_run_id) or {}
+                artifacts = entry.get("artifacts") if isinstance(entry.get("artifacts"), dict) else {}
+                if not artifacts:
+                    artifacts = _artifact_paths(base_out=base, run_id=parent_run_id, include_deid=(mode == "share"))
+                _print_summary(
+                    run_id=parent_run_id,
+                    base_out=base,
+                    state_dir=state,
+                    artifacts=artifacts,
+                    status="no_changes",
+                    sample_fraction=sample_fraction,
+                )
+                return 0
+
+        if run_id is None:
+            run_id = compute_run_id(parent_run_id=parent_run_id, input_fingerprint_sha256=fp_sha)
+            if sample_fraction is not None:
+                # Sampled runs are never the last run, so an interrupted one is found by its run_id instead.
+                sampled_root = base / run_id
+                resumed = (sampled_root / _STEP_JOURNAL).exists() and not _journal_complete(sampled_root, step_keys)
+
+        run_root = base / run_id
+        staging_dir = run_root / "staging"
+        identity_dir = state / "identity"
+        deid_dir = run_root / "deid"
+        ndjson_dir = run_root / "ndjson"
+        duckdb_dir = run_root / "duckdb"
+        reports_dir = run_root / "reports"
+        note_dir = run_root / "note"
+        duckdb_path = duckdb_dir / "run.duckdb"
+
+        run_root.mkdir(parents=True, exist_ok=True)
+        identity_dir.mkdir(parents=True, exist_ok=True)
+        deid_dir.mkdir(parents=True, exist_ok=True)
+        ndjson_dir.mkdir(parents=True, exist_ok=True)
+        duckdb_dir.mkdir(parents=True, exist_ok=True)
+        reports_dir.mkdir(parents=True, exist_ok=True)
+        note_dir.mkdir(parents=True, exist_ok=True)
+
+        # One `run all` per run_id at a time (e.g. identical inputs in one batch); waiters then see it complete.
+        with file_lock(run_root / _RUN_LOCK):
+            # Registry updates are single-row SQLite transactions (safe across steps and processes).
+            def update_artifacts(patch: dict[str, object]) -> None:
+                if registry is not None:
+                    registry.update_artifacts(run_id, patch)
+                else:
+                    update_run_artifacts(str(state), run_id, patch)
+
+            def end_turn() -> None:
+                # Parsed objects live for this run only (a daemon or batch worker must not carry them into the
+                # next export); with turns they are dropped before the next run may start parsing.
+                if turn is None or not turn.released:
+                    parse_cache.clear()
+                if turn is not None:
+                    turn.release()
+
+            def step_stage_input() -> None:
+                # Stage into a temporary run_id subdir then rename to <run_root>/staging to match operator layout. An
+                # interrupted ingest left its checkpoint there: keep the subdir so ingest continues from it.
+                if not (run_root / run_id / INGEST_CHECKPOINT).exists():
+                    _clear_outputs(run_root, (run_id,))
+                # The registry points gc at <run_root>/staging: hold off gc until the staged manifest is there.
+                store = default_store(str(state)) if use_blob_store else None
+                with store_lock(store, shared=True) if store is not None else contextlib.nullcontext():
+                    staged_tmp = ingest_to_staging(
+                        input_path=str(input_p),
+                        staging_root=str(run_root),
+                        run_id_override=run_id,
+                        staging_mode=staging_mode,
+                        blob_store=str(store) if store is not None else None,
+                        zip_members=zip_members,
+                        sample_fraction=sample_fraction,
+                    )
+                    if staging_dir.exists():
+                        raise FileExistsError(f"staging dir already exists: {staging_dir}")
+                    staged_tmp.replace(staging_dir)
+
+            def step_identity() -> None:
+                # The identity store serializes concurrent builds itself; aliases.json is not re-exported per run.
+                build_identity(staging_run_dir=str(staging_dir), output_dir=str(identity_dir), export_aliases=False)
+
+            def step_deid() -> None:
+                deidentify_run(staging_run_dir=str(staging_dir), identity_dir=str(identity_dir), out_dir=str(deid_dir))
+
+            artifacts = {
+                "staging_dir": f"{run_id}/staging",
+                "identity_dir": "state/identity",
+                "deid_dir": f"{run_id}/deid" if include_deid else None,
+                "ndjson_dir": f"{run_id}/ndjson",
+                "duckdb_db": f"{run_id}/duckdb/run.duckdb",
+                "reports_dir": f"{run_id}/reports",
                 "note_dir": f"{run_id}/note",
                 "doctor_note_txt": f"{run_id}/note/doctor_note.txt",
                 "doctor_note_md": f"{run_id}/note/doctor_note.md",
-            },
-        )
+            }
 
-    steps: list[tuple[str, callable]] = [
-        ("Stage input", step_stage_input),
-        ("Build identity", step_identity),
-    ]
-    if include_deid:
-        steps.append(("De-identify", step_deid))
-    steps.extend(
-        [
-            ("Export NDJSON", step_export_ndjson),
-            ("Build DuckDB", step_duckdb),
-            ("Generate reports", step_reports),
-        ]
-    )
-    if not skip_note:
-        steps.append(("Generate doctor note", step_note))
+            with state_lock(str(state)):
+                if not resumed and lookup(run_id) is not None and _journal_complete(run_root, step_keys):
+                    # Same input already fully processed as this run_id (e.g. an explicit `--since` or a batch rerun).
+                    _print_summary(
+                        run_id=run_id,
+                        base_out=base,
+                        state_dir=state,
+                        artifacts=artifacts,
+                        status="no_changes",
+                        sample_fraction=sample_fraction,
+                    )
+                    return 0
+                registration = dict(
+                    run_id=run_id,
+                    input_fingerprint=input_fingerprint,
+                    parent_run_id=parent_run_id,
+                    note=note,
+                    artifacts=artifacts,
+                )
+                if registry is not None:
+                    registry.register(**registration)
+                else:
+                    register_run(state_dir=str(state), **registration)
+                if sample_fraction is None and record_last_run:
+                    write_last_run_id(str(state), run_id)
+                if not (run_root / _STEP_JOURNAL).exists():
+                    # From here on the run is resumable: a rerun interrupted before any step finished must not look
+                    # like a completed run (no_changes).
+                    _save_step_journal(run_root, {})
 
-    total_steps = len(steps)
-    for i, (name, fn) in enumerate(steps, start=1):
-        with progress.phase(f"[{i}/{total_steps}] {name}"):
-            fn()
+            def step_export_ndjson() -> None:
+                identity_lookup = warm.identity if warm is not None else None
+                if include_deid:
+                    export_ndjson(
+                        input_dir=str(deid_dir), out_dir=str(ndjson_dir), mode="share", identity_lookup=identity_lookup
+                    )
+                else:
+                    export_ndjson(
+                        input_dir=str(staging_dir), out_dir=str(ndjson_dir), mode="local", identity_lookup=identity_lookup
+                    )
+                update_artifacts({"ndjson_dir": f"{run_id}/ndjson"})
+                # The rest of the run reads only its own outputs: let the next export take its turn.
+                end_turn()
+
+            shared_con = warm.duckdb if warm is not None else None
+
+            def step_duckdb() -> None:
+                build_duckdb(input_dir=str(ndjson_dir), db_path=str(duckdb_path), replace=True, shared_con=shared_con)
+                update_artifacts({"duckdb_db": f"{run_id}/duckdb/run.duckdb"})
 
-    _print_summary(run_id=run_id, base_out=base, state_dir=state, artifacts=artifacts, status="created")
-    return 0
+            def step_reports() -> None:
+                build_report(db_path=str(duckdb_path), out_dir=str(reports_dir), mode=mode, shared_con=shared_con)
+                update_artifacts({"reports_dir": f"{run_id}/reports"})
+
+            def step_note() -> None:
+                build_doctor_note(db_path=str(duckdb_path), out_dir=str(note_dir), mode=mode, shared_con=shared_con)
+                update_artifacts(
+                    {
+                        "note_dir": f"{run_id}/note",
+                        "doctor_note_txt": f"{run_id}/note/doctor_note.txt",
+                        "doctor_note_md": f"{run_id}/note/doctor_note.md",
+                    },
+                )
+
+            steps = [
+                _Step("stage", "Stage input", (), ("staging",), step_stage_input),
+                _Step("identity", "Build identity", ("stage",), (), step_identity),
+            ]
+            if include_deid:
+                steps.append(_Step("deid", "De-identify", ("stage", "identity"), ("deid",), step_deid))
+            steps.extend(
+                [
+                    _Step(
+                        "export_ndjson",
+                        "Export NDJSON",
+                        ("deid",) if include_deid else ("stage", "identity"),
+                        ("ndjson",),
+                        step_export_ndjson,
+                        resumable=True,
+                    ),
+                    _Step("duckdb", "Build DuckDB", ("export_ndjson",), ("duckdb",), step_duckdb),
+                    _Step("reports", "Generate reports", ("duckdb",), ("reports",), step_reports),
+                ]
+            )
+            if not skip_note:
+                steps.append(_Step("note", "Generate doctor note", ("duckdb",), ("note",), step_note))
+
+            digests = _step_input_digests(steps, run_input_sha256=fp_sha, mode=mode)
+            # Identity, deid and export share one parse of each clinical JSON file (see end_turn).
+            parse_cache.clear()
+            try:
+                _run_step_dag(steps, run_root=run_root, digests=digests, jobs=int(jobs))
+            finally:
+                end_turn()
+
+            with state_lock(str(state)):
+                if registry is not None:
+                    registry.export_json()
+                else:
+                    export_registry_json(str(state))
+
+            _print_summary(
+                run_id=run_id,
+                base_out=base,
+                state_dir=state,
+                artifacts=artifacts,
+                status="resumed" if resumed else "created",
+                sample_fraction=sample_fraction,
+            )
+            return 0
+    finally:
+        if turn is not None:
+            turn.release()
+        # Cached zip handles outlive a run otherwise (a daemon would keep every export.zip it read open).
+        staged_source.close_all()
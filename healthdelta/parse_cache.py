@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import collections
+import hashlib
+import json
+import marshal
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from healthdelta import staged_source
+
+
+# In-process budget, counted in source JSON bytes (parsed objects take several times that in memory).
+_DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+_DISK_MAGIC = b"HDPC1\n"
+
+
+class _ParseCache:
+    """
+    Parse-once cache for clinical JSON shared by the identity, deid and export stages of a run.
+
+    - In process: an LRU keyed by resolved path and validated against (size, mtime_ns), so a rewritten file is
+      never served stale.
+    - Across processes (stages run as separate commands): an optional on-disk cache of marshal-serialized objects
+      keyed by the file's sha256. It holds clinical content: keep it under the local-only data dir.
+
+    Returned objects are shared between callers and must not be mutated.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: collections.OrderedDict[str, tuple[int, int, Any]] = collections.OrderedDict()
+        self._bytes = 0
+        self._max_bytes = _DEFAULT_MAX_BYTES
+        self._disk_dir: Path | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, *, max_bytes: int | None = None, disk_dir: str | None = None) -> None:
+        with self._lock:
+            if max_bytes is not None:
+                if max_bytes < 0:
+                    raise ValueError("parse cache size must be >= 0")
+                self._max_bytes = int(max_bytes)
+                self._evict_locked()
+            self._disk_dir = Path(disk_dir) / f"marshal-v{marshal.version}" if disk_dir else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _evict_locked(self) -> None:
+        while self._entries and self._bytes > self._max_bytes:
+            _, (size, _, _) = self._entries.popitem(last=False)
+            self._bytes -= size
+
+    def _get(self, key: str, size: int, mtime_ns: int) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != size or entry[1] != mtime_ns:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+
+    def _put(self, key: str, size: int, mtime_ns: int, obj: Any) -> None:
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[0]
+            self._entries[key] = (size, mtime_ns, obj)
+            self._bytes += size
+            self._evict_locked()
+
+    def _disk_path(self, sha256: str) -> Path | None:
+        return self._disk_dir / sha256[:2] / sha256 if self._disk_dir is not None else None
+
+    def _disk_get(self, raw: bytes) -> tuple[bool, Any]:
+        p = self._disk_path(hashlib.sha256(raw).hexdigest())
+        if p is None or not p.exists():
+            return False, None
+        try:
+            blob = p.read_bytes()
+            if not blob.startswith(_DISK_MAGIC):
+                return False, None
+            return True, marshal.loads(blob[len(_DISK_MAGIC) :])
+        except (OSError, ValueError, EOFError, TypeError):
+            return False, None
+
+    def _disk_put(self, raw: bytes, obj: Any) -> None:
+        p = self._disk_path(hashlib.sha256(raw).hexdigest())
+        if p is None or p.exists():
+            return
+        try:
+            blob = _DISK_MAGIC + marshal.dumps(obj)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(blob)
+            tmp.replace(p)
+        except (OSError, ValueError):
+            # Best effort: an unwritable cache dir only costs a re-parse next time.
+            return
+
+    def load_json(self, path: Path, *, raw: bytes | None = None) -> Any:
+        """
+        `json.loads(path)` through the cache (`path` may be a staged zip member, see staged_source). `raw` passes
+        bytes the caller already read. Decode errors propagate (as json.JSONDecodeError) and are not cached.
+        """
+        key, size, mtime_ns = staged_source.cache_key(path)
+        found, obj = self._get(key, size, mtime_ns)
+        if found:
+            return obj
+        if raw is None:
+            raw = staged_source.read_bytes(path)
+        found, obj = self._disk_get(raw) if self._disk_dir is not None else (False, None)
+        if not found:
+            obj = json.loads(raw.decode("utf-8"))
+            if self._disk_dir is not None:
+                self._disk_put(raw, obj)
+        self._put(key, size, mtime_ns, obj)
+        return obj
+
+    def remember(self, path: Path, obj: Any) -> None:
+        """
+        Seed the cache with `obj` for a file the caller just wrote as its JSON serialization (e.g. deid output,
+        which export then reads), so it is not parsed back.
+        """
+        self._put(*staged_source.cache_key(path), obj)
+
+
+parse_cache = _ParseCache()
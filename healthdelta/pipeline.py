@@ -8,6 +8,7 @@ import sys
 from pathlib import Path
 from typing import Any
 
+from healthdelta.blob_store import default_store
 from healthdelta.deid import deidentify_run
 from healthdelta.identity import build_identity
 from healthdelta.ingest import ingest_to_staging
@@ -16,6 +17,7 @@ from healthdelta.state import (
     artifact_pointers_for_run,
     compute_input_fingerprint,
     compute_run_id,
+    export_registry_json,
     read_last_run_id,
     register_run,
     run_input_fingerprint_sha256,
@@ -72,6 +74,9 @@ def run_pipeline(
     state_dir: str | None = None,
     since: str = "last",
     note: str | None = None,
+    staging_mode: str = "copy",
+    use_blob_store: bool = True,
+    zip_members: str = "extract",
 ) -> int:
     started_at = _now_utc()
 
@@ -116,7 +121,14 @@ def run_pipeline(
         run_id = None
 
     with progress.phase("[1/4] Stage input"):
-        ingest_run_dir = ingest_to_staging(input_path=str(input_p), staging_root=str(staging_root), run_id_override=run_id)
+        ingest_run_dir = ingest_to_staging(
+            input_path=str(input_p),
+            staging_root=str(staging_root),
+            run_id_override=run_id,
+            staging_mode=staging_mode,
+            blob_store=str(default_store(state_dir)) if use_blob_store and state_dir is not None else None,
+            zip_members=zip_members,
+        )
     run_id_actual = ingest_run_dir.name
     if expected_run_id is not None and expected_run_id != run_id_actual:
         print(f"ERROR: --run-id {expected_run_id} does not match computed run_id {run_id_actual}", file=sys.stderr)
@@ -204,6 +216,7 @@ def run_pipeline(
             note=note,
             artifacts=artifact_pointers_for_run(state_dir=state_dir, run_id=run_id_actual, mode=mode),
         )
+        export_registry_json(state_dir)
         write_last_run_id(state_dir, run_id_actual)
 
     print(f"run_id={run_id_actual}")
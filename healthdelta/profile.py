@@ -1,17 +1,26 @@
 from __future__ import annotations
 
+import concurrent.futures
+import contextlib
+import contextvars
 import csv
+import datetime
+import functools
 import hashlib
 import json
+import mmap
+import os
 import re
 import tempfile
+import zipfile
 from collections import Counter
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import Any, BinaryIO, Callable, Iterable, Union
 
-from healthdelta.export_layout import resolve_export_layout
-from healthdelta.progress import progress
+from healthdelta.export_layout import resolve_export_layout, resolve_zip_layout
+from healthdelta.file_reader import map_files, scan_files
+from healthdelta.progress import ProgressTask, progress
 
 
 def _write_text_atomic(path: Path, text: str) -> None:
@@ -75,6 +84,118 @@ def _walk_files(root: Path) -> list[FileInfo]:
     return files
 
 
+class _DirSource:
+    """Files of the export root of an unpacked export directory, addressed by posix paths relative to it."""
+
+    kind = "export_dir"
+
+    def __init__(self, input_root: Path) -> None:
+        self.layout = resolve_export_layout(input_root)
+        self._root = input_root if self.layout.export_root_rel == "." else (input_root / self.layout.export_root_rel)
+
+    def __enter__(self) -> "_DirSource":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        return None
+
+    def walk(self) -> list[FileInfo]:
+        return _walk_files(self._root)
+
+    def exists(self, rel: str) -> bool:
+        return (self._root / rel).is_file()
+
+    def size(self, rel: str) -> int:
+        return (self._root / rel).stat().st_size
+
+    def open(self, rel: str) -> BinaryIO:
+        return (self._root / rel).open("rb")
+
+    def local_path(self, rel: str) -> Path | None:
+        return self._root / rel
+
+    def fingerprint(self, rel: str) -> str:
+        # Cache validity: a rewritten file gets a new mtime even when its size is unchanged.
+        st = (self._root / rel).stat()
+        return _sha256_bytes(f"{rel}\0{st.st_size}\0{st.st_mtime_ns}".encode("utf-8"))
+
+    def json_files(self, dir_rel: str) -> list[str]:
+        # Sorted by posix path (all share the `dir_rel` prefix, so this is the order relative to it).
+        d = self._root / dir_rel
+        return sorted(p.relative_to(self._root).as_posix() for p in scan_files(d, suffix=".json"))
+
+
+class _ZipSource:
+    """
+    The same view of an export.zip: members are read (decompressed) straight from the zip, never extracted.
+    One ZipFile is shared by the scanner threads; it serializes raw reads, members still decompress concurrently.
+    """
+
+    kind = "export_zip"
+
+    def __init__(self, zip_path: Path) -> None:
+        self._zf = zipfile.ZipFile(zip_path)
+        infos = self._zf.infolist()
+        try:
+            self.layout = resolve_zip_layout(i.filename for i in infos)
+        except ValueError:
+            self._zf.close()
+            raise
+        prefix = "" if self.layout.export_root_rel == "." else self.layout.export_root_rel + "/"
+        self._infos: dict[str, zipfile.ZipInfo] = {}
+        for i in infos:
+            name = i.filename.lstrip("/")
+            if i.is_dir() or not name.startswith(prefix):
+                continue
+            self._infos.setdefault(name[len(prefix) :], i)
+
+    def __enter__(self) -> "_ZipSource":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._zf.close()
+
+    def walk(self) -> list[FileInfo]:
+        task = progress.task("profile: scan files", total=len(self._infos), unit="files")
+        files = [FileInfo(relpath=rel, size_bytes=i.file_size) for rel, i in self._infos.items()]
+        task.advance(len(files))
+        files.sort(key=lambda x: x.relpath)
+        return files
+
+    def exists(self, rel: str) -> bool:
+        return rel in self._infos
+
+    def size(self, rel: str) -> int:
+        return self._infos[rel].file_size
+
+    def open(self, rel: str) -> BinaryIO:
+        return self._zf.open(self._infos[rel])  # type: ignore[return-value]
+
+    def local_path(self, rel: str) -> Path | None:
+        # Members are compressed: they can only be streamed.
+        return None
+
+    def fingerprint(self, rel: str) -> str:
+        # The central directory records each member's CRC-32: a content fingerprint for free.
+        i = self._infos[rel]
+        return _sha256_bytes(f"{rel}\0{i.file_size}\0{i.CRC:08x}".encode("utf-8"))
+
+    def json_files(self, dir_rel: str) -> list[str]:
+        prefix = dir_rel.rstrip("/") + "/"
+        return sorted(rel for rel in self._infos if rel.startswith(prefix) and rel.endswith(".json"))
+
+
+_Source = Union[_DirSource, _ZipSource]
+
+
+def _open_source(input_path: Path) -> _Source:
+    if input_path.is_dir():
+        return _DirSource(input_path)
+    if input_path.is_file() and zipfile.is_zipfile(input_path):
+        return _ZipSource(input_path)
+    raise ValueError("--input must be an unpacked export directory or an export.zip")
+
+
 def _counts_by_ext(files: list[FileInfo]) -> list[tuple[str, int]]:
     c: Counter[str] = Counter()
     for f in files:
@@ -92,53 +213,285 @@ def _top_files(files: list[FileInfo], k: int) -> list[FileInfo]:
     return items[:k]
 
 
-_RECORD_TYPE_RE = re.compile(br"<Record\b[^>]*\btype=\"([^\"]+)\"")
+# An unpacked export.xml / export_cda.xml is memory-mapped and cut into segments, which run on a process pool (regex
+# matching holds the GIL, so threads would not scale). Segments start at a `<`: the patterns begin with a tag start
+# and, in well-formed XML, contain no other, so no match crosses a cut and the results equal a sequential scan.
+SEGMENT_BYTES = 32 * 1024 * 1024
 
+# A segment scanner: `fn(buf, start, end)` over the bytes in [start, end) of `buf` (a mapping or a bytes chunk).
+# Its result must be picklable and have `update(other)` merging another segment's result into it.
+_SegmentFn = Callable[[Any, int, int], Any]
 
-def _count_healthkit_record_types(export_xml: Path) -> list[tuple[str, int]]:
-    """
-    Streaming-safe scan for HealthKit Record type counts.
-    Fast heuristic: counts occurrences of `<Record ... type="...">` without building a DOM.
-    """
-    if not export_xml.exists():
+
+def _segment_bounds(path: Path, *, segment_bytes: int) -> list[tuple[int, int]]:
+    size = path.stat().st_size
+    if size == 0:
         return []
+    cuts = [0]
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        while cuts[-1] + segment_bytes < size:
+            cut = mm.find(b"<", cuts[-1] + segment_bytes)
+            if cut < 0:
+                break
+            cuts.append(cut)
+    cuts.append(size)
+    return list(zip(cuts, cuts[1:]))
 
-    counts: Counter[str] = Counter()
+
+def _scan_segment(path: str, fn: _SegmentFn, start: int, end: int) -> Any:
+    # Runs in a worker process (or inline): regexes run on the mapping, reading the page cache in place.
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return fn(mm, start, end)
+
+
+def _scan_stream(f: BinaryIO, fn: _SegmentFn, out: Any, task: ProgressTask) -> None:
+    # A zip member cannot be mapped: read 1 MiB chunks and cut each before its last `<` (the element there may
+    # continue in the next chunk), the same cut rule as the segments.
     carry = b""
-    carry_keep = 8192
-    task = progress.task("profile: scan export.xml", total=export_xml.stat().st_size, unit="bytes")
-    with export_xml.open("rb") as f:
-        while True:
-            chunk = f.read(1024 * 1024)
-            if not chunk:
-                break
-            data = carry + chunk
-            cutoff = max(0, len(data) - carry_keep)
-            for m in _RECORD_TYPE_RE.finditer(data):
-                if m.start() >= cutoff:
-                    continue
-                t = m.group(1).decode("utf-8", errors="replace").strip()
-                if t:
-                    counts[t] += 1
-            carry = data[-carry_keep:] if len(data) > carry_keep else data
-            task.advance(len(chunk))
-    # Final pass for remaining carry (safe; no further overlaps).
-    for m in _RECORD_TYPE_RE.finditer(carry):
-        t = m.group(1).decode("utf-8", errors="replace").strip()
+    while True:
+        chunk = f.read(1024 * 1024)
+        if not chunk:
+            break
+        data = carry + chunk
+        cut = data.rfind(b"<")
+        if cut > 0:
+            out.update(fn(data, 0, cut))
+            carry = data[cut:]
+        else:
+            carry = data
+        task.advance(len(chunk))
+    out.update(fn(carry, 0, len(carry)))
+
+
+def _scan_file(
+    src: _Source,
+    rel: str,
+    fn: _SegmentFn,
+    factory: Callable[[], Any],
+    *,
+    task_name: str,
+    pool: concurrent.futures.Executor | None = None,
+    segment_bytes: int = SEGMENT_BYTES,
+) -> Any:
+    """`fn` over the whole file, segment results merged into `factory()`."""
+    out = factory()
+    task = progress.task(task_name, total=src.size(rel), unit="bytes")
+    path = src.local_path(rel)
+    if path is None:
+        with src.open(rel) as f:
+            _scan_stream(f, fn, out, task)
+        return out
+
+    bounds = _segment_bounds(path, segment_bytes=segment_bytes)
+    if pool is None or len(bounds) < 2:
+        for start, end in bounds:
+            out.update(_scan_segment(str(path), fn, start, end))
+            task.advance(end - start)
+        return out
+
+    futures = {pool.submit(_scan_segment, str(path), fn, start, end): end - start for start, end in bounds}
+    for fut in concurrent.futures.as_completed(futures):
+        out.update(fut.result())
+        task.advance(futures[fut])
+    return out
+
+
+def _findall_counts(pattern: re.Pattern[bytes], buf: Any, start: int, end: int) -> Counter[bytes]:
+    return Counter(pattern.findall(buf, start, end))
+
+
+class _SizeSketch:
+    """
+    Mergeable histogram of non-negative sizes in bounded memory: exact below 64, above that bucketed on the 5
+    leading bits (so a quantile is within 1/32 of a true value, and there are at most 16 buckets per power of
+    two). min and max are exact.
+    """
+
+    __slots__ = ("buckets", "min", "max", "count")
+
+    def __init__(self) -> None:
+        self.buckets: Counter[int] = Counter()
+        self.min: int | None = None
+        self.max: int | None = None
+        self.count = 0
+
+    def add(self, n: int, k: int = 1) -> None:
+        shift = n.bit_length() - 5
+        self.buckets[(n >> shift) << shift if n >= 64 else n] += k
+        self.min = n if self.min is None or n < self.min else self.min
+        self.max = n if self.max is None or n > self.max else self.max
+        self.count += k
+
+    def update(self, other: "_SizeSketch") -> None:
+        self.buckets.update(other.buckets)
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        self.count += other.count
+
+    def quantile(self, q: float) -> int | None:
+        if self.count == 0 or self.min is None or self.max is None:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for low in sorted(self.buckets):
+            seen += self.buckets[low]
+            if seen > rank:
+                width = 1 << (low.bit_length() - 5) if low >= 64 else 1
+                return min(max(low + width // 2, self.min), self.max)
+        return self.max
+
+
+class _TypeStats:
+    """Per HealthKit type: record count, distinct units, distinct start days (YYYY-MM-DD) and record sizes."""
+
+    __slots__ = ("count", "units", "days", "sizes")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.units: set[bytes] = set()
+        self.days: set[bytes] = set()
+        self.sizes = _SizeSketch()
+
+    def update(self, other: "_TypeStats") -> None:
+        self.count += other.count
+        self.units |= other.units
+        self.days |= other.days
+        self.sizes.update(other.sizes)
+
+
+class _RecordStats:
+    __slots__ = ("types",)
+
+    def __init__(self) -> None:
+        self.types: dict[bytes, _TypeStats] = {}
+
+    def update(self, other: "_RecordStats") -> None:
+        for t, st in other.types.items():
+            mine = self.types.get(t)
+            if mine is None:
+                self.types[t] = st
+            else:
+                mine.update(st)
+
+
+_RECORD_TAG_RE = re.compile(br"<Record\b[^>]*>")
+_ATTR_NAMES = (b"type", b"unit", b"startDate")
+_ATTR_NEEDLES = {name: b" " + name + b"=\"" for name in _ATTR_NAMES}
+_ATTR_RES = {name: re.compile(rb"\b" + name + rb"=\"([^\"]*)\"") for name in _ATTR_NAMES}
+_DAY_RE = re.compile(rb"\d{4}-\d{2}-\d{2}")
+
+
+def _attr(tag: bytes, name: bytes) -> bytes | None:
+    # bytes.find for the usual ` name="` (several times faster than a regex search per tag); the regex handles
+    # attributes separated by other whitespace.
+    needle = _ATTR_NEEDLES[name]
+    i = tag.find(needle)
+    if i >= 0:
+        i += len(needle)
+        j = tag.find(b"\"", i)
+        return tag[i:j] if j >= 0 else None
+    if name not in tag:
+        return None
+    m = _ATTR_RES[name].search(tag)
+    return m.group(1) if m is not None else None
+
+
+def _record_stats(buf: Any, start: int, end: int) -> _RecordStats:
+    # One pass over the `<Record ...>` start tags; everything else is derived from the tag bytes. Record size is
+    # the start tag's length (child metadata elements are not included). Exact sizes are counted per segment (few
+    # distinct values) and folded into the sketch once at the end.
+    sizes: dict[bytes, Counter[int]] = {}
+    out = _RecordStats()
+    types = out.types
+    for tag in _RECORD_TAG_RE.findall(buf, start, end):
+        t = _attr(tag, b"type")
+        if not t:
+            continue
+        st = types.get(t)
+        if st is None:
+            st = types[t] = _TypeStats()
+            sizes[t] = Counter()
+        st.count += 1
+        unit = _attr(tag, b"unit")
+        if unit is not None:
+            st.units.add(unit)
+        start_date = _attr(tag, b"startDate")
+        if start_date is not None and _DAY_RE.match(start_date):
+            st.days.add(start_date[:10])
+        sizes[t][len(tag)] += 1
+    for t, counts in sizes.items():
+        for n, k in counts.items():
+            types[t].sizes.add(n, k)
+    return out
+
+
+def _scan_healthkit_records(
+    src: _Source, rel: str, *, pool: concurrent.futures.Executor | None = None
+) -> dict[str, _TypeStats]:
+    """
+    Streaming-safe scan of HealthKit `<Record ... type="...">` start tags without building a DOM: per type, the
+    record count plus bounded-size stats (units, start days, size sketch).
+    """
+    if not src.exists(rel):
+        return {}
+
+    raw = _scan_file(src, rel, _record_stats, _RecordStats, task_name="profile: scan export.xml", pool=pool)
+    stats: dict[str, _TypeStats] = {}
+    for raw_type, st in raw.types.items():
+        t = raw_type.decode("utf-8", errors="replace").strip()
         if t:
-            counts[t] += 1
+            stats.setdefault(t, _TypeStats()).update(st)
+    return stats
 
-    items = list(counts.items())
-    items.sort(key=lambda kv: (-kv[1], kv[0]))
-    return items
+
+def _parse_days(days: set[bytes]) -> list[datetime.date]:
+    out: list[datetime.date] = []
+    for d in days:
+        try:
+            out.append(datetime.date.fromisoformat(d.decode("ascii")))
+        except ValueError:
+            continue
+    return sorted(out)
+
+
+def _type_stats_rows(stats: dict[str, _TypeStats], types: list[str], *, mode: str) -> list[dict[str, Any]]:
+    """
+    Share mode reports how many days a type spans and has records on, never which days; local mode adds the
+    first and last start day.
+    """
+    rows: list[dict[str, Any]] = []
+    for t in types:
+        st = stats[t]
+        days = _parse_days(st.days)
+        row: dict[str, Any] = {
+            "type": t,
+            "count": st.count,
+            "units": sorted(u.decode("utf-8", errors="replace") for u in st.units),
+            "active_days": len(days),
+            "span_days": (days[-1] - days[0]).days + 1 if days else 0,
+            "record_bytes": {
+                "min": st.sizes.min,
+                "p50": st.sizes.quantile(0.5),
+                "p90": st.sizes.quantile(0.9),
+                "p99": st.sizes.quantile(0.99),
+                "max": st.sizes.max,
+            },
+        }
+        if mode == "local":
+            row["first_start_day"] = days[0].isoformat() if days else None
+            row["last_start_day"] = days[-1].isoformat() if days else None
+        rows.append(row)
+    return rows
 
 
 _FHIR_RESOURCE_TYPE_RE = re.compile(br"\"resourceType\"\s*:\s*\"([A-Za-z][A-Za-z0-9]+)\"")
 
 
-def _extract_fhir_resource_type(path: Path, *, max_bytes: int = 64 * 1024) -> str | None:
+def _extract_fhir_resource_type(src: _Source, rel: str, *, max_bytes: int = 64 * 1024) -> str | None:
     # Read a bounded prefix and only extract resourceType.
-    with path.open("rb") as f:
+    with src.open(rel) as f:
         head = f.read(max_bytes)
     m = _FHIR_RESOURCE_TYPE_RE.search(head)
     if not m:
@@ -147,76 +500,76 @@ def _extract_fhir_resource_type(path: Path, *, max_bytes: int = 64 * 1024) -> st
     return rt or None
 
 
-def _count_clinical_resource_types(clinical_dir: Path, *, sample_json: int) -> tuple[list[tuple[str, int]], dict[str, int]]:
+def _count_clinical_resource_types(
+    src: _Source, clinical_dir_rel: str | None, *, sample_json: int, cached: dict[str, Any] | None = None
+) -> tuple[list[tuple[str, int]], dict[str, int], dict[str, list[Any]]]:
     """
     Counts FHIR resourceType across clinical JSON files. Deterministic sampling:
     - files are sorted by relative path
     - only the first N files are scanned when sample_json > 0
+    Prefix reads run on the file_reader thread pool (one small read per file is latency bound). Files whose
+    fingerprint matches `cached` (relpath -> [fingerprint, resourceType]) are not read again; the returned map
+    is the cache entry for this run.
     """
-    if not clinical_dir.exists() or not clinical_dir.is_dir():
-        return [], {"total_files": 0, "sampled_files": 0}
+    if clinical_dir_rel is None:
+        return [], {"total_files": 0, "sampled_files": 0}, {}
 
-    json_files = sorted([p for p in clinical_dir.rglob("*.json") if p.is_file()], key=lambda p: p.relative_to(clinical_dir).as_posix())
+    json_files = src.json_files(clinical_dir_rel)
     total = len(json_files)
     if sample_json > 0:
         json_files = json_files[:sample_json]
     sampled = len(json_files)
 
-    counts: Counter[str] = Counter()
-    task = progress.task("profile: scan clinical JSON", total=len(json_files), unit="files")
-    for p in json_files:
-        rt = _extract_fhir_resource_type(p)
-        if rt:
-            counts[rt] += 1
+    results: dict[str, list[Any]] = {}
+    todo: list[tuple[str, str]] = []
+    for rel in json_files:
+        fp = src.fingerprint(rel)
+        hit = (cached or {}).get(rel)
+        if isinstance(hit, list) and len(hit) == 2 and hit[0] == fp:
+            results[rel] = hit
+        else:
+            todo.append((rel, fp))
+
+    task = progress.task("profile: scan clinical JSON", total=len(todo), unit="files")
+    for (rel, fp), rt in map_files(lambda item: _extract_fhir_resource_type(src, item[0]), todo):
+        results[rel] = [fp, rt]
         task.advance(1)
 
+    counts: Counter[str] = Counter(rt for _, rt in results.values() if isinstance(rt, str) and rt)
     items = list(counts.items())
     items.sort(key=lambda kv: (-kv[1], kv[0]))
-    return items, {"total_files": total, "sampled_files": sampled}
+    return items, {"total_files": total, "sampled_files": sampled}, results
 
 
 _CDA_TAG_RE = re.compile(br"<\s*([A-Za-z_][A-Za-z0-9_.:-]*)")
 
 
-def _count_cda_tags(export_cda_xml: Path, *, top_n: int = 50) -> list[tuple[str, int]]:
+def _count_cda_tags(
+    src: _Source, rel: str, *, top_n: int = 50, pool: concurrent.futures.Executor | None = None
+) -> list[tuple[str, int]]:
     """
     Streaming-safe tag name counter for CDA XML (start tags only).
     Counts local tag names (drops namespace prefix like `hl7:`).
     """
-    if not export_cda_xml.exists():
+    if not src.exists(rel):
         return []
 
     counts: Counter[str] = Counter()
-    carry = b""
-    carry_keep = 8192
-    task = progress.task("profile: scan export_cda.xml", total=export_cda_xml.stat().st_size, unit="bytes")
-    with export_cda_xml.open("rb") as f:
-        while True:
-            chunk = f.read(1024 * 1024)
-            if not chunk:
-                break
-            data = carry + chunk
-            cutoff = max(0, len(data) - carry_keep)
-            for m in _CDA_TAG_RE.finditer(data):
-                if m.start() >= cutoff:
-                    continue
-                raw = m.group(1)
-                if not raw or raw.startswith((b"/", b"!", b"?")):
-                    continue
-                tag = raw.decode("utf-8", errors="replace")
-                tag = tag.split(":", 1)[-1]
-                if tag:
-                    counts[tag] += 1
-            carry = data[-carry_keep:] if len(data) > carry_keep else data
-            task.advance(len(chunk))
-    for m in _CDA_TAG_RE.finditer(carry):
-        raw = m.group(1)
+    raw_counts = _scan_file(
+        src,
+        rel,
+        functools.partial(_findall_counts, _CDA_TAG_RE),
+        Counter,
+        task_name="profile: scan export_cda.xml",
+        pool=pool,
+    )
+    for raw, n in raw_counts.items():
         if not raw or raw.startswith((b"/", b"!", b"?")):
             continue
         tag = raw.decode("utf-8", errors="replace")
         tag = tag.split(":", 1)[-1]
         if tag:
-            counts[tag] += 1
+            counts[tag] += n
 
     items = list(counts.items())
     items.sort(key=lambda kv: (-kv[1], kv[0]))
@@ -237,63 +590,188 @@ def _stable_profile_id(files: list[FileInfo]) -> str:
     return h.hexdigest()
 
 
-def build_export_profile(*, input_dir: str, out_dir: str, sample_json: int = 200, top_files: int = 20) -> None:
-    with progress.phase("profile: init"):
-        input_root = Path(input_dir)
-        if not input_root.is_dir():
-            raise ValueError("--input must be an unpacked export directory")
+# Scan results of the last profile written to an out dir, so re-profiling an unchanged export skips the scans and a
+# changed one rescans only what changed: export.xml and export_cda.xml as a whole, clinical JSON per file. Entries
+# are checked against per-file fingerprints (hashed, so the cache holds no raw mtimes); profile_id records which
+# export the cache was written for. A local-mode cache holds per-type start days; a share-mode run rewrites it
+# without them.
+PROFILE_CACHE = ".profile_cache.json"
+_CACHE_SCHEMA_VERSION = 1
+_LOCAL_ONLY_FIELDS = ("first_start_day", "last_start_day")
 
-        out = Path(out_dir)
-        out.mkdir(parents=True, exist_ok=True)
 
-    with progress.phase("profile: resolve layout"):
-        layout = resolve_export_layout(input_root)
-        export_root = input_root if layout.export_root_rel == "." else (input_root / layout.export_root_rel)
+def _load_cache(path: Path) -> dict[str, Any]:
+    try:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError):
+        return {}
+    if not isinstance(obj, dict) or obj.get("schema_version") != _CACHE_SCHEMA_VERSION:
+        return {}
+    return obj
 
-    with progress.phase("profile: walk files"):
-        files = _walk_files(export_root)
-        total_bytes = sum(f.size_bytes for f in files)
 
-    export_xml = export_root / layout.export_xml_rel
-    export_cda = export_root / layout.export_cda_rel if isinstance(layout.export_cda_rel, str) else export_root / "export_cda.xml"
-    clinical_dir = export_root / layout.clinical_dir_rel if isinstance(layout.clinical_dir_rel, str) else export_root / "clinical-records"
+def _cached_scan(entry: Any, fingerprint: str | None, *, mode: str | None = None) -> dict[str, Any] | None:
+    """The cached scan result if it was made from the same file (and, for mode-dependent results, a usable mode)."""
+    if fingerprint is None or not isinstance(entry, dict) or entry.get("fingerprint") != fingerprint:
+        return None
+    if mode is not None and entry.get("mode") not in {mode, "local"}:
+        return None
+    if mode == "share" and entry.get("mode") == "local":
+        rows = [{k: v for k, v in r.items() if k not in _LOCAL_ONLY_FIELDS} for r in entry.get("type_stats") or []]
+        return {**entry, "mode": "share", "type_stats": rows}
+    return entry
+
+
+def _summarize_healthkit(
+    src: _Source, rel: str, *, mode: str, pool: concurrent.futures.Executor | None = None
+) -> dict[str, Any]:
+    stats = _scan_healthkit_records(src, rel, pool=pool)
+    counts = sorted(((t, st.count) for t, st in stats.items()), key=lambda kv: (-kv[1], kv[0]))
+    return {
+        "mode": mode,
+        "counts": [[t, n] for t, n in counts],
+        "type_stats": _type_stats_rows(stats, [t for t, _ in counts], mode=mode),
+    }
+
+
+def _summarize_cda(src: _Source, rel: str, *, pool: concurrent.futures.Executor | None = None) -> dict[str, Any]:
+    return {"counts": [[t, n] for t, n in _count_cda_tags(src, rel, top_n=50, pool=pool)]}
 
-    with progress.phase("profile: scan export.xml"):
-        hk_counts = _count_healthkit_record_types(export_xml) if export_xml.exists() else []
 
-    with progress.phase("profile: scan clinical JSON"):
-        fhir_counts, fhir_meta = _count_clinical_resource_types(clinical_dir, sample_json=sample_json)
+def _segment_pool(src: _Source, rels: list[str], *, workers: int) -> concurrent.futures.ProcessPoolExecutor | None:
+    """A process pool for the segmented scans, or None when there is nothing big enough to split."""
+    if workers <= 1:
+        return None
+    if not any(src.exists(r) and src.local_path(r) is not None and src.size(r) > SEGMENT_BYTES for r in rels):
+        return None
+    pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    # Start the worker processes now, before the scanner threads: a process forked while other threads run can
+    # inherit their held locks.
+    pool.submit(int).result()
+    return pool
+
+
+def build_export_profile(
+    *,
+    input_dir: str,
+    out_dir: str,
+    sample_json: int = 0,
+    top_files: int = 20,
+    workers: int | None = None,
+    mode: str = "share",
+    use_cache: bool = True,
+) -> None:
+    with progress.phase("profile: init"):
+        if mode not in {"local", "share"}:
+            raise ValueError("--mode must be one of: local, share")
+        workers = int(workers) if workers is not None else (os.cpu_count() or 1)
+        if workers < 1:
+            raise ValueError("--workers must be >= 1")
+        input_root = Path(input_dir)
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
 
-    with progress.phase("profile: scan export_cda.xml"):
-        cda_counts = _count_cda_tags(export_cda, top_n=50) if export_cda.exists() else []
+    with progress.phase("profile: resolve layout"):
+        src = _open_source(input_root)
+        layout = src.layout
+
+    with src:
+        with progress.phase("profile: walk files"):
+            files = src.walk()
+            total_bytes = sum(f.size_bytes for f in files)
+
+        export_xml_rel = layout.export_xml_rel
+        export_cda_rel = layout.export_cda_rel if isinstance(layout.export_cda_rel, str) else "export_cda.xml"
+        has_export_xml = src.exists(export_xml_rel)
+        has_export_cda = src.exists(export_cda_rel)
+
+        profile_id = _stable_profile_id(files)
+        cache_path = out / PROFILE_CACHE
+        cache = _load_cache(cache_path) if use_cache else {}
+        xml_fp = src.fingerprint(export_xml_rel) if has_export_xml else None
+        cda_fp = src.fingerprint(export_cda_rel) if has_export_cda else None
+        hk = _cached_scan(cache.get("export_xml"), xml_fp, mode=mode)
+        cda = _cached_scan(cache.get("export_cda"), cda_fp)
+        clinical_cache = cache.get("clinical_files") if isinstance(cache.get("clinical_files"), dict) else {}
+
+        with progress.phase("profile: scan contents"), contextlib.ExitStack() as stack:
+            to_scan = [rel for rel, cached in ((export_xml_rel, hk), (export_cda_rel, cda)) if cached is None]
+            seg_pool = _segment_pool(src, to_scan, workers=workers)
+            if seg_pool is not None:
+                stack.enter_context(seg_pool)
+            # export.xml, export_cda.xml and the clinical JSON are independent: scan them side by side so their
+            # reads (and zip decompression, which releases the GIL) overlap; the regex work of large unpacked XML
+            # files runs on `seg_pool`. Each scan gets its own context copy so its progress task reports to the
+            # configured reporter.
+            with concurrent.futures.ThreadPoolExecutor(max_workers=3, thread_name_prefix="healthdelta-profile") as pool:
+                hk_future = None
+                if hk is None and has_export_xml:
+                    hk_future = pool.submit(
+                        contextvars.copy_context().run, _summarize_healthkit, src, export_xml_rel, mode=mode, pool=seg_pool
+                    )
+                cda_future = None
+                if cda is None and has_export_cda:
+                    cda_future = pool.submit(contextvars.copy_context().run, _summarize_cda, src, export_cda_rel, pool=seg_pool)
+                fhir_future = pool.submit(
+                    contextvars.copy_context().run,
+                    _count_clinical_resource_types,
+                    src,
+                    layout.clinical_dir_rel,
+                    sample_json=sample_json,
+                    cached=clinical_cache,
+                )
+                if hk_future is not None:
+                    hk = {"fingerprint": xml_fp, **hk_future.result()}
+                if cda_future is not None:
+                    cda = {"fingerprint": cda_fp, **cda_future.result()}
+                fhir_counts, fhir_meta, clinical_files = fhir_future.result()
+
+        if use_cache:
+            _write_json(
+                cache_path,
+                {
+                    "schema_version": _CACHE_SCHEMA_VERSION,
+                    "profile_id": profile_id,
+                    "export_xml": hk,
+                    "export_cda": cda,
+                    "clinical_files": clinical_files,
+                },
+            )
 
     with progress.phase("profile: aggregate"):
         ext_counts = _counts_by_ext(files)
         top = _top_files(files, top_files)
+        hk_counts = [(t, n) for t, n in (hk or {}).get("counts") or []]
+        hk_type_stats: list[dict[str, Any]] = list((hk or {}).get("type_stats") or [])
+        cda_counts = [(t, n) for t, n in (cda or {}).get("counts") or []]
 
-    profile_id = _stable_profile_id(files)
     profile_obj: dict[str, object] = {
         "schema_version": 1,
         "profile_id": profile_id,
-        "input": {"path_redacted": True, "kind": "export_dir"},
+        "mode": mode,
+        "input": {"path_redacted": True, "kind": src.kind},
         "summary": {
             "export_root_rel": layout.export_root_rel,
             "file_count": len(files),
             "total_bytes": total_bytes,
-            "has_export_xml": export_xml.exists(),
-            "has_export_cda_xml": export_cda.exists(),
+            "has_export_xml": has_export_xml,
+            "has_export_cda_xml": has_export_cda,
             "clinical_json_total_files": fhir_meta["total_files"],
             "clinical_json_sampled_files": fhir_meta["sampled_files"],
         },
         "top_files": [{"path": f.relpath, "size_bytes": f.size_bytes} for f in top],
         "counts_by_ext": [{"ext": ext, "count": n} for ext, n in ext_counts],
         "healthkit_record_types": [{"type": t, "count": n} for t, n in hk_counts],
+        "healthkit_type_stats": hk_type_stats,
         "clinical_resource_types": [{"resourceType": t, "count": n} for t, n in fhir_counts],
         "cda_tag_counts": [{"tag": t, "count": n} for t, n in cda_counts],
         "determinism": {
             "notes": [
                 "profile_id is derived from relpath + size only (no content hashing) for speed on large exports",
-                "no absolute paths, timestamps, or payload fragments are emitted",
+                "no absolute paths, timestamps, or payload fragments are emitted"
+                if mode == "share"
+                else "no absolute paths or payload fragments are emitted; local mode adds first/last start days",
+                "record_bytes quantiles come from a bucketed sketch (within 1/32 of the exact value); min/max are exact",
                 "ordering is deterministic (explicit sorts; newline-terminated outputs)",
             ],
         },
@@ -321,6 +799,21 @@ def build_export_profile(*, input_dir: str, out_dir: str, sample_json: int = 200
         if hk_counts:
             _write_csv(out / "healthkit_record_types.csv", header=["type", "count"], rows=[[t, n] for t, n in hk_counts])
             task.advance(1)
+            size_cols = ["min", "p50", "p90", "p99", "max"]
+            day_cols = ["first_start_day", "last_start_day"] if mode == "local" else []
+            _write_csv(
+                out / "healthkit_type_stats.csv",
+                header=["type", "count", "units", "active_days", "span_days"]
+                + [f"record_bytes_{k}" for k in size_cols]
+                + day_cols,
+                rows=[
+                    [r["type"], r["count"], "|".join(r["units"]), r["active_days"], r["span_days"]]
+                    + [r["record_bytes"][k] for k in size_cols]
+                    + [r[c] for c in day_cols]
+                    for r in hk_type_stats
+                ],
+            )
+            task.advance(1)
         if fhir_counts:
             _write_csv(
                 out / "clinical_resource_types.csv",
@@ -338,21 +831,23 @@ def build_export_profile(*, input_dir: str, out_dir: str, sample_json: int = 200
     md_lines.append("## Summary")
     md_lines.append(f"- file_count: {len(files)}")
     md_lines.append(f"- total_bytes: {total_bytes}")
-    md_lines.append(f"- export.xml: {'present' if export_xml.exists() else 'missing'}")
-    md_lines.append(f"- export_cda.xml: {'present' if export_cda.exists() else 'missing'}")
+    md_lines.append(f"- export.xml: {'present' if has_export_xml else 'missing'}")
+    md_lines.append(f"- export_cda.xml: {'present' if has_export_cda else 'missing'}")
     md_lines.append(f"- clinical JSON files: {fhir_meta['total_files']} (sampled {fhir_meta['sampled_files']})")
     md_lines.append("")
 
+    # ingest and run all take the export.zip as is.
+    input_hint = "<export.zip>" if src.kind == "export_zip" else "<export_dir>"
     md_lines.append("## Next Steps")
     md_lines.append("- Preferred one-command operator path (share-safe default):")
-    md_lines.append("  - `healthdelta run all --input <export_dir> --out data --mode share`")
-    if export_xml.exists():
+    md_lines.append(f"  - `healthdelta run all --input {input_hint} --out data --mode share`")
+    if has_export_xml:
         md_lines.append("- Pipeline-only (ingest -> identity -> optional deid):")
-        md_lines.append("  - share-safe: `healthdelta pipeline run --input <export_dir> --out data --mode share`")
-        md_lines.append("  - local-only: `healthdelta pipeline run --input <export_dir> --out data --mode local`")
+        md_lines.append(f"  - share-safe: `healthdelta pipeline run --input {input_hint} --out data --mode share`")
+        md_lines.append(f"  - local-only: `healthdelta pipeline run --input {input_hint} --out data --mode local`")
     else:
         md_lines.append("- `export.xml` is missing; validate you selected the correct export root (Apple Health exports must include `export.xml`).")
-    if export_cda.exists():
+    if has_export_cda:
         md_lines.append("- ClinicalDocument detected (`export_cda.xml` present): use `--mode share` for de-identified outputs before sharing.")
     if fhir_meta["total_files"] > 0:
         md_lines.append("- FHIR clinical JSON detected: use `--mode share` before sharing outputs with others.")
@@ -377,6 +872,18 @@ def build_export_profile(*, input_dir: str, out_dir: str, sample_json: int = 200
             md_lines.append(f"- {t}: {n}")
         md_lines.append("")
 
+        md_lines.append("## HealthKit Type Stats (export.xml)")
+        for r in hk_type_stats[: min(len(hk_type_stats), 15)]:
+            rb = r["record_bytes"]
+            days = f"{r['active_days']} active days over {r['span_days']}"
+            if mode == "local":
+                days += f" ({r['first_start_day']} .. {r['last_start_day']})"
+            md_lines.append(
+                f"- {r['type']}: units {', '.join(r['units']) or 'none'}; {days}; "
+                f"record bytes p50 {rb['p50']}, p99 {rb['p99']}, max {rb['max']}"
+            )
+        md_lines.append("")
+
     if fhir_counts:
         md_lines.append("## Clinical Resource Types (clinical-records/*.json)")
         for t, n in fhir_counts[: min(len(fhir_counts), 15)]:
@@ -390,8 +897,13 @@ def build_export_profile(*, input_dir: str, out_dir: str, sample_json: int = 200
         md_lines.append("")
 
     md_lines.append("## Privacy")
-    md_lines.append("- Output is share-safe: no names, DOB, identifiers, free-text payload fragments, or timestamps.")
-    md_lines.append("- Only schema-level strings (HK `type`, FHIR `resourceType`, CDA tag names) and aggregate counts are emitted.")
+    if mode == "share":
+        md_lines.append("- Output is share-safe: no names, DOB, identifiers, free-text payload fragments, or timestamps.")
+    else:
+        md_lines.append("- Local mode: adds first/last start days per HealthKit type. Do not share; rerun with `--mode share`.")
+    md_lines.append(
+        "- Only schema-level strings (HK `type` and `unit`, FHIR `resourceType`, CDA tag names) and aggregate counts are emitted."
+    )
 
     with progress.phase("profile: write markdown"):
         task_md = progress.task("profile: write markdown", total=1, unit="files")
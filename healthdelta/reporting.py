@@ -8,6 +8,16 @@ import tempfile
 from pathlib import Path
 from typing import Any, Iterable
 
+from healthdelta.duckdb_tools import (
+    CONTENT_FINGERPRINT_KEY,
+    META_TABLE,
+    RECORD_TYPE_EXPR,
+    ROLLUP_DAILY_TABLE,
+    ROLLUP_PERSON_TABLE,
+    SOURCE_BUCKET_EXPR,
+    connect_database,
+    read_sample_fraction,
+)
 from healthdelta.progress import progress
 
 
@@ -58,21 +68,21 @@ def _write_csv(path: Path, *, header: list[str], rows: Iterable[list[object]]) -
     tmp.replace(path)
 
 
-def _connect_read_only(db_path: Path):
-    try:
-        import duckdb
-    except Exception as e:  # pragma: no cover
-        raise RuntimeError("duckdb Python package is required (install dependency 'duckdb')") from e
-
-    con = duckdb.connect(database=str(db_path), read_only=True)
-    con.execute("PRAGMA threads=1;")
+def _connect_read_only(db_path: Path, *, threads: int = 1, shared_con: Any = None):
+    if int(threads) < 1:
+        raise ValueError("--threads must be >= 1")
+    con = connect_database(db_path, read_only=True, shared=shared_con)
+    con.execute(f"PRAGMA threads={int(threads)};")
     con.execute("PRAGMA enable_progress_bar=false;")
     return con
 
 
 def _tables_present(con) -> set[str]:
     tables = set()
-    for (name,) in con.execute("SELECT table_name FROM information_schema.tables WHERE table_schema='main' ORDER BY table_name;").fetchall():
+    for (name,) in con.execute(
+        "SELECT table_name FROM information_schema.tables "
+        "WHERE table_catalog=current_database() AND table_schema='main' ORDER BY table_name;"
+    ).fetchall():
         if isinstance(name, str):
             tables.add(name)
     return tables
@@ -87,7 +97,89 @@ def _rows(con, sql: str, params: list[Any] | None = None) -> list[tuple]:
     return con.execute(sql, params or []).fetchall()
 
 
-def build_report(*, db_path: str, out_dir: str, mode: str = "local") -> None:
+# GROUPING(canonical_person_id, source, record_type, day) bitmask per grouping set (1 = column rolled up).
+_G_TABLE = 0b1111
+_G_SOURCE = 0b1011
+_G_PERSON = 0b0111
+_G_PERSON_TYPE = 0b0101
+_G_DAY_SOURCE = 0b1010
+
+
+def _table_aggregate_sql(table: str, *, top_n: int) -> str:
+    """
+    One scan per table for every report aggregate: table totals, rows by source, per-person counts and
+    event_time range, per-person top-N record types (via QUALIFY) and the daily timeline.
+    """
+    return f"""
+    SELECT GROUPING(canonical_person_id, source, record_type, day) AS g,
+           canonical_person_id,
+           source,
+           record_type,
+           day,
+           COUNT(*) AS n,
+           COUNT(DISTINCT canonical_person_id) AS people,
+           MIN(event_time) AS min_et,
+           MAX(event_time) AS max_et
+    FROM (
+      SELECT canonical_person_id,
+             {SOURCE_BUCKET_EXPR} AS source,
+             {RECORD_TYPE_EXPR[table]} AS record_type,
+             CAST(date_trunc('day', event_time) AS DATE) AS day,
+             event_time
+      FROM {table}
+    )
+    GROUP BY GROUPING SETS ((), (source), (canonical_person_id), (canonical_person_id, record_type), (day, source))
+    QUALIFY GROUPING(canonical_person_id, source, record_type, day) <> {_G_PERSON_TYPE}
+         OR row_number() OVER (
+              PARTITION BY GROUPING(canonical_person_id, source, record_type, day), canonical_person_id
+              ORDER BY COUNT(*) DESC, record_type ASC
+            ) <= {int(top_n)};
+    """
+
+
+def _rollups_present(present: set[str]) -> bool:
+    return ROLLUP_DAILY_TABLE in present and ROLLUP_PERSON_TABLE in present
+
+
+def _rollup_aggregate_sql(table: str, *, top_n: int) -> str:
+    """
+    Same row shape as `_table_aggregate_sql`, answered from the load-time rollup tables instead of raw rows.
+    """
+    return f"""
+    SELECT {_G_TABLE} AS g, CAST(NULL AS VARCHAR), CAST(NULL AS VARCHAR), CAST(NULL AS VARCHAR), CAST(NULL AS DATE),
+           COALESCE(SUM(n), 0), COUNT(DISTINCT canonical_person_id), MIN(min_event_time), MAX(max_event_time)
+    FROM {ROLLUP_PERSON_TABLE} WHERE table_name='{table}'
+    UNION ALL
+    SELECT {_G_SOURCE}, NULL, source_bucket, NULL, NULL, SUM(n), NULL, NULL, NULL
+    FROM {ROLLUP_DAILY_TABLE} WHERE table_name='{table}'
+    GROUP BY source_bucket
+    UNION ALL
+    SELECT {_G_PERSON}, canonical_person_id, NULL, NULL, NULL, SUM(n), NULL, MIN(min_event_time), MAX(max_event_time)
+    FROM {ROLLUP_PERSON_TABLE} WHERE table_name='{table}'
+    GROUP BY canonical_person_id
+    UNION ALL
+    SELECT * FROM (
+      SELECT {_G_PERSON_TYPE}, canonical_person_id, NULL, record_type, NULL, SUM(n) AS n, NULL, NULL, NULL
+      FROM {ROLLUP_DAILY_TABLE} WHERE table_name='{table}'
+      GROUP BY canonical_person_id, record_type
+      QUALIFY row_number() OVER (PARTITION BY canonical_person_id ORDER BY SUM(n) DESC, record_type ASC) <= {int(top_n)}
+    )
+    UNION ALL
+    SELECT {_G_DAY_SOURCE}, NULL, source_bucket, NULL, day, SUM(n), NULL, NULL, NULL
+    FROM {ROLLUP_DAILY_TABLE} WHERE table_name='{table}'
+    GROUP BY day, source_bucket;
+    """
+
+
+def build_report(
+    *,
+    db_path: str,
+    out_dir: str,
+    mode: str = "local",
+    threads: int = 1,
+    hash_db: bool = False,
+    shared_con: Any = None,
+) -> None:
     if mode not in {"local", "share"}:
         raise ValueError("--mode must be one of: local, share")
 
@@ -99,156 +191,81 @@ def build_report(*, db_path: str, out_dir: str, mode: str = "local") -> None:
     out.mkdir(parents=True, exist_ok=True)
 
     with progress.phase("report: connect"):
-        con = _connect_read_only(db)
+        con = _connect_read_only(db, threads=threads, shared_con=shared_con)
     try:
         with progress.phase("report: scan tables"):
             present = _tables_present(con)
             streams = [t for t in ["conditions", "documents", "medications", "observations"] if t in present]
+            fingerprint = None
+            if META_TABLE in present:
+                fingerprint = _scalar(con, f"SELECT value FROM {META_TABLE} WHERE key=?;", [CONTENT_FINGERPRINT_KEY])
+            sample_fraction = read_sample_fraction(con)
+            aggregate_sql = _rollup_aggregate_sql if _rollups_present(present) else _table_aggregate_sql
 
         tables_summary: dict[str, dict[str, object]] = {}
         coverage_by_source_rows: list[tuple[str, str, int]] = []
+        rows_by_table: dict[str, dict[str, int]] = {t: {} for t in streams}
+        times_map: dict[str, tuple[object | None, object | None]] = {}
+        timeline_rows: list[tuple[str, str, str, int]] = []
+        people_set: set[str] = set()
 
-        source_bucket = "CASE WHEN source_file LIKE 'ndjson/%' THEN 'ios' ELSE source END"
+        # Top-N record types per person (if type/code fields exist)
+        top_n = 5
+        type_rows: list[tuple[str, str, int]] = []
 
-        with progress.phase("report: summarize tables"):
-            task = progress.task("report: summarize tables", total=len(streams), unit="tables")
+        with progress.phase("report: aggregate tables"):
+            task = progress.task("report: aggregate tables", total=len(streams), unit="tables")
             for table in streams:
-                total_rows = int(_scalar(con, f"SELECT COUNT(*) FROM {table};") or 0)
-                distinct_people = int(_scalar(con, f"SELECT COUNT(DISTINCT canonical_person_id) FROM {table};") or 0)
-                min_et = _scalar(con, f"SELECT MIN(event_time) FROM {table} WHERE event_time IS NOT NULL;")
-                max_et = _scalar(con, f"SELECT MAX(event_time) FROM {table} WHERE event_time IS NOT NULL;")
-
-                by_source = _rows(con, f"SELECT {source_bucket} AS source, COUNT(*) AS n FROM {table} GROUP BY 1 ORDER BY 1;")
-                by_source_map: dict[str, int] = {}
-                for source, n in by_source:
-                    if isinstance(source, str):
-                        by_source_map[source] = int(n)
-                        coverage_by_source_rows.append((table, source, int(n)))
-
-                tables_summary[table] = {
-                    "total_rows": total_rows,
-                    "distinct_canonical_person_id": distinct_people,
-                    "min_event_time": _fmt_ts(min_et),
-                    "max_event_time": _fmt_ts(max_et),
-                    "rows_by_source": {k: by_source_map[k] for k in sorted(by_source_map)},
-                }
-                task.advance(1)
-
-        # Per-person coverage across all available tables
-        with progress.phase("report: per-person coverage"):
-            if not streams:
-                people: list[str] = []
-            else:
-                union = " UNION ".join([f"SELECT DISTINCT canonical_person_id FROM {t}" for t in streams])
-                people = [p for (p,) in _rows(con, f"{union} ORDER BY canonical_person_id;") if isinstance(p, str)]
-
-            rows_by_table: dict[str, dict[str, int]] = {t: {} for t in streams}
-            task_rows = progress.task("report: count rows by table", total=len(streams), unit="tables")
-            for t in streams:
-                for person_id, n in _rows(
-                    con,
-                    f"SELECT canonical_person_id, COUNT(*) FROM {t} GROUP BY canonical_person_id ORDER BY canonical_person_id;",
+                for g, person_id, source, record_type, day, n, distinct_people, min_et, max_et in _rows(
+                    con, aggregate_sql(table, top_n=top_n)
                 ):
-                    if isinstance(person_id, str):
-                        rows_by_table[t][person_id] = int(n)
-                task_rows.advance(1)
-
-            # Min/max event_time across all tables per person
-            if streams:
-                union_events = " UNION ALL ".join([f"SELECT canonical_person_id, event_time FROM {t}" for t in streams])
-                per_person_times = _rows(
-                    con,
-                    f"""
-                    SELECT canonical_person_id, MIN(event_time) AS min_et, MAX(event_time) AS max_et
-                    FROM ({union_events})
-                    WHERE event_time IS NOT NULL
-                    GROUP BY canonical_person_id
-                    ORDER BY canonical_person_id;
-                    """,
+                    n = int(n)
+                    if g == _G_TABLE:
+                        tables_summary[table] = {
+                            "total_rows": n,
+                            "distinct_canonical_person_id": int(distinct_people or 0),
+                            "min_event_time": _fmt_ts(min_et),
+                            "max_event_time": _fmt_ts(max_et),
+                            "rows_by_source": {},
+                        }
+                    elif g == _G_SOURCE:
+                        if isinstance(source, str):
+                            coverage_by_source_rows.append((table, source, n))
+                    elif g == _G_PERSON:
+                        if not isinstance(person_id, str):
+                            continue
+                        people_set.add(person_id)
+                        rows_by_table[table][person_id] = n
+                        if min_et is not None:
+                            # Min/max event_time across all tables per person.
+                            prev_min, prev_max = times_map.get(person_id, (None, None))
+                            times_map[person_id] = (
+                                min_et if prev_min is None or min_et < prev_min else prev_min,
+                                max_et if prev_max is None or max_et > prev_max else prev_max,
+                            )
+                    elif g == _G_PERSON_TYPE:
+                        if isinstance(person_id, str) and isinstance(record_type, str):
+                            type_rows.append((person_id, f"{table}:{record_type}", n))
+                    elif g == _G_DAY_SOURCE:
+                        day_s = _fmt_ts(day)
+                        if isinstance(source, str) and day_s is not None:
+                            timeline_rows.append((day_s, table, source, n))
+
+                summary_row = tables_summary.setdefault(
+                    table,
+                    {
+                        "total_rows": 0,
+                        "distinct_canonical_person_id": 0,
+                        "min_event_time": None,
+                        "max_event_time": None,
+                        "rows_by_source": {},
+                    },
                 )
-            else:
-                per_person_times = []
-
-        times_map: dict[str, tuple[object | None, object | None]] = {}
-        for person_id, min_et, max_et in per_person_times:
-            if isinstance(person_id, str):
-                times_map[person_id] = (min_et, max_et)
+                by_source_map = {source: n for t, source, n in coverage_by_source_rows if t == table}
+                summary_row["rows_by_source"] = {k: by_source_map[k] for k in sorted(by_source_map)}
+                task.advance(1)
 
-        # Top-N record types per person (if type/code fields exist)
-        top_n = 5
-        type_rows: list[tuple[str, str, int]] = []
-        if "observations" in streams:
-            type_rows.extend(
-                [
-                    (pid, f"observations:{rt}", int(n))
-                    for pid, rt, n in _rows(
-                        con,
-                        """
-                        SELECT canonical_person_id,
-                               COALESCE(hk_type, resource_type, code, 'unknown') AS record_type,
-                               COUNT(*) AS n
-                        FROM observations
-                        GROUP BY canonical_person_id, record_type
-                        ORDER BY canonical_person_id, n DESC, record_type ASC;
-                        """,
-                    )
-                    if isinstance(pid, str) and isinstance(rt, str)
-                ]
-            )
-        if "documents" in streams:
-            type_rows.extend(
-                [
-                    (pid, f"documents:{rt}", int(n))
-                    for pid, rt, n in _rows(
-                        con,
-                        """
-                        SELECT canonical_person_id,
-                               COALESCE(resource_type, 'unknown') AS record_type,
-                               COUNT(*) AS n
-                        FROM documents
-                        GROUP BY canonical_person_id, record_type
-                        ORDER BY canonical_person_id, n DESC, record_type ASC;
-                        """,
-                    )
-                    if isinstance(pid, str) and isinstance(rt, str)
-                ]
-            )
-        if "medications" in streams:
-            type_rows.extend(
-                [
-                    (pid, f"medications:{rt}", int(n))
-                    for pid, rt, n in _rows(
-                        con,
-                        """
-                        SELECT canonical_person_id,
-                               COALESCE(resource_type, 'unknown') AS record_type,
-                               COUNT(*) AS n
-                        FROM medications
-                        GROUP BY canonical_person_id, record_type
-                        ORDER BY canonical_person_id, n DESC, record_type ASC;
-                        """,
-                    )
-                    if isinstance(pid, str) and isinstance(rt, str)
-                ]
-            )
-        if "conditions" in streams:
-            type_rows.extend(
-                [
-                    (pid, f"conditions:{rt}", int(n))
-                    for pid, rt, n in _rows(
-                        con,
-                        """
-                        SELECT canonical_person_id,
-                               COALESCE(resource_type, code, 'unknown') AS record_type,
-                               COUNT(*) AS n
-                        FROM conditions
-                        GROUP BY canonical_person_id, record_type
-                        ORDER BY canonical_person_id, n DESC, record_type ASC;
-                        """,
-                    )
-                    if isinstance(pid, str) and isinstance(rt, str)
-                ]
-            )
+        people = sorted(people_set)
 
         types_by_person: dict[str, list[tuple[str, int]]] = {p: [] for p in people}
         for pid, type_key, n in type_rows:
@@ -326,26 +343,6 @@ def build_report(*, db_path: str, out_dir: str, mode: str = "local") -> None:
             task_write.advance(1)
 
             # CSV: timeline_daily_counts.csv
-            timeline_rows: list[tuple[str, str, str, int]] = []
-            task_timeline = progress.task("report: timeline query", total=len(streams), unit="tables")
-            for table in streams:
-                for day, source, n in _rows(
-                    con,
-                    f"""
-                    SELECT CAST(date_trunc('day', event_time) AS DATE) AS day, {source_bucket} AS source, COUNT(*) AS n
-                    FROM {table}
-                    WHERE event_time IS NOT NULL
-                    GROUP BY 1, 2
-                    ORDER BY 1, 2;
-                    """,
-                ):
-                    if not isinstance(source, str):
-                        continue
-                    day_s = _fmt_ts(day)
-                    if day_s is None:
-                        continue
-                    timeline_rows.append((day_s, table, source, int(n)))
-                task_timeline.advance(1)
             timeline_rows.sort(key=lambda r: (r[0], r[1], r[2]))
             _write_csv(
                 out / "timeline_daily_counts.csv",
@@ -354,13 +351,18 @@ def build_report(*, db_path: str, out_dir: str, mode: str = "local") -> None:
             )
             task_write.advance(1)
 
+        db_info: dict[str, object] = {"path_redacted": True}
+        if isinstance(fingerprint, str):
+            db_info["content_fingerprint"] = fingerprint
+        if hash_db or not isinstance(fingerprint, str):
+            # Full-file hash is O(DB size); only on request or for DBs built before fingerprints were recorded.
+            with progress.phase("report: hash db"):
+                db_info["sha256"] = _sha256_file(db)
+
         summary = {
             "schema_version": 1,
             "mode": mode,
-            "db": {
-                "path_redacted": True,
-                "sha256": _sha256_file(db),
-            },
+            "db": db_info,
             "tables": {k: tables_summary[k] for k in sorted(tables_summary)},
             "per_person": per_person,
             "notes": {
@@ -368,6 +370,11 @@ def build_report(*, db_path: str, out_dir: str, mode: str = "local") -> None:
                 "determinism": "No generated_at timestamps. Stable ordering and stable formatting for same DB bytes.",
             },
         }
+        if sample_fraction is not None:
+            summary["sample"] = {
+                "fraction": sample_fraction,
+                "note": "Counts cover a hash-selected subset of the export, not all of it.",
+            }
 
         _write_json(out / "summary.json", summary)
         _write_text_atomic(out / "summary.md", _render_markdown(summary))
@@ -387,6 +394,10 @@ def _render_markdown(summary: dict[str, object]) -> str:
     lines: list[str] = []
     lines.append("# HealthDelta Summary Report")
     lines.append("")
+    sample = summary.get("sample")
+    if isinstance(sample, dict):
+        lines.append(f"**SAMPLED PREVIEW** (sample_fraction={sample.get('fraction')}): {sample.get('note')}")
+        lines.append("")
     lines.append("## Tables")
     for table_name in sorted(tables.keys()):
         info = tables.get(table_name)
@@ -442,9 +453,17 @@ def show_report(*, db_path: str) -> None:
         streams = [t for t in ["observations", "documents", "medications", "conditions"] if t in present]
         print("HealthDelta Report (terminal)")
         print(f"tables={','.join(streams)}")
+        use_rollups = _rollups_present(present)
         for t in streams:
-            n = int(_scalar(con, f"SELECT COUNT(*) FROM {t};") or 0)
-            people = int(_scalar(con, f"SELECT COUNT(DISTINCT canonical_person_id) FROM {t};") or 0)
+            if use_rollups:
+                n, people = con.execute(
+                    f"SELECT COALESCE(SUM(n), 0), COUNT(DISTINCT canonical_person_id) FROM {ROLLUP_PERSON_TABLE} WHERE table_name=?;",
+                    [t],
+                ).fetchone()
+                n, people = int(n), int(people)
+            else:
+                n = int(_scalar(con, f"SELECT COUNT(*) FROM {t};") or 0)
+                people = int(_scalar(con, f"SELECT COUNT(DISTINCT canonical_person_id) FROM {t};") or 0)
             print(f"{t}.rows={n}")
             print(f"{t}.distinct_people={people}")
     finally:
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from pathlib import Path
+
+from healthdelta.fhir_stream import contains_bytes
+from healthdelta.file_reader import map_files
+
+
+# Sampled preview runs (`run all --sample-fraction`, `export ndjson --sample-fraction`): a deterministic,
+# hash-selected subset of the export flows through every stage. Clinical JSON files are selected at staging by
+# the sha256 of their file name (the same files whichever way the export was staged); HealthKit (and CDA) records
+# at NDJSON export by the prefix of their event_key. Files holding a Patient resource are always kept so identity
+# still resolves people. Every sampled artifact records the fraction.
+SAMPLE_JSON = "sample.json"
+
+_KEY_SPACE = 1 << 32
+
+# Same byte-level pre-filter as identity's Patient scan (identity imports ingest, so it is not imported here).
+_PATIENT_RESOURCE_TYPE_RE = re.compile(rb'"resourceType"\s*:\s*"Patient"')
+
+
+def validate_fraction(fraction: float | None) -> float | None:
+    if fraction is None:
+        return None
+    f = float(fraction)
+    if not 0.0 < f <= 1.0:
+        raise ValueError("--sample-fraction must be > 0 and <= 1")
+    # 1.0 keeps everything: an ordinary (unsampled) run.
+    return None if f == 1.0 else f
+
+
+def keeps_key(hex_key: str, fraction: float | None) -> bool:
+    """True when the hex digest `hex_key` (e.g. an event_key) falls in the sampled subset."""
+    if fraction is None:
+        return True
+    return int(hex_key[:8], 16) < fraction * _KEY_SPACE
+
+
+def keeps_file(rel: str, fraction: float | None) -> bool:
+    return keeps_key(hashlib.sha256(Path(rel).name.encode("utf-8")).hexdigest(), fraction)
+
+
+def sample_clinical_rels(run_dir: Path, rels: list[str], fraction: float | None) -> list[str]:
+    """The clinical JSON rels (staged under `run_dir`) a sampled run keeps, in their original order."""
+    if fraction is None:
+        return list(rels)
+
+    def keep(rel: str) -> bool:
+        return keeps_file(rel, fraction) or contains_bytes(run_dir / rel, _PATIENT_RESOURCE_TYPE_RE)
+
+    kept = {rel for rel, ok in map_files(keep, sorted(set(rels))) if ok}
+    return [rel for rel in rels if rel in kept]
+
+
+def combine(*fractions: float | None) -> float | None:
+    # Subsets nest (same hash, lower threshold), so sampling twice keeps the smaller fraction.
+    present = [f for f in fractions if f is not None]
+    return min(present) if present else None
+
+
+def layout_fraction(layout: object) -> float | None:
+    f = layout.get("sample_fraction") if isinstance(layout, dict) else None
+    return float(f) if isinstance(f, (int, float)) and not isinstance(f, bool) else None
@@ -5,12 +5,15 @@ import gzip
 import hashlib
 import io
 import json
+import shutil
+import struct
 import tarfile
+import zlib
 from pathlib import Path
 from pathlib import PurePosixPath
 from typing import Any
 
-from healthdelta.state import load_registry
+from healthdelta.state import lookup_run
 from healthdelta.progress import progress
 
 
@@ -18,7 +21,15 @@ _ALLOWLIST_DIRS: tuple[str, ...] = ("deid", "ndjson", "duckdb", "reports", "note
 _REGISTRY_DIR = "registry"
 _RUN_ENTRY_JSON = "run_entry.json"
 _BUNDLE_MANIFEST_CSV = "bundle_manifest.csv"
+_DELTA_MANIFEST_JSON = "delta_manifest.json"
+_BUNDLE_INDEX_CSV = "bundle_index.csv"
 _MANIFEST_HEADER = ["path", "size", "sha256"]
+_INDEX_HEADER = ["path", "offset", "length"]
+_BUNDLE_FORMATS: tuple[str, ...] = ("tar.gz", "indexed")
+
+# Indexed bundles end with a fixed-size, empty gzip member whose FEXTRA subfield "HD" locates the index member.
+_LOCATOR_SUBFIELD = b"HD"
+_LOCATOR_SIZE = 10 + 2 + 4 + 16 + 5 + 8  # header + XLEN + subfield header + payload + empty stored block + trailer
 
 
 def _stable_json_bytes(obj: object) -> bytes:
@@ -81,12 +92,198 @@ def _manifest_csv_bytes(entries: list[tuple[str, int, str]]) -> bytes:
     return text.encode("utf-8")
 
 
+def _index_csv_bytes(entries: list[tuple[str, int, int]]) -> bytes:
+    out = io.StringIO()
+    w = csv.writer(out, lineterminator="\n")
+    w.writerow(_INDEX_HEADER)
+    for p, offset, length in entries:
+        w.writerow([p, str(int(offset)), str(int(length))])
+    return out.getvalue().encode("utf-8")
+
+
+def _tar_header_bytes(ti: tarfile.TarInfo) -> bytes:
+    return ti.tobuf(tarfile.GNU_FORMAT, "utf-8", "surrogateescape")
+
+
+def _tar_padding(size: int) -> bytes:
+    rem = size % tarfile.BLOCKSIZE
+    return b"\0" * (tarfile.BLOCKSIZE - rem) if rem else b""
+
+
+class _GzipMemberWriter:
+    """
+    Writes one self-contained gzip member (stable header: mtime=0, XFL=2, OS=255), matching gzip.GzipFile level 9.
+    Concatenated members form a valid multi-member gzip stream, so indexed bundles remain ordinary `.tar.gz` files.
+    """
+
+    def __init__(self, raw: io.BufferedWriter) -> None:
+        self._raw = raw
+        self.offset = raw.tell()
+        raw.write(b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\xff")
+        self._c = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, 0)
+        self._crc = 0
+        self._size = 0
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        self._raw.write(self._c.compress(data))
+
+    def close(self) -> int:
+        self._raw.write(self._c.flush())
+        self._raw.write(struct.pack("<II", self._crc & 0xFFFFFFFF, self._size & 0xFFFFFFFF))
+        return self._raw.tell() - self.offset
+
+
+def _locator_member_bytes(index_offset: int, index_length: int) -> bytes:
+    payload = struct.pack("<QQ", index_offset, index_length)
+    extra = _LOCATOR_SUBFIELD + struct.pack("<H", len(payload)) + payload
+    header = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x02\xff" + struct.pack("<H", len(extra)) + extra
+    empty_stored_block = b"\x01\x00\x00\xff\xff"
+    return header + empty_stored_block + struct.pack("<II", 0, 0)
+
+
+def _parse_locator(tail: bytes) -> tuple[int, int] | None:
+    if len(tail) != _LOCATOR_SIZE or tail[:4] != b"\x1f\x8b\x08\x04":
+        return None
+    if tail[12:14] != _LOCATOR_SUBFIELD or struct.unpack("<H", tail[14:16])[0] != 16:
+        return None
+    offset, length = struct.unpack("<QQ", tail[16:32])
+    return int(offset), int(length)
+
+
+def _write_indexed_archive(
+    *,
+    out: Path,
+    dir_names: set[str],
+    preamble: list[tuple[str, bytes]],
+    file_members: list[tuple[str, Path]],
+    index_arc: str,
+    task,
+) -> None:
+    """
+    Random-access variant: every regular file is its own gzip member (tar header + data + padding), and a trailing
+    `registry/bundle_index.csv` member records each member's byte range. The whole file still decompresses to the same
+    logical tar stream, so `verify_share_bundle` and standard tools work unchanged.
+    """
+    index_entries: list[tuple[str, int, int]] = []
+    with out.open("wb") as raw:
+        member = _GzipMemberWriter(raw)
+        for dname in sorted(dir_names):
+            member.write(_tar_header_bytes(_tarinfo_dir(dname)))
+            task.advance(1)
+        member.close()
+
+        for arc, data in preamble:
+            member = _GzipMemberWriter(raw)
+            member.write(_tar_header_bytes(_tarinfo_file(arc, size=len(data))))
+            member.write(data)
+            member.write(_tar_padding(len(data)))
+            index_entries.append((arc, member.offset, member.close()))
+            task.advance(1)
+
+        for arc, p in sorted(file_members, key=lambda t: t[0]):
+            size = p.stat().st_size
+            member = _GzipMemberWriter(raw)
+            member.write(_tar_header_bytes(_tarinfo_file(arc, size=size)))
+            written = 0
+            with p.open("rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    member.write(chunk)
+                    written += len(chunk)
+            if written != size:
+                raise RuntimeError(f"file changed while bundling: {arc}")
+            member.write(_tar_padding(size))
+            index_entries.append((arc, member.offset, member.close()))
+            task.advance(1)
+
+        index_bytes = _index_csv_bytes(sorted(index_entries, key=lambda t: t[0]))
+        member = _GzipMemberWriter(raw)
+        member.write(_tar_header_bytes(_tarinfo_file(index_arc, size=len(index_bytes))))
+        member.write(index_bytes)
+        member.write(_tar_padding(len(index_bytes)))
+        # End-of-archive marker lives in the index member so the locator member can stay empty.
+        member.write(b"\0" * (2 * tarfile.BLOCKSIZE))
+        index_offset = member.offset
+        index_length = member.close()
+
+        raw.write(_locator_member_bytes(index_offset, index_length))
+
+
+def _parse_manifest_csv(text: str, *, manifest_path: str) -> tuple[dict[str, tuple[int, str]] | None, list[str]]:
+    """
+    Parses `path,size,sha256` rows. Returns (None, errors) when the header is invalid.
+    """
+    errors: list[str] = []
+    entries: dict[str, tuple[int, str]] = {}
+    reader = csv.DictReader(io.StringIO(text))
+    if list(reader.fieldnames or []) != _MANIFEST_HEADER:
+        errors.append(f"invalid manifest header: {manifest_path}")
+        return None, errors
+
+    for row in reader:
+        p = row.get("path")
+        size_s = row.get("size")
+        sha = row.get("sha256")
+        if not isinstance(p, str) or not p:
+            errors.append(f"invalid manifest row (missing path): {manifest_path}")
+            continue
+        if p == manifest_path:
+            errors.append(f"manifest must not include itself: {manifest_path}")
+            continue
+        try:
+            size = int(size_s or "")
+        except ValueError:
+            errors.append(f"invalid manifest size for {p}: {size_s!r}")
+            continue
+        if not isinstance(sha, str) or len(sha) != 64:
+            errors.append(f"invalid manifest sha256 for {p}")
+            continue
+        entries[p] = (size, sha)
+    return entries, errors
+
+
+def _split_run_prefix(arc: str) -> tuple[str, str]:
+    parts = PurePosixPath(arc).parts
+    if len(parts) < 2:
+        return arc, ""
+    return parts[0], PurePosixPath(*parts[1:]).as_posix()
+
+
+def _load_base_manifest(path: Path) -> tuple[str, bytes, dict[str, tuple[int, str]]]:
+    """
+    Loads a previously shared bundle_manifest.csv and returns (base_run_id, raw bytes, entries keyed by run-relative path).
+    Registry files are excluded: they are regenerated for every bundle.
+    """
+    if not path.is_file():
+        raise FileNotFoundError("--base must be an existing bundle_manifest.csv file")
+    raw = path.read_bytes()
+    entries, errors = _parse_manifest_csv(raw.decode("utf-8"), manifest_path=_BUNDLE_MANIFEST_CSV)
+    if entries is None or errors:
+        raise ValueError(f"invalid base manifest: {errors[0] if errors else 'no entries'}")
+
+    run_ids = sorted({_split_run_prefix(p)[0] for p in entries})
+    if len(run_ids) != 1:
+        raise ValueError(f"base manifest must reference exactly 1 run_id prefix, found {len(run_ids)}")
+
+    rel_entries: dict[str, tuple[int, str]] = {}
+    for arc, v in entries.items():
+        _, rel = _split_run_prefix(arc)
+        if not rel or not _is_safe_member_name(rel):
+            raise ValueError(f"invalid base manifest path: {arc!r}")
+        if PurePosixPath(rel).parts[0] == _REGISTRY_DIR:
+            continue
+        rel_entries[rel] = v
+    return run_ids[0], raw, rel_entries
+
+
 def _safe_run_registry_snippet(*, base_out: Path, run_id: str, present_dirs: list[str]) -> dict[str, Any]:
     state_dir = base_out / "state"
     entry: dict[str, Any] | None = None
     if state_dir.exists():
-        runs = load_registry(str(state_dir))
-        e = runs.get(run_id)
+        e = lookup_run(str(state_dir), run_id)
         if isinstance(e, dict):
             entry = e
 
@@ -108,7 +305,7 @@ def _safe_run_registry_snippet(*, base_out: Path, run_id: str, present_dirs: lis
     fp_out: dict[str, Any] | None = None
     if isinstance(fp, dict):
         fp_out = {}
-        for k in ["algorithm", "sha256", "file_count", "total_bytes"]:
+        for k in ["algorithm", "sha256", "file_count", "total_bytes", "sample_fraction"]:
             if k in fp:
                 fp_out[k] = fp[k]
 
@@ -122,7 +319,21 @@ def _safe_run_registry_snippet(*, base_out: Path, run_id: str, present_dirs: lis
     }
 
 
-def build_share_bundle(*, run_dir: str, out_path: str) -> None:
+def build_share_bundle(
+    *, run_dir: str, out_path: str, base_manifest: str | None = None, bundle_format: str = "tar.gz"
+) -> None:
+    """
+    Builds a deterministic share bundle for `<base_out>/<run_id>`.
+
+    When `base_manifest` points at a previously shared bundle_manifest.csv, only files whose (path, size, sha256)
+    differ from the base are archived. The bundle still carries the full target manifest plus
+    `registry/delta_manifest.json` (added/modified/deleted paths) so `apply_share_bundle` can rebuild the full tree.
+
+    `bundle_format="indexed"` writes the random-access variant (see `_write_indexed_archive`).
+    """
+    if bundle_format not in _BUNDLE_FORMATS:
+        raise ValueError(f"--format must be one of: {', '.join(_BUNDLE_FORMATS)}")
+
     run_root = Path(run_dir)
     if not run_root.is_dir():
         raise FileNotFoundError("--run must be an existing directory")
@@ -130,6 +341,11 @@ def build_share_bundle(*, run_dir: str, out_path: str) -> None:
     run_id = run_root.name
     base_out = run_root.parent
 
+    base: tuple[str, bytes, dict[str, tuple[int, str]]] | None = None
+    if base_manifest is not None:
+        with progress.phase("bundle: load base manifest"):
+            base = _load_base_manifest(Path(base_manifest))
+
     with progress.phase("bundle: collect members"):
         include_dirs = [d for d in _ALLOWLIST_DIRS if (run_root / d).is_dir()]
         out = Path(out_path)
@@ -178,11 +394,67 @@ def build_share_bundle(*, run_dir: str, out_path: str) -> None:
         manifest_entries = sorted(manifest_entries, key=lambda t: t[0])
         manifest_bytes = _manifest_csv_bytes(manifest_entries)
 
+    delta_arc: str | None = None
+    delta_bytes = b""
+    if base is not None:
+        with progress.phase("bundle: compute delta"):
+            base_run_id, base_raw, base_entries = base
+            target_entries: dict[str, tuple[int, str]] = {}
+            for arc, size, sha in manifest_entries:
+                _, rel = _split_run_prefix(arc)
+                if PurePosixPath(rel).parts[0] == _REGISTRY_DIR:
+                    continue
+                target_entries[rel] = (int(size), sha)
+
+            added = sorted(rel for rel in target_entries if rel not in base_entries)
+            modified = sorted(rel for rel in target_entries if rel in base_entries and base_entries[rel] != target_entries[rel])
+            deleted = sorted(rel for rel in base_entries if rel not in target_entries)
+
+            changed = {f"{run_id}/{rel}" for rel in [*added, *modified]}
+            file_members = [(arc, p) for arc, p in file_members if arc in changed]
+
+            # Keep only directories that still lead to an archived file (plus the run root and registry dir).
+            kept_dirs = {f"{run_id}/", f"{run_id}/{_REGISTRY_DIR}/"}
+            for arc, _ in file_members:
+                parent = PurePosixPath(arc).parent
+                while parent.as_posix() not in {".", run_id}:
+                    kept_dirs.add(f"{parent.as_posix()}/")
+                    parent = parent.parent
+            dir_names = {d for d in dir_names if d in kept_dirs}
+
+            delta_arc = f"{run_id}/{_REGISTRY_DIR}/{_DELTA_MANIFEST_JSON}"
+            delta_bytes = _stable_json_bytes(
+                {
+                    "schema_version": 1,
+                    "base_run_id": base_run_id,
+                    "base_manifest_sha256": _sha256_bytes(base_raw),
+                    "added": added,
+                    "modified": modified,
+                    "deleted": deleted,
+                }
+            )
+
     # Write deterministic tar.gz (stable gzip header mtime + stable tar metadata).
     with progress.phase("bundle: write archive"):
         total_members = len(dir_names) + 2 + len(file_members)  # dirs + snippet + manifest + files
+        if delta_arc is not None:
+            total_members += 1
         task = progress.task("bundle: write archive", total=total_members, unit="members")
 
+        if bundle_format == "indexed":
+            preamble = [(snippet_arc, snippet_bytes), (manifest_arc, manifest_bytes)]
+            if delta_arc is not None:
+                preamble.append((delta_arc, delta_bytes))
+            _write_indexed_archive(
+                out=out,
+                dir_names=dir_names,
+                preamble=preamble,
+                file_members=file_members,
+                index_arc=f"{run_id}/{_REGISTRY_DIR}/{_BUNDLE_INDEX_CSV}",
+                task=task,
+            )
+            return
+
         with out.open("wb") as raw:
             with gzip.GzipFile(filename="", fileobj=raw, mode="wb", compresslevel=9, mtime=0) as gz:
                 with tarfile.open(fileobj=gz, mode="w", format=tarfile.GNU_FORMAT) as tf:
@@ -196,6 +468,10 @@ def build_share_bundle(*, run_dir: str, out_path: str) -> None:
                     tf.addfile(_tarinfo_file(manifest_arc, size=len(manifest_bytes)), io.BytesIO(manifest_bytes))
                     task.advance(1)
 
+                    if delta_arc is not None:
+                        tf.addfile(_tarinfo_file(delta_arc, size=len(delta_bytes)), io.BytesIO(delta_bytes))
+                        task.advance(1)
+
                     for arc, p in sorted(file_members, key=lambda t: t[0]):
                         size = p.stat().st_size
                         with p.open("rb") as f:
@@ -214,6 +490,203 @@ def _is_safe_member_name(name: str) -> bool:
     return True
 
 
+def _parse_index_csv(text: str, *, index_path: str) -> tuple[dict[str, tuple[int, int]] | None, list[str]]:
+    reader = csv.DictReader(io.StringIO(text))
+    if list(reader.fieldnames or []) != _INDEX_HEADER:
+        return None, [f"invalid index header: {index_path}"]
+    entries: dict[str, tuple[int, int]] = {}
+    for row in reader:
+        try:
+            entries[str(row.get("path") or "")] = (int(row.get("offset") or ""), int(row.get("length") or ""))
+        except ValueError:
+            return None, [f"invalid index row: {index_path}"]
+    return entries, []
+
+
+def _read_locator(bundle: Path) -> tuple[int, int] | None:
+    size = bundle.stat().st_size
+    if size < _LOCATOR_SIZE:
+        return None
+    with bundle.open("rb") as f:
+        f.seek(size - _LOCATOR_SIZE)
+        return _parse_locator(f.read(_LOCATOR_SIZE))
+
+
+class _RangeReader(io.RawIOBase):
+    def __init__(self, f: io.BufferedReader, offset: int, length: int) -> None:
+        self._f = f
+        self._pos = offset
+        self._end = offset + length
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), self._end - self._pos)
+        if n <= 0:
+            return 0
+        self._f.seek(self._pos)
+        data = self._f.read(n)
+        b[: len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+def _open_indexed_member(f: io.BufferedReader, offset: int, length: int):
+    """
+    Opens one gzip member by byte range and returns (TarInfo, file object) for the single tar member it contains.
+    """
+    gz = gzip.GzipFile(fileobj=io.BufferedReader(_RangeReader(f, offset, length)), mode="rb")
+    tf = tarfile.open(fileobj=gz, mode="r|")
+    m = tf.next()
+    if m is None or not m.isfile():
+        raise ValueError("indexed member is not a regular file")
+    data = tf.extractfile(m)
+    if data is None:
+        raise ValueError("indexed member is not a regular file")
+    return m, data
+
+
+def extract_share_bundle_file(*, bundle_path: str, member_path: str, out_path: str) -> list[str]:
+    """
+    Extracts one file from a share bundle and verifies its size + sha256 against bundle_manifest.csv.
+
+    `member_path` is run-relative (e.g. `reports/summary.json`). Indexed bundles are read by byte range in
+    O(file size); plain `.tar.gz` bundles fall back to a sequential scan.
+    """
+    bundle = Path(bundle_path)
+    if not bundle.is_file():
+        return [f"missing bundle file: {bundle.name}"]
+    if not _is_safe_member_name(member_path):
+        return [f"unsafe member path: {member_path!r}"]
+
+    out = Path(out_path)
+    with progress.phase("bundle: extract file"):
+        locator = _read_locator(bundle)
+        if locator is None:
+            with tarfile.open(bundle, mode="r:gz") as tf:
+                members = {m.name: m for m in tf.getmembers() if m.isfile()}
+                run_ids = sorted({PurePosixPath(n).parts[0] for n in members})
+                if len(run_ids) != 1:
+                    return [f"expected exactly 1 run_id prefix, found {len(run_ids)}: {run_ids}"]
+                manifest_path = f"{run_ids[0]}/{_REGISTRY_DIR}/{_BUNDLE_MANIFEST_CSV}"
+                arc = f"{run_ids[0]}/{member_path}"
+                if manifest_path not in members:
+                    return [f"missing {manifest_path}"]
+                if arc not in members:
+                    return [f"file not in bundle: {member_path}"]
+                manifest_text = tf.extractfile(members[manifest_path]).read().decode("utf-8")
+                src = tf.extractfile(members[arc])
+                return _extract_verified(src, out=out, arc=arc, manifest_text=manifest_text, manifest_path=manifest_path)
+
+        try:
+            return _extract_indexed(bundle, locator, member_path=member_path, out=out)
+        except (OSError, EOFError, ValueError, zlib.error, tarfile.TarError) as e:
+            return [f"unable to read indexed bundle: {type(e).__name__}"]
+
+
+def _extract_indexed(bundle: Path, locator: tuple[int, int], *, member_path: str, out: Path) -> list[str]:
+    with bundle.open("rb") as f:
+        _, index_f = _open_indexed_member(f, *locator)
+        index_text = index_f.read().decode("utf-8")
+        index_entries, errors = _parse_index_csv(index_text, index_path=_BUNDLE_INDEX_CSV)
+        if index_entries is None:
+            return errors
+        run_ids = sorted({PurePosixPath(n).parts[0] for n in index_entries})
+        if len(run_ids) != 1:
+            return [f"expected exactly 1 run_id prefix, found {len(run_ids)}: {run_ids}"]
+        manifest_path = f"{run_ids[0]}/{_REGISTRY_DIR}/{_BUNDLE_MANIFEST_CSV}"
+        arc = f"{run_ids[0]}/{member_path}"
+        if manifest_path not in index_entries:
+            return [f"missing {manifest_path}"]
+        if arc not in index_entries:
+            return [f"file not in bundle: {member_path}"]
+
+        _, manifest_f = _open_indexed_member(f, *index_entries[manifest_path])
+        manifest_text = manifest_f.read().decode("utf-8")
+        m, src = _open_indexed_member(f, *index_entries[arc])
+        if m.name != arc:
+            return [f"bundle index points at the wrong member: {member_path}"]
+        return _extract_verified(src, out=out, arc=arc, manifest_text=manifest_text, manifest_path=manifest_path)
+
+
+def _extract_verified(src, *, out: Path, arc: str, manifest_text: str, manifest_path: str) -> list[str]:
+    manifest_entries, errors = _parse_manifest_csv(manifest_text, manifest_path=manifest_path)
+    if manifest_entries is None:
+        return errors
+    if arc not in manifest_entries:
+        return [f"file not in manifest: {arc}"]
+    expected_size, expected_sha = manifest_entries[arc]
+
+    tmp = out.with_name(out.name + ".partial")
+    try:
+        size, sha = _copy_and_hash(src, tmp)
+    except (OSError, EOFError, zlib.error, tarfile.TarError) as e:
+        tmp.unlink(missing_ok=True)
+        return [f"unable to extract: {arc}: {type(e).__name__}"]
+    if size != int(expected_size):
+        tmp.unlink()
+        return [f"size mismatch: {arc}: expected {expected_size}, got {size}"]
+    if sha != expected_sha:
+        tmp.unlink()
+        return [f"sha256 mismatch: {arc}"]
+    tmp.replace(out)
+    return []
+
+
+def _read_delta_manifest(tf: tarfile.TarFile, delta_path: str) -> tuple[dict[str, Any] | None, list[str]]:
+    f = tf.extractfile(delta_path)
+    if f is None:
+        return None, [f"unable to extract: {delta_path}"]
+    try:
+        obj = json.loads(f.read().decode("utf-8"))
+    except Exception as e:
+        return None, [f"invalid JSON: {delta_path}: {type(e).__name__}"]
+
+    if not isinstance(obj, dict) or not isinstance(obj.get("base_run_id"), str) or not obj["base_run_id"]:
+        return None, [f"invalid delta manifest (missing base_run_id): {delta_path}"]
+    errors: list[str] = []
+    for k in ["added", "modified", "deleted"]:
+        v = obj.get(k)
+        if not isinstance(v, list) or not all(isinstance(x, str) and _is_safe_member_name(x) for x in v):
+            errors.append(f"invalid delta manifest field {k!r}: {delta_path}")
+    if errors:
+        return None, errors
+    return obj, []
+
+
+def _verify_index_ranges(
+    bundle: Path,
+    index_entries: dict[str, tuple[int, int]],
+    *,
+    locator: tuple[int, int],
+    index_path: str,
+    expected_sha: dict[str, str],
+) -> list[str]:
+    """
+    Random-access check of an indexed bundle: the locator and every index range must open (as its own gzip member)
+    the tar member of that name, with the expected sha256.
+    """
+    errors: list[str] = []
+    with bundle.open("rb") as f:
+        ranges = [(index_path, locator, None), *((p, index_entries[p], expected_sha[p]) for p in sorted(index_entries))]
+        with progress.phase("bundle: verify index ranges"):
+            task = progress.task("bundle: verify index ranges", total=len(ranges), unit="members")
+            for path, (offset, length), sha in ranges:
+                try:
+                    m, data = _open_indexed_member(f, offset, length)
+                    actual_sha = _sha256_stream(data)
+                except (OSError, EOFError, ValueError, zlib.error, tarfile.TarError) as e:
+                    errors.append(f"unable to read indexed member: {path}: {type(e).__name__}")
+                else:
+                    if m.name != path:
+                        errors.append(f"bundle index points at the wrong member: {path}")
+                    elif sha is not None and actual_sha != sha:
+                        errors.append(f"bundle index sha256 mismatch: {path}")
+                task.advance(1)
+    return errors
+
+
 def verify_share_bundle(*, bundle_path: str) -> list[str]:
     bundle = Path(bundle_path)
     if not bundle.is_file():
@@ -267,7 +740,7 @@ def verify_share_bundle(*, bundle_path: str) -> list[str]:
                     # Allow only registry dir and known files.
                     if len(p.parts) == 2:
                         continue
-                    if len(p.parts) == 3 and p.parts[2] in {_RUN_ENTRY_JSON, _BUNDLE_MANIFEST_CSV}:
+                    if len(p.parts) == 3 and p.parts[2] in {_RUN_ENTRY_JSON, _BUNDLE_MANIFEST_CSV, _DELTA_MANIFEST_JSON, _BUNDLE_INDEX_CSV}:
                         continue
                 errors.append(f"disallowed path: {n}")
 
@@ -301,39 +774,38 @@ def verify_share_bundle(*, bundle_path: str) -> list[str]:
                 return sorted(errors)
 
             # Parse manifest entries.
-            manifest_entries: dict[str, tuple[int, str]] = {}
-            reader = csv.DictReader(io.StringIO(manifest_text))
-            if list(reader.fieldnames or []) != _MANIFEST_HEADER:
-                errors.append(f"invalid manifest header: {manifest_path}")
+            parsed, parse_errors = _parse_manifest_csv(manifest_text, manifest_path=manifest_path)
+            errors.extend(parse_errors)
+            if parsed is None:
                 return sorted(errors)
+            manifest_entries = parsed
 
-            for row in reader:
-                p = row.get("path")
-                size_s = row.get("size")
-                sha = row.get("sha256")
-                if not isinstance(p, str) or not p:
-                    errors.append(f"invalid manifest row (missing path): {manifest_path}")
-                    continue
-                if p == manifest_path:
-                    errors.append(f"manifest must not include itself: {manifest_path}")
-                    continue
-                try:
-                    size = int(size_s or "")
-                except ValueError:
-                    errors.append(f"invalid manifest size for {p}: {size_s!r}")
-                    continue
-                if not isinstance(sha, str) or len(sha) != 64:
-                    errors.append(f"invalid manifest sha256 for {p}")
-                    continue
-                manifest_entries[p] = (size, sha)
+            # Delta bundles carry the full target manifest but only the changed files.
+            delta_path = f"{run_id}/{_REGISTRY_DIR}/{_DELTA_MANIFEST_JSON}"
+            expected_files: set[str] = set(manifest_entries)
+            if delta_path in names:
+                delta, delta_errors = _read_delta_manifest(tf, delta_path)
+                errors.extend(delta_errors)
+                if delta is None:
+                    return sorted(errors)
+                for rel in delta["deleted"]:
+                    if f"{run_id}/{rel}" in manifest_entries:
+                        errors.append(f"delta manifest deletes a file still in the manifest: {rel}")
+                expected_files = {f"{run_id}/{_REGISTRY_DIR}/{_RUN_ENTRY_JSON}"}
+                for rel in [*delta["added"], *delta["modified"]]:
+                    arc = f"{run_id}/{rel}"
+                    if arc not in manifest_entries:
+                        errors.append(f"delta manifest references a file missing from the manifest: {rel}")
+                    expected_files.add(arc)
 
-            # Determine regular file members to verify (excluding the manifest itself).
+            # Determine regular file members to verify (excluding the manifests and index themselves).
+            index_path = f"{run_id}/{_REGISTRY_DIR}/{_BUNDLE_INDEX_CSV}"
             actual_files: dict[str, tarfile.TarInfo] = {}
             for m in members:
                 if not _is_safe_member_name(m.name):
                     continue
                 if m.isfile():
-                    if m.name == manifest_path:
+                    if m.name in {manifest_path, delta_path, index_path}:
                         continue
                     actual_files[m.name] = m
                 elif m.isdir():
@@ -341,15 +813,43 @@ def verify_share_bundle(*, bundle_path: str) -> list[str]:
                 else:
                     errors.append(f"unsupported member type: {m.name}")
 
-            if sorted(actual_files) != sorted(manifest_entries):
+            if sorted(actual_files) != sorted(expected_files) or not set(actual_files) <= set(manifest_entries):
                 missing = sorted(set(actual_files) - set(manifest_entries))
-                extra = sorted(set(manifest_entries) - set(actual_files))
+                extra = sorted(set(expected_files) - set(actual_files))
+                unexpected = sorted((set(actual_files) - set(expected_files)) - set(missing))
                 if missing:
                     errors.append(f"files missing from manifest: {missing}")
                 if extra:
                     errors.append(f"manifest references missing files: {extra}")
+                if unexpected:
+                    errors.append(f"files not listed in delta manifest: {unexpected}")
                 return sorted(errors)
 
+            if index_path in names:
+                index_f = tf.extractfile(index_path)
+                index_entries, index_errors = _parse_index_csv(
+                    index_f.read().decode("utf-8") if index_f is not None else "", index_path=index_path
+                )
+                errors.extend(index_errors)
+                if index_entries is not None:
+                    indexed = set(index_entries)
+                    expected_indexed = {*actual_files, manifest_path} | ({delta_path} if delta_path in names else set())
+                    locator = _read_locator(bundle)
+                    if indexed != expected_indexed:
+                        errors.append(f"bundle index does not match archived files: {index_path}")
+                    elif locator is None:
+                        errors.append(f"missing or invalid bundle index locator: {bundle.name}")
+                    else:
+                        expected_sha = {path: manifest_entries[path][1] for path in actual_files}
+                        expected_sha[manifest_path] = _sha256_bytes(manifest_text.encode("utf-8"))
+                        if delta_path in names:
+                            expected_sha[delta_path] = _sha256_stream(tf.extractfile(delta_path))
+                        errors.extend(
+                            _verify_index_ranges(
+                                bundle, index_entries, locator=locator, index_path=index_path, expected_sha=expected_sha
+                            )
+                        )
+
             with progress.phase("bundle: verify sha256"):
                 task = progress.task("bundle: verify sha256", total=len(actual_files), unit="files")
                 for path in sorted(actual_files):
@@ -370,3 +870,185 @@ def verify_share_bundle(*, bundle_path: str) -> list[str]:
                     task.advance(1)
 
     return sorted(errors)
+
+
+def _copy_and_hash(src: io.BufferedReader, dst: Path) -> tuple[int, str]:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    h = hashlib.sha256()
+    size = 0
+    with dst.open("wb") as f:
+        for chunk in iter(lambda: src.read(1024 * 1024), b""):
+            h.update(chunk)
+            size += len(chunk)
+            f.write(chunk)
+    return size, h.hexdigest()
+
+
+def apply_share_bundle(*, bundle_path: str, out_dir: str, base_path: str | None = None) -> list[str]:
+    """
+    Reconstructs `<out_dir>/<run_id>/` from a share bundle and verifies every file against its bundle_manifest.csv.
+
+    Delta bundles (built with `--base`) need `base_path`: a previous full bundle `.tar.gz` (plain or indexed) or a
+    directory containing the previously reconstructed `<base_run_id>/` tree. Unchanged files are taken from the
+    base: a plain base is streamed once, an indexed base is read by byte range. A delta bundle is not a valid base.
+    """
+    errors = verify_share_bundle(bundle_path=bundle_path)
+    if errors:
+        return errors
+
+    bundle = Path(bundle_path)
+    out = Path(out_dir)
+
+    with progress.phase("bundle: apply"):
+        with tarfile.open(bundle, mode="r:gz") as tf:
+            members = {m.name for m in tf.getmembers() if m.name and m.isfile()}
+            run_id = sorted({PurePosixPath(n).parts[0] for n in members})[0]
+            manifest_path = f"{run_id}/{_REGISTRY_DIR}/{_BUNDLE_MANIFEST_CSV}"
+            delta_path = f"{run_id}/{_REGISTRY_DIR}/{_DELTA_MANIFEST_JSON}"
+
+            manifest_f = tf.extractfile(manifest_path)
+            manifest_bytes = manifest_f.read() if manifest_f is not None else b""
+            manifest_entries, _ = _parse_manifest_csv(manifest_bytes.decode("utf-8"), manifest_path=manifest_path)
+            if manifest_entries is None:
+                return [f"invalid manifest header: {manifest_path}"]
+
+            delta = None
+            if delta_path in members:
+                delta, delta_errors = _read_delta_manifest(tf, delta_path)
+                if delta is None:
+                    return delta_errors
+
+        base: Path | None = None
+        if delta is not None:
+            if base_path is None:
+                return [f"delta bundle requires --base (base_run_id={delta['base_run_id']})"]
+            base = Path(base_path)
+            base_errors = _check_base(base, str(delta["base_run_id"]))
+            if base_errors:
+                return base_errors
+
+        out_root = out / run_id
+        if out_root.exists():
+            return [f"output already exists: {run_id}"]
+        tmp_root = out / f".{run_id}.partial"
+        if tmp_root.exists():
+            shutil.rmtree(tmp_root)
+
+        # run-relative path -> (arc, size, sha256) for every file still to write.
+        pending: dict[str, tuple[str, int, str]] = {}
+        for arc in sorted(manifest_entries):
+            prefix, rel = _split_run_prefix(arc)
+            if prefix != run_id or not rel or not _is_safe_member_name(arc):
+                errors.append(f"invalid manifest path: {arc!r}")
+                continue
+            expected_size, expected_sha = manifest_entries[arc]
+            pending[rel] = (arc, int(expected_size), expected_sha)
+
+        task = progress.task("bundle: apply files", total=len(pending), unit="files")
+
+        def write(rel: str, src) -> None:
+            if rel not in pending:
+                src.close()
+                return
+            arc, expected_size, expected_sha = pending.pop(rel)
+            with src:
+                size, sha = _copy_and_hash(src, tmp_root / rel)
+            if size != expected_size:
+                errors.append(f"size mismatch: {arc}: expected {expected_size}, got {size}")
+            elif sha != expected_sha:
+                errors.append(f"sha256 mismatch: {arc}")
+            task.advance(1)
+
+        # Both archives are read front to back in one pass (a gzip stream cannot seek backwards cheaply).
+        with tarfile.open(bundle, mode="r|gz") as stream:
+            for m in stream:
+                prefix, rel = _split_run_prefix(m.name)
+                if m.isfile() and prefix == run_id and rel in pending:
+                    write(rel, stream.extractfile(m))
+        if base is not None and pending:
+            errors.extend(_apply_from_base(base, str(delta["base_run_id"]), needed=set(pending), write=write))
+
+        errors.extend(f"missing from bundle and base: {rel}" for rel in sorted(pending))
+        if errors:
+            shutil.rmtree(tmp_root, ignore_errors=True)
+            return sorted(errors)
+
+        manifest_out = tmp_root / _REGISTRY_DIR / _BUNDLE_MANIFEST_CSV
+        manifest_out.parent.mkdir(parents=True, exist_ok=True)
+        manifest_out.write_bytes(manifest_bytes)
+        tmp_root.replace(out_root)
+
+    return []
+
+
+def _check_base(base: Path, base_run_id: str) -> list[str]:
+    # A delta base lacks the files it left unchanged: reject it before anything is written.
+    delta_arc = f"{base_run_id}/{_REGISTRY_DIR}/{_DELTA_MANIFEST_JSON}"
+    if base.is_dir():
+        return []
+    if not base.is_file():
+        return ["--base must be a previous bundle .tar.gz or a directory containing its <run_id>/ tree"]
+    try:
+        locator = _read_locator(base)
+        if locator is not None:
+            with base.open("rb") as f:
+                _, index_f = _open_indexed_member(f, *locator)
+                index_entries, index_errors = _parse_index_csv(
+                    index_f.read().decode("utf-8"), index_path=_BUNDLE_INDEX_CSV
+                )
+            if index_entries is None:
+                return [f"invalid --base bundle: {e}" for e in index_errors]
+            is_delta = delta_arc in index_entries
+        else:
+            # The registry preamble (run entry, manifest, delta manifest) precedes every data file.
+            is_delta = False
+            with tarfile.open(base, mode="r|gz") as stream:
+                for m in stream:
+                    if m.name == delta_arc:
+                        is_delta = True
+                        break
+                    if m.isfile() and PurePosixPath(m.name).parts[1:2] != (_REGISTRY_DIR,):
+                        break
+    except (OSError, EOFError, ValueError, zlib.error, tarfile.TarError) as e:
+        return [f"unable to read --base bundle: {type(e).__name__}"]
+    if is_delta:
+        return ["--base is a delta bundle: apply it first and pass the applied directory (or a full bundle) as --base"]
+    return []
+
+
+def _apply_from_base(base: Path, base_run_id: str, *, needed: set[str], write) -> list[str]:
+    """Writes the `needed` run-relative files from the base (see apply_share_bundle)."""
+    if base.is_dir():
+        root = base / base_run_id if (base / base_run_id).is_dir() else base
+        for rel in sorted(needed):
+            try:
+                src = (root / rel).open("rb")
+            except FileNotFoundError:
+                continue
+            write(rel, src)
+        return []
+
+    try:
+        locator = _read_locator(base)
+        if locator is not None:
+            with base.open("rb") as f:
+                _, index_f = _open_indexed_member(f, *locator)
+                index_entries, _ = _parse_index_csv(index_f.read().decode("utf-8"), index_path=_BUNDLE_INDEX_CSV)
+                for rel in sorted(needed):
+                    arc = f"{base_run_id}/{rel}"
+                    if index_entries is None or arc not in index_entries:
+                        continue
+                    m, src = _open_indexed_member(f, *index_entries[arc])
+                    if m.name != arc:
+                        return [f"--base bundle index points at the wrong member: {rel}"]
+                    write(rel, src)
+            return []
+
+        with tarfile.open(base, mode="r|gz") as stream:
+            for m in stream:
+                prefix, rel = _split_run_prefix(m.name)
+                if m.isfile() and prefix == base_run_id and rel in needed:
+                    write(rel, stream.extractfile(m))
+    except (OSError, EOFError, ValueError, zlib.error, tarfile.TarError) as e:
+        return [f"unable to read --base bundle: {type(e).__name__}"]
+    return []
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import io
+import json
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO, BinaryIO
+
+
+# A staged zip member that was not extracted is addressed as `<zip relpath>!/<member name>` in layout.json and
+# manifest.json (e.g. `source/export.zip!/apple_health_export/export.xml`). The helpers below read such virtual
+# paths and ordinary staged files alike, so stage code can keep passing `run_dir / rel` around.
+ZIP_MEMBER_SEP = "!/"
+
+_ZIP_MARKER = ".zip" + ZIP_MEMBER_SEP
+
+
+def virtual_rel(zip_rel: str, member: str) -> str:
+    return f"{zip_rel}{ZIP_MEMBER_SEP}{member}"
+
+
+def is_zip_member(rel: str) -> bool:
+    return _ZIP_MARKER in rel
+
+
+def materialized_rel(rel: str) -> str:
+    """
+    Where the member would have been extracted: `source/export.zip!/a/b.json` -> `source/unpacked/a/b.json`
+    (stages that write per-file outputs, e.g. deid, keep the extracted layout).
+    """
+    i = rel.find(_ZIP_MARKER)
+    if i < 0:
+        return rel
+    zip_rel = rel[: i + len(".zip")]
+    return (Path(zip_rel).parent / "unpacked" / rel[i + len(_ZIP_MARKER) :]).as_posix()
+
+
+def _split(path: Path) -> tuple[Path, str] | None:
+    s = path.as_posix()
+    i = s.find(_ZIP_MARKER)
+    if i < 0:
+        return None
+    return Path(s[: i + len(".zip")]), s[i + len(_ZIP_MARKER) :]
+
+
+class _ZipHandles:
+    """
+    Open ZipFile handles, one per staged zip (keyed by its stat, so a re-staged export.zip is reopened): the
+    central directory is parsed once, not per member. Bounded; an evicted handle is closed. ZipFile serializes
+    raw reads on the shared handle; members still decompress concurrently.
+
+    Members are opened under the cache lock, so a handle is never closed between lookup and open. A member
+    that is already open keeps reading after its handle is closed (ZipFile reference-counts the file).
+    """
+
+    def __init__(self, maxsize: int = 8) -> None:
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._handles: OrderedDict[tuple[str, int, int], tuple[zipfile.ZipFile, dict[str, zipfile.ZipInfo]]] = (
+            OrderedDict()
+        )
+
+    def _get(self, zip_path: Path) -> tuple[zipfile.ZipFile, dict[str, zipfile.ZipInfo]]:
+        st = zip_path.stat()
+        key = (str(zip_path), st.st_mtime_ns, st.st_size)
+        hit = self._handles.get(key)
+        if hit is not None:
+            self._handles.move_to_end(key)
+            return hit
+        zf = zipfile.ZipFile(zip_path)
+        hit = self._handles[key] = (zf, {i.filename: i for i in zf.infolist()})
+        while len(self._handles) > self._maxsize:
+            self._handles.popitem(last=False)[1][0].close()
+        return hit
+
+    def info(self, zip_path: Path, member: str) -> zipfile.ZipInfo | None:
+        with self._lock:
+            return self._get(zip_path)[1].get(member)
+
+    def open(self, zip_path: Path, member: str) -> tuple[IO[bytes], zipfile.ZipInfo]:
+        with self._lock:
+            zf, infos = self._get(zip_path)
+            info = infos.get(member)
+            if info is None:
+                raise FileNotFoundError(f"zip member not found: {member}")
+            return zf.open(info), info
+
+    def close_all(self) -> None:
+        with self._lock:
+            while self._handles:
+                self._handles.popitem()[1][0].close()
+
+
+_ZIPS = _ZipHandles()
+
+
+def close_all() -> None:
+    """Close the cached zip handles (e.g. once a run is done with its export.zip); later reads reopen them."""
+    _ZIPS.close_all()
+
+
+def _info(zip_path: Path, member: str) -> zipfile.ZipInfo | None:
+    return _ZIPS.info(zip_path, member)
+
+
+@functools.lru_cache(maxsize=16)
+def _recorded_digests(manifest_path: str, mtime_ns: int) -> dict[str, str]:
+    try:
+        manifest = json.loads(Path(manifest_path).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    files = manifest.get("files") if isinstance(manifest, dict) else None
+    return {
+        f["path"]: f["sha256"]
+        for f in files or []
+        if isinstance(f, dict) and isinstance(f.get("path"), str) and isinstance(f.get("sha256"), str)
+    }
+
+
+def _expected_sha256(zip_path: Path, member: str) -> str | None:
+    # The run's manifest.json sits in the nearest parent of the staged zip (`<run_dir>/source/export.zip`).
+    for parent in zip_path.parents:
+        manifest = parent / "manifest.json"
+        if manifest.is_file():
+            rel = virtual_rel(zip_path.relative_to(parent).as_posix(), member)
+            return _recorded_digests(str(manifest), manifest.stat().st_mtime_ns).get(rel)
+    return None
+
+
+class _VerifiedMember(io.RawIOBase):
+    """
+    Stream of one zip member that checks its sha256 against the manifest once read to the end (zipfile
+    already checks the CRC-32). A mismatch raises ValueError naming only the member. A stream closed before
+    EOF (a prefix read, a search that stopped at its first match) is never checked.
+    """
+
+    def __init__(self, src: IO[bytes], info: zipfile.ZipInfo, expected: str | None) -> None:
+        self._src = src
+        self._member = info.filename
+        self._expected = expected
+        self._h = hashlib.sha256() if expected is not None else None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:  # type: ignore[no-untyped-def]
+        n = self._src.readinto(b)
+        if self._h is not None:
+            if n:
+                self._h.update(memoryview(b)[:n])
+            elif self._h.hexdigest() != self._expected:
+                raise ValueError(f"staged zip member does not match manifest sha256: {self._member}")
+            else:
+                self._h = None
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._src.close()
+        super().close()
+
+
+def open_binary(path: Path) -> BinaryIO:
+    """
+    Open a staged file or zip member for reading. A zip member is verified against its manifest sha256 only when
+    read to EOF (see _VerifiedMember): callers that act on a partial read must not treat it as verified.
+    """
+    split = _split(path)
+    if split is None:
+        return path.open("rb")
+    zip_path, member = split
+    src, info = _ZIPS.open(zip_path, member)
+    raw = _VerifiedMember(src, info, _expected_sha256(zip_path, member))
+    return io.BufferedReader(raw, buffer_size=1024 * 1024)  # type: ignore[return-value]
+
+
+def read_bytes(path: Path) -> bytes:
+    if _split(path) is None:
+        return path.read_bytes()
+    with open_binary(path) as f:
+        return f.read()
+
+
+def read_text(path: Path, *, errors: str = "strict") -> str:
+    # Same result as Path.read_text(encoding="utf-8", errors=...), including newline translation.
+    if _split(path) is None:
+        return path.read_text(encoding="utf-8", errors=errors)
+    with io.TextIOWrapper(open_binary(path), encoding="utf-8", errors=errors) as f:
+        return f.read()
+
+
+def exists(path: Path) -> bool:
+    split = _split(path)
+    if split is None:
+        return path.exists()
+    try:
+        return _info(*split) is not None
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def size(path: Path) -> int:
+    split = _split(path)
+    if split is None:
+        return path.stat().st_size
+    info = _info(*split)
+    if info is None:
+        raise FileNotFoundError(f"zip member not found: {split[1]}")
+    return info.file_size
+
+
+def cache_key(path: Path) -> tuple[str, int, int]:
+    """
+    `(key, size, mtime_ns)` for in-process caches: a member is keyed by the zip's path and mtime (members
+    change only with the zip).
+    """
+    split = _split(path)
+    if split is None:
+        st = path.stat()
+        return str(path.resolve()), st.st_size, st.st_mtime_ns
+    zip_path, member = split
+    st = zip_path.stat()
+    info = _info(zip_path, member)
+    if info is None:
+        raise FileNotFoundError(f"zip member not found: {member}")
+    return virtual_rel(str(zip_path.resolve()), member), info.file_size, st.st_mtime_ns
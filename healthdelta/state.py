@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import contextlib
 import datetime as dt
 import hashlib
 import json
+import sqlite3
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover (non-POSIX)
+    fcntl = None
 
 
 PIPELINE_VERSION_SALT = "healthdelta_pipeline_v1"
@@ -46,6 +54,8 @@ class StatePaths:
     state_dir: Path
     runs_json: Path
     last_run: Path
+    lock: Path
+    registry_db: Path
 
 
 def resolve_state_paths(state_dir: str) -> StatePaths:
@@ -54,16 +64,39 @@ def resolve_state_paths(state_dir: str) -> StatePaths:
         state_dir=sd,
         runs_json=sd / "runs.json",
         last_run=sd / "LAST_RUN",
+        lock=sd / ".lock",
+        registry_db=sd / "registry.sqlite",
     )
 
 
-def _base_dir_for_state(state_dir: Path) -> Path:
+@contextlib.contextmanager
+def file_lock(path: Path, *, shared: bool = False) -> Iterator[None]:
+    """
+    Exclusive (or, with `shared`, shared) advisory lock on `path`, safe across processes and threads: each
+    acquisition opens its own file description. No-op where `fcntl` is unavailable.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def state_lock(state_dir: str):
+    """Lock guarding shared state-dir writes (registry, LAST_RUN, identity)."""
+    return file_lock(resolve_state_paths(state_dir).lock)
+
+
+def base_dir_for_state(state_dir: Path) -> Path:
     # Default convention: <base>/state. If caller uses a different layout, we still anchor pointers to the parent.
     return state_dir.parent
 
 
-def load_registry(state_dir: str) -> dict[str, dict]:
-    paths = resolve_state_paths(state_dir)
+def _load_registry_json(paths: StatePaths) -> dict[str, dict]:
     if not paths.runs_json.exists():
         return {}
     obj = _read_json(paths.runs_json)
@@ -77,11 +110,96 @@ def load_registry(state_dir: str) -> dict[str, dict]:
     return out
 
 
-def save_registry(state_dir: str, runs: dict[str, dict]) -> None:
+def _entry_row(run_id: str, entry: dict) -> tuple[str, str | None, str | None, str]:
+    parent = entry.get("parent_run_id")
+    created_at = entry.get("created_at")
+    return (
+        run_id,
+        parent if isinstance(parent, str) else None,
+        created_at if isinstance(created_at, str) else None,
+        json.dumps(entry, sort_keys=True, separators=(",", ":")),
+    )
+
+
+@contextlib.contextmanager
+def _registry_txn(state_dir: str) -> Iterator[sqlite3.Connection]:
+    """
+    Write transaction on the SQLite registry (source of truth; `runs.json` is an exported mirror). The first
+    write against a legacy state dir imports its `runs.json`. BEGIN IMMEDIATE serializes concurrent writers.
+    """
     paths = resolve_state_paths(state_dir)
+    paths.state_dir.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(str(paths.registry_db), timeout=60, isolation_level=None)
+    try:
+        con.execute("PRAGMA journal_mode=WAL;")
+        con.execute("BEGIN IMMEDIATE;")
+        try:
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                  run_id TEXT PRIMARY KEY,
+                  parent_run_id TEXT,
+                  created_at TEXT,
+                  entry_json TEXT NOT NULL
+                );
+                """
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS runs_parent_run_id ON runs(parent_run_id);")
+            con.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);")
+            imported = con.execute("SELECT value FROM meta WHERE key='runs_json_imported';").fetchone()
+            if imported is None:
+                con.executemany(
+                    "INSERT OR IGNORE INTO runs VALUES (?, ?, ?, ?);",
+                    [_entry_row(k, v) for k, v in sorted(_load_registry_json(paths).items())],
+                )
+                con.execute("INSERT INTO meta VALUES ('runs_json_imported', '1');")
+            yield con
+        except BaseException:
+            con.execute("ROLLBACK;")
+            raise
+        con.execute("COMMIT;")
+    finally:
+        con.close()
+
+
+def _registry_query(state_dir: str, sql: str, params: tuple = ()) -> list[tuple] | None:
+    # Read path: None when no SQLite registry exists yet (callers then fall back to a legacy runs.json).
+    paths = resolve_state_paths(state_dir)
+    if not paths.registry_db.exists():
+        return None
+    con = sqlite3.connect(f"file:{paths.registry_db.as_posix()}?mode=ro", uri=True, timeout=60)
+    try:
+        return con.execute(sql, params).fetchall()
+    except sqlite3.OperationalError:
+        # Created but not yet initialized by its first writer.
+        return None
+    finally:
+        con.close()
+
+
+def load_registry(state_dir: str) -> dict[str, dict]:
+    rows = _registry_query(state_dir, "SELECT run_id, entry_json FROM runs ORDER BY run_id;")
+    if rows is None:
+        return _load_registry_json(resolve_state_paths(state_dir))
+    out: dict[str, dict] = {}
+    for run_id, entry_json in rows:
+        entry = json.loads(entry_json)
+        if isinstance(entry, dict):
+            out[run_id] = entry
+    return out
+
+
+def export_registry_json(state_dir: str, *, runs: dict[str, dict] | None = None) -> None:
+    """
+    Write the compatibility `runs.json` (same shape and bytes as before the SQLite registry). O(history): call
+    once per run, not per update. `runs` (from a RegistryCache) saves re-reading the registry.
+    """
+    paths = resolve_state_paths(state_dir)
+    if not paths.registry_db.exists():
+        return
     obj = {
         "schema_version": STATE_SCHEMA_VERSION,
-        "runs": runs,
+        "runs": runs if runs is not None else load_registry(state_dir),
     }
     _write_if_changed(paths.runs_json, _stable_json_bytes(obj))
 
@@ -142,6 +260,14 @@ def compute_run_id(*, parent_run_id: str | None, input_fingerprint_sha256: str)
     return hashlib.sha256(blob).hexdigest()
 
 
+def _bump_registry_version(con: sqlite3.Connection) -> int:
+    # Every write bumps the registry version, so a RegistryCache can tell its own writes from other processes'.
+    con.execute(
+        "INSERT INTO meta VALUES ('version', '1') ON CONFLICT(key) DO UPDATE SET value=CAST(value AS INTEGER) + 1;"
+    )
+    return int(con.execute("SELECT value FROM meta WHERE key='version';").fetchone()[0])
+
+
 def register_run(
     *,
     state_dir: str,
@@ -151,10 +277,8 @@ def register_run(
     note: str | None,
     artifacts: dict[str, object],
     created_at: str | None = None,
-) -> None:
-    runs = load_registry(state_dir)
-    if run_id in runs:
-        return
+) -> int:
+    """Insert the run (a no-op if it is registered already). Returns the registry version after the write."""
     entry = {
         "run_id": run_id,
         "created_at": created_at or _now_utc(),
@@ -163,8 +287,9 @@ def register_run(
         "notes": note,
         "artifacts": artifacts,
     }
-    runs[run_id] = entry
-    save_registry(state_dir, runs)
+    with _registry_txn(state_dir) as con:
+        con.execute("INSERT OR IGNORE INTO runs VALUES (?, ?, ?, ?);", _entry_row(run_id, entry))
+        return _bump_registry_version(con)
 
 
 def _sanitize_artifact_pointer(v: object) -> object:
@@ -175,35 +300,41 @@ def _sanitize_artifact_pointer(v: object) -> object:
     return v
 
 
-def update_run_artifacts(state_dir: str, run_id: str, patch: dict[str, object]) -> None:
-    runs = load_registry(state_dir)
-    entry = runs.get(run_id)
-    if not isinstance(entry, dict):
-        raise KeyError(f"run_id not found in registry: {run_id}")
+def update_run_artifacts(state_dir: str, run_id: str, patch: dict[str, object]) -> int | None:
+    """Merge `patch` into the run's artifact pointers. Returns the registry version after the write, or None if
+    nothing changed."""
+    with _registry_txn(state_dir) as con:
+        row = con.execute("SELECT entry_json FROM runs WHERE run_id=?;", (run_id,)).fetchone()
+        entry = json.loads(row[0]) if row else None
+        if not isinstance(entry, dict):
+            raise KeyError(f"run_id not found in registry: {run_id}")
 
-    artifacts = entry.get("artifacts")
-    if not isinstance(artifacts, dict):
-        artifacts = {}
+        artifacts = entry.get("artifacts")
+        if not isinstance(artifacts, dict):
+            artifacts = {}
 
-    changed = False
-    for k, v in patch.items():
-        if not isinstance(k, str) or not k:
-            continue
-        v = _sanitize_artifact_pointer(v)
-        if artifacts.get(k) != v:
-            artifacts[k] = v
-            changed = True
+        changed = False
+        for k, v in patch.items():
+            if not isinstance(k, str) or not k:
+                continue
+            v = _sanitize_artifact_pointer(v)
+            if artifacts.get(k) != v:
+                artifacts[k] = v
+                changed = True
 
-    if not changed:
-        return
+        if not changed:
+            return None
 
-    entry = {**entry, "artifacts": artifacts}
-    runs[run_id] = entry
-    save_registry(state_dir, runs)
+        entry = {**entry, "artifacts": artifacts}
+        con.execute(
+            "UPDATE runs SET entry_json=? WHERE run_id=?;",
+            (json.dumps(entry, sort_keys=True, separators=(",", ":")), run_id),
+        )
+        return _bump_registry_version(con)
 
 
 def artifact_pointers_for_run(*, state_dir: str, run_id: str, mode: str) -> dict[str, object]:
-    base = _base_dir_for_state(resolve_state_paths(state_dir).state_dir)
+    base = base_dir_for_state(resolve_state_paths(state_dir).state_dir)
     # Store relative paths under the base dir (avoids absolute path leakage).
     def rel(p: Path) -> str:
         try:
@@ -223,22 +354,77 @@ def artifact_pointers_for_run(*, state_dir: str, run_id: str, mode: str) -> dict
 
 
 def lookup_run(state_dir: str, run_id: str) -> dict[str, object] | None:
-    return load_registry(state_dir).get(run_id)
+    rows = _registry_query(state_dir, "SELECT entry_json FROM runs WHERE run_id=?;", (run_id,))
+    if rows is None:
+        return _load_registry_json(resolve_state_paths(state_dir)).get(run_id)
+    entry = json.loads(rows[0][0]) if rows else None
+    return entry if isinstance(entry, dict) else None
 
 
-def run_input_fingerprint_sha256(state_dir: str, run_id: str) -> str | None:
-    entry = lookup_run(state_dir, run_id)
-    if not isinstance(entry, dict):
-        return None
-    fp = entry.get("input_fingerprint")
+def entry_input_fingerprint_sha256(entry: object) -> str | None:
+    fp = entry.get("input_fingerprint") if isinstance(entry, dict) else None
     if isinstance(fp, dict) and isinstance(fp.get("sha256"), str):
         return fp["sha256"]
     return None
 
 
+def run_input_fingerprint_sha256(state_dir: str, run_id: str) -> str | None:
+    return entry_input_fingerprint_sha256(lookup_run(state_dir, run_id))
+
+
+class RegistryCache:
+    """
+    The registry of one state dir kept in memory by a long-lived process (the daemon): lookups are dict reads and
+    the runs.json export does not re-read SQLite. Writes go to SQLite as usual and are applied to the copy; a write
+    by any other process (seen as an unexpected registry version) makes the next read reload everything.
+    Returned entries are shared and must not be mutated.
+    """
+
+    def __init__(self, state_dir: str) -> None:
+        self.state_dir = state_dir
+        self._lock = threading.Lock()
+        self._runs: dict[str, dict] | None = None
+        self._version: int | None = None
+
+    def _stored_version(self) -> int | None:
+        rows = _registry_query(self.state_dir, "SELECT value FROM meta WHERE key='version';")
+        return int(rows[0][0]) if rows else None
+
+    def runs(self) -> dict[str, dict]:
+        with self._lock:
+            version = self._stored_version()
+            if self._runs is None or version is None or version != self._version:
+                self._runs = load_registry(self.state_dir)
+                self._version = version
+            return self._runs
+
+    def lookup(self, run_id: str) -> dict | None:
+        return self.runs().get(run_id)
+
+    def _wrote(self, run_id: str, version: int | None) -> None:
+        with self._lock:
+            if version is None or self._runs is None or self._version is None or version != self._version + 1:
+                # Not (only) our write since the copy was taken: leave it for runs() to reload.
+                return
+            entry = lookup_run(self.state_dir, run_id)
+            if isinstance(entry, dict):
+                # Copy on write: a reader may be iterating the previous dict (runs.json export).
+                self._runs = {**self._runs, run_id: entry}
+            self._version = version
+
+    def register(self, **kwargs: Any) -> None:
+        self._wrote(kwargs["run_id"], register_run(state_dir=self.state_dir, **kwargs))
+
+    def update_artifacts(self, run_id: str, patch: dict[str, object]) -> None:
+        self._wrote(run_id, update_run_artifacts(self.state_dir, run_id, patch))
+
+    def export_json(self) -> None:
+        export_registry_json(self.state_dir, runs=self.runs())
+
+
 def register_existing_run_dir(*, run_dir: Path, state_dir: str, note: str | None = None) -> str:
     run_id = run_dir.name
-    base = _base_dir_for_state(resolve_state_paths(state_dir).state_dir)
+    base = base_dir_for_state(resolve_state_paths(state_dir).state_dir)
     parent_run_id = None
 
     # Fingerprint from staged manifest if present; otherwise fingerprint the run_dir content itself.
@@ -296,5 +482,6 @@ def register_existing_run_dir(*, run_dir: Path, state_dir: str, note: str | None
         note=note,
         artifacts=artifacts,
     )
+    export_registry_json(state_dir)
     write_last_run_id(state_dir, run_id)
     return run_id
@@ -0,0 +1,131 @@
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+def _duckdb_available() -> bool:
+    try:
+        import duckdb  # noqa: F401
+
+        return True
+    except Exception:
+        return False
+
+
+def _export_xml(value: int) -> str:
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<HealthData>
+  <Me name="John Doe" />
+  <Record type="HKQuantityTypeIdentifierHeartRate" unit="count/min" value="{value}" startDate="2020-01-01 00:00:00 -0500" endDate="2020-01-01 00:00:00 -0500"/>
+</HealthData>
+"""
+
+
+class TestRunBatch(unittest.TestCase):
+    @unittest.skipUnless(_duckdb_available(), "duckdb not installed in this environment")
+    def test_run_batch_runs_exports_in_parallel_with_consistent_shared_state(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            inputs = []
+            for i, value in enumerate([70, 71, 72]):
+                d = root / f"John Doe export {i}"
+                d.mkdir(parents=True, exist_ok=True)
+                (d / "export.xml").write_text(_export_xml(value), encoding="utf-8")
+                inputs.append(d)
+            # Same content as export 0: must land on the same run_id without clobbering it.
+            dup = root / "John Doe export dup"
+            dup.mkdir(parents=True, exist_ok=True)
+            (dup / "export.xml").write_text(_export_xml(70), encoding="utf-8")
+            inputs.append(dup)
+
+            inputs_file = root / "list.txt"
+            inputs_file.write_text("# nightly\n" + "".join(f"{p}\n" for p in inputs) + "\n", encoding="utf-8")
+
+            base_out = root / "out"
+            summary_path = root / "batch_summary.json"
+            proc = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "healthdelta",
+                    "run",
+                    "batch",
+                    "--inputs-file",
+                    str(inputs_file),
+                    "--out",
+                    str(base_out),
+                    "--workers",
+                    "4",
+                    "--summary-out",
+                    str(summary_path),
+                ],
+                capture_output=True,
+                text=True,
+            )
+            self.assertEqual(proc.returncode, 0, msg=f"stdout={proc.stdout}\nstderr={proc.stderr}")
+            self.assertNotIn("John Doe", proc.stdout + proc.stderr)
+            self.assertIn("batch exports=4 failed=0", proc.stdout)
+
+            summary = json.loads(summary_path.read_text(encoding="utf-8"))
+            exports = summary["exports"]
+            self.assertEqual([e["index"] for e in exports], [1, 2, 3, 4])
+            for e in exports:
+                self.assertIn(e["status"], {"created", "no_changes"})
+                self.assertIsInstance(e["elapsed_s"], float)
+            self.assertEqual(exports[0]["run_id"], exports[3]["run_id"])
+            self.assertEqual(len({e["run_id"] for e in exports}), 3)
+
+            # Registry holds every run despite concurrent writers.
+            registry = json.loads((base_out / "state" / "runs.json").read_text(encoding="utf-8"))
+            self.assertEqual(sorted(registry["runs"]), sorted({e["run_id"] for e in exports}))
+            for run_id in registry["runs"]:
+                self.assertTrue((base_out / run_id / "note" / "doctor_note.txt").exists())
+            self.assertTrue((base_out / "state" / "identity" / "people.json").exists())
+
+    @unittest.skipUnless(_duckdb_available(), "duckdb not installed in this environment")
+    def test_run_batch_shared_state_last_run_follows_input_order(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            inputs = []
+            for i, value in enumerate([80, 81, 82]):
+                d = root / f"export {i}"
+                d.mkdir(parents=True, exist_ok=True)
+                (d / "export.xml").write_text(_export_xml(value), encoding="utf-8")
+                inputs.append(d)
+
+            base_out = root / "out"
+            for order in (inputs, list(reversed(inputs))):
+                inputs_file = root / "list.txt"
+                inputs_file.write_text("".join(f"{p}\n" for p in order), encoding="utf-8")
+                summary_path = root / "batch_summary.json"
+                proc = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "healthdelta",
+                        "run",
+                        "batch",
+                        "--inputs-file",
+                        str(inputs_file),
+                        "--out",
+                        str(base_out),
+                        "--workers",
+                        "3",
+                        "--summary-out",
+                        str(summary_path),
+                    ],
+                    capture_output=True,
+                    text=True,
+                )
+                self.assertEqual(proc.returncode, 0, msg=f"stdout={proc.stdout}\nstderr={proc.stderr}")
+                exports = json.loads(summary_path.read_text(encoding="utf-8"))["exports"]
+                last_run = (base_out / "state" / "LAST_RUN").read_text(encoding="utf-8").strip()
+                # The last export listed, not whichever worker finished last.
+                self.assertEqual(last_run, exports[-1]["run_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
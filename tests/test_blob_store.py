@@ -0,0 +1,105 @@
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+
+EXPORT_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<HealthData>
+  <Record type="HKQuantityTypeIdentifierStepCount" value="{value}" />
+</HealthData>
+"""
+
+
+def _write_json(path: Path, obj: object) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(obj, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def _run(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-m", "healthdelta", *args], capture_output=True, text=True)
+
+
+def _stdout_kv(stdout: str) -> dict[str, str]:
+    return dict(tok.split("=", 1) for tok in stdout.split() if "=" in tok)
+
+
+class TestBlobStore(unittest.TestCase):
+    def test_runs_share_blobs_and_gc_removes_unreferenced(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            input_dir = root / "export_dir"
+            (input_dir / "clinical-records").mkdir(parents=True, exist_ok=True)
+            _write_json(input_dir / "clinical-records" / "patient.json", {"resourceType": "Patient", "id": "p1"})
+            _write_json(input_dir / "clinical-records" / "obs.json", {"resourceType": "Observation", "id": "o1"})
+            base = root / "out"
+            state = base / "state"
+
+            run_dirs = []
+            for value in ("1", "2"):
+                (input_dir / "export.xml").write_text(EXPORT_XML.format(value=value), encoding="utf-8")
+                result = _run("pipeline", "run", "--input", str(input_dir), "--out", str(base))
+                self.assertEqual(result.returncode, 0, msg=f"stdout={result.stdout}\nstderr={result.stderr}")
+                run_dirs.append(base / "staging" / _stdout_kv(result.stdout)["run_id"])
+            self.assertNotEqual(run_dirs[0], run_dirs[1])
+
+            # Unchanged clinical files are one inode across runs; the changed export.xml is not.
+            obs = [(d / "source" / "clinical" / "clinical-records" / "obs.json").stat() for d in run_dirs]
+            self.assertEqual(obs[0].st_ino, obs[1].st_ino)
+            self.assertEqual(obs[0].st_nlink, 3)
+            xml = [(d / "source" / "export.xml").stat() for d in run_dirs]
+            self.assertNotEqual(xml[0].st_ino, xml[1].st_ino)
+            manifest = json.loads((run_dirs[0] / "manifest.json").read_text(encoding="utf-8"))
+            blobs = sorted(p.name for p in (state / "blobs" / "sha256").glob("*/*"))
+            self.assertEqual(len(blobs), 4)
+            self.assertTrue({f["sha256"] for f in manifest["files"]} <= set(blobs))
+
+            result = _run("gc", "--state", str(state))
+            self.assertEqual(result.returncode, 0, msg=result.stderr)
+            self.assertEqual(_stdout_kv(result.stdout)["removed"], "0")
+
+            # Deleting the first run's staging dir leaves its export.xml blob unreferenced.
+            shutil.rmtree(run_dirs[0])
+            result = _run("gc", "--state", str(state), "--dry-run")
+            kv = _stdout_kv(result.stdout)
+            self.assertEqual((kv["removed"], kv["dry_run"]), ("1", "1"))
+            self.assertEqual(int(kv["freed_bytes"]), xml[0].st_size)
+            self.assertEqual(len(list((state / "blobs" / "sha256").glob("*/*"))), 4)
+
+            result = _run("gc", "--state", str(state))
+            self.assertEqual(_stdout_kv(result.stdout)["removed"], "1")
+            self.assertEqual(len(list((state / "blobs" / "sha256").glob("*/*"))), 3)
+            self.assertTrue((run_dirs[1] / "source" / "export.xml").exists())
+
+    def test_gc_waits_for_staging_holding_the_store_lock(self) -> None:
+        from healthdelta.blob_store import blob_path, store_lock
+
+        with tempfile.TemporaryDirectory() as td:
+            state = Path(td) / "out" / "state"
+            store = state / "blobs"
+            blob = blob_path(store, "ab" * 32)
+            blob.parent.mkdir(parents=True)
+            blob.write_bytes(b"adopted, not yet referenced")
+
+            with store_lock(store, shared=True):
+                proc = subprocess.Popen(
+                    [sys.executable, "-m", "healthdelta", "gc", "--state", str(state)],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                )
+                time.sleep(1.0)
+                self.assertIsNone(proc.poll())
+                self.assertTrue(blob.exists())
+            stdout, stderr = proc.communicate(timeout=60)
+            self.assertEqual(proc.returncode, 0, msg=stderr)
+            self.assertEqual(_stdout_kv(stdout)["removed"], "1")
+            self.assertFalse(blob.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+def _duckdb_available() -> bool:
+    try:
+        import duckdb  # noqa: F401
+
+        return True
+    except Exception:
+        return False
+
+
+EXPORT_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<HealthData>
+  <Me name="John Doe" />
+  <Record type="HKQuantityTypeIdentifierHeartRate" unit="count/min" value="72" startDate="2020-01-01 00:00:00 -0500" endDate="2020-01-01 00:00:00 -0500"/>
+</HealthData>
+"""
+
+
+def _stdout_kv(stdout: str) -> dict[str, str]:
+    out: dict[str, str] = {}
+    for line in stdout.splitlines():
+        if "=" not in line or line.startswith("daemon "):
+            continue
+        k, v = line.split("=", 1)
+        if k.strip():
+            out[k.strip()] = v.strip()
+    return out
+
+
+class TestDaemon(unittest.TestCase):
+    @unittest.skipUnless(_duckdb_available(), "duckdb not installed in this environment")
+    def test_daemon_once_processes_settled_exports_and_skips_seen(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            inbox = root / "inbox"
+            export_dir = inbox / "John Doe export"
+            export_dir.mkdir(parents=True, exist_ok=True)
+            (export_dir / "export.xml").write_text(EXPORT_XML, encoding="utf-8")
+            # In-flight copies are ignored.
+            (inbox / "next.zip.partial").write_bytes(b"incomplete")
+
+            base_out = root / "out"
+            cmd = [
+                sys.executable,
+                "-m",
+                "healthdelta",
+                "daemon",
+                "--watch",
+                str(inbox),
+                "--out",
+                str(base_out),
+                "--once",
+                "--interval",
+                "0.1",
+            ]
+
+            run1 = subprocess.run(cmd, capture_output=True, text=True)
+            self.assertEqual(run1.returncode, 0, msg=f"stdout={run1.stdout}\nstderr={run1.stderr}")
+            self.assertIn("daemon processed=1 failed=0", run1.stdout)
+            self.assertNotIn("John Doe", run1.stdout + run1.stderr)
+
+            kv = _stdout_kv(run1.stdout)
+            self.assertEqual(kv.get("status"), "created")
+            run_id = kv["run_id"]
+            self.assertTrue((base_out / run_id / "reports" / "summary.json").exists())
+            self.assertTrue((base_out / run_id / "note" / "doctor_note.txt").exists())
+
+            seen = json.loads((base_out / "state" / "daemon_seen.json").read_text(encoding="utf-8"))
+            self.assertEqual(len(seen["seen"]), 1)
+            self.assertNotIn("John Doe", json.dumps(seen))
+
+            # Unchanged inbox: nothing new to process.
+            run2 = subprocess.run(cmd, capture_output=True, text=True)
+            self.assertEqual(run2.returncode, 0, msg=f"stdout={run2.stdout}\nstderr={run2.stderr}")
+            self.assertIn("daemon processed=0 failed=0", run2.stdout)
+
+    @unittest.skipUnless(_duckdb_available(), "duckdb not installed in this environment")
+    def test_daemon_overlapping_exports_chain_in_arrival_order(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            inbox = root / "inbox"
+            for i, (name, value) in enumerate([("b first", "72"), ("a second", "80")]):
+                export_dir = inbox / name
+                export_dir.mkdir(parents=True, exist_ok=True)
+                xml = export_dir / "export.xml"
+                xml.write_text(EXPORT_XML.replace('value="72"', f'value="{value}"'), encoding="utf-8")
+                # Arrival order is mtime order, not name order.
+                os.utime(xml, ns=(1_600_000_000_000_000_000 + i, 1_600_000_000_000_000_000 + i))
+
+            base_out = root / "out"
+            cmd = [
+                sys.executable,
+                "-m",
+                "healthdelta",
+                "daemon",
+                "--watch",
+                str(inbox),
+                "--out",
+                str(base_out),
+                "--max-exports",
+                "2",
+                "--once",
+                "--interval",
+                "0.1",
+            ]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            self.assertEqual(proc.returncode, 0, msg=f"stdout={proc.stdout}\nstderr={proc.stderr}")
+            self.assertIn("daemon processed=2 failed=0", proc.stdout)
+
+            runs = json.loads((base_out / "state" / "runs.json").read_text(encoding="utf-8"))["runs"]
+            self.assertEqual(len(runs), 2)
+            first = next(r for r in runs.values() if r["parent_run_id"] is None)
+            second = next(r for r in runs.values() if r["parent_run_id"] is not None)
+            self.assertEqual(second["parent_run_id"], first["run_id"])
+            last_run = (base_out / "state" / "LAST_RUN").read_text(encoding="utf-8").strip()
+            self.assertEqual(last_run, second["run_id"])
+            for run_id in runs:
+                self.assertTrue((base_out / run_id / "reports" / "summary.json").exists())
+                self.assertTrue((base_out / run_id / "note" / "doctor_note.txt").exists())
+            # The warm DuckDB connection detached every run DB: they open normally afterwards.
+            import duckdb
+
+            for run_id in runs:
+                con = duckdb.connect(str(base_out / run_id / "duckdb" / "run.duckdb"), read_only=True)
+                try:
+                    self.assertEqual(con.execute("SELECT COUNT(*) FROM observations;").fetchone()[0], 1)
+                finally:
+                    con.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
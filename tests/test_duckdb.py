@@ -166,3 +166,87 @@ class TestDuckdbLoader(unittest.TestCase):
             self.assertEqual(q1b.returncode, 0, msg=f"stdout={q1b.stdout}\nstderr={q1b.stderr}")
             rows = list(csv.DictReader(q1b.stdout.splitlines()))
             self.assertEqual(rows[0]["n"], "3")
+
+    @unittest.skipUnless(_duckdb_available(), "duckdb not installed in this environment")
+    def test_rollups_update_incrementally_and_match_raw_rows(self) -> None:
+        import duckdb
+
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            ndjson = root / "ndjson"
+            rows = [
+                '{"record_key":"k1","canonical_person_id":"person-1","source":"healthkit","source_file":"source/export.xml","event_time":"2020-01-01T05:00:00Z","run_id":"run-1","hk_type":"HKQuantityTypeIdentifierHeartRate"}',
+                '{"record_key":"k2","canonical_person_id":"person-2","source":"fhir","source_file":"source/clinical/obs.json","event_time":"2020-01-02T01:00:00Z","run_id":"run-1","resource_type":"Observation"}',
+                '{"record_key":"k3","canonical_person_id":"person-1","source":"healthkit","source_file":"source/export.xml","event_time":"2020-01-01T09:00:00Z","run_id":"run-2","hk_type":"HKQuantityTypeIdentifierHeartRate"}',
+            ]
+            # No person and no event time: NULL rollup keys, merged into the same group on the second load.
+            undated = [
+                '{"record_key":"k4","source":"healthkit","source_file":"source/export.xml","run_id":"run-1","hk_type":"HKQuantityTypeIdentifierStepCount"}',
+                '{"record_key":"k5","source":"healthkit","source_file":"source/export.xml","run_id":"run-1","hk_type":"HKQuantityTypeIdentifierStepCount"}',
+            ]
+            _write_text(ndjson / "documents.ndjson", "")
+            db_path = root / "out.duckdb"
+
+            def build(observations: list[str]) -> None:
+                _write_text(ndjson / "observations.ndjson", "\n".join(observations) + "\n")
+                p = subprocess.run(
+                    [sys.executable, "-m", "healthdelta", "duckdb", "build", "--input", str(ndjson), "--db", str(db_path)],
+                    capture_output=True,
+                    text=True,
+                )
+                self.assertEqual(p.returncode, 0, msg=f"stdout={p.stdout}\nstderr={p.stderr}")
+
+            # Second load re-offers k2 (deduped) and adds k3; rollups must count each record once.
+            def fingerprint() -> str:
+                con = duckdb.connect(str(db_path), read_only=True)
+                try:
+                    return con.execute("SELECT value FROM healthdelta_meta WHERE key='content_fingerprint';").fetchone()[0]
+                finally:
+                    con.close()
+
+            build(rows[:2] + undated[:1])
+            first = fingerprint()
+            build(rows[:2] + undated[:1])
+            self.assertEqual(fingerprint(), first, msg="no-op rebuild must keep the content fingerprint")
+            build(rows[1:] + undated)
+            self.assertNotEqual(fingerprint(), first)
+
+            con = duckdb.connect(str(db_path), read_only=True)
+            try:
+                daily = con.execute(
+                    "SELECT canonical_person_id, day, record_type, n FROM rollup_daily_counts ORDER BY ALL;"
+                ).fetchall()
+                person = con.execute(
+                    "SELECT canonical_person_id, run_id, n FROM rollup_person_span ORDER BY ALL;"
+                ).fetchall()
+            finally:
+                con.close()
+            self.assertEqual(
+                [(p, d and str(d), n) for p, d, _, n in daily],
+                [("person-1", "2020-01-01", 2), ("person-2", "2020-01-02", 1), (None, None, 2)],
+            )
+            self.assertEqual(
+                person, [("person-1", "run-1", 1), ("person-1", "run-2", 1), ("person-2", "run-1", 1), (None, "run-1", 2)]
+            )
+
+            # Reports from rollups must match reports computed from raw rows.
+            raw_db = root / "raw.duckdb"
+            con = duckdb.connect(str(raw_db))
+            try:
+                con.execute(f"ATTACH '{db_path}' AS src (READ_ONLY);")
+                con.execute("CREATE TABLE observations AS SELECT * FROM src.observations;")
+                con.execute("CREATE TABLE documents AS SELECT * FROM src.documents;")
+            finally:
+                con.close()
+
+            for db, out in [(db_path, root / "rep_rollup"), (raw_db, root / "rep_raw")]:
+                p = subprocess.run(
+                    [sys.executable, "-m", "healthdelta", "report", "build", "--db", str(db), "--out", str(out)],
+                    capture_output=True,
+                    text=True,
+                )
+                self.assertEqual(p.returncode, 0, msg=f"stdout={p.stdout}\nstderr={p.stderr}")
+            for name in ["coverage_by_person.csv", "coverage_by_source.csv", "timeline_daily_counts.csv", "summary.md"]:
+                self.assertEqual(
+                    (root / "rep_rollup" / name).read_bytes(), (root / "rep_raw" / name).read_bytes(), msg=name
+                )
@@ -0,0 +1,85 @@
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from healthdelta import fhir_stream
+
+
+BUNDLE = {
+    "resourceType": "Bundle",
+    "type": "collection",
+    "meta": {"lastUpdated": "2020-01-01T00:00:00Z", "tag": [1, 2.5, True, None]},
+    "entry": [
+        {"fullUrl": "urn:1", "resource": {"resourceType": "Patient", "id": "p1", "name": [{"text": "John Doe"}]}},
+        {"resource": {"resourceType": "Observation", "id": "o1", "valueQuantity": {"value": 123456789}}},
+        {"resource": {"resourceType": "Condition", "id": "c1", "note": [{"text": "John Doe é \"q\""}]}},
+    ],
+    "total": 3,
+}
+
+
+class TestFhirStream(unittest.TestCase):
+    def test_iter_members_matches_json_loads_across_chunk_boundaries(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            p = Path(td) / "bundle.json"
+            p.write_text(json.dumps(BUNDLE, indent=1), encoding="utf-8")
+            for chunk in (3, 7, 64, 1 << 20):
+                with mock.patch.object(fhir_stream, "_CHUNK_CHARS", chunk):
+                    members = list(fhir_stream.iter_members(p))
+                rebuilt = {m.key: m.value for m in members if not m.item}
+                rebuilt["entry"] = [m.value for m in members if m.item]
+                self.assertEqual(rebuilt, BUNDLE)
+                self.assertEqual([m.key for m in members if not m.item], list(BUNDLE))
+
+            # Numbers cut by a read (`12.`, `1e`, `-`) must be read whole: the first read ends at every offset.
+            numbers = {
+                "resourceType": "Bundle",
+                "entry": [{"valueQuantity": {"value": v}} for v in (12.5, -0.25, 1e-07, 6.02e23, 123456789, -7)],
+                "total": 1.5e300,
+            }
+            text = json.dumps(numbers)
+            p.write_text(text, encoding="utf-8")
+            for chunk in range(1, len(text) + 1):
+                with mock.patch.object(fhir_stream, "_CHUNK_CHARS", chunk):
+                    members = list(fhir_stream.iter_members(p))
+                self.assertEqual([m.value for m in members if m.item], numbers["entry"], msg=f"chunk={chunk}")
+                self.assertEqual(members[-1].value, numbers["total"], msg=f"chunk={chunk}")
+
+            p.write_text(json.dumps(BUNDLE)[:-20], encoding="utf-8")
+            with self.assertRaises(json.JSONDecodeError):
+                list(fhir_stream.iter_members(p))
+
+    def test_write_sorted_json_matches_json_dumps(self) -> None:
+        for obj in (BUNDLE, {**BUNDLE, "entry": []}, {}):
+            buf = io.StringIO()
+            members = {k: ([] if k == "entry" else v) for k, v in obj.items()}
+            fhir_stream.write_sorted_json(buf, members, stream_key="entry", items=iter(obj.get("entry", [])))
+            self.assertEqual(buf.getvalue(), json.dumps(obj, indent=2, sort_keys=True) + "\n")
+
+    def test_large_bundles_stream_through_identity_and_deid_with_identical_results(self) -> None:
+        from healthdelta.deid import PersonPseudonym, _deid_fhir_json, _deid_large_bundle
+        from healthdelta.identity import _scan_patients, _scan_patients_streamed
+
+        people = [PersonPseudonym(canonical_person_id="k1", first_norm="john", last_norm="doe", label="Patient 1")]
+        with tempfile.TemporaryDirectory() as td:
+            src = Path(td) / "bundle.json"
+            src.write_text(json.dumps(BUNDLE), encoding="utf-8")
+
+            with mock.patch.object(fhir_stream, "STREAM_THRESHOLD_BYTES", 1):
+                self.assertTrue(fhir_stream.is_large_bundle(src))
+                self.assertEqual(_scan_patients_streamed(src), _scan_patients(src.read_bytes()))
+
+                dst = Path(td) / "deid.json"
+                _deid_large_bundle(src, dst, people)
+                expected = json.dumps(_deid_fhir_json(json.loads(src.read_text()), people), indent=2, sort_keys=True)
+                self.assertEqual(dst.read_text(encoding="utf-8"), expected + "\n")
+                self.assertNotIn("John Doe", dst.read_text(encoding="utf-8"))
+
+            self.assertFalse(fhir_stream.is_large_bundle(src))
+
+
+if __name__ == "__main__":
+    unittest.main()
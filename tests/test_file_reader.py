@@ -0,0 +1,56 @@
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from healthdelta.file_reader import map_files, scan_files
+
+
+class TestFileReader(unittest.TestCase):
+    def test_scan_files_matches_sorted_rglob(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            for rel in ["b.json", "a/x.json", "a-b/y.json", "a/deep/z.json", "a/notes.txt", ".hidden.json"]:
+                (root / rel).parent.mkdir(parents=True, exist_ok=True)
+                (root / rel).write_text("{}", encoding="utf-8")
+            (root / "dir.json").mkdir()
+
+            expected = sorted([p for p in root.rglob("*.json") if p.is_file()])
+            self.assertEqual(scan_files(root, suffix=".json"), expected)
+            self.assertEqual(scan_files(root / "missing", suffix=".json"), [])
+
+    def test_map_files_keeps_input_order_with_bounded_concurrency(self) -> None:
+        lock = threading.Lock()
+        active = 0
+        peak = 0
+
+        def slow(i: int) -> int:
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01 * (i % 3))
+            with lock:
+                active -= 1
+            return i * i
+
+        out = list(map_files(slow, range(40), workers=4))
+        self.assertEqual(out, [(i, i * i) for i in range(40)])
+        self.assertLessEqual(peak, 4)
+        self.assertGreater(peak, 1)
+
+        def boom(i: int) -> int:
+            if i == 5:
+                raise ValueError("bad")
+            return i
+
+        seen = []
+        with self.assertRaises(ValueError):
+            for i, _ in map_files(boom, range(10), workers=3):
+                seen.append(i)
+        self.assertEqual(seen, [0, 1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -145,6 +145,131 @@ class TestIdentityBuild(unittest.TestCase):
             link_person_keys = sorted([l["person_key"] for l in link_list if isinstance(l, dict) and isinstance(l.get("person_key"), str)])
             self.assertEqual(len(set(link_person_keys)), 2)
 
+    def test_store_imports_legacy_json_and_updates_incrementally(self) -> None:
+        from healthdelta.identity import IDENTITY_DB, build_identity, load_external_id_map, load_people
+
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            identity_dir = root / "identity"
+
+            def stage(run_id: str, patients: list[dict]) -> Path:
+                run_dir = root / "staging" / run_id
+                clinical_rel = "source/unpacked/clinical/patient.json"
+                _write_json(run_dir / clinical_rel, {"resourceType": "Bundle", "entry": [{"resource": p} for p in patients]})
+                _write_json(run_dir / "layout.json", {"run_id": run_id, "clinical_json": [clinical_rel]})
+                return run_dir
+
+            john = {"resourceType": "Patient", "id": "p1", "name": [{"text": "John Doe"}]}
+            build_identity(staging_run_dir=str(stage("run1", [john])), output_dir=str(identity_dir))
+            person_key = load_people(identity_dir)[0]["person_key"]
+
+            # A JSON-only identity dir (pre-store layout) is imported on the next build.
+            (identity_dir / IDENTITY_DB).unlink()
+            for extra in ("-wal", "-shm"):
+                (identity_dir / (IDENTITY_DB + extra)).unlink(missing_ok=True)
+            self.assertEqual(load_external_id_map(identity_dir), {("fhir:id", "p1"): person_key})
+            aliases_before = (identity_dir / "aliases.json").read_bytes()
+
+            jane = {"resourceType": "Patient", "id": "p2", "name": [{"text": "Jane Roe"}]}
+            build_identity(
+                staging_run_dir=str(stage("run2", [john, jane])), output_dir=str(identity_dir), export_aliases=False
+            )
+            self.assertTrue((identity_dir / IDENTITY_DB).exists())
+            self.assertEqual((identity_dir / "aliases.json").read_bytes(), aliases_before)
+
+            people = load_people(identity_dir)
+            self.assertEqual(len(people), 2)
+            mapping = load_external_id_map(identity_dir)
+            self.assertEqual(mapping[("fhir:id", "p1")], person_key)
+            self.assertNotEqual(mapping[("fhir:id", "p2")], person_key)
+
+            # Re-running the same staged run adds nothing; the aliases export then reflects the store.
+            build_identity(staging_run_dir=str(stage("run2", [john, jane])), output_dir=str(identity_dir))
+            aliases = json.loads((identity_dir / "aliases.json").read_text(encoding="utf-8"))["aliases"]
+            self.assertEqual(len(aliases), 3)
+            self.assertEqual(len({a["alias_key"] for a in aliases}), 3)
+            self.assertEqual(len(load_people(identity_dir)), 2)
+
+    def test_external_id_seen_with_another_person_maps_to_the_last_alias(self) -> None:
+        from healthdelta.identity import build_identity, load_external_id_map
+
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            identity_dir = root / "identity"
+            people = [
+                {"person_key": "k_doe", "first_norm": "john", "last_norm": "doe", "created_at": "2020-01-01T00:00:00Z"},
+                {"person_key": "k_roe", "first_norm": "jane", "last_norm": "roe", "created_at": "2020-01-01T00:00:00Z"},
+            ]
+            external = [{"system": "fhir:id", "value": "p1"}]
+            aliases = [
+                {
+                    "alias_key": f"a_{p['last_norm']}",
+                    "person_key": p["person_key"],
+                    "first_norm": p["first_norm"],
+                    "last_norm": p["last_norm"],
+                    "source": {"run_id": "run0", "external_ids": external},
+                }
+                for p in people
+            ]
+            _write_json(identity_dir / "people.json", {"people": people})
+            _write_json(identity_dir / "aliases.json", {"aliases": aliases})
+            self.assertEqual(load_external_id_map(identity_dir), {("fhir:id", "p1"): "k_roe"})
+
+            # The store (imported on the next build) resolves the conflicting id like the JSON files did.
+            run_dir = root / "staging" / "run1"
+            clinical_rel = "source/unpacked/clinical/patient.json"
+            patient = {"resourceType": "Patient", "id": "p9", "name": [{"text": "Ann Poe"}]}
+            _write_json(run_dir / clinical_rel, {"resourceType": "Bundle", "entry": [{"resource": patient}]})
+            _write_json(run_dir / "layout.json", {"run_id": "run1", "clinical_json": [clinical_rel]})
+            build_identity(staging_run_dir=str(run_dir), output_dir=str(identity_dir), export_aliases=False)
+            self.assertEqual(load_external_id_map(identity_dir)[("fhir:id", "p1")], "k_roe")
+
+    def test_patient_scan_prefilters_and_reuses_cached_file_scans(self) -> None:
+        import hashlib
+
+        from healthdelta.identity import _iter_fhir_resources, _scan_patients, build_identity, load_people
+
+        nested = {
+            "resourceType": "Bundle",
+            "entry": [
+                {"resource": {"resourceType": "Patient", "contained": [{"resourceType": "Observation"}]}},
+                {"resource": {"resourceType": "Condition"}},
+            ],
+        }
+        self.assertEqual(
+            [r["resourceType"] for r in _iter_fhir_resources(nested)], ["Bundle", "Patient", "Observation", "Condition"]
+        )
+        # No Patient resourceType in the bytes: not parsed at all (even if the JSON is broken).
+        self.assertEqual(_scan_patients(b'{"resourceType": "Observation", '), [])
+
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            identity_dir = root / "identity"
+            run_dir = root / "staging" / "run1"
+            patient_rel = "source/unpacked/clinical/patient.json"
+            obs_rel = "source/unpacked/clinical/obs.json"
+            _write_json(run_dir / patient_rel, {"resourceType": "Patient", "id": "p1", "name": [{"text": "John Doe"}]})
+            _write_json(run_dir / obs_rel, {"resourceType": "Observation", "id": "o1"})
+            _write_json(run_dir / "layout.json", {"run_id": "run1", "clinical_json": [obs_rel, patient_rel]})
+            _write_json(
+                run_dir / "manifest.json",
+                {
+                    "files": [
+                        {"path": rel, "sha256": hashlib.sha256((run_dir / rel).read_bytes()).hexdigest()}
+                        for rel in (obs_rel, patient_rel)
+                    ]
+                },
+            )
+            build_identity(staging_run_dir=str(run_dir), output_dir=str(identity_dir))
+            self.assertEqual(len(load_people(identity_dir)), 1)
+
+            # Unchanged manifest digests: the cached scan is used and the files are not read again.
+            (run_dir / patient_rel).unlink()
+            (run_dir / obs_rel).unlink()
+            build_identity(staging_run_dir=str(run_dir), output_dir=str(identity_dir))
+            people = load_people(identity_dir)
+            self.assertEqual([(p["first_norm"], p["last_norm"]) for p in people], [("john", "doe")])
+
 
 if __name__ == "__main__":
     unittest.main()
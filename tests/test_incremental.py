@@ -213,6 +213,64 @@ class TestIncrementalRuns(unittest.TestCase):
             self.assertEqual(reg2.returncode, 0, msg=f"stdout={reg2.stdout}\nstderr={reg2.stderr}")
             self.assertEqual((state_dir / "runs.json").read_bytes(), runs_bytes_1)
 
+    def test_registry_store_imports_legacy_json_and_serializes_concurrent_writers(self) -> None:
+        import concurrent.futures
+
+        from healthdelta.state import (
+            export_registry_json,
+            load_registry,
+            lookup_run,
+            register_run,
+            update_run_artifacts,
+        )
+
+        with tempfile.TemporaryDirectory() as td:
+            state_dir = Path(td) / "state"
+            legacy = {
+                "run_id": "run_a",
+                "created_at": "2020-01-01T00:00:00Z",
+                "input_fingerprint": {"sha256": "a" * 64},
+                "parent_run_id": None,
+                "notes": None,
+                "artifacts": {},
+            }
+            _write_json(state_dir / "runs.json", {"schema_version": 1, "runs": {"run_a": legacy}})
+            legacy_bytes = (state_dir / "runs.json").read_bytes()
+
+            # Reads before the first write come from the legacy file and create nothing.
+            self.assertEqual(lookup_run(str(state_dir), "run_a"), legacy)
+            self.assertFalse((state_dir / "registry.sqlite").exists())
+
+            def register(i: int) -> None:
+                register_run(
+                    state_dir=str(state_dir),
+                    run_id=f"run_{i:02d}",
+                    input_fingerprint={"sha256": f"{i:064d}"},
+                    parent_run_id="run_a",
+                    note=None,
+                    artifacts={},
+                    created_at="2020-01-02T00:00:00Z",
+                )
+                update_run_artifacts(str(state_dir), f"run_{i:02d}", {"reports_dir": f"run_{i:02d}/reports"})
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(register, range(16)))
+
+            runs = load_registry(str(state_dir))
+            self.assertEqual(len(runs), 17)
+            self.assertEqual(runs["run_a"], legacy)
+            self.assertEqual(runs["run_07"]["artifacts"], {"reports_dir": "run_07/reports"})
+            children = sorted(k for k, v in runs.items() if v["parent_run_id"] == "run_a")
+            self.assertEqual(children, [f"run_{i:02d}" for i in range(16)])
+            with self.assertRaises(KeyError):
+                update_run_artifacts(str(state_dir), "missing", {"reports_dir": "x"})
+
+            # runs.json is only a mirror: untouched until exported, then the same shape as before.
+            self.assertEqual((state_dir / "runs.json").read_bytes(), legacy_bytes)
+            export_registry_json(str(state_dir))
+            exported = json.loads((state_dir / "runs.json").read_text(encoding="utf-8"))
+            self.assertEqual(exported, {"schema_version": 1, "runs": runs})
+
 
 if __name__ == "__main__":
     unittest.main()
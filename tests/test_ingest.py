@@ -33,9 +33,9 @@ def _read_json(path: Path) -> dict:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def _run_ingest(input_path: Path, staging_root: Path) -> Path:
+def _run_ingest(input_path: Path, staging_root: Path, *extra: str) -> Path:
     result = subprocess.run(
-        [sys.executable, "-m", "healthdelta", "ingest", "--input", str(input_path), "--out", str(staging_root)],
+        [sys.executable, "-m", "healthdelta", "ingest", "--input", str(input_path), "--out", str(staging_root), *extra],
         capture_output=True,
         text=True,
     )
@@ -136,6 +136,190 @@ class TestIngest(unittest.TestCase):
             manifest_2.pop("timestamps", None)
             self.assertEqual(manifest_1, manifest_2)
 
+    def test_zip_members_hashed_and_counted_while_extracting(self) -> None:
+        import hashlib
+
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            # `<Record` tokens straddle the 1 MiB read boundary at several offsets.
+            body = "".join(f'{"x" * (1024 * 1024 - 3 - i)}<Record i="{i}"/>\n' for i in range(6))
+            zip_path = root / "export.zip"
+            with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr("apple_health_export/export.xml", "<HealthData>\n" + body + "</HealthData>\n")
+                for i in range(20):
+                    zf.writestr(f"apple_health_export/clinical-records/r{i:02d}.json", json.dumps({"id": i}))
+
+            runs = []
+            for workers in ("1", "4"):
+                out = root / f"staging_{workers}"
+                result = subprocess.run(
+                    [sys.executable, "-m", "healthdelta", "--io-workers", workers, "ingest", "--input", str(zip_path), "--out", str(out)],
+                    capture_output=True,
+                    text=True,
+                )
+                self.assertEqual(result.returncode, 0, msg=result.stderr)
+                runs.append(next(out.iterdir()))
+
+            manifests = [_read_json(r / "manifest.json") for r in runs]
+            for m in manifests:
+                m.pop("timestamps")
+            self.assertEqual(manifests[0], manifests[1])
+            self.assertEqual(manifests[0]["counts"]["xml_record_count_estimate"], 6)
+            self.assertEqual([f["path"] for f in manifests[0]["files"]], sorted(f["path"] for f in manifests[0]["files"]))
+            for f in manifests[0]["files"]:
+                data = (runs[0] / f["path"]).read_bytes()
+                self.assertEqual((f["sha256"], f["size_bytes"]), (hashlib.sha256(data).hexdigest(), len(data)))
+
+    def test_virtual_zip_members_are_read_from_export_zip_and_verified(self) -> None:
+        from healthdelta import staged_source
+
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            export_zip = _make_export_zip(root, _make_unpacked_export(root))
+            run_extract = _run_ingest(export_zip, root / "staging_extract")
+            run_virtual = _run_ingest(export_zip, root / "staging_virtual", "--zip-members", "virtual")
+
+            layout = _read_json(run_virtual / "layout.json")
+            self.assertEqual(layout["export_xml"], "source/export.zip!/apple_health_export/export.xml")
+            self.assertEqual(layout["clinical_json"], ["source/export.zip!/apple_health_export/clinical_records/record.json"])
+            self.assertFalse((run_virtual / "source" / "unpacked").exists())
+
+            # Same digests and counts as extraction, under the virtual paths.
+            m_extract = _read_json(run_extract / "manifest.json")
+            m_virtual = _read_json(run_virtual / "manifest.json")
+            self.assertEqual(m_virtual["counts"], m_extract["counts"])
+            self.assertEqual(
+                sorted((staged_source.materialized_rel(f["path"]), f["sha256"]) for f in m_virtual["files"]),
+                sorted((f["path"], f["sha256"]) for f in m_extract["files"]),
+            )
+
+            # Export rows are identical (source_file reports the extracted location).
+            for run in (run_extract, run_virtual):
+                result = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "healthdelta",
+                        "export",
+                        "ndjson",
+                        "--input",
+                        str(run),
+                        "--out",
+                        str(root / "nd" / run.parent.name),
+                        "--mode",
+                        "local",
+                    ],
+                    capture_output=True,
+                    text=True,
+                )
+                self.assertEqual(result.returncode, 0, msg=f"stdout={result.stdout}\nstderr={result.stderr}")
+            for name in ("observations.ndjson", "documents.ndjson"):
+                self.assertEqual(
+                    (root / "nd" / "staging_extract" / name).read_bytes(),
+                    (root / "nd" / "staging_virtual" / name).read_bytes(),
+                )
+
+            # A member whose bytes no longer match manifest.json fails when read to the end.
+            record = run_virtual / layout["clinical_json"][0]
+            self.assertEqual(staged_source.read_bytes(record), CLINICAL_JSON.encode("utf-8"))
+
+            # Cached handles are bounded and closed on eviction or close_all; an open member keeps reading.
+            handles = staged_source._ZipHandles(maxsize=1)
+            first = handles._get(export_zip)[0]
+            handles._get(run_virtual / "source" / "export.zip")
+            self.assertIsNone(first.fp)
+            with staged_source.open_binary(record) as f:
+                head = f.read(5)
+                staged_source.close_all()
+                self.assertEqual(head + f.read(), CLINICAL_JSON.encode("utf-8"))
+            self.assertEqual(staged_source.read_bytes(record), CLINICAL_JSON.encode("utf-8"))
+            with zipfile.ZipFile(run_virtual / "source" / "export.zip", "w") as zf:
+                zf.writestr("apple_health_export/clinical_records/record.json", CLINICAL_JSON.replace("collection", "batch"))
+            with self.assertRaises(ValueError):
+                staged_source.read_bytes(record)
+
+    def test_interrupted_zip_ingest_resumes_completed_members(self) -> None:
+        from unittest import mock
+
+        from healthdelta import ingest
+
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            export_zip = _make_export_zip(root, _make_unpacked_export(root))
+            expected = _read_json(_run_ingest(export_zip, root / "expected") / "manifest.json")
+
+            extract = ingest._ZipMemberExtractor.extract
+            extracted: list[str] = []
+
+            def extract_or_crash(self, member, out_path, *, count_records):  # type: ignore[no-untyped-def]
+                if member.endswith("record.json") and not extracted:
+                    raise KeyboardInterrupt
+                return extract(self, member, out_path, count_records=count_records)
+
+            def spy(self, member, out_path, *, count_records):  # type: ignore[no-untyped-def]
+                extracted.append(member)
+                return extract(self, member, out_path, count_records=count_records)
+
+            staging_root = root / "staging"
+            # Members are extracted largest first: export.xml and export_cda.xml finish before record.json fails.
+            with mock.patch.object(ingest._ZipMemberExtractor, "extract", extract_or_crash):
+                with self.assertRaises(KeyboardInterrupt):
+                    ingest.ingest_to_staging(input_path=str(export_zip), staging_root=str(staging_root))
+            run_dir = staging_root / expected["run_id"]
+            self.assertTrue((run_dir / ingest.INGEST_CHECKPOINT).exists())
+            self.assertFalse((run_dir / "manifest.json").exists())
+
+            with mock.patch.object(ingest._ZipMemberExtractor, "extract", spy):
+                ingest.ingest_to_staging(input_path=str(export_zip), staging_root=str(staging_root))
+            self.assertEqual(extracted, ["apple_health_export/clinical_records/record.json"])
+            self.assertFalse((run_dir / ingest.INGEST_CHECKPOINT).exists())
+            manifest = _read_json(run_dir / "manifest.json")
+            for key in ("run_id", "files", "counts"):
+                self.assertEqual(manifest[key], expected[key])
+
+    def test_staging_modes_keep_layout_and_pin_inputs(self) -> None:
+        from healthdelta.ingest import ingest_to_staging, verify_staged_sources
+
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            export_dir = _make_unpacked_export(root)
+            run_copy = _run_ingest(export_dir, root / "staging_copy")
+            manifest_copy = _read_json(run_copy / "manifest.json")
+            self.assertNotIn("staging", manifest_copy)
+
+            run_ref = _run_ingest(export_dir, root / "staging_ref", "--staging-mode", "reference")
+            run_link = _run_ingest(export_dir, root / "staging_link", "--staging-mode", "hardlink")
+            for run_dir in (run_ref, run_link):
+                manifest = _read_json(run_dir / "manifest.json")
+                self.assertEqual(manifest["run_id"], manifest_copy["run_id"])
+                self.assertEqual(manifest["files"], manifest_copy["files"])
+                self.assertEqual(_read_json(run_dir / "layout.json"), _read_json(run_copy / "layout.json"))
+                verify_staged_sources(run_dir)
+
+            staged_xml = run_ref / "source" / "export.xml"
+            self.assertTrue(staged_xml.is_symlink())
+            self.assertEqual(staged_xml.resolve(), (export_dir / "export.xml").resolve())
+            self.assertEqual(_read_json(run_ref / "manifest.json")["staging"]["methods"], {"reference": 3})
+            # Hardlinks may fall back to copies on filesystems without link support.
+            linked = (run_link / "source" / "export.xml").stat().st_ino == (export_dir / "export.xml").stat().st_ino
+            self.assertEqual(linked, _read_json(run_link / "manifest.json")["staging"]["methods"].get("hardlink") == 3)
+
+            # Same size, different bytes: caught by the sha256 re-check once the mtime moves.
+            (export_dir / "export.xml").write_text(EXPORT_XML.replace('value="1"', 'value="9"'), encoding="utf-8")
+            with self.assertRaises(ValueError) as cm:
+                verify_staged_sources(run_ref)
+            self.assertNotIn(str(export_dir), str(cm.exception))
+            verify_staged_sources(run_copy)
+
+            # Re-staging a linked run dir (pipeline run_id override) replaces the links instead of writing through
+            # them to the original input.
+            other_dir = _make_unpacked_export(root / "other")
+            (other_dir / "export.xml").write_text(EXPORT_XML.replace("StepCount", "HeartRate"), encoding="utf-8")
+            ingest_to_staging(input_path=str(other_dir), staging_root=str(root / "staging_ref"), run_id_override=run_ref.name)
+            self.assertFalse(staged_xml.is_symlink())
+            self.assertIn("HeartRate", staged_xml.read_text(encoding="utf-8"))
+            self.assertNotIn("HeartRate", (export_dir / "export.xml").read_text(encoding="utf-8"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -251,5 +251,71 @@ class TestNdjsonExport(unittest.TestCase):
             self.assertTrue((out_share / "observations.ndjson").exists())
 
 
+    def test_interrupted_export_resumes_from_checkpoint_with_identical_output(self) -> None:
+        from unittest import mock
+
+        from healthdelta import ndjson_export
+        from healthdelta.ingest import ingest_to_staging
+
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            input_dir = root / "export_dir"
+            clinical_dir = input_dir / "clinical-records"
+            clinical_dir.mkdir(parents=True, exist_ok=True)
+            records = "".join(
+                f'  <Record type="HKQuantityTypeIdentifierStepCount" unit="count" value="{i % 37}" '
+                f'startDate="2020-01-{1 + i % 28:02d} 00:00:00 -0500" endDate="2020-01-01 00:01:00 -0500"/>\n'
+                for i in range(3000)
+            )
+            (input_dir / "export.xml").write_text(
+                '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE HealthData [\n<!-- comment in the DTD -->\n'
+                '<!ELEMENT HealthData (Record*)>\n]>\n<HealthData>\n' + records + "</HealthData>\n",
+                encoding="utf-8",
+            )
+            (input_dir / "export_cda.xml").write_text(EXPORT_CDA_XML, encoding="utf-8")
+            for i in range(40):
+                _write_json(clinical_dir / f"obs{i:02d}.json", {**FHIR_OBS, "id": f"o{i}"})
+            _write_json(clinical_dir / "doc.json", FHIR_DOC)
+            run_dir = ingest_to_staging(input_path=str(input_dir), staging_root=str(root / "staging"))
+
+            ndjson_export.export_ndjson(input_dir=str(run_dir), out_dir=str(root / "expected"), mode="local")
+
+            out_dir = root / "resumed"
+            spill = ndjson_export._SpilledRuns.spill
+            calls: list[object] = []
+
+            def spill_then_crash(self, buffers, *, position):  # type: ignore[no-untyped-def]
+                spill(self, buffers, position=position)
+                if len(calls) == 2:
+                    raise KeyboardInterrupt
+                calls.append(position)
+
+            with mock.patch.object(ndjson_export, "SPILL_ROWS", 500), mock.patch.object(
+                ndjson_export, "_XML_CHECKPOINT_BYTES", 4096
+            ):
+                with mock.patch.object(ndjson_export._SpilledRuns, "spill", spill_then_crash):
+                    with self.assertRaises(KeyboardInterrupt):
+                        ndjson_export.export_ndjson(input_dir=str(run_dir), out_dir=str(out_dir), mode="local")
+                checkpoint = json.loads((out_dir / ".export_checkpoint" / "checkpoint.json").read_text(encoding="utf-8"))
+                # Interrupted inside export.xml: the checkpoint is a byte offset into it.
+                self.assertEqual(checkpoint["position"][0], 0)
+                resumed_from = checkpoint["position"][1]
+
+                parse = ndjson_export._iterparse_checkpointed
+                resumes: list[object] = []
+
+                def spy(path, *, resume=None):  # type: ignore[no-untyped-def]
+                    resumes.append(resume)
+                    return parse(path, resume=resume)
+
+                with mock.patch.object(ndjson_export, "_iterparse_checkpointed", spy):
+                    ndjson_export.export_ndjson(input_dir=str(run_dir), out_dir=str(out_dir), mode="local")
+
+            self.assertEqual(resumes[0], resumed_from)
+            self.assertFalse((out_dir / ".export_checkpoint").exists())
+            for name in ("observations.ndjson", "documents.ndjson"):
+                self.assertEqual((out_dir / name).read_bytes(), (root / "expected" / name).read_bytes())
+
+
 if __name__ == "__main__":
     unittest.main()
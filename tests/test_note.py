@@ -150,6 +150,26 @@ class TestDoctorNote(unittest.TestCase):
             self.assertEqual(txt.read_bytes(), before_txt)
             self.assertEqual(md.read_bytes(), before_md)
 
+            # Raw-table aggregation (DB without load-time rollups) must produce the same note.
+            import duckdb
+
+            raw_db = root / "raw.duckdb"
+            con = duckdb.connect(str(raw_db))
+            try:
+                con.execute(f"ATTACH '{db_path}' AS src (READ_ONLY);")
+                con.execute("CREATE TABLE observations AS SELECT * FROM src.observations;")
+                con.execute("CREATE TABLE documents AS SELECT * FROM src.documents;")
+            finally:
+                con.close()
+            raw_out = root / "note_raw"
+            note3 = subprocess.run(
+                [sys.executable, "-m", "healthdelta", "note", "build", "--db", str(raw_db), "--out", str(raw_out)],
+                capture_output=True,
+                text=True,
+            )
+            self.assertEqual(note3.returncode, 0, msg=f"stdout={note3.stdout}\nstderr={note3.stderr}")
+            self.assertEqual((raw_out / "doctor_note.txt").read_bytes(), expected)
+
 
 if __name__ == "__main__":
     unittest.main()
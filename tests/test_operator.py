@@ -152,7 +152,7 @@ class TestOperatorAll(unittest.TestCase):
             # Identity is stored under state for stability across runs.
             identity_dir = base_out / "state" / "identity"
             self.assertTrue((identity_dir / "people.json").exists())
-            self.assertTrue((identity_dir / "aliases.json").exists())
+            self.assertTrue((identity_dir / "identity.sqlite").exists())
 
             ndjson_files = [
                 expected["ndjson"] / "observations.ndjson",
@@ -282,5 +282,175 @@ class TestOperatorAll(unittest.TestCase):
             self.assertNotIn("unresolved", ids1)
 
 
+    @unittest.skipUnless(_duckdb_available(), "duckdb not installed in this environment")
+    def test_run_all_resumes_interrupted_run_and_skips_completed_steps(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            input_dir = root / "export"
+            input_dir.mkdir(parents=True, exist_ok=True)
+            (input_dir / "export.xml").write_text(EXPORT_XML, encoding="utf-8")
+            (input_dir / "export_cda.xml").write_text(EXPORT_CDA, encoding="utf-8")
+
+            base_out = root / "out"
+            cmd = [sys.executable, "-m", "healthdelta", "run", "all", "--input", str(input_dir), "--out", str(base_out)]
+
+            run1 = subprocess.run([*cmd, "--jobs", "1"], capture_output=True, text=True)
+            self.assertEqual(run1.returncode, 0, msg=f"stdout={run1.stdout}\nstderr={run1.stderr}")
+            run_id = _stdout_kv(run1.stdout)["run_id"]
+            run_root = base_out / run_id
+            summary_1 = (run_root / "reports" / "summary.json").read_bytes()
+            note_1 = (run_root / "note" / "doctor_note.txt").read_bytes()
+
+            # Simulate a crash after DuckDB was built: later steps never completed.
+            journal_path = run_root / "operator_steps.json"
+            journal = json.loads(journal_path.read_text(encoding="utf-8"))
+            self.assertEqual(
+                sorted(journal["steps"]), ["deid", "duckdb", "export_ndjson", "identity", "note", "reports", "stage"]
+            )
+            for key in ["reports", "note"]:
+                del journal["steps"][key]
+            journal_path.write_text(json.dumps(journal), encoding="utf-8")
+            (run_root / "reports" / "summary.json").unlink()
+            (run_root / "note" / "doctor_note.txt").write_text("partial", encoding="utf-8")
+
+            run2 = subprocess.run([*cmd, "--progress", "always"], capture_output=True, text=True)
+            self.assertEqual(run2.returncode, 0, msg=f"stdout={run2.stdout}\nstderr={run2.stderr}")
+            kv2 = _stdout_kv(run2.stdout)
+            self.assertEqual(kv2.get("status"), "resumed")
+            self.assertEqual(kv2.get("run_id"), run_id)
+            self.assertIn("Stage input (up to date)", run2.stderr)
+            self.assertIn("Build DuckDB (up to date)", run2.stderr)
+            self.assertNotIn("staging dir already exists", run2.stderr)
+            self.assertEqual((run_root / "reports" / "summary.json").read_bytes(), summary_1)
+            self.assertEqual((run_root / "note" / "doctor_note.txt").read_bytes(), note_1)
+
+            # Once every step is complete, the same input is a no-op again.
+            run3 = subprocess.run(cmd, capture_output=True, text=True)
+            self.assertEqual(run3.returncode, 0, msg=f"stdout={run3.stdout}\nstderr={run3.stderr}")
+            self.assertEqual(_stdout_kv(run3.stdout).get("status"), "no_changes")
+
+    @unittest.skipUnless(_duckdb_available(), "duckdb not installed in this environment")
+    def test_run_all_continues_step_interrupted_while_running(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            input_dir = root / "export"
+            input_dir.mkdir(parents=True, exist_ok=True)
+            (input_dir / "export.xml").write_text(EXPORT_XML, encoding="utf-8")
+
+            base_out = root / "out"
+            cmd = [sys.executable, "-m", "healthdelta", "run", "all", "--input", str(input_dir), "--out", str(base_out)]
+            run1 = subprocess.run(cmd, capture_output=True, text=True)
+            self.assertEqual(run1.returncode, 0, msg=f"stdout={run1.stdout}\nstderr={run1.stderr}")
+            run_root = base_out / _stdout_kv(run1.stdout)["run_id"]
+            observations_1 = (run_root / "ndjson" / "observations.ndjson").read_bytes()
+
+            # Simulate a kill during NDJSON export: the journal still says "running" for it.
+            journal_path = run_root / "operator_steps.json"
+            journal = json.loads(journal_path.read_text(encoding="utf-8"))
+            journal["steps"]["export_ndjson"]["status"] = "running"
+            for key in ["duckdb", "reports", "note"]:
+                del journal["steps"][key]
+            journal_path.write_text(json.dumps(journal), encoding="utf-8")
+            (run_root / "ndjson" / "observations.ndjson").unlink()
+            (run_root / "ndjson" / "kept.txt").write_text("partial", encoding="utf-8")
+
+            run2 = subprocess.run([*cmd, "--progress", "always"], capture_output=True, text=True)
+            self.assertEqual(run2.returncode, 0, msg=f"stdout={run2.stdout}\nstderr={run2.stderr}")
+            self.assertEqual(_stdout_kv(run2.stdout).get("status"), "resumed")
+            self.assertIn("De-identify (up to date)", run2.stderr)
+            # A resumable step keeps its outputs (where its checkpoint lives) instead of starting from scratch.
+            self.assertTrue((run_root / "ndjson" / "kept.txt").exists())
+            self.assertEqual((run_root / "ndjson" / "observations.ndjson").read_bytes(), observations_1)
+            journal = json.loads(journal_path.read_text(encoding="utf-8"))
+            self.assertEqual({v["status"] for v in journal["steps"].values()}, {"completed"})
+
+    @unittest.skipUnless(_duckdb_available(), "duckdb not installed in this environment")
+    def test_run_all_sample_fraction_runs_marked_deterministic_subset(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            input_dir = root / "export"
+            input_dir.mkdir(parents=True, exist_ok=True)
+            records = "".join(
+                f'  <Record type="HKQuantityTypeIdentifierStepCount" unit="count" value="{i}" '
+                f'startDate="2020-01-01 00:{i // 60:02d}:{i % 60:02d} -0500"/>\n'
+                for i in range(400)
+            )
+            (input_dir / "export.xml").write_text(
+                f'<?xml version="1.0" encoding="UTF-8"?>\n<HealthData>\n{records}</HealthData>\n', encoding="utf-8"
+            )
+            clinical_dir = input_dir / "clinical-records"
+            _write_json(
+                clinical_dir / "patient.json",
+                {"resourceType": "Patient", "id": "p1", "name": [{"text": "Doe, John"}], "birthDate": "1980-01-02"},
+            )
+            for i in range(40):
+                _write_json(
+                    clinical_dir / f"obs-{i:02d}.json",
+                    {
+                        "resourceType": "Observation",
+                        "id": f"o{i}",
+                        "subject": {"reference": "Patient/p1"},
+                        "effectiveDateTime": f"2020-01-02T00:00:{i:02d}Z",
+                    },
+                )
+
+            base_out = root / "out"
+            cmd = [sys.executable, "-m", "healthdelta", "run", "all", "--input", str(input_dir), "--out", str(base_out)]
+
+            def rows(run_id: str) -> list[dict]:
+                text = (base_out / run_id / "ndjson" / "observations.ndjson").read_text(encoding="utf-8")
+                return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+            full = subprocess.run(cmd, capture_output=True, text=True)
+            self.assertEqual(full.returncode, 0, msg=f"stdout={full.stdout}\nstderr={full.stderr}")
+            full_id = _stdout_kv(full.stdout)["run_id"]
+            self.assertNotIn("sample_fraction", _stdout_kv(full.stdout))
+
+            sampled = subprocess.run([*cmd, "--sample-fraction", "0.25"], capture_output=True, text=True)
+            self.assertEqual(sampled.returncode, 0, msg=f"stdout={sampled.stdout}\nstderr={sampled.stderr}")
+            kv = _stdout_kv(sampled.stdout)
+            self.assertEqual((kv["status"], kv["sample_fraction"]), ("created", "0.25"))
+            sampled_id = kv["run_id"]
+            self.assertNotEqual(sampled_id, full_id)
+
+            def content(r: dict) -> tuple:
+                return (r["source"], r.get("value"), r.get("source_id"), r["event_time"])
+
+            full_rows = {content(r) for r in rows(full_id)}
+            sampled_rows = rows(sampled_id)
+            hk = [r for r in sampled_rows if r["source"] == "healthkit"]
+            fhir = [r for r in sampled_rows if r["source"] == "fhir"]
+            self.assertTrue({content(r) for r in sampled_rows} <= full_rows)
+            self.assertTrue(0 < len(hk) < 200)
+            self.assertTrue(0 < len(fhir) < 20)
+            self.assertTrue(all(int(r["event_key"][:8], 16) < 0.25 * 2**32 for r in hk))
+            # The Patient file is always kept, so people still resolve.
+            self.assertEqual({r["canonical_person_id"] for r in sampled_rows}, {r["canonical_person_id"] for r in rows(full_id)})
+
+            run_root = base_out / sampled_id
+            layout = json.loads((run_root / "staging" / "layout.json").read_text(encoding="utf-8"))
+            self.assertEqual(layout["sample_fraction"], 0.25)
+            self.assertIn("source/clinical/clinical-records/patient.json", layout["clinical_json"])
+            self.assertEqual(json.loads((run_root / "deid" / "layout.json").read_text(encoding="utf-8"))["sample_fraction"], 0.25)
+            self.assertTrue(json.loads((run_root / "ndjson" / "sample.json").read_text(encoding="utf-8"))["sampled"])
+            summary = json.loads((run_root / "reports" / "summary.json").read_text(encoding="utf-8"))
+            self.assertEqual(summary["sample"]["fraction"], 0.25)
+            self.assertIn("SAMPLED PREVIEW", (run_root / "reports" / "summary.md").read_text(encoding="utf-8"))
+            self.assertIn("SAMPLED PREVIEW", (run_root / "note" / "doctor_note.txt").read_text(encoding="utf-8"))
+            full_summary = json.loads((base_out / full_id / "reports" / "summary.json").read_text(encoding="utf-8"))
+            self.assertNotIn("sample", full_summary)
+            self.assertFalse((base_out / full_id / "ndjson" / "sample.json").exists())
+
+            # Same fraction again: the same run, already complete.
+            again = subprocess.run([*cmd, "--sample-fraction", "0.25"], capture_output=True, text=True)
+            kv_again = _stdout_kv(again.stdout)
+            self.assertEqual((kv_again["status"], kv_again["run_id"]), ("no_changes", sampled_id))
+
+            # A preview never becomes the last run: the full input is still unchanged against the full run.
+            rerun = subprocess.run(cmd, capture_output=True, text=True)
+            kv_rerun = _stdout_kv(rerun.stdout)
+            self.assertEqual((kv_rerun["status"], kv_rerun["run_id"]), ("no_changes", full_id))
+
+
 if __name__ == "__main__":
     unittest.main()
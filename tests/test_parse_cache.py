@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from healthdelta.parse_cache import _ParseCache
+
+
+class TestParseCache(unittest.TestCase):
+    def test_parses_each_file_once_and_detects_rewrites(self) -> None:
+        cache = _ParseCache()
+        with tempfile.TemporaryDirectory() as td:
+            p = Path(td) / "obs.json"
+            p.write_text(json.dumps({"resourceType": "Observation", "id": "o1"}), encoding="utf-8")
+
+            with mock.patch("healthdelta.parse_cache.json.loads", wraps=json.loads) as loads:
+                first = cache.load_json(p)
+                second = cache.load_json(p)
+                self.assertIs(first, second)
+                self.assertEqual(loads.call_count, 1)
+
+                p.write_text(json.dumps({"resourceType": "Observation", "id": "o2"}), encoding="utf-8")
+                os.utime(p, ns=(0, 0))
+                self.assertEqual(cache.load_json(p)["id"], "o2")
+                self.assertEqual(loads.call_count, 2)
+
+            # A file the caller just wrote from an object is served without parsing it back.
+            out = Path(td) / "deid.json"
+            obj = {"resourceType": "Observation", "id": "o3"}
+            out.write_text(json.dumps(obj), encoding="utf-8")
+            cache.remember(out, obj)
+            self.assertIs(cache.load_json(out), obj)
+
+            with self.assertRaises(json.JSONDecodeError):
+                bad = Path(td) / "bad.json"
+                bad.write_text("{", encoding="utf-8")
+                cache.load_json(bad)
+
+    def test_lru_budget_and_disk_cache_across_processes(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            files = []
+            for i in range(3):
+                p = root / f"f{i}.json"
+                p.write_text(json.dumps({"resourceType": "Observation", "id": f"o{i}", "pad": "x" * 100}), encoding="utf-8")
+                files.append(p)
+
+            cache = _ParseCache()
+            cache.configure(max_bytes=files[0].stat().st_size * 2, disk_dir=str(root / "cache"))
+            for p in files:
+                cache.load_json(p)
+            # Oldest entry evicted once the byte budget is exceeded.
+            self.assertEqual(len(cache._entries), 2)
+            self.assertNotIn(str(files[0].resolve()), cache._entries)
+
+            # A fresh process (new cache instance) finds the marshal copies keyed by sha256.
+            other = _ParseCache()
+            other.configure(disk_dir=str(root / "cache"))
+            with mock.patch("healthdelta.parse_cache.json.loads") as loads:
+                self.assertEqual([other.load_json(p)["id"] for p in files], ["o0", "o1", "o2"])
+                loads.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
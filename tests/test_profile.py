@@ -1,9 +1,16 @@
+import concurrent.futures
 import csv
+import functools
 import json
+import os
+import re
+import shutil
 import subprocess
 import sys
 import tempfile
 import unittest
+import zipfile
+from collections import Counter
 from pathlib import Path
 
 
@@ -152,6 +159,167 @@ class TestExportProfile(unittest.TestCase):
             for banned in ["John Doe", "1980-01-02", "19800102"]:
                 self.assertNotIn(banned, combined)
 
+    def test_export_profile_reads_export_zip_like_unpacked_dir(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            for fixture in (FIXTURE_DIR, FIXTURE_DIR_WRAPPED):
+                zip_path = root / f"{fixture.name}.zip"
+                with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+                    for p in sorted(fixture.rglob("*")):
+                        zf.write(p, p.relative_to(fixture).as_posix())
+
+                outs = {}
+                for kind, input_path in (("dir", fixture), ("zip", zip_path)):
+                    out = root / f"out_{fixture.name}_{kind}"
+                    cmd = [sys.executable, "-m", "healthdelta", "export", "profile", "--input", str(input_path), "--out", str(out)]
+                    r = subprocess.run(cmd, capture_output=True, text=True)
+                    self.assertEqual(r.returncode, 0, msg=f"stdout={r.stdout}\nstderr={r.stderr}")
+                    outs[kind] = out
+
+                prof_dir = json.loads((outs["dir"] / "profile.json").read_text(encoding="utf-8"))
+                prof_zip = json.loads((outs["zip"] / "profile.json").read_text(encoding="utf-8"))
+                self.assertEqual(prof_dir["input"]["kind"], "export_dir")
+                self.assertEqual(prof_zip["input"]["kind"], "export_zip")
+                # Same export root, file list (so profile_id) and counts; every clinical JSON file is scanned by default.
+                prof_dir.pop("input")
+                prof_zip.pop("input")
+                self.assertEqual(prof_zip, prof_dir)
+                self.assertEqual(
+                    prof_zip["summary"]["clinical_json_sampled_files"], prof_zip["summary"]["clinical_json_total_files"]
+                )
+                for csv_path in sorted(outs["dir"].glob("*.csv")):
+                    self.assertEqual((outs["zip"] / csv_path.name).read_bytes(), csv_path.read_bytes(), msg=csv_path.name)
+                self.assertIn("--input <export.zip>", (outs["zip"] / "profile.md").read_text(encoding="utf-8"))
+
+            fhir_rows = _read_csv(root / "out_profile_export_zip" / "clinical_resource_types.csv")
+            self.assertEqual(len(fhir_rows), 3)
+
+    def test_segmented_scan_counts_match_whole_file_scan(self) -> None:
+        from healthdelta import profile
+
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            types = ["HKQuantityTypeIdentifierStepCount", "HKQuantityTypeIdentifierHeartRate", "HKCategoryTypeIdentifierSleepAnalysis"]
+            lines = ['<?xml version="1.0" encoding="UTF-8"?>', "<HealthData>"]
+            for i in range(500):
+                lines.append(f' <Record type="{types[i % 3]}" sourceName="s" value="{i}">')
+                lines.append('  <MetadataEntry key="k" value="v"/>')
+                lines.append(" </Record>")
+            lines.append("</HealthData>")
+            (root / "export.xml").write_text("\n".join(lines) + "\n", encoding="utf-8")
+            data = (root / "export.xml").read_bytes()
+
+            src = profile._DirSource(root)
+            with concurrent.futures.ProcessPoolExecutor(max_workers=2) as pool:
+                # Segments of a few hundred bytes: many cuts land inside records.
+                bounds = profile._segment_bounds(root / "export.xml", segment_bytes=300)
+                self.assertGreater(len(bounds), 100)
+                self.assertTrue(all(data[start : start + 1] == b"<" for start, _ in bounds))
+                fn = functools.partial(profile._findall_counts, profile._CDA_TAG_RE)
+                counts = profile._scan_file(src, "export.xml", fn, Counter, task_name="t", pool=pool, segment_bytes=300)
+                self.assertEqual(counts, Counter(profile._CDA_TAG_RE.findall(data)))
+
+                whole = profile._record_stats(data, 0, len(data))
+                segmented = profile._scan_file(
+                    src, "export.xml", profile._record_stats, profile._RecordStats, task_name="t", pool=pool, segment_bytes=300
+                )
+                self.assertEqual(sorted(segmented.types), sorted(whole.types))
+                for t, st in whole.types.items():
+                    seg = segmented.types[t]
+                    self.assertEqual((seg.count, seg.units, seg.days), (st.count, st.units, st.days))
+                    self.assertEqual((seg.sizes.buckets, seg.sizes.min, seg.sizes.max), (st.sizes.buckets, st.sizes.min, st.sizes.max))
+
+            hk = {t: st.count for t, st in profile._scan_healthkit_records(src, "export.xml").items()}
+            self.assertEqual(hk, {t: (500 + 2 - i) // 3 for i, t in enumerate(types)})
+
+    def test_size_sketch_quantiles_are_close_to_exact(self) -> None:
+        from healthdelta import profile
+
+        sizes = [(i * 7919) % 5000 + 20 for i in range(20000)]
+        sketch = profile._SizeSketch()
+        halves = (profile._SizeSketch(), profile._SizeSketch())
+        for i, n in enumerate(sizes):
+            sketch.add(n)
+            halves[i % 2].add(n)
+        halves[0].update(halves[1])
+        exact = sorted(sizes)
+        self.assertEqual((sketch.min, sketch.max), (exact[0], exact[-1]))
+        for q in (0.5, 0.9, 0.99):
+            approx = sketch.quantile(q)
+            self.assertEqual(halves[0].quantile(q), approx)
+            true = exact[int(q * (len(exact) - 1))]
+            self.assertLessEqual(abs(approx - true), true / 16)
+
+    def test_type_stats_share_mode_has_no_dates_and_local_mode_adds_days(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            outs = {}
+            for mode in ("share", "local"):
+                out = Path(td) / mode
+                cmd = [sys.executable, "-m", "healthdelta", "export", "profile", "--input", str(FIXTURE_DIR), "--out", str(out)]
+                r = subprocess.run([*cmd, "--mode", mode], capture_output=True, text=True)
+                self.assertEqual(r.returncode, 0, msg=f"stdout={r.stdout}\nstderr={r.stderr}")
+                outs[mode] = out
+
+            prof = json.loads((outs["share"] / "profile.json").read_text(encoding="utf-8"))
+            self.assertEqual(prof["mode"], "share")
+            stats = {r["type"]: r for r in prof["healthkit_type_stats"]}
+            hr = stats["HKQuantityTypeIdentifierHeartRate"]
+            self.assertEqual(hr["count"], 2)
+            self.assertEqual(hr["units"], ["count/min"])
+            self.assertNotIn("first_start_day", hr)
+            self.assertGreaterEqual(hr["span_days"], hr["active_days"])
+            self.assertLessEqual(hr["record_bytes"]["min"], hr["record_bytes"]["p50"])
+            self.assertLessEqual(hr["record_bytes"]["p50"], hr["record_bytes"]["max"])
+            share_text = "".join(p.read_text(encoding="utf-8") for p in outs["share"].iterdir())
+            self.assertIsNone(re.search(r"\d{4}-\d{2}-\d{2}", share_text))
+
+            local = json.loads((outs["local"] / "profile.json").read_text(encoding="utf-8"))
+            local_hr = {r["type"]: r for r in local["healthkit_type_stats"]}["HKQuantityTypeIdentifierHeartRate"]
+            self.assertRegex(local_hr["first_start_day"], r"^\d{4}-\d{2}-\d{2}$")
+            self.assertLessEqual(local_hr["first_start_day"], local_hr["last_start_day"])
+            rows = _read_csv(outs["local"] / "healthkit_type_stats.csv")
+            self.assertIn("first_start_day", rows[0])
+    def test_profile_cache_skips_unchanged_sources_and_rescans_changed_ones(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            export_dir = Path(td) / "export"
+            shutil.copytree(FIXTURE_DIR, export_dir)
+            out = Path(td) / "out"
+            cmd = [sys.executable, "-m", "healthdelta", "export", "profile", "--input", str(export_dir), "--out", str(out)]
+
+            def profile_run(*extra: str) -> dict:
+                r = subprocess.run([*cmd, *extra], capture_output=True, text=True)
+                self.assertEqual(r.returncode, 0, msg=f"stdout={r.stdout}\nstderr={r.stderr}")
+                return json.loads((out / "profile.json").read_text(encoding="utf-8"))
+
+            def hk_types(prof: dict) -> set:
+                return {r["type"] for r in prof["healthkit_record_types"]}
+
+            first = profile_run()
+            self.assertTrue((out / ".profile_cache.json").exists())
+            before = {p.name: p.read_bytes() for p in out.iterdir()}
+            self.assertEqual(profile_run(), first)
+            self.assertEqual({p.name: p.read_bytes() for p in out.iterdir()}, before)
+
+            # Same size and mtime: the cached export.xml result stands (proof that it was not read again).
+            xml = export_dir / "export.xml"
+            st = xml.stat()
+            xml.write_bytes(xml.read_bytes().replace(b"HeartRate", b"HeartRatX"))
+            os.utime(xml, ns=(st.st_atime_ns, st.st_mtime_ns))
+            # A new clinical file is scanned (and changes profile_id) without rescanning export.xml.
+            (export_dir / "clinical-records" / "4_obs.json").write_text('{"resourceType": "Observation"}\n', encoding="utf-8")
+            second = profile_run()
+            self.assertNotEqual(second["profile_id"], first["profile_id"])
+            self.assertEqual(second["summary"]["clinical_json_total_files"], 4)
+            self.assertEqual(dict((r["resourceType"], r["count"]) for r in second["clinical_resource_types"])["Observation"], 2)
+            self.assertIn("HKQuantityTypeIdentifierHeartRate", hk_types(second))
+
+            # A new mtime invalidates the export.xml entry; --no-cache rescans regardless.
+            os.utime(xml, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+            self.assertIn("HKQuantityTypeIdentifierHeartRatX", hk_types(profile_run()))
+            xml.write_bytes(xml.read_bytes().replace(b"HeartRatX", b"HeartRatY"))
+            os.utime(xml, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+            self.assertIn("HKQuantityTypeIdentifierHeartRatY", hk_types(profile_run("--no-cache")))
+
 
 if __name__ == "__main__":
     unittest.main()
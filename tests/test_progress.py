@@ -186,11 +186,21 @@ class TestProgressImportCost(unittest.TestCase):
         import importlib
         import sys
 
-        sys.modules.pop("healthdelta.progress", None)
-        sys.modules.pop("rich", None)
-
-        importlib.import_module("healthdelta.progress")
-        self.assertNotIn("rich", sys.modules)
+        # Restore the originals afterwards: modules imported earlier hold the original progress object.
+        saved = {name: sys.modules.pop(name, None) for name in ("healthdelta.progress", "rich")}
+        try:
+            importlib.import_module("healthdelta.progress")
+            self.assertNotIn("rich", sys.modules)
+        finally:
+            for name, module in saved.items():
+                if module is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = module
+            if saved["healthdelta.progress"] is not None:
+                import healthdelta
+
+                healthdelta.progress = saved["healthdelta.progress"]
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 import csv
+import hashlib
 import json
 import subprocess
 import sys
@@ -134,6 +135,10 @@ class TestReports(unittest.TestCase):
             self.assertEqual(per_person["person-1"]["min_event_time"], "2020-01-01T01:02:03Z")
             self.assertEqual(per_person["person-1"]["max_event_time"], "2020-01-04T00:00:00Z")
 
+            # DB identity comes from the loader fingerprint; the full-file hash is opt-in.
+            self.assertRegex(summary["db"]["content_fingerprint"], r"^[0-9a-f]{64}$")
+            self.assertNotIn("sha256", summary["db"])
+
             by_source = _read_csv(out_dir / "coverage_by_source.csv")
             # Stable expectations: stream+source rows
             expected = {
@@ -183,6 +188,53 @@ class TestReports(unittest.TestCase):
             self.assertEqual((out_dir / "summary.json").read_bytes(), before_json)
             self.assertEqual((out_dir / "summary.md").read_bytes(), before_md)
 
+            # Thread count must not change any artifact bytes.
+            out_threads = root / "reports_threads"
+            run3 = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "healthdelta",
+                    "report",
+                    "build",
+                    "--db",
+                    str(db_path),
+                    "--out",
+                    str(out_threads),
+                    "--mode",
+                    "share",
+                    "--threads",
+                    "4",
+                ],
+                capture_output=True,
+                text=True,
+            )
+            self.assertEqual(run3.returncode, 0, msg=f"stdout={run3.stdout}\nstderr={run3.stderr}")
+            for p in expected_paths:
+                self.assertEqual((out_threads / p.name).read_bytes(), p.read_bytes(), msg=p.name)
+
+            out_hashed = root / "reports_hashed"
+            run4 = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "healthdelta",
+                    "report",
+                    "build",
+                    "--db",
+                    str(db_path),
+                    "--out",
+                    str(out_hashed),
+                    "--hash-db",
+                ],
+                capture_output=True,
+                text=True,
+            )
+            self.assertEqual(run4.returncode, 0, msg=f"stdout={run4.stdout}\nstderr={run4.stderr}")
+            hashed = json.loads((out_hashed / "summary.json").read_text(encoding="utf-8"))
+            self.assertEqual(hashed["db"]["sha256"], hashlib.sha256(db_path.read_bytes()).hexdigest())
+            self.assertEqual(hashed["db"]["content_fingerprint"], summary["db"]["content_fingerprint"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -124,6 +124,188 @@ class TestShareBundle(unittest.TestCase):
             v = subprocess.run([sys.executable, "-m", "healthdelta", "share", "verify", "--bundle", str(bundle)], capture_output=True, text=True)
             self.assertNotEqual(v.returncode, 0)
 
+    def test_delta_bundle_contains_only_changes_and_applies_onto_base(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            base_out = root / "out"
+
+            old_root = base_out / "run_old"
+            _write(old_root / "ndjson" / "observations.ndjson", '{"a":1}\n')
+            _write(old_root / "ndjson" / "documents.ndjson", '{"d":1}\n')
+            _write(old_root / "reports" / "summary.json", '{"v":1}\n')
+            _write(old_root / "note" / "doctor_note.txt", "HealthDelta Summary\n")
+
+            new_root = base_out / "run_new"
+            _write(new_root / "ndjson" / "observations.ndjson", '{"a":1}\n')
+            _write(new_root / "ndjson" / "documents.ndjson", '{"d":1}\n')
+            _write(new_root / "reports" / "summary.json", '{"v":2}\n')
+            _write(new_root / "reports" / "summary.md", "# Summary\n")
+
+            def hd(*args: str) -> subprocess.CompletedProcess:
+                return subprocess.run([sys.executable, "-m", "healthdelta", *args], capture_output=True, text=True)
+
+            full_old = root / "old.tar.gz"
+            r = hd("share", "bundle", "--run", str(old_root), "--out", str(full_old))
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            with tarfile.open(full_old, mode="r:gz") as tf:
+                base_manifest = root / "old_manifest.csv"
+                base_manifest.write_bytes(tf.extractfile("run_old/registry/bundle_manifest.csv").read())
+
+            full_new = root / "new.tar.gz"
+            delta = root / "delta.tar.gz"
+            r = hd("share", "bundle", "--run", str(new_root), "--out", str(full_new))
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            r = hd("share", "bundle", "--run", str(new_root), "--out", str(delta), "--base", str(base_manifest))
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+
+            v = hd("share", "verify", "--bundle", str(delta))
+            self.assertEqual(v.returncode, 0, msg=v.stderr)
+
+            with tarfile.open(delta, mode="r:gz") as tf:
+                files = sorted(m.name for m in tf.getmembers() if m.isfile())
+                delta_obj = json.loads(tf.extractfile("run_new/registry/delta_manifest.json").read().decode("utf-8"))
+                delta_manifest = tf.extractfile("run_new/registry/bundle_manifest.csv").read()
+            with tarfile.open(full_new, mode="r:gz") as tf:
+                full_manifest = tf.extractfile("run_new/registry/bundle_manifest.csv").read()
+
+            self.assertEqual(
+                files,
+                [
+                    "run_new/registry/bundle_manifest.csv",
+                    "run_new/registry/delta_manifest.json",
+                    "run_new/registry/run_entry.json",
+                    "run_new/reports/summary.json",
+                    "run_new/reports/summary.md",
+                ],
+            )
+            self.assertEqual(delta_obj["base_run_id"], "run_old")
+            self.assertEqual(delta_obj["added"], ["reports/summary.md"])
+            self.assertEqual(delta_obj["modified"], ["reports/summary.json"])
+            self.assertEqual(delta_obj["deleted"], ["note/doctor_note.txt"])
+            self.assertEqual(delta_manifest, full_manifest)
+
+            # Applying without the base fails; applying onto the previous bundle rebuilds the full tree.
+            r = hd("share", "apply", "--bundle", str(delta), "--out", str(root / "applied_nobase"))
+            self.assertNotEqual(r.returncode, 0)
+
+            applied = root / "applied"
+            r = hd("share", "apply", "--bundle", str(delta), "--out", str(applied), "--base", str(full_old))
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            self.assertEqual((applied / "run_new" / "ndjson" / "observations.ndjson").read_text(encoding="utf-8"), '{"a":1}\n')
+            self.assertEqual((applied / "run_new" / "reports" / "summary.json").read_text(encoding="utf-8"), '{"v":2}\n')
+            self.assertFalse((applied / "run_new" / "note").exists())
+            self.assertEqual((applied / "run_new" / "registry" / "bundle_manifest.csv").read_bytes(), full_manifest)
+
+            # An indexed base is read by byte range and gives the same tree.
+            indexed_old = root / "old_indexed.tar.gz"
+            r = hd("share", "bundle", "--run", str(old_root), "--out", str(indexed_old), "--format", "indexed")
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            applied_idx = root / "applied_idx"
+            r = hd("share", "apply", "--bundle", str(delta), "--out", str(applied_idx), "--base", str(indexed_old))
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            for rel in ["ndjson/observations.ndjson", "ndjson/documents.ndjson", "reports/summary.json"]:
+                self.assertEqual((applied_idx / "run_new" / rel).read_bytes(), (applied / "run_new" / rel).read_bytes())
+
+            # A delta bundle is not a usable base (it lacks its unchanged files): rejected before writing anything.
+            newer_root = base_out / "run_newer"
+            _write(newer_root / "ndjson" / "observations.ndjson", '{"a":1}\n')
+            _write(newer_root / "reports" / "summary.json", '{"v":3}\n')
+            new_manifest = root / "new_manifest.csv"
+            new_manifest.write_bytes(full_manifest)
+            delta2 = root / "delta2.tar.gz"
+            r = hd("share", "bundle", "--run", str(newer_root), "--out", str(delta2), "--base", str(new_manifest))
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            r = hd("share", "apply", "--bundle", str(delta2), "--out", str(root / "applied_on_delta"), "--base", str(delta))
+            self.assertNotEqual(r.returncode, 0)
+            self.assertIn("--base is a delta bundle", r.stderr)
+            self.assertFalse((root / "applied_on_delta").exists())
+
+            # A corrupted base is rejected against the target manifest.
+            base_dir = root / "base_tree"
+            r = hd("share", "apply", "--bundle", str(full_old), "--out", str(base_dir))
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            _write(base_dir / "run_old" / "ndjson" / "observations.ndjson", '{"a":"tampered"}\n')
+            r = hd("share", "apply", "--bundle", str(delta), "--out", str(root / "applied_bad"), "--base", str(base_dir))
+            self.assertNotEqual(r.returncode, 0)
+            self.assertIn("observations.ndjson", r.stderr)
+            self.assertFalse((root / "applied_bad" / "run_new").exists())
+
+    def test_indexed_bundle_supports_single_file_extract_and_passes_verify(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            run_root = root / "out" / "run_idx"
+            _write(run_root / "ndjson" / "observations.ndjson", '{"a":1}\n' * 500)
+            _write(run_root / "duckdb" / "run.duckdb", "DUCKDB_BYTES")
+            _write(run_root / "reports" / "summary.json", '{"v":1}\n')
+
+            def hd(*args: str) -> subprocess.CompletedProcess:
+                return subprocess.run([sys.executable, "-m", "healthdelta", *args], capture_output=True, text=True)
+
+            plain = root / "plain.tar.gz"
+            idx1 = root / "idx1.tar.gz"
+            idx2 = root / "idx2.tar.gz"
+            self.assertEqual(hd("share", "bundle", "--run", str(run_root), "--out", str(plain)).returncode, 0)
+            for out in [idx1, idx2]:
+                r = hd("share", "bundle", "--run", str(run_root), "--out", str(out), "--format", "indexed")
+                self.assertEqual(r.returncode, 0, msg=r.stderr)
+            self.assertEqual(idx1.read_bytes(), idx2.read_bytes())
+
+            v = hd("share", "verify", "--bundle", str(idx1))
+            self.assertEqual(v.returncode, 0, msg=v.stderr)
+
+            with tarfile.open(plain, mode="r:gz") as tf:
+                plain_names = tf.getnames()
+                plain_manifest = tf.extractfile("run_idx/registry/bundle_manifest.csv").read()
+            with tarfile.open(idx1, mode="r:gz") as tf:
+                idx_names = tf.getnames()
+                idx_manifest = tf.extractfile("run_idx/registry/bundle_manifest.csv").read()
+            self.assertEqual(sorted(idx_names), sorted([*plain_names, "run_idx/registry/bundle_index.csv"]))
+            self.assertEqual(idx_manifest, plain_manifest)
+
+            for bundle in [idx1, plain]:
+                out_file = root / f"summary_{bundle.stem}.json"
+                r = hd("share", "extract", "--bundle", str(bundle), "--path", "reports/summary.json", "--out", str(out_file))
+                self.assertEqual(r.returncode, 0, msg=r.stderr)
+                self.assertEqual(out_file.read_text(encoding="utf-8"), '{"v":1}\n')
+
+            r = hd("share", "extract", "--bundle", str(idx1), "--path", "reports/missing.json", "--out", str(root / "x"))
+            self.assertNotEqual(r.returncode, 0)
+
+            # Tampering with the indexed file payload is caught by the single-file extract.
+            data = bytearray(idx1.read_bytes())
+            with tarfile.open(idx1, mode="r:gz") as tf:
+                index_text = tf.extractfile("run_idx/registry/bundle_index.csv").read().decode("utf-8")
+            row = next(ln for ln in index_text.splitlines() if ln.startswith("run_idx/reports/summary.json,"))
+            _, offset, length = row.split(",")
+            data[int(offset) + int(length) - 12] ^= 0xFF
+            tampered = root / "tampered.tar.gz"
+            tampered.write_bytes(bytes(data))
+            r = hd("share", "extract", "--bundle", str(tampered), "--path", "reports/summary.json", "--out", str(root / "t.json"))
+            self.assertNotEqual(r.returncode, 0)
+            self.assertNotIn("Traceback", r.stderr)
+            self.assertFalse((root / "t.json").exists())
+
+            # An index row pointing at another member's gzip range is caught by verify (path sets still match).
+            from healthdelta import share_bundle as sb
+
+            rows = [ln.split(",") for ln in index_text.splitlines()[1:]]
+            ranges = {path: (offset, length) for path, offset, length in rows}
+            obs_range = ranges["run_idx/ndjson/observations.ndjson"]
+            swapped = [[r[0], *obs_range] if r[0] == "run_idx/reports/summary.json" else r for r in rows]
+            index_bytes = ("path,offset,length\n" + "".join(",".join(r) + "\n" for r in swapped)).encode("utf-8")
+            locator_offset, _ = sb._read_locator(idx1)
+            bad_offset = root / "bad_offset.tar.gz"
+            with bad_offset.open("wb") as raw:
+                raw.write(idx1.read_bytes()[:locator_offset])
+                member = sb._GzipMemberWriter(raw)
+                member.write(sb._tar_header_bytes(sb._tarinfo_file("run_idx/registry/bundle_index.csv", len(index_bytes))))
+                member.write(index_bytes)
+                member.write(sb._tar_padding(len(index_bytes)))
+                member.write(b"\0" * (2 * tarfile.BLOCKSIZE))
+                raw.write(sb._locator_member_bytes(member.offset, member.close()))
+            v = hd("share", "verify", "--bundle", str(bad_offset))
+            self.assertNotEqual(v.returncode, 0)
+            self.assertIn("bundle index points at the wrong member: run_idx/reports/summary.json", v.stderr)
 
 
 if __name__ == "__main__":